@@ -1,9 +1,15 @@
+import asyncio
+import base64
+import binascii
 import os
 import json
-from typing import List, Dict, Any
+import logging
+import threading
+import time
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 
 from .base import BaseAgent
-from ..schemas.models import CasePayload, AgentResponse
+from ..schemas.models import CasePayload, AgentResponse, EmbeddingData
 
 try:
     import numpy as np
@@ -12,73 +18,318 @@ try:
 except Exception:
     FAISS_AVAILABLE = False
 
-INFRA_DIR = os.path.join("infra")
-INDEX_PATH = os.path.join(INFRA_DIR, "faiss_index.bin")
-META_PATH = os.path.join(INFRA_DIR, "faiss_meta.jsonl")
+logger = logging.getLogger(__name__)
 
-class RetrieverAgent(BaseAgent):
-    @property
-    def name(self) -> str:
-        return "RetrieverAgent"
+INFRA_DIR = os.environ.get("RETRIEVER_INFRA_DIR", os.path.join("infra"))
+INDEX_FILE = "faiss_index.bin"
+META_FILE = "faiss_meta.jsonl"
+# float32 rows added since the last checkpoint of faiss_index.bin (replayed on load),
+# after an int64 header: the id of the log's first row
+VECTOR_LOG_FILE = "faiss_vectors.log"
+_LOG_HEADER = np.dtype("<i8") if FAISS_AVAILABLE else None
 
-    @property
-    def role(self) -> str:
-        return "Retrieval Agent (MiniLM / bge-small): Lightweight semantic recall for de-identified reference examples."
+# flat | ivf | hnsw | auto (flat below AUTO_IVF_MIN_VECTORS, IVF above)
+INDEX_TYPE = os.getenv("RETRIEVER_INDEX_TYPE", "auto")
+AUTO_IVF_MIN_VECTORS = 10_000
+NPROBE = int(os.getenv("RETRIEVER_NPROBE", "16"))
+EF_SEARCH = int(os.getenv("RETRIEVER_EF_SEARCH", "64"))
+# Rewrite faiss_index.bin (and clear the vector log) after this many appended rows
+CHECKPOINT_ROWS = int(os.getenv("RETRIEVER_CHECKPOINT_ROWS", "10000"))
+RELOAD_CHECK_S = float(os.getenv("RETRIEVER_RELOAD_CHECK_S", "5"))
+TOP_K = 3
 
-    def _ensure_infra(self):
-        os.makedirs(INFRA_DIR, exist_ok=True)
 
-    def _load_index(self, dim: int):
-        if not FAISS_AVAILABLE:
-            return None, []
-        if os.path.exists(INDEX_PATH) and os.path.getsize(INDEX_PATH) > 0:
-            index = faiss.read_index(INDEX_PATH)
-        else:
-            index = faiss.IndexFlatIP(dim)
-        meta: List[Dict[str, Any]] = []
-        if os.path.exists(META_PATH):
-            with open(META_PATH, "r", encoding="utf-8") as fh:
+def _file_sig(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def index_spec(kind: str, n_vectors: int) -> str:
+    """faiss.index_factory spec for an index type; `auto` picks by corpus size."""
+    if kind == "auto":
+        kind = "ivf" if n_vectors >= AUTO_IVF_MIN_VECTORS else "flat"
+    if kind == "flat":
+        return "Flat"
+    if kind == "ivf":
+        # ~4*sqrt(n) lists, at least 39 training points per list
+        nlist = max(1, min(int(4 * n_vectors ** 0.5), n_vectors // 39))
+        return f"IVF{nlist},Flat"
+    if kind == "hnsw":
+        return "HNSW32"
+    raise ValueError(f"Unknown retriever index type: {kind}")
+
+
+def decode_embedding(emb: EmbeddingData) -> Optional["np.ndarray"]:
+    """Zero-copy float32 view of a b64 embedding, shaped (rows, dim); None if it is not a real vector."""
+    try:
+        raw = base64.b64decode(emb.b64, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    if not raw or len(raw) % 4:
+        return None
+    arr = np.frombuffer(raw, dtype=np.float32)
+    dim = emb.shape[-1] if emb.shape else arr.size
+    if dim <= 0 or arr.size % dim:
+        return None
+    return arr.reshape(-1, dim)
+
+
+class ReferenceIndex:
+    """
+    Resident FAISS index + metadata for RetrieverAgent, loaded once per process.
+
+    On disk: faiss_index.bin (checkpoint), faiss_meta.jsonl (append-only, row i
+    describes vector i) and faiss_vectors.log (float32 rows added since the
+    checkpoint, replayed on load from the first id the checkpoint lacks).
+    add() only appends; the index file is rewritten by checkpoint(). Files
+    are only ever replaced whole (os.replace), never rewritten in place, and
+    files replaced by an offline rebuild are picked up on the next change check.
+    """
+
+    def __init__(self, infra_dir: str = INFRA_DIR, check_interval_s: float = RELOAD_CHECK_S):
+        self.infra_dir = infra_dir
+        self.index_path = os.path.join(infra_dir, INDEX_FILE)
+        self.meta_path = os.path.join(infra_dir, META_FILE)
+        self.vector_log_path = os.path.join(infra_dir, VECTOR_LOG_FILE)
+        self.check_interval_s = check_interval_s
+        self._lock = threading.RLock()
+        self._index = None
+        self._meta: List[Optional[Dict[str, Any]]] = []
+        self._logged_rows = 0
+        self._sig: Optional[tuple] = None
+        self._next_check = 0.0
+
+    def _signature(self) -> tuple:
+        return (_file_sig(self.index_path), _file_sig(self.meta_path), _file_sig(self.vector_log_path))
+
+    def _load(self) -> None:
+        self._index, self._meta, self._logged_rows = None, [], 0
+        if not os.path.exists(self.index_path) or os.path.getsize(self.index_path) == 0:
+            return
+        try:
+            index = faiss.read_index(self.index_path)
+        except Exception:
+            return
+        rows = self._read_log(index)
+        if len(rows):
+            index.add(rows)
+        self._logged_rows = len(rows)
+        meta: List[Optional[Dict[str, Any]]] = []
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as fh:
                 for line in fh:
                     try:
                         meta.append(json.loads(line))
                     except Exception:
-                        continue
-        return index, meta
+                        meta.append(None)
+        if len(meta) < index.ntotal:
+            # Vectors were logged but their metadata write did not land; keep rows aligned
+            missing = index.ntotal - len(meta)
+            with open(self.meta_path, "a", encoding="utf-8") as fh:
+                fh.write("null\n" * missing)
+            meta.extend([None] * missing)
+        elif len(meta) > index.ntotal:
+            # Metadata for vectors that never reached the index
+            meta = meta[: index.ntotal]
+            _replace_file(self.meta_path, "".join(json.dumps(m) + "\n" for m in meta).encode("utf-8"))
+        _tune(index)
+        self._index, self._meta = index, meta
+
+    def _read_log(self, index) -> "np.ndarray":
+        """Logged rows the checkpointed index does not contain yet."""
+        try:
+            raw = np.fromfile(self.vector_log_path, dtype=np.uint8)
+        except OSError:
+            return np.zeros((0, index.d), dtype=np.float32)
+        if raw.size < _LOG_HEADER.itemsize:
+            return np.zeros((0, index.d), dtype=np.float32)
+        first_id = int(raw[: _LOG_HEADER.itemsize].view(_LOG_HEADER)[0])
+        body = raw[_LOG_HEADER.itemsize:]
+        rows = body[: body.size - body.size % (4 * index.d)].view(np.float32).reshape(-1, index.d)
+        # A crash between checkpoint()'s index swap and its log reset leaves rows
+        # that are already in the index; skip them
+        skip = index.ntotal - first_id
+        if skip < 0:
+            logger.warning("Vector log starts at row %d but the index has %d; ignoring it", first_id, index.ntotal)
+            return np.zeros((0, index.d), dtype=np.float32)
+        return rows[skip:]
 
-    def _persist(self, index, meta: List[Dict[str, Any]]):
-        if not FAISS_AVAILABLE:
+    def _reset_log(self, first_id: int) -> None:
+        _replace_file(self.vector_log_path, np.array([first_id], dtype=_LOG_HEADER).tobytes())
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
             return
-        faiss.write_index(index, INDEX_PATH)
-        with open(META_PATH, "w", encoding="utf-8") as fh:
-            for m in meta:
-                fh.write(json.dumps(m) + "\n")
+        with self._lock:
+            sig = self._signature()
+            if sig != self._sig:
+                self._load()
+                self._sig = self._signature()
+            self._next_check = now + self.check_interval_s
+
+    @property
+    def ntotal(self) -> int:
+        self._refresh()
+        return 0 if self._index is None else int(self._index.ntotal)
+
+    @property
+    def dim(self) -> Optional[int]:
+        self._refresh()
+        return None if self._index is None else int(self._index.d)
+
+    def search(self, queries: "np.ndarray", k: int = TOP_K) -> List[Dict[str, Any]]:
+        """Top-k references over all query rows (best score per reference)."""
+        self._refresh()
+        with self._lock:
+            index, meta = self._index, self._meta
+            if index is None or index.ntotal == 0 or not meta:
+                return []
+            q = np.array(queries, dtype=np.float32, ndmin=2)  # copy: normalize_L2 is in-place
+            if q.shape[1] != index.d:
+                return []
+            faiss.normalize_L2(q)
+            scores, ids = index.search(q, min(k, index.ntotal))
+        best: Dict[int, float] = {}
+        for s, i in zip(scores.ravel(), ids.ravel()):
+            if 0 <= i < len(meta) and meta[i] is not None and s > best.get(int(i), -np.inf):
+                best[int(i)] = float(s)
+        examples = []
+        for i, s in sorted(best.items(), key=lambda kv: -kv[1])[:k]:
+            item = dict(meta[i])
+            item["_score"] = s
+            examples.append(item)
+        return examples
+
+    def add(self, vectors: "np.ndarray", metas: Sequence[Dict[str, Any]], kind: str = INDEX_TYPE) -> None:
+        """Append reference vectors + metadata (vector log first, then metadata)."""
+        vecs = np.array(vectors, dtype=np.float32, ndmin=2)
+        if len(vecs) != len(metas):
+            raise ValueError("vectors and metas must have the same length")
+        faiss.normalize_L2(vecs)
+        self._refresh()
+        with self._lock:
+            os.makedirs(self.infra_dir, exist_ok=True)
+            if self._index is None:
+                index = faiss.index_factory(vecs.shape[1], index_spec(kind, len(vecs)), faiss.METRIC_INNER_PRODUCT)
+                if not index.is_trained:
+                    index.train(vecs)
+                index.add(vecs)
+                _tune(index)
+                self._index, self._meta = index, []
+                # Index first: a crash before the metadata lands leaves rows that load() pads
+                self.checkpoint()
+                self._write_meta(metas)
+                self._sig = self._signature()
+                return
+            if vecs.shape[1] != self._index.d:
+                raise ValueError(f"Expected {self._index.d}-dim vectors, got {vecs.shape[1]}")
+            if not os.path.exists(self.vector_log_path):
+                # e.g. the index was rebuilt offline and the log removed
+                self._reset_log(int(self._index.ntotal))
+            with open(self.vector_log_path, "ab") as fh:
+                fh.write(vecs.tobytes())
+            self._index.add(vecs)
+            self._logged_rows += len(vecs)
+            self._write_meta(metas)
+            if self._logged_rows >= CHECKPOINT_ROWS:
+                self.checkpoint()
+            else:
+                self._sig = self._signature()
+
+    def _write_meta(self, metas: Sequence[Dict[str, Any]]) -> None:
+        with open(self.meta_path, "a", encoding="utf-8") as fh:
+            fh.write("".join(json.dumps(m) + "\n" for m in metas))
+        self._meta.extend(dict(m) for m in metas)
+
+    def checkpoint(self) -> None:
+        """Write the full index atomically and clear the vector log."""
+        with self._lock:
+            if self._index is None:
+                return
+            tmp = self.index_path + ".tmp"
+            faiss.write_index(self._index, tmp)
+            os.replace(tmp, self.index_path)
+            # The old log stays valid until this lands: its rows are skipped by id
+            self._reset_log(int(self._index.ntotal))
+            self._logged_rows = 0
+            self._sig = self._signature()
+
+
+def _replace_file(path: str, data: bytes) -> None:
+    """Write via a temp file and os.replace, so readers never see a truncated file."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def _tune(index) -> None:
+    """Search-time knobs for approximate indexes."""
+    try:
+        faiss.extract_index_ivf(index).nprobe = NPROBE
+    except Exception:
+        pass
+    hnsw = getattr(index, "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = EF_SEARCH
+
+
+_reference_index: Optional[ReferenceIndex] = None
+_reference_index_lock = threading.Lock()
+
+
+def get_reference_index() -> ReferenceIndex:
+    """Process-wide ReferenceIndex singleton."""
+    global _reference_index
+    if _reference_index is None:
+        with _reference_index_lock:
+            if _reference_index is None:
+                _reference_index = ReferenceIndex()
+    return _reference_index
+
+
+class RetrieverAgent(BaseAgent):
+    def __init__(self, index: Optional[ReferenceIndex] = None):
+        self._index = index
+
+    @property
+    def name(self) -> str:
+        return "RetrieverAgent"
+
+    @property
+    def role(self) -> str:
+        return "Retrieval Agent (MiniLM / bge-small): Lightweight semantic recall for de-identified reference examples."
+
+    @property
+    def index(self) -> ReferenceIndex:
+        if self._index is None:
+            self._index = get_reference_index()
+        return self._index
 
     async def process(self, payload: CasePayload) -> AgentResponse:
         # MiniLM / bge-small based retrieval
         # Role: Retrieve de-identified reference examples to provide contextual grounding (not evidence)
-        
-        self._ensure_infra()
+
         if not payload.embeddings:
             return AgentResponse(success=True, data={"examples": []}, log_entry="Retrieval Agent: No embeddings to retrieve against.")
 
-        # MedSigLIP embeddings are 768-dim
-        dim = 768
-        
         if FAISS_AVAILABLE:
-            # Real implementation would decode b64 -> np.float32 array
-            query = np.zeros((1, dim), dtype="float32")
-            index, meta = self._load_index(dim)
-            if index is None or index.ntotal == 0 or not meta:
+            index = self.index
+            if index.ntotal == 0:
                 return AgentResponse(success=True, data={"examples": []}, log_entry="Retrieval Agent: Index empty (MiniLM/bge-small mock).")
-            
-            D, I = index.search(query, 3)
-            examples: List[Dict[str, Any]] = []
-            for scores, idxs in zip(D, I):
-                for s, i in zip(scores, idxs):
-                    if 0 <= i < len(meta):
-                        item = dict(meta[i])
-                        item["_score"] = float(s)
-                        examples.append(item)
+
+            rows = [decode_embedding(e) for e in payload.embeddings]
+            rows = [r for r in rows if r is not None and r.shape[1] == index.dim]
+            if not rows:
+                return AgentResponse(success=True, data={"examples": []}, log_entry=f"Retrieval Agent: No decodable {index.dim}-dim embeddings for this case.")
+
+            query = rows[0] if len(rows) == 1 else np.concatenate(rows)
+            # Off the event loop: IVF/HNSW searches on large corpora are not free
+            examples = await asyncio.to_thread(index.search, query, TOP_K)
             return AgentResponse(success=True, data={"examples": examples}, log_entry=f"Retrieval Agent: Found {len(examples)} de-identified examples.")
         else:
             # Fallback mock examples
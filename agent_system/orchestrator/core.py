@@ -1,5 +1,7 @@
+import asyncio
+import os
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from ..schemas.models import CasePayload, AgentResponse, MedGemmaOutput, EmbeddingData, ParentCommunicationOutput, EdgeOutput
 from ..agents.base import BaseAgent
 from ..agents.intake_agent import IntakeAgent
@@ -13,6 +15,37 @@ from ..agents.retriever_agent import RetrieverAgent
 from ..agents.audit_agent import AuditAgent
 from ..agents.parent_communication_agent import ParentCommunicationAgent
 from ..agents.edge_agent import EdgeAgent
+from .graph import AgentNode, NodeRun, critical_path, run_graph, validate_graph
+
+AGENT_TIMEOUT_S = float(os.getenv("AGENT_TIMEOUT_S", "30"))
+MEDGEMMA_AGENT_TIMEOUT_S = float(os.getenv("MEDGEMMA_AGENT_TIMEOUT_S", "60"))
+
+# Workflow as a dependency graph (declaration order is a topological order).
+# Temporal, VisionQA and Retriever only read the embeddings, so they run concurrently.
+WORKFLOW: List[AgentNode] = [
+    AgentNode("intake", timeout_s=AGENT_TIMEOUT_S),
+    # Edge / local processing is a fallback/enhancement: failure does not stop the case
+    AgentNode("edge", ("intake",), timeout_s=AGENT_TIMEOUT_S, optional=True),
+    AgentNode("embedding", ("edge",), timeout_s=AGENT_TIMEOUT_S),
+    AgentNode("temporal", ("embedding",), timeout_s=AGENT_TIMEOUT_S),
+    AgentNode("vision_qa", ("embedding",), timeout_s=AGENT_TIMEOUT_S),
+    AgentNode("retriever", ("embedding",), timeout_s=AGENT_TIMEOUT_S),
+    AgentNode("medgemma", ("temporal", "vision_qa", "retriever"), timeout_s=MEDGEMMA_AGENT_TIMEOUT_S),
+    AgentNode("safety", ("medgemma",), timeout_s=AGENT_TIMEOUT_S),
+    # Only runs if approved by Safety
+    AgentNode("parent_comm", ("safety",), timeout_s=AGENT_TIMEOUT_S),
+]
+
+# Sinks run after the workflow (also after a safety failure).
+# Audit snapshots payload.metrics and logs, so it waits for Metrics to commit.
+SINKS: List[AgentNode] = [
+    AgentNode("metrics", timeout_s=AGENT_TIMEOUT_S),
+    AgentNode("audit", ("metrics",), timeout_s=AGENT_TIMEOUT_S),
+]
+
+validate_graph(WORKFLOW)
+validate_graph(SINKS)
+
 
 class CentralOrchestrator:
     def __init__(self):
@@ -29,71 +62,92 @@ class CentralOrchestrator:
             "metrics": MetricsAgent(),
             "audit": AuditAgent(),
         }
+        missing = [n.key for n in WORKFLOW + SINKS if n.key not in self.agents]
+        if missing:
+            raise ValueError(f"Workflow agents {missing} are not registered")
 
     async def run_workflow(self, payload: CasePayload) -> CasePayload:
         start_time = datetime.utcnow()
         payload.status = "processing"
-        
-        # 1. Intake
-        await self._call_agent("intake", payload)
-        if payload.status == "failed": return payload
-        
-        # 2. Edge / Local Processing (Optional Offline/Privacy step)
-        await self._call_agent("edge", payload)
-        # We don't fail here, it's a fallback/enhancement
-        
-        # 3. Embedding (Vision Encoding Agent - MedSigLIP)
-        await self._call_agent("embedding", payload)
-        if payload.status == "failed": return payload
-        
-        # 4. Temporal Analysis (Temporal Pattern Agent)
-        await self._call_agent("temporal", payload)
-        if payload.status == "failed": return payload
-
-        # 5. Vision QA (Secondary features)
-        await self._call_agent("vision_qa", payload)
-        if payload.status == "failed": return payload
-
-        # 6. Retriever (Retrieval Agent - MiniLM/bge-small)
-        await self._call_agent("retriever", payload)
-        if payload.status == "failed": return payload
-        
-        # 7. MedGemma Reasoning (Clinical Reasoning Agent)
-        await self._call_agent("medgemma", payload)
-        if payload.status == "failed": return payload
-        
-        # 8. Safety Guardrails (Safety & Compliance Agent - Rules + NLI)
-        await self._call_agent("safety", payload)
-        if payload.status == "failed": 
-            # On safety failure, we still audit and return
+
+        runs, failed = await self._run_graph(WORKFLOW, payload)
+        self._record_latency(payload, WORKFLOW, runs)
+        if failed == "safety":
+            # On safety failure, we still collect metrics and audit before returning
             payload.metrics["safety_violation"] = True
-            await self._call_agent("metrics", payload)
-            await self._call_agent("audit", payload)
+        elif failed:
             return payload
-        
-        # 9. Parent Communication (Parent Communication Agent - Gemma 3)
-        # Only run if approved by Safety
-        await self._call_agent("parent_comm", payload)
-        if payload.status == "failed": return payload
-
-        payload.status = "completed"
-        payload.metrics["total_latency"] = (datetime.utcnow() - start_time).total_seconds()
-        
-        # 10. Metrics Collection
-        await self._call_agent("metrics", payload)
-        # 11. Audit Logging (Audit & Explanation Agent)
-        await self._call_agent("audit", payload)
-        
+        else:
+            payload.status = "completed"
+            payload.metrics["total_latency"] = (datetime.utcnow() - start_time).total_seconds()
+
+        # Metrics Collection + Audit Logging (Audit & Explanation Agent)
+        sink_runs, _ = await self._run_graph(SINKS, payload)
+        self._record_latency(payload, WORKFLOW + SINKS, {**runs, **sink_runs}, sinks=sink_runs)
         return payload
 
+    async def _run_graph(self, nodes: List[AgentNode], payload: CasePayload) -> Tuple[Dict[str, NodeRun], Optional[str]]:
+        async def invoke(node: AgentNode):
+            return await self.agents[node.key].process(payload)
+
+        def commit(node: AgentNode, result) -> bool:
+            return self._apply_response(node.key, result, payload, optional=node.optional)
+
+        return await run_graph(nodes, invoke, commit)
+
+    def _record_latency(
+        self,
+        payload: CasePayload,
+        nodes: List[AgentNode],
+        runs: Dict[str, NodeRun],
+        sinks: Optional[Dict[str, NodeRun]] = None,
+    ) -> None:
+        """Per-agent latency and the critical path (sinks run after the workflow, so their own critical path extends it)."""
+        latency = {n.key: runs[n.key].latency_ms for n in nodes if n.key in runs}
+        path, path_ms = critical_path([n for n in nodes if n not in SINKS], runs)
+        if sinks:
+            sink_path, sink_ms = critical_path(SINKS, sinks)
+            path, path_ms = path + sink_path, round(path_ms + sink_ms, 3)
+        payload.metrics["agent_latency_ms"] = latency
+        payload.metrics["critical_path"] = path
+        payload.metrics["critical_path_ms"] = path_ms
+        payload.metrics["serial_latency_ms"] = round(sum(latency.values()), 3)
+        if "medgemma" in runs:
+            payload.metrics["medgemma_latency"] = runs["medgemma"].finished - runs["medgemma"].started
+
     async def _call_agent(self, agent_key: str, payload: CasePayload):
         agent = self.agents.get(agent_key)
         if not agent:
             return
+        try:
+            result = await agent.process(payload)
+        except Exception as e:
+            result = e
+        self._apply_response(agent_key, result, payload)
 
+    def _apply_response(self, agent_key: str, result, payload: CasePayload, optional: bool = False) -> bool:
+        """
+        Log an agent's outcome and merge its updates into the payload (result may be an
+        exception). Returns False if the agent failed; optional agents never fail the case.
+        """
+        agent = self.agents[agent_key]
+        if isinstance(result, Exception):
+            message = (
+                f"Agent timed out: {result}" if isinstance(result, asyncio.TimeoutError)
+                else f"Critical Agent Error: {str(result)}"
+            )
+            payload.logs.append({
+                "timestamp": datetime.utcnow().isoformat(),
+                "agent": agent.name,
+                "success": False,
+                "message": message
+            })
+            if not optional:
+                payload.status = "failed"
+            return False
+
+        response = result
         try:
-            response = await agent.process(payload)
-            
             # Log the action
             log_entry = {
                 "timestamp": datetime.utcnow().isoformat(),
@@ -104,8 +158,9 @@ class CentralOrchestrator:
             payload.logs.append(log_entry)
 
             if not response.success:
-                payload.status = "failed"
-                return
+                if not optional:
+                    payload.status = "failed"
+                return False
 
             # Apply updates to payload based on agent
             if agent_key == "embedding" and response.data:
@@ -145,4 +200,7 @@ class CentralOrchestrator:
                 "success": False,
                 "message": f"Critical Agent Error: {str(e)}"
             })
-            payload.status = "failed"
+            if not optional:
+                payload.status = "failed"
+            return False
+        return True
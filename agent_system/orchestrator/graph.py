@@ -0,0 +1,113 @@
+"""
+Dependency-graph execution for CentralOrchestrator.
+
+A workflow is a list of AgentNode in a valid topological order. run_graph starts
+every node as soon as all of its dependencies are committed, so independent
+agents run concurrently. Results are committed (merged into the payload) strictly
+in declaration order, which keeps logs and payload updates identical from run to
+run regardless of which concurrent agent finishes first.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class AgentNode:
+    key: str
+    deps: Tuple[str, ...] = ()
+    timeout_s: Optional[float] = None
+    # Failure is logged but does not stop the workflow
+    optional: bool = False
+
+
+@dataclass
+class NodeRun:
+    """Outcome of one agent invocation (result is an AgentResponse or the raised exception)."""
+    result: object
+    started: float
+    finished: float
+
+    @property
+    def latency_ms(self) -> float:
+        return round((self.finished - self.started) * 1000, 3)
+
+
+def validate_graph(nodes: Iterable[AgentNode]) -> None:
+    """Every dependency must be declared earlier in the list (no cycles, no unknown keys)."""
+    seen = set()
+    for node in nodes:
+        missing = [d for d in node.deps if d not in seen]
+        if missing:
+            raise ValueError(f"Agent '{node.key}' depends on {missing}, which are not declared before it")
+        if node.key in seen:
+            raise ValueError(f"Agent '{node.key}' declared twice")
+        seen.add(node.key)
+
+
+async def run_graph(
+    nodes: List[AgentNode],
+    invoke: Callable[[AgentNode], Awaitable[object]],
+    commit: Callable[[AgentNode, object], bool],
+) -> Tuple[Dict[str, NodeRun], Optional[str]]:
+    """
+    Run `invoke` for each node once its dependencies are committed; `commit` merges a
+    result and returns False on failure. Stops at the first failed non-optional node
+    (still-running agents are cancelled). Returns (runs by key, failed key or None).
+    """
+    runs: Dict[str, NodeRun] = {}
+    tasks: Dict[asyncio.Task, AgentNode] = {}
+    committed = set()
+    started = set()
+    cursor = 0
+
+    async def timed(node: AgentNode) -> NodeRun:
+        t0 = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(invoke(node), node.timeout_s)
+        except asyncio.TimeoutError:
+            result = asyncio.TimeoutError(f"timed out after {node.timeout_s}s")
+        except Exception as e:
+            result = e
+        return NodeRun(result, t0, time.perf_counter())
+
+    try:
+        while cursor < len(nodes):
+            for node in nodes:
+                if node.key not in started and all(d in committed for d in node.deps):
+                    started.add(node.key)
+                    tasks[asyncio.ensure_future(timed(node))] = node
+            progressed = False
+            while cursor < len(nodes) and nodes[cursor].key in runs:
+                node = nodes[cursor]
+                cursor += 1
+                progressed = True
+                if not commit(node, runs[node.key].result) and not node.optional:
+                    return runs, node.key
+                committed.add(node.key)
+            if progressed:
+                continue
+            done, _ = await asyncio.wait(list(tasks), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                runs[tasks.pop(task).key] = task.result()
+        return runs, None
+    finally:
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def critical_path(nodes: List[AgentNode], runs: Dict[str, NodeRun]) -> Tuple[List[str], float]:
+    """Longest latency chain through the dependency graph over the nodes that ran."""
+    best: Dict[str, Tuple[float, List[str]]] = {}
+    for node in nodes:
+        if node.key not in runs:
+            continue
+        prev = max((best[d] for d in node.deps if d in best), key=lambda b: b[0], default=(0.0, []))
+        best[node.key] = (prev[0] + runs[node.key].latency_ms, prev[1] + [node.key])
+    if not best:
+        return [], 0.0
+    total, path = max(best.values(), key=lambda b: b[0])
+    return path, round(total, 3)
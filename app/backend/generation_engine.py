@@ -0,0 +1,474 @@
+"""
+Continuous-batching generation engine for the self-hosted MedGemmaService.
+
+One scheduler thread owns the model. Callers enqueue prompts with submit()
+(returns a concurrent.futures.Future) or await agenerate() from async handlers.
+Each scheduler iteration:
+  1. admits waiting requests into free batch slots and prefills them together,
+     left-padded; requests are grouped by prompt length so padding stays under
+     MAX_PAD_RATIO of the prefill batch and within the prefill token budget
+  2. merges their KV caches into the running batch (the shorter cache is
+     left-padded and masked out)
+  3. runs one decode step for every active sequence
+
+Sequences stop independently (stop token ids, stop strings, max_new_tokens);
+finished rows are dropped from the batch, so new requests join without waiting
+for the longest generation to end.
+
+Shared prefixes: a request may mark its first prefix_len prompt tokens as a
+static prefix (e.g. the instruction + JSON schema block of a prompt template).
+The prefix KV cache is computed once, kept in a small LRU keyed by the prefix
+token ids, and copied into every prefill that uses it, so only the variable
+suffix is prefilled. The cache belongs to the engine, i.e. to one model +
+adapter; MedGemmaService builds a new engine on adapter reload.
+
+Works with models whose cache is a per-layer (key, value) tuple or a
+DynamicCache (Gemma 1/2B, Llama, GPT-2 families). Sliding-window / static
+caches are not supported.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import torch
+from loguru import logger
+
+MAX_BATCH_SIZE = int(os.getenv("MEDGEMMA_MAX_BATCH_SIZE", "8"))
+MAX_PREFILL_TOKENS = int(os.getenv("MEDGEMMA_MAX_PREFILL_TOKENS", "8192"))
+# Largest share of padding tolerated when grouping prompts into one prefill
+MAX_PAD_RATIO = float(os.getenv("MEDGEMMA_MAX_PAD_RATIO", "0.3"))
+# Distinct prompt prefixes whose KV cache is kept (0 disables prefix reuse)
+PREFIX_CACHE_SIZE = int(os.getenv("MEDGEMMA_PREFIX_CACHE_SIZE", "8"))
+# Tokens decoded from the tail of a sequence when checking stop strings
+_STOP_TAIL_TOKENS = 16
+
+
+@dataclass
+class GenerationRequest:
+    prompt_ids: List[int]
+    max_new_tokens: int = 512
+    temperature: float = 0.0
+    stop_token_ids: Tuple[int, ...] = ()
+    stop_strings: Tuple[str, ...] = ()
+    # Leading prompt tokens served from the shared prefix cache
+    prefix_len: int = 0
+    future: Future = field(default_factory=Future)
+    submitted_at: float = field(default_factory=time.perf_counter)
+
+
+@dataclass
+class GenerationResult:
+    token_ids: List[int]
+    text: str
+    finish_reason: str  # "stop" | "length"
+    prompt_tokens: int
+    queue_time_s: float
+    generation_time_s: float
+    # Submit to first sampled token (queue wait + prefill)
+    time_to_first_token_s: float = 0.0
+    # Prompt tokens taken from the prefix cache instead of being prefilled
+    cached_prompt_tokens: int = 0
+
+
+@dataclass
+class _Sequence:
+    req: GenerationRequest
+    started_at: float
+    generated: List[int] = field(default_factory=list)
+    stop_text: Optional[str] = None
+    first_token_at: Optional[float] = None
+    cached_tokens: int = 0
+
+
+def _to_legacy(past):
+    if hasattr(past, "to_legacy_cache"):
+        return past.to_legacy_cache()
+    return tuple(tuple(t) for t in past)
+
+
+def _prefix_key(req: GenerationRequest) -> Tuple[int, ...]:
+    return tuple(req.prompt_ids[: req.prefix_len])
+
+
+def _suffix_len(req: GenerationRequest) -> int:
+    return len(req.prompt_ids) - req.prefix_len
+
+
+def _pad_left(t: torch.Tensor, length: int, dim: int) -> torch.Tensor:
+    missing = length - t.shape[dim]
+    if missing <= 0:
+        return t
+    shape = list(t.shape)
+    shape[dim] = missing
+    return torch.cat([t.new_zeros(shape), t], dim=dim)
+
+
+class ContinuousBatchingEngine:
+    def __init__(
+        self,
+        model,
+        tokenizer,
+        device: Optional[torch.device] = None,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_prefill_tokens: int = MAX_PREFILL_TOKENS,
+        max_pad_ratio: float = MAX_PAD_RATIO,
+        prefix_cache_size: int = PREFIX_CACHE_SIZE,
+    ):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device or next(model.parameters()).device
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_prefill_tokens = max(1, max_prefill_tokens)
+        self.max_pad_ratio = max_pad_ratio
+        self.prefix_cache_size = max(0, prefix_cache_size)
+        pad = getattr(tokenizer, "pad_token_id", None)
+        if pad is None:
+            pad = getattr(tokenizer, "eos_token_id", None)
+        self.pad_token_id = 0 if pad is None else int(pad)
+
+        self._queue: "queue.Queue[GenerationRequest]" = queue.Queue()
+        self._waiting: Deque[GenerationRequest] = deque()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        # Running batch (scheduler thread only)
+        self._seqs: List[_Sequence] = []
+        self._past: Optional[Tuple[Tuple[torch.Tensor, torch.Tensor], ...]] = None
+        self._mask: Optional[torch.Tensor] = None
+        self._next_tokens: Optional[torch.Tensor] = None
+        self._cache_cls = None
+        # prefix token ids -> batch-1 legacy KV cache (scheduler thread only)
+        self._prefixes: "OrderedDict[Tuple[int, ...], Tuple[Tuple[torch.Tensor, torch.Tensor], ...]]" = OrderedDict()
+
+        self._stats = {"completed": 0, "failed": 0, "prefill_batches": 0, "decode_steps": 0,
+                       "decode_rows": 0, "generated_tokens": 0, "prefill_tokens": 0, "padding_tokens": 0,
+                       "prefix_hits": 0, "prefix_misses": 0, "prefix_tokens_reused": 0}
+
+    # -------------------------
+    # Public API
+    # -------------------------
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="medgemma-batcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """Stop the scheduler; requests still queued or running fail with RuntimeError."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(
+        self,
+        prompt_ids: Sequence[int],
+        max_new_tokens: int = 512,
+        temperature: float = 0.0,
+        stop_token_ids: Sequence[int] = (),
+        stop_strings: Sequence[str] = (),
+        prefix_len: int = 0,
+    ) -> Future:
+        """
+        Queue a tokenized prompt; the Future resolves to a GenerationResult.
+        prompt_ids[:prefix_len] is treated as a shared, cacheable prefix.
+        """
+        if not prompt_ids:
+            raise ValueError("prompt_ids must not be empty")
+        # At least one suffix token is prefilled so the request gets its own logits
+        prefix_len = min(max(0, int(prefix_len)), len(prompt_ids) - 1) if self.prefix_cache_size else 0
+        req = GenerationRequest(
+            prompt_ids=list(prompt_ids),
+            max_new_tokens=max(1, int(max_new_tokens)),
+            temperature=float(temperature or 0.0),
+            stop_token_ids=tuple(int(t) for t in stop_token_ids if t is not None),
+            stop_strings=tuple(s for s in stop_strings if s),
+            prefix_len=prefix_len,
+        )
+        self.start()
+        self._queue.put(req)
+        return req.future
+
+    async def agenerate(self, prompt_ids: Sequence[int], **kwargs) -> GenerationResult:
+        return await asyncio.wrap_future(self.submit(prompt_ids, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        s = dict(self._stats)
+        s["waiting"] = self._queue.qsize() + len(self._waiting)
+        s["active"] = len(self._seqs)
+        s["mean_decode_batch"] = round(s["decode_rows"] / s["decode_steps"], 2) if s["decode_steps"] else 0.0
+        s["max_batch_size"] = self.max_batch_size
+        s["cached_prefixes"] = len(self._prefixes)
+        return s
+
+    # -------------------------
+    # Scheduler
+    # -------------------------
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if not self._seqs and not self._waiting:
+                try:
+                    self._waiting.append(self._queue.get(timeout=0.1))
+                except queue.Empty:
+                    continue
+            while True:
+                try:
+                    self._waiting.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with torch.no_grad():
+                    self._admit()
+                    if self._seqs:
+                        self._decode_step()
+            except Exception as e:
+                logger.exception("Batched generation step failed")
+                self._fail_active(e)
+        self._fail_active(RuntimeError("Generation engine stopped"))
+        while self._waiting or not self._queue.empty():
+            req = self._waiting.popleft() if self._waiting else self._queue.get_nowait()
+            if not req.future.done():
+                req.future.set_exception(RuntimeError("Generation engine stopped"))
+
+    def _select_prefill_group(self) -> List[GenerationRequest]:
+        """
+        Oldest waiting request plus the closest-length requests that share its prefix and
+        fit the slot, token and padding budgets (lengths count only the prefilled suffix).
+        """
+        free = self.max_batch_size - len(self._seqs)
+        if free <= 0 or not self._waiting:
+            return []
+        anchor = self._waiting[0]
+        prefix = _prefix_key(anchor)
+        lookahead = [r for r in list(self._waiting)[1: 1 + 4 * free] if _prefix_key(r) == prefix]
+        lookahead.sort(key=lambda r: abs(_suffix_len(r) - _suffix_len(anchor)))
+        group = [anchor]
+        lengths = [_suffix_len(anchor)]
+        for req in lookahead:
+            if len(group) >= free:
+                break
+            cand = lengths + [_suffix_len(req)]
+            width = max(cand)
+            padded = width * len(cand)
+            if padded > self.max_prefill_tokens:
+                continue
+            if (padded - sum(cand)) / padded > self.max_pad_ratio:
+                continue
+            group.append(req)
+            lengths = cand
+        chosen = {id(r) for r in group}
+        self._waiting = deque(r for r in self._waiting if id(r) not in chosen)
+        return [r for r in group if r.future.set_running_or_notify_cancel()]
+
+    def _admit(self) -> None:
+        group = self._select_prefill_group()
+        if not group:
+            return
+        now = time.perf_counter()
+        seqs = [_Sequence(req=r, started_at=now) for r in group]
+        plen = group[0].prefix_len
+        suffixes = [r.prompt_ids[plen:] for r in group]
+        width = max(len(t) for t in suffixes)
+        input_ids = torch.full((len(group), width), self.pad_token_id, dtype=torch.long)
+        mask = torch.zeros((len(group), width), dtype=torch.long)
+        for i, toks in enumerate(suffixes):
+            input_ids[i, width - len(toks):] = torch.tensor(toks, dtype=torch.long)
+            mask[i, width - len(toks):] = 1
+        input_ids, mask = input_ids.to(self.device), mask.to(self.device)
+        try:
+            if plen:
+                prefix_past = self._prefix_past(group[0])
+                # Cached prefix columns come first; suffix padding sits between prefix and suffix
+                mask = torch.cat([mask.new_ones((len(group), plen)), mask], dim=1)
+                past = tuple(
+                    (k.repeat(len(group), 1, 1, 1), v.repeat(len(group), 1, 1, 1)) for k, v in prefix_past
+                )
+                if hasattr(self._cache_cls, "from_legacy_cache"):
+                    past = self._cache_cls.from_legacy_cache(past)
+                position_ids = (mask.cumsum(-1) - 1)[:, plen:].clamp(min=0)
+                out = self.model(
+                    input_ids=input_ids,
+                    attention_mask=mask,
+                    position_ids=position_ids,
+                    past_key_values=past,
+                    use_cache=True,
+                )
+                for s in seqs:
+                    s.cached_tokens = plen
+                self._stats["prefix_tokens_reused"] += plen * len(seqs)
+            else:
+                position_ids = (mask.cumsum(-1) - 1).clamp(min=0)
+                out = self.model(input_ids=input_ids, attention_mask=mask, position_ids=position_ids, use_cache=True)
+        except Exception as e:
+            # Only the new group fails; sequences already decoding keep going
+            logger.exception("Prefill failed for {} request(s)", len(seqs))
+            for s in seqs:
+                s.req.future.set_exception(e)
+            self._stats["failed"] += len(seqs)
+            return
+        if self._cache_cls is None:
+            self._cache_cls = type(out.past_key_values)
+        self._stats["prefill_batches"] += 1
+        suffix_mask = mask[:, -width:]
+        self._stats["prefill_tokens"] += int(suffix_mask.sum())
+        self._stats["padding_tokens"] += int(suffix_mask.numel() - suffix_mask.sum())
+
+        past = _to_legacy(out.past_key_values)
+        next_tokens = self._sample(out.logits[:, -1, :], seqs)
+        self._merge(seqs, past, mask, next_tokens)
+        self._record_tokens(len(self._seqs) - len(seqs), next_tokens)
+
+    def _prefix_past(self, req: GenerationRequest):
+        """Batch-1 KV cache for the request's prefix; computed on first use, then LRU-cached."""
+        key = _prefix_key(req)
+        past = self._prefixes.get(key)
+        if past is not None:
+            self._prefixes.move_to_end(key)
+            self._stats["prefix_hits"] += 1
+            return past
+        ids = torch.tensor([key], dtype=torch.long, device=self.device)
+        out = self.model(
+            input_ids=ids,
+            attention_mask=torch.ones_like(ids),
+            position_ids=torch.arange(ids.shape[1], device=self.device)[None],
+            use_cache=True,
+        )
+        if self._cache_cls is None:
+            self._cache_cls = type(out.past_key_values)
+        past = _to_legacy(out.past_key_values)
+        self._prefixes[key] = past
+        while len(self._prefixes) > self.prefix_cache_size:
+            self._prefixes.popitem(last=False)
+        self._stats["prefix_misses"] += 1
+        self._stats["prefill_tokens"] += len(key)
+        return past
+
+    def _merge(self, seqs: List[_Sequence], past, mask: torch.Tensor, next_tokens: torch.Tensor) -> None:
+        if not self._seqs:
+            self._seqs, self._past, self._mask, self._next_tokens = seqs, past, mask, next_tokens
+            return
+        width = max(self._mask.shape[1], mask.shape[1])
+        self._past = tuple(
+            (
+                torch.cat([_pad_left(k0, width, 2), _pad_left(k1, width, 2)], dim=0),
+                torch.cat([_pad_left(v0, width, 2), _pad_left(v1, width, 2)], dim=0),
+            )
+            for (k0, v0), (k1, v1) in zip(self._past, past)
+        )
+        self._mask = torch.cat([_pad_left(self._mask, width, 1), _pad_left(mask, width, 1)], dim=0)
+        self._next_tokens = torch.cat([self._next_tokens, next_tokens], dim=0)
+        self._seqs = self._seqs + seqs
+
+    def _decode_step(self) -> None:
+        mask = torch.cat([self._mask, self._mask.new_ones((self._mask.shape[0], 1))], dim=1)
+        position_ids = mask.sum(-1, keepdim=True) - 1
+        past = self._past
+        if hasattr(self._cache_cls, "from_legacy_cache"):
+            past = self._cache_cls.from_legacy_cache(past)
+        out = self.model(
+            input_ids=self._next_tokens[:, None],
+            attention_mask=mask,
+            position_ids=position_ids,
+            past_key_values=past,
+            use_cache=True,
+        )
+        self._past = _to_legacy(out.past_key_values)
+        self._mask = mask
+        self._stats["decode_steps"] += 1
+        self._stats["decode_rows"] += len(self._seqs)
+        self._next_tokens = self._sample(out.logits[:, -1, :], self._seqs)
+        self._record_tokens(0, self._next_tokens)
+
+    def _sample(self, logits: torch.Tensor, seqs: List[_Sequence]) -> torch.Tensor:
+        greedy = logits.argmax(dim=-1)
+        temps = torch.tensor([s.req.temperature for s in seqs], device=logits.device, dtype=torch.float32)
+        if not bool((temps > 0).any()):
+            return greedy
+        probs = torch.softmax(logits.float() / temps.clamp(min=1e-5)[:, None], dim=-1)
+        sampled = torch.multinomial(probs, 1).squeeze(-1)
+        return torch.where(temps > 0, sampled, greedy)
+
+    def _record_tokens(self, offset: int, tokens: torch.Tensor) -> None:
+        """Append sampled tokens to rows offset.. and retire sequences that hit a stop condition."""
+        ids = tokens.tolist()
+        done: List[Tuple[int, str]] = []
+        now = time.perf_counter()
+        for i, tok in enumerate(ids):
+            seq = self._seqs[offset + i]
+            seq.generated.append(tok)
+            if seq.first_token_at is None:
+                seq.first_token_at = now
+            reason = self._finish_reason(seq, tok)
+            if reason:
+                done.append((offset + i, reason))
+        self._stats["generated_tokens"] += len(ids)
+        if done:
+            self._complete(done)
+
+    def _finish_reason(self, seq: _Sequence, tok: int) -> Optional[str]:
+        req = seq.req
+        if tok in req.stop_token_ids:
+            return "stop"
+        if req.stop_strings:
+            tail = self.tokenizer.decode(seq.generated[-_STOP_TAIL_TOKENS:], skip_special_tokens=True)
+            for s in req.stop_strings:
+                if s in tail:
+                    seq.stop_text = s
+                    return "stop"
+        if len(seq.generated) >= req.max_new_tokens:
+            return "length"
+        return None
+
+    def _complete(self, done: List[Tuple[int, str]]) -> None:
+        now = time.perf_counter()
+        finished = dict(done)
+        for idx, reason in done:
+            seq = self._seqs[idx]
+            text = self.tokenizer.decode(seq.generated, skip_special_tokens=True)
+            if seq.stop_text and seq.stop_text in text:
+                text = text[: text.index(seq.stop_text)]
+            seq.req.future.set_result(GenerationResult(
+                token_ids=list(seq.generated),
+                text=text,
+                finish_reason=reason,
+                prompt_tokens=len(seq.req.prompt_ids),
+                queue_time_s=seq.started_at - seq.req.submitted_at,
+                generation_time_s=now - seq.started_at,
+                time_to_first_token_s=(seq.first_token_at or now) - seq.req.submitted_at,
+                cached_prompt_tokens=seq.cached_tokens,
+            ))
+        self._stats["completed"] += len(done)
+        keep = [i for i in range(len(self._seqs)) if i not in finished]
+        self._prune(keep)
+
+    def _prune(self, keep: List[int]) -> None:
+        """Drop finished rows and any leading cache columns that are padding for every remaining row."""
+        if not keep:
+            self._seqs, self._past, self._mask, self._next_tokens = [], None, None, None
+            return
+        idx = torch.tensor(keep, device=self._mask.device)
+        mask = self._mask.index_select(0, idx)
+        start = int((mask.sum(0) > 0).nonzero()[0])
+        self._mask = mask[:, start:]
+        self._past = tuple(
+            (k.index_select(0, idx)[:, :, start:], v.index_select(0, idx)[:, :, start:]) for k, v in self._past
+        )
+        self._next_tokens = self._next_tokens.index_select(0, idx)
+        self._seqs = [self._seqs[i] for i in keep]
+
+    def _fail_active(self, exc: BaseException) -> None:
+        for seq in self._seqs:
+            if not seq.req.future.done():
+                seq.req.future.set_exception(exc)
+        self._stats["failed"] += len(self._seqs)
+        self._seqs, self._past, self._mask, self._next_tokens = [], None, None, None
@@ -187,10 +187,17 @@ def health():
         model=medgemma_service.model_name,
         adapter_loaded=adapter_loaded,
         device=str(medgemma_service.device),
-        capabilities=capabilities
+        capabilities=capabilities,
+        generation=medgemma_service.engine.stats() if medgemma_service.engine else None,
     )
 
 
+@app.on_event("shutdown")
+def _stop_generation_engine():
+    if medgemma_service.engine is not None:
+        medgemma_service.engine.stop()
+
+
 @app.post("/api/medblip/analyze")
 async def medblip_analyze(req: InferRequest):
     """
@@ -293,7 +300,7 @@ async def analyze(req: InferRequest, request: Request):
         
         # Run inference
         try:
-            result = medgemma_service.infer(
+            result = await medgemma_service.infer_async(
                 precomputed_image_emb=embedding,
                 age_months=req.age_months,
                 observations=req.observations,
@@ -3,9 +3,12 @@ MedGemmaService
 - loads MedGemma base model
 - optionally attaches LoRA adapters (PEFT)
 - exposes `infer` that accepts precomputed embeddings or raw images (hook)
+- exposes `infer_async` for request handlers: text prompts share the model through the
+  continuous-batching engine (generation_engine.py) instead of serializing on generate()
 """
 
-from typing import Optional, Union, Dict, Any
+from typing import Optional, Union, Dict, Any, Tuple
+import asyncio
 import os
 import time
 import json
@@ -16,10 +19,85 @@ from loguru import logger
 from transformers import AutoProcessor, AutoModelForCausalLM, AutoTokenizer
 from peft import PeftModel
 
+from .generation_engine import ContinuousBatchingEngine
+
 # Environment-driven defaults
 MODEL_NAME = os.getenv("MEDGEMMA_MODEL_NAME", "google/medgemma-2b-it")
 ADAPTER_LOCAL_DIR = os.getenv("ADAPTER_LOCAL_DIR", "/app/adapters")
 DEVICE_AUTO = os.getenv("DEVICE_AUTO", "1") == "1"
+CONTINUOUS_BATCHING = os.getenv("MEDGEMMA_CONTINUOUS_BATCHING", "1") == "1"
+
+
+# Static head of every build_prompt() prompt. Per-request INPUT CONTEXT goes after it
+# so the whole block is a shared prefix (KV-cached by the batching engine).
+PROMPT_PREFIX = """SYSTEM:
+You are a pediatric developmental screening support model.
+You do not diagnose.
+You summarize screening observations for clinician review.
+
+TASKS:
+1. Generate a clinical screening summary (3–4 bullets)
+2. Assign a screening risk level (Low / Moderate / Elevated)
+3. Provide rationale for the risk level
+4. Provide differential screening considerations (reasoned enumeration of factors)
+5. Suggest actionable next screening steps
+6. Estimate economic impact of early intervention for this specific case based on the identified risk.
+
+OUTPUT FORMAT:
+JSON with keys:
+"risk_stratification", "clinical_summary", "parent_friendly_explanation", "differential_considerations", "supporting_evidence", "developmental_profile", "recommendations", "referral_guidance", "follow_up", "economic_impact"
+
+Detailed JSON Schema:
+{
+    "risk_stratification": {
+        "level": "low" | "moderate" | "elevated",
+        "primary_domain": "Developmental domain from INPUT CONTEXT",
+        "confidence": 0.0-1.0,
+        "rationale": "Explanation of risk determination"
+    },
+    "clinical_summary": "3-4 bullet clinical summary",
+    "differential_considerations": ["Consideration 1", "Consideration 2"],
+    "supporting_evidence": {
+        "from_parent_report": [],
+        "from_assessment_scores": [],
+        "from_visual_analysis": []
+    },
+    "developmental_profile": {
+        "strengths": [],
+        "concerns": [],
+        "milestones_met": [],
+        "milestones_emerging": [],
+        "milestones_not_observed": []
+    },
+    "recommendations": {
+        "immediate": [],
+        "short_term": [],
+        "long_term": [],
+        "parent_friendly_tips": []
+    },
+    "referral_guidance": {
+        "needed": true | false,
+        "urgency": "routine" | "priority" | "urgent",
+        "specialties": [],
+        "reason": ""
+    },
+    "follow_up": {
+        "rescreen_interval_days": 90,
+        "monitoring_focus": [],
+        "red_flags_to_watch": []
+    },
+    "economic_impact": {
+        "early_intervention_value": "Estimated savings (e.g. '$30,000 to $100,000')",
+        "description": "Societal and lifetime benefit explanation based on early identification."
+    }
+}
+
+IMPORTANT: 
+- You are a junior clinical reasoning assistant, not a final diagnostician.
+- Every finding must be grounded in the input data.
+- Use developmentally appropriate language.
+
+"""
 
 
 class MedGemmaService:
@@ -45,6 +123,7 @@ class MedGemmaService:
         self.tokenizer = None
         self.processor = None
         self.model = None
+        self.engine: Optional[ContinuousBatchingEngine] = None
         try:
             self._load_base_model()
         except Exception as e:
@@ -58,6 +137,34 @@ class MedGemmaService:
                 self.attach_adapter(self.adapter_dir)
             except Exception as e:
                 logger.warning("Failed to attach adapter at init: {}", e)
+        self._reset_engine()
+
+    def _reset_engine(self):
+        """
+        (Re)build the batching engine around the current model; called after model/adapter swaps.
+        The prefix KV cache lives in the engine, so this also invalidates it.
+        """
+        self._prefix_ids: Dict[str, list] = {}
+        if self.engine is not None:
+            self.engine.stop()
+            self.engine = None
+        if CONTINUOUS_BATCHING and self.model is not None and self.tokenizer is not None:
+            self.engine = ContinuousBatchingEngine(self.model, self.tokenizer, self.device)
+
+    def _prefix_token_ids(self, prefix: str) -> list:
+        """Token ids of a static prompt prefix (tokenized once per tokenizer)."""
+        ids = self._prefix_ids.get(prefix)
+        if ids is None:
+            ids = self._prefix_ids[prefix] = list(self.tokenizer(prefix)["input_ids"])
+        return ids
+
+    def _stop_token_ids(self) -> list:
+        ids = [self.tokenizer.eos_token_id]
+        # Gemma chat turns end with <end_of_turn> rather than EOS
+        end_turn = self.tokenizer.convert_tokens_to_ids("<end_of_turn>")
+        if isinstance(end_turn, int) and end_turn != self.tokenizer.unk_token_id:
+            ids.append(end_turn)
+        return [i for i in ids if i is not None]
 
     def _load_base_model(self):
         logger.info("Loading base model: {}", self.model_name)
@@ -133,6 +240,7 @@ class MedGemmaService:
         logger.info("Reloading adapter: %s", adapter_path)
         self._load_base_model()
         self.attach_adapter(adapter_path)
+        self._reset_engine()
 
     def _normalize_embedding(
         self, emb: Union[np.ndarray, torch.Tensor]
@@ -165,6 +273,30 @@ class MedGemmaService:
         Build an enhanced clinical prompt for structured report generation.
         Uses evidence-grounded summarization approach.
         """
+        prefix, suffix = self.build_prompt_parts(
+            age_months=age_months,
+            observations=observations,
+            domain=domain,
+            domain_prompt=domain_prompt,
+            questionnaire_scores=questionnaire_scores,
+            visual_evidence=visual_evidence,
+        )
+        return prefix + suffix
+
+    def build_prompt_parts(
+        self,
+        age_months: int,
+        observations: str,
+        domain: str = "",
+        domain_prompt: Optional[str] = None,
+        questionnaire_scores: Optional[Dict[str, Any]] = None,
+        visual_evidence: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        build_prompt() split into (static prefix, per-request suffix). The prefix is the
+        instruction + JSON schema block (plus domain_prompt), identical across requests,
+        so the batching engine can reuse its KV cache.
+        """
         if age_months < 0:
             raise ValueError("age_months cannot be negative")
 
@@ -206,82 +338,15 @@ class MedGemmaService:
         context_sections.append("- Public Health Context: Early identification before age 3 can save $30k-$100k in lifetime costs per child and improve long-term outcomes in language and social integration.")
         
         input_context = "\n".join(context_sections)
-        
-        prompt = f"""SYSTEM:
-You are a pediatric developmental screening support model.
-You do not diagnose.
-You summarize screening observations for clinician review.
 
-INPUT CONTEXT:
+        prefix = PROMPT_PREFIX
+        if domain_prompt:
+            prefix = domain_prompt + "\n\n" + prefix
+        suffix = f"""INPUT CONTEXT:
 {input_context}
 
-TASKS:
-1. Generate a clinical screening summary (3–4 bullets)
-2. Assign a screening risk level (Low / Moderate / Elevated)
-3. Provide rationale for the risk level
-4. Provide differential screening considerations (reasoned enumeration of factors)
-5. Suggest actionable next screening steps
-6. Estimate economic impact of early intervention for this specific case based on the identified risk.
-
-OUTPUT FORMAT:
-JSON with keys:
-"risk_stratification", "clinical_summary", "parent_friendly_explanation", "differential_considerations", "supporting_evidence", "developmental_profile", "recommendations", "referral_guidance", "follow_up", "economic_impact"
-
-Detailed JSON Schema:
-{{
-    "risk_stratification": {{
-        "level": "low" | "moderate" | "elevated",
-        "primary_domain": "{domain_label}",
-        "confidence": 0.0-1.0,
-        "rationale": "Explanation of risk determination"
-    }},
-    "clinical_summary": "3-4 bullet clinical summary",
-    "differential_considerations": ["Consideration 1", "Consideration 2"],
-    "supporting_evidence": {{
-        "from_parent_report": [],
-        "from_assessment_scores": [],
-        "from_visual_analysis": []
-    }},
-    "developmental_profile": {{
-        "strengths": [],
-        "concerns": [],
-        "milestones_met": [],
-        "milestones_emerging": [],
-        "milestones_not_observed": []
-    }},
-    "recommendations": {{
-        "immediate": [],
-        "short_term": [],
-        "long_term": [],
-        "parent_friendly_tips": []
-    }},
-    "referral_guidance": {{
-        "needed": true | false,
-        "urgency": "routine" | "priority" | "urgent",
-        "specialties": [],
-        "reason": ""
-    }},
-    "follow_up": {{
-        "rescreen_interval_days": 90,
-        "monitoring_focus": [],
-        "red_flags_to_watch": []
-    }},
-    "economic_impact": {{
-        "early_intervention_value": "Estimated savings (e.g. '$30,000 to $100,000')",
-        "description": "Societal and lifetime benefit explanation based on early identification."
-    }}
-}}
-
-IMPORTANT: 
-- You are a junior clinical reasoning assistant, not a final diagnostician.
-- Every finding must be grounded in the input data.
-- Use developmentally appropriate language.
-- Respond with ONLY the valid JSON object."""
-
-        if domain_prompt:
-            prompt = domain_prompt + "\n\n" + prompt
-        
-        return prompt
+Respond with ONLY the valid JSON object."""
+        return prefix, suffix
 
     def infer(
         self,
@@ -421,6 +486,74 @@ IMPORTANT:
             except Exception:
                 generated_text = str(out_ids[0])
 
+        return self._build_result(generated_text, elapsed, fallback, return_raw)
+
+    async def infer_async(
+        self,
+        precomputed_image_emb: Optional[Union[np.ndarray, torch.Tensor]] = None,
+        age_months: int = 24,
+        observations: str = "",
+        domain: str = "",
+        max_new_tokens: int = 1024,
+        temperature: float = 0.1,
+        return_raw: bool = False,
+        questionnaire_scores: Optional[Dict[str, Any]] = None,
+        visual_evidence: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        infer() for async handlers. Text-only requests are batched with other in-flight
+        requests by the continuous-batching engine; requests carrying an image embedding
+        (per-request injection) or arriving with batching disabled run infer() in a thread.
+        """
+        kwargs = dict(
+            precomputed_image_emb=precomputed_image_emb,
+            age_months=age_months,
+            observations=observations,
+            domain=domain,
+            max_new_tokens=max_new_tokens,
+            temperature=temperature,
+            return_raw=return_raw,
+            questionnaire_scores=questionnaire_scores,
+            visual_evidence=visual_evidence,
+        )
+        if self.engine is None or precomputed_image_emb is not None:
+            return await asyncio.to_thread(self.infer, **kwargs)
+
+        try:
+            prefix, suffix = self.build_prompt_parts(
+                age_months=age_months,
+                observations=observations,
+                domain=domain,
+                questionnaire_scores=questionnaire_scores,
+                visual_evidence=visual_evidence
+            )
+        except Exception as e:
+            logger.error("Failed to build prompt: {}", e)
+            raise ValueError(f"Failed to build clinical prompt: {str(e)}")
+
+        prefix_ids = self._prefix_token_ids(prefix)
+        prompt_ids = prefix_ids + self.tokenizer(suffix, add_special_tokens=False)["input_ids"]
+        start = time.time()
+        try:
+            gen = await self.engine.agenerate(
+                prompt_ids,
+                max_new_tokens=max_new_tokens,
+                temperature=temperature,
+                stop_token_ids=self._stop_token_ids(),
+                prefix_len=len(prefix_ids),
+            )
+        except Exception as e:
+            logger.warning("Batched generation failed: {}. Retrying with single-request generate.", e)
+            return await asyncio.to_thread(self.infer, **kwargs)
+
+        result = self._build_result(gen.text, time.time() - start, False, return_raw)
+        result["queue_time_s"] = gen.queue_time_s
+        result["time_to_first_token_s"] = gen.time_to_first_token_s
+        result["cached_prompt_tokens"] = gen.cached_prompt_tokens
+        result["finish_reason"] = gen.finish_reason
+        return result
+
+    def _build_result(self, generated_text: str, elapsed: float, fallback: bool, return_raw: bool) -> Dict[str, Any]:
         result = {
             "text": generated_text,
             "inference_time_s": elapsed,
@@ -414,6 +414,9 @@ class HealthResponse(BaseModel):
     capabilities: List[str] = Field(
         default_factory=lambda: ["text_analysis", "structured_reports"]
     )
+    generation: Optional[Dict[str, Any]] = Field(
+        None, description="Continuous-batching engine stats (queue depth, batch sizes)"
+    )
 
 
 class AdapterUpdateRequest(BaseModel):
@@ -0,0 +1,138 @@
+"""
+Tests for the continuous-batching generation engine.
+
+Uses a toy causal LM whose next token is the sum of all attended tokens mod
+VOCAB, so any padding/mask/cache-merge mistake changes the output.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from app.backend.generation_engine import ContinuousBatchingEngine, GenerationRequest  # noqa: E402
+
+VOCAB = 31
+PAD = 7
+
+
+class ToyLM(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.dummy = torch.nn.Parameter(torch.zeros(1))
+
+    def forward(self, input_ids, attention_mask, position_ids, past_key_values=None, use_cache=True):
+        tokens = input_ids.float()
+        if past_key_values is not None:
+            tokens = torch.cat([past_key_values[0][0][:, 0, :, 0], tokens], dim=1)
+        assert tokens.shape == attention_mask.shape
+        # Positions must count only real tokens
+        assert torch.equal(position_ids[:, -1], attention_mask.sum(-1) - 1)
+        totals = (tokens * attention_mask).cumsum(-1)[:, -input_ids.shape[1]:]
+        logits = torch.nn.functional.one_hot(totals.long() % VOCAB, VOCAB).float() * 10
+        cache = ((tokens[:, None, :, None], tokens[:, None, :, None]),)
+        return SimpleNamespace(logits=logits, past_key_values=cache)
+
+
+class ToyTokenizer:
+    pad_token_id = PAD
+    eos_token_id = None
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(str(i) for i in ids)
+
+
+def reference(prompt, max_new_tokens, stop=()):
+    seq, out = list(prompt), []
+    for _ in range(max_new_tokens):
+        tok = sum(seq) % VOCAB
+        seq.append(tok)
+        out.append(tok)
+        if tok in stop:
+            break
+    return out
+
+
+@pytest.fixture
+def engine():
+    eng = ContinuousBatchingEngine(ToyLM(), ToyTokenizer(), torch.device("cpu"), max_batch_size=4)
+    yield eng
+    eng.stop()
+
+
+def test_mixed_lengths_match_sequential_reference(engine):
+    prompts = [[1, 2], [3, 4, 5, 6, 7, 8], [9], [2, 2, 2], [5, 1, 4, 1], [8] * 11]
+    futures = [engine.submit(p, max_new_tokens=3 + i) for i, p in enumerate(prompts)]
+    for i, (p, f) in enumerate(zip(prompts, futures)):
+        res = f.result(timeout=10)
+        assert res.token_ids == reference(p, 3 + i)
+        assert res.finish_reason == "length" and res.prompt_tokens == len(p)
+    stats = engine.stats()
+    assert stats["completed"] == len(prompts) and stats["active"] == 0
+    assert stats["prefill_batches"] >= 2  # six requests through four slots
+
+
+def test_stop_tokens_and_strings(engine):
+    prompt = [3, 1]
+    full = reference(prompt, 8)
+    stop_tok = full[2]
+    res = engine.submit(prompt, max_new_tokens=8, stop_token_ids=[stop_tok]).result(timeout=10)
+    assert res.token_ids == reference(prompt, 8, stop=(stop_tok,))
+    assert res.finish_reason == "stop"
+
+    stop = f" {full[3]}"
+    res = engine.submit(prompt, max_new_tokens=8, stop_strings=[stop]).result(timeout=10)
+    assert res.finish_reason == "stop" and len(res.token_ids) <= 4
+    assert stop not in res.text
+
+
+def test_agenerate_concurrent_requests(engine):
+    async def run():
+        return await asyncio.gather(*(engine.agenerate([i + 1, i + 2], max_new_tokens=5) for i in range(10)))
+
+    results = asyncio.run(run())
+    for i, res in enumerate(results):
+        assert res.token_ids == reference([i + 1, i + 2], 5)
+    assert engine.stats()["mean_decode_batch"] > 1
+
+
+def test_prefill_groups_respect_padding_budget():
+    eng = ContinuousBatchingEngine(ToyLM(), ToyTokenizer(), torch.device("cpu"), max_batch_size=8, max_pad_ratio=0.1)
+    for n in (10, 2, 9, 3, 10):
+        eng._waiting.append(GenerationRequest(prompt_ids=[1] * n))
+    group = eng._select_prefill_group()
+    assert sorted(len(r.prompt_ids) for r in group) == [9, 10, 10]
+    assert sorted(len(r.prompt_ids) for r in eng._waiting) == [2, 3]
+
+
+def test_shared_prefix_is_prefilled_once(engine):
+    prefix = [4, 9, 1, 6, 2, 8, 3]
+    prompts = [prefix + tail for tail in ([5], [1, 2, 3], [7, 7], [2, 9, 4, 4, 1])]
+    first = engine.submit(prompts[0], max_new_tokens=4, prefix_len=len(prefix)).result(timeout=10)
+    assert first.token_ids == reference(prompts[0], 4)
+    futures = [engine.submit(p, max_new_tokens=6, prefix_len=len(prefix)) for p in prompts[1:]]
+    for p, f in zip(prompts[1:], futures):
+        res = f.result(timeout=10)
+        assert res.token_ids == reference(p, 6)
+        assert res.cached_prompt_tokens == len(prefix) and res.time_to_first_token_s > 0
+    stats = engine.stats()
+    assert stats["prefix_misses"] == 1 and stats["prefix_hits"] >= 1
+    assert stats["prefix_tokens_reused"] == len(prefix) * len(prompts)
+
+
+def test_prefix_cache_is_bounded_and_keyed_by_prefix():
+    eng = ContinuousBatchingEngine(ToyLM(), ToyTokenizer(), torch.device("cpu"), prefix_cache_size=2)
+    try:
+        for head in ([1, 1], [2, 2], [3, 3], [1, 1]):
+            prompt = head + [5, 6]
+            res = eng.submit(prompt, max_new_tokens=2, prefix_len=2).result(timeout=10)
+            assert res.token_ids == reference(prompt, 2)
+        stats = eng.stats()
+        # [1, 1] was evicted by [3, 3], so it is recomputed
+        assert stats["prefix_misses"] == 4 and stats["cached_prefixes"] == 2
+        # The whole prompt can never be "prefix": one token is always prefilled
+        assert eng.submit([1, 1], max_new_tokens=1, prefix_len=5).result(timeout=10).cached_prompt_tokens == 1
+    finally:
+        eng.stop()
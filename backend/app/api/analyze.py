@@ -14,8 +14,9 @@ from app.errors import ApiError, ErrorCodes
 from app.models.schemas import AnalyzeResponse
 from app.schemas.health_data import ScreeningInput
 from app.services.db import get_db
-from app.services.db_cloudsql import is_cloudsql_enabled, insert_screening_record as cloudsql_insert_screening
-from app.services.feedback_store import insert_inference
+from app.services.db_cloudsql import is_cloudsql_enabled, insert_screening_record_async as cloudsql_insert_screening
+from app.services.feedback_store import insert_inference_async
+from app.services.medgemma_provider import get_medgemma_service
 from app.services.medgemma_service import MedGemmaService
 from app.services.model_wrapper import analyze as run_analysis
 from app.services.phi_redactor import redact_text
@@ -24,32 +25,6 @@ from app.telemetry.emitter import build_ai_event_envelope, emit_ai_event
 
 router = APIRouter()
 
-# MedGemmaService: lazy init when Vertex or HF is configured
-_medgemma_svc = None
-
-
-def _get_medgemma_svc() -> Optional[MedGemmaService]:
-    global _medgemma_svc
-    if _medgemma_svc is None and (
-        (settings.HF_MODEL and settings.HF_API_KEY)
-        or (settings.VERTEX_PROJECT and settings.VERTEX_LOCATION)
-    ):
-        _medgemma_svc = MedGemmaService({
-            "HF_MODEL": settings.HF_MODEL,
-            "HF_API_KEY": settings.HF_API_KEY,
-            "VERTEX_PROJECT": settings.VERTEX_PROJECT,
-            "VERTEX_LOCATION": settings.VERTEX_LOCATION,
-            "VERTEX_TEXT_ENDPOINT_ID": settings.VERTEX_TEXT_ENDPOINT_ID,
-            "VERTEX_VISION_ENDPOINT_ID": settings.VERTEX_VISION_ENDPOINT_ID,
-            "REDIS_URL": settings.REDIS_URL,
-            "ALLOW_PHI": settings.ALLOW_PHI,
-            "MEDSIGLIP_ENABLE_LOCAL": getattr(settings, "MEDSIGLIP_ENABLE_LOCAL", True),
-            "LORA_ADAPTER_PATH": getattr(settings, "LORA_ADAPTER_PATH", None),
-            "BASE_MODEL_ID": getattr(settings, "BASE_MODEL_ID", "google/medgemma-2b-it"),
-        })
-    return _medgemma_svc
-
-
 def _medgemma_report_to_response(
     analysis_result: dict, age: int, domain: str, screening_id: str, inference_id: str | None = None
 ) -> dict:
@@ -102,6 +77,7 @@ async def analyze_endpoint(
     image: UploadFile | None = File(None),
     consent_id: str | None = Form(None),
     consent_given: str | None = Form(None),
+    medgemma_svc: Optional[MedGemmaService] = Depends(get_medgemma_service),
 ):
     # Embeddings-first: raw image requires explicit consent (Page 3)
     if image:
@@ -143,7 +119,6 @@ async def analyze_endpoint(
     request_id = get_request_id(request)
     start_ns = time.perf_counter_ns()
     org_id = "default"
-    medgemma_svc = _get_medgemma_svc()
     try:
         if medgemma_svc:
             analysis_result = await medgemma_svc.analyze_input(
@@ -156,7 +131,7 @@ async def analyze_endpoint(
             screening_id = f"ps-{int(time.time())}-{uuid.uuid4().hex[:8]}"
             inference_id = str(uuid.uuid4())
             prov = analysis_result.get("provenance", {})
-            insert_inference(
+            await insert_inference_async(
                 inference_id=inference_id,
                 case_id=screening_id,
                 screening_id=screening_id,
@@ -181,7 +156,7 @@ async def analyze_endpoint(
             screening_id = result.get("screening_id", f"ps-{int(time.time())}-{uuid.uuid4().hex[:8]}")
             inference_id = str(uuid.uuid4())
             rep = result.get("report", {})
-            insert_inference(
+            await insert_inference_async(
                 inference_id=inference_id,
                 case_id=screening_id,
                 screening_id=screening_id,
@@ -230,9 +205,9 @@ async def analyze_endpoint(
     # Save screening record in DB for persistence (fire-and-forget via background task)
     if is_cloudsql_enabled():
         # Cloud SQL (Cloud Run): sync insert via background task
-        def _save_cloudsql():
+        async def _save_cloudsql():
             try:
-                cloudsql_insert_screening(
+                await cloudsql_insert_screening(
                     screening_id=result["screening_id"],
                     child_age_months=age,
                     domain=domain,
@@ -276,6 +251,7 @@ async def analyze_endpoint(
 async def screening_endpoint(
     input: ScreeningInput,
     background_tasks: BackgroundTasks,
+    medgemma_svc: Optional[MedGemmaService] = Depends(get_medgemma_service),
 ):
     """
     Submit screening with strongly-typed ScreeningInput (JSON).
@@ -289,7 +265,6 @@ async def screening_endpoint(
     redaction_result = redact_text(observations)
     observations_clean = redaction_result["redacted_text"]
 
-    medgemma_svc = _get_medgemma_svc()
     try:
         if medgemma_svc:
             analysis_result = await medgemma_svc.analyze_input(
@@ -302,7 +277,7 @@ async def screening_endpoint(
             screening_id = f"ps-{int(time.time())}-{uuid.uuid4().hex[:8]}"
             inference_id = str(uuid.uuid4())
             prov = analysis_result.get("provenance", {})
-            insert_inference(
+            await insert_inference_async(
                 inference_id=inference_id,
                 case_id=screening_id,
                 screening_id=screening_id,
@@ -321,7 +296,7 @@ async def screening_endpoint(
             screening_id = result.get("screening_id", f"ps-{int(time.time())}-{uuid.uuid4().hex[:8]}")
             inference_id = str(uuid.uuid4())
             rep = result.get("report", {})
-            insert_inference(
+            await insert_inference_async(
                 inference_id=inference_id,
                 case_id=screening_id,
                 screening_id=screening_id,
@@ -342,9 +317,9 @@ async def screening_endpoint(
         ) from e
 
     if is_cloudsql_enabled():
-        def _save_cloudsql():
+        async def _save_cloudsql():
             try:
-                cloudsql_insert_screening(
+                await cloudsql_insert_screening(
                     screening_id=result["screening_id"],
                     child_age_months=age,
                     domain=domain,
@@ -10,7 +10,7 @@ from app.core.security import get_api_key
 from app.services.db import get_db
 from app.services.db_cloudsql import (
     is_cloudsql_enabled,
-    fetch_screening_by_id as cloudsql_fetch_screening,
+    fetch_screening_by_id_async as cloudsql_fetch_screening,
 )
 from app.services.health_data_preprocessor import HealthDataPreprocessor
 
@@ -40,7 +40,7 @@ async def get_data_quality(case_id: str):
     preprocessor = HealthDataPreprocessor(require_consent_for_images=False)
 
     if is_cloudsql_enabled():
-        doc = cloudsql_fetch_screening(case_id)
+        doc = await cloudsql_fetch_screening(case_id)
         if not doc:
             raise HTTPException(status_code=404, detail="Case not found")
         doc = dict(doc)
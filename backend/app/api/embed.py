@@ -70,15 +70,18 @@ async def embed_image(file: UploadFile = File(...)):
     # 1. Local (if transformers/torch available)
     if settings.MEDSIGLIP_ENABLE_LOCAL:
         try:
-            from app.services.medsiglip_local import get_medsiglip_embedding_local
+            import asyncio
+            from app.services.embedding_utils import float32_arr_to_b64
+            from app.services.medsiglip_local import embed_images_local
 
-            out = get_medsiglip_embedding_local(contents)
+            # Already-decoded image; array goes straight to b64 (no list round-trip)
+            arr = await asyncio.to_thread(embed_images_local, [pil])
             result = {
-                "embedding_b64": out["embedding_b64"],
-                "shape": out["shape"],
-                "model": out["model"],
+                "embedding_b64": float32_arr_to_b64(arr),
+                "shape": list(arr.shape),
+                "model": "medsiglip-local",
             }
-            model_used = out["model"]
+            model_used = "medsiglip-local"
         except Exception as e:
             logger.debug("Local MedSigLIP skipped: %s", e)
 
@@ -13,10 +13,9 @@ from app.core.logger import logger
 from app.core.security import get_api_key, get_api_key_or_supabase_user
 from app.errors import ApiError, ErrorCodes
 from app.services.feedback_store import (
-    insert_feedback,
-    get_feedback_by_inference,
-    get_feedback_by_case,
-    inference_exists,
+    insert_feedback_async,
+    get_feedback_by_inference_async,
+    get_feedback_by_case_async,
 )
 from app.services.audit import write_audit
 
@@ -98,7 +97,7 @@ async def create_feedback(
     }
 
     try:
-        feedback_id = insert_feedback(data)
+        feedback_id = await insert_feedback_async(data)
     except Exception as e:
         logger.exception("Feedback insert failed: %s", e)
         raise ApiError(
@@ -143,7 +142,7 @@ async def get_feedback_for_inference(
     _auth=Depends(get_api_key),
 ):
     """Retrieve all feedback for a given inference."""
-    items = get_feedback_by_inference(inference_id)
+    items = await get_feedback_by_inference_async(inference_id)
     return {"inference_id": inference_id, "feedback": items}
 
 
@@ -153,7 +152,7 @@ async def get_feedback_for_case(
     _auth=Depends(get_api_key),
 ):
     """Retrieve all feedback for a case (screening)."""
-    items = get_feedback_by_case(case_id)
+    items = await get_feedback_by_case_async(case_id)
     return {"case_id": case_id, "feedback": items}
 
 
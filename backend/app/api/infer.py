@@ -18,8 +18,9 @@ from app.core.logger import logger
 from app.core.security import get_api_key
 from app.core.request_id_middleware import get_request_id
 from app.errors import ApiError, ErrorCodes, ErrorResponse
+from app.services.medgemma_provider import get_medgemma_service
 from app.services.medgemma_service import MedGemmaService
-from app.services.feedback_store import insert_inference
+from app.services.feedback_store import insert_inference_async
 from app.services.audit import log_inference_audit
 from app.telemetry.emitter import build_ai_event_envelope, emit_ai_event
 
@@ -33,30 +34,6 @@ _infer_responses = {
     503: {"model": ErrorResponse, "description": "Model not configured (MODEL_LOAD_FAIL)"},
 }
 
-_medgemma_svc = None
-
-
-def _get_medgemma_svc() -> Optional[MedGemmaService]:
-    global _medgemma_svc
-    if _medgemma_svc is None and (
-        (settings.HF_MODEL and settings.HF_API_KEY)
-        or (settings.VERTEX_PROJECT and settings.VERTEX_LOCATION)
-    ):
-        _medgemma_svc = MedGemmaService({
-            "HF_MODEL": settings.HF_MODEL,
-            "HF_API_KEY": settings.HF_API_KEY,
-            "VERTEX_PROJECT": settings.VERTEX_PROJECT,
-            "VERTEX_LOCATION": settings.VERTEX_LOCATION,
-            "VERTEX_TEXT_ENDPOINT_ID": settings.VERTEX_TEXT_ENDPOINT_ID,
-            "VERTEX_VISION_ENDPOINT_ID": settings.VERTEX_VISION_ENDPOINT_ID,
-            "REDIS_URL": settings.REDIS_URL,
-            "ALLOW_PHI": settings.ALLOW_PHI,
-            "LORA_ADAPTER_PATH": settings.LORA_ADAPTER_PATH,
-            "BASE_MODEL_ID": settings.BASE_MODEL_ID,
-        })
-    return _medgemma_svc
-
-
 class InferRequest(BaseModel):
     """Canonical contract for embedding-based inference (design spec 4.3, 16.1)."""
     case_id: str = Field(..., description="Unique case identifier")
@@ -96,6 +73,7 @@ async def infer_endpoint(
     req: InferRequest,
     request: Request,
     api_key: str = Depends(get_api_key),
+    svc: Optional[MedGemmaService] = Depends(get_medgemma_service),
 ):
     """
     Run MedGemma inference with precomputed image embedding.
@@ -108,8 +86,8 @@ async def infer_endpoint(
     # Optional: HAI pipeline (model registry + MCP tools + calibration + expanded audit)
     if getattr(settings, "USE_HAI_PIPELINE", False):
         try:
-            from app.services.inference_controller import run_inference_sync
-            result = run_inference_sync(
+            from app.services.inference_controller import run_inference
+            result = await run_inference(
                 case_id=req.case_id,
                 age_months=req.age_months,
                 observations=req.observations,
@@ -138,7 +116,6 @@ async def infer_endpoint(
             logger.exception("HAI pipeline failed: %s", e)
             # Fall through to legacy path or mock
             pass
-    svc = _get_medgemma_svc()
     if not svc:
         if getattr(settings, "MOCK_FALLBACK", True):
             mock = _mock_inference(req.case_id)
@@ -211,6 +188,7 @@ async def infer_endpoint(
             )
         prov = result.get("provenance", {})
         res = result.get("result", {})
+        audit_t0 = time.perf_counter()
         log_inference_audit(
             request_id=request_id,
             case_id=req.case_id,
@@ -252,7 +230,7 @@ async def infer_endpoint(
         prov = result.get("provenance", {})
         res = result.get("result", {})
         try:
-            insert_inference(
+            await insert_inference_async(
                 inference_id=inference_id,
                 case_id=req.case_id,
                 screening_id=None,
@@ -266,6 +244,8 @@ async def infer_endpoint(
             )
         except Exception as e:
             logger.warning("Failed to insert inference for feedback: %s", e)
+        if isinstance(result.get("stage_ms"), dict):
+            result["stage_ms"]["audit"] = round((time.perf_counter() - audit_t0) * 1000, 3)
         result["inference_id"] = inference_id
         result["feedback_allowed"] = True
         result["feedback_url"] = f"/api/feedback/inference/{inference_id}"
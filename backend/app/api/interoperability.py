@@ -15,7 +15,7 @@ from app.core.logger import logger
 from app.core.security import get_api_key
 from app.security.google_auth import require_clinician_or_api_key
 from app.services.db import get_db
-from app.services.db_cloudsql import is_cloudsql_enabled, fetch_screening_by_id as cloudsql_fetch_screening
+from app.services.db_cloudsql import is_cloudsql_enabled, fetch_screening_by_id_async as cloudsql_fetch_screening
 from app.services.fhir_bundle_builder import create_bundle_for_case
 from app.services.pdf_exporter import export_report_pdf
 from app.services.hl7_screening import build_screening_oru
@@ -46,7 +46,7 @@ async def _get_report_and_screening(case_id: str) -> tuple:
 
     screening_id = doc.get("screening_id") or case_id
     if is_cloudsql_enabled():
-        screening = cloudsql_fetch_screening(screening_id)
+        screening = await cloudsql_fetch_screening(screening_id)
     else:
         screening = await db.screenings.find_one({"screening_id": screening_id})
     screening = screening or {}
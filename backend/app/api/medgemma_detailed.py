@@ -18,7 +18,7 @@ from app.services.detailed_writer import generate_technical_report
 from app.services.phi_redactor import redact_text
 from app.services.db_cloudsql import (
     is_cloudsql_enabled,
-    fetch_screening_by_id as cloudsql_fetch_screening,
+    fetch_screening_by_id_async as cloudsql_fetch_screening,
     insert_report as cloudsql_insert_report,
     insert_report_audit as cloudsql_insert_report_audit,
     fetch_report_by_id as cloudsql_fetch_report,
@@ -166,7 +166,7 @@ async def generate_end2end(
     screening_row: dict = {"screening_id": screening_id, "patient_id": None}
     if is_cloudsql_enabled():
         try:
-            row = cloudsql_fetch_screening(screening_id)
+            row = await cloudsql_fetch_screening(screening_id)
             if row:
                 screening_row = dict(row)
         except Exception as e:
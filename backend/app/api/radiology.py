@@ -3,12 +3,13 @@
 Radiology case prioritization: AI-assisted urgency labeling + automatic queue sorting.
 Clinical decision-support; clinician review and override required. Audit-ready.
 """
+import asyncio
+import json
 from datetime import datetime
 from typing import Optional
 
-from bson.binary import Binary
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
-from fastapi.responses import Response
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import Response, StreamingResponse
 
 from app.core.config import settings
 from app.core.logger import logger
@@ -22,11 +23,15 @@ from app.services.gradcam import generate_gradcam
 from app.services.benchmark import benchmark as run_benchmark
 from app.services.hl7_oru import build_oru_r01
 from app.services.hl7_sender import send_hl7
+from app.services import radiology_worklist as worklist
 
 router = APIRouter()
 
 # Priority sort order: stat=1, urgent=2, routine=3
-PRIORITY_ORDER = {"stat": 1, "urgent": 2, "routine": 3}
+PRIORITY_ORDER = worklist.PRIORITY_RANK
+
+# Seconds between SSE keep-alive comments on the worklist stream
+STREAM_HEARTBEAT_S = 15.0
 
 
 def require_clinician(api_key: str = Depends(get_api_key)):
@@ -92,14 +97,18 @@ async def upload_study(
         "uploaded_at": datetime.utcnow(),
         "priority_score": ai["risk_score"],
         "priority_label": priority,
+        "priority_rank": worklist.priority_rank(priority),
         "status": "pending",
         "ai_summary": ai_summary,
         "override_priority": None,
         "reviewed_by": None,
+        "has_explainability": bool(explainability_image),
     }
+    # Heatmap stored separately so worklist reads never touch the PNG
     if explainability_image:
-        doc["explainability_image"] = Binary(explainability_image)
+        await worklist.save_heatmap(db, study_id, explainability_image)
     await db.radiology_studies.insert_one(doc)
+    worklist.publish_study(doc)
 
     return {
         "study_id": study_id,
@@ -111,38 +120,80 @@ async def upload_study(
 
 
 @router.get("/api/radiology/queue")
-async def get_queue(_: str = Depends(get_api_key)):
+async def get_queue(
+    limit: int = Query(100, ge=1, le=worklist.MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    _: str = Depends(get_api_key),
+):
     """
     Get radiology worklist sorted by priority (stat > urgent > routine), then FIFO.
-    Excludes explainability_image binary; includes has_explainability flag.
+    Cursor-paginated over the (status, priority_rank, uploaded_at) index; pass
+    next_cursor back as ?cursor= for the following page. Rows carry has_explainability;
+    heatmaps are fetched separately.
     """
-    db = get_db()
-    pipeline = [
-        {"$match": {"status": "pending"}},
-        {
-            "$addFields": {
-                "has_explainability": {"$cond": [{"$ne": [{"$type": "$explainability_image"}, "missing"]}, True, False]}
-            }
-        },
-        {"$project": {"explainability_image": 0}},
-        {"$sort": [("priority_label", 1), ("uploaded_at", 1)]},
-    ]
-    items = []
-    async for doc in db.radiology_studies.aggregate(pipeline):
-        doc["_id"] = str(doc["_id"])
-        if "uploaded_at" in doc and hasattr(doc["uploaded_at"], "isoformat"):
-            doc["uploaded_at"] = doc["uploaded_at"].isoformat()
-        items.append(doc)
-
-    # Sort: stat=1, urgent=2, routine=3, then uploaded_at asc
-    items.sort(key=lambda x: (PRIORITY_ORDER.get(x.get("priority_label", "routine"), 3), x.get("uploaded_at", "")))
-
+    try:
+        page = await worklist.fetch_page(get_db(), limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {
-        "items": items,
+        "items": page["items"],
+        "next_cursor": page["next_cursor"],
         "disclaimer": FDA_RADIOLOGY_DISCLAIMER,
     }
 
 
+def _sse_event(data: dict) -> str:
+    """Format dict as SSE event (data line + double newline)."""
+    return f"data: {json.dumps(data)}\n\n"
+
+
+async def _worklist_stream(request: Request, events):
+    """SSE frames for worklist events, with keep-alive comments while idle."""
+    yield _sse_event({"type": "ready"})
+    pending = None
+    try:
+        while not await request.is_disconnected():
+            if pending is None:
+                pending = asyncio.ensure_future(events.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=STREAM_HEARTBEAT_S)
+            if not done:
+                yield ": keep-alive\n\n"
+                continue
+            try:
+                event = pending.result()
+            except StopAsyncIteration:
+                return
+            pending = None
+            yield _sse_event(event)
+    finally:
+        if pending is not None:
+            pending.cancel()
+            # The generator must be idle before it can be closed
+            await asyncio.gather(pending, return_exceptions=True)
+        await events.aclose()
+
+
+@router.get("/api/radiology/queue/stream")
+async def stream_queue(
+    request: Request,
+    _: str = Depends(get_api_key_from_header_or_query),
+):
+    """
+    Server-sent worklist updates: {"type": "upsert", "item": {...}} when a study
+    enters or changes on the pending worklist, {"type": "remove", "study_id": ...}
+    when it leaves. Load the first page from /queue, then apply events.
+    """
+    return StreamingResponse(
+        _worklist_stream(request, worklist.worklist_events(get_db())),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @router.post("/api/radiology/{study_id}/review")
 async def review_study(
     study_id: str,
@@ -175,6 +226,7 @@ async def review_study(
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Study not found")
+    worklist.publish_study({**doc, "status": "reviewed"})
 
     # HL7 ORU^R01 push when configured
     if settings.HL7_HOST:
@@ -197,14 +249,10 @@ async def review_study(
 
 async def _get_explainability_bytes(study_id: str) -> bytes:
     """Shared logic for explainability/heatmap endpoints."""
-    db = get_db()
-    doc = await db.radiology_studies.find_one(
-        {"study_id": study_id},
-        {"explainability_image": 1},
-    )
-    if not doc or not doc.get("explainability_image"):
+    img = await worklist.load_heatmap(get_db(), study_id)
+    if not img:
         raise HTTPException(status_code=404, detail="Explainability image not available")
-    return bytes(doc["explainability_image"])
+    return img
 
 
 @router.get("/api/radiology/{study_id}/explainability")
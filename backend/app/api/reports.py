@@ -15,9 +15,10 @@ from app.core.logger import logger
 from app.core.security import get_api_key
 from app.security.google_auth import require_clinician, require_clinician_or_api_key
 from app.services.db import get_db
-from app.services.db_cloudsql import is_cloudsql_enabled, fetch_screening_by_id as cloudsql_fetch_screening
+from app.services.db_cloudsql import is_cloudsql_enabled, fetch_screening_by_id_async as cloudsql_fetch_screening
 from app.services.edit_guard import validate_edit
 from app.services.fda_mapper import map_report_to_fda
+from app.services.medgemma_provider import get_medgemma_service
 from app.services.pdf_exporter import export_report_pdf
 from app.services.pdf_renderer import generate_pdf_bytes
 from app.services.pdf_signing import hash_pdf, embed_hash_in_pdf
@@ -25,47 +26,20 @@ from app.services.report_generator import generate_report_from_screening
 
 router = APIRouter()
 
-# MedGemmaService lazy init (reuse from analyze)
-_medgemma_svc = None
-
-
-def _get_medgemma_svc():
-    global _medgemma_svc
-    if _medgemma_svc is None and (
-        (settings.HF_MODEL and settings.HF_API_KEY)
-        or (settings.VERTEX_PROJECT and settings.VERTEX_LOCATION)
-    ):
-        from app.services.medgemma_service import MedGemmaService
-
-        _medgemma_svc = MedGemmaService(
-            {
-                "HF_MODEL": settings.HF_MODEL,
-                "HF_API_KEY": settings.HF_API_KEY,
-                "VERTEX_PROJECT": settings.VERTEX_PROJECT,
-                "VERTEX_LOCATION": settings.VERTEX_LOCATION,
-                "VERTEX_TEXT_ENDPOINT_ID": settings.VERTEX_TEXT_ENDPOINT_ID,
-                "VERTEX_VISION_ENDPOINT_ID": settings.VERTEX_VISION_ENDPOINT_ID,
-                "REDIS_URL": settings.REDIS_URL,
-                "ALLOW_PHI": settings.ALLOW_PHI,
-                "LORA_ADAPTER_PATH": getattr(settings, "LORA_ADAPTER_PATH", None),
-                "BASE_MODEL_ID": getattr(settings, "BASE_MODEL_ID", "google/medgemma-2b-it"),
-            }
-        )
-    return _medgemma_svc
-
 
 @router.post("/api/reports/generate")
 async def generate_report_endpoint(
     screening_id: Optional[str] = Form(None),
     image: Optional[UploadFile] = File(None),
     api_key: str = Depends(get_api_key),
+    medgemma_svc=Depends(get_medgemma_service),
 ):
     """Generate a draft report from a screening record."""
     if not screening_id:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="screening_id required")
 
     if is_cloudsql_enabled():
-        doc = cloudsql_fetch_screening(screening_id)
+        doc = await cloudsql_fetch_screening(screening_id)
     else:
         db = get_db()
         doc = await db.screenings.find_one({"screening_id": screening_id})
@@ -91,7 +65,6 @@ async def generate_report_endpoint(
         image_bytes = await image.read()
         image_filename = image.filename
 
-    medgemma_svc = _get_medgemma_svc()
     draft = await generate_report_from_screening(
         screening,
         image_bytes=image_bytes,
@@ -119,7 +119,7 @@ async def screen_child(
 
     try:
         router_instance = _get_router()
-        result = router_instance.ensemble_predict(screening, request_id=request_id)
+        result = await router_instance.ensemble_predict(screening, request_id=request_id)
 
         # Final safety validation
         await guard.validate_output(screening, result)
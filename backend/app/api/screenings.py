@@ -2,7 +2,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from app.core.security import get_api_key
 from app.services.db import get_db
-from app.services.db_cloudsql import is_cloudsql_enabled, fetch_screenings as cloudsql_fetch_screenings, fetch_screening_by_id as cloudsql_fetch_screening
+from app.services.db_cloudsql import is_cloudsql_enabled, fetch_screenings_async as cloudsql_fetch_screenings, fetch_screening_by_id_async as cloudsql_fetch_screening
 from app.services.screening_diff import diff_screenings, build_change_observation, push_change_observation_to_fhir
 from typing import List, Optional
 
@@ -24,7 +24,7 @@ def _normalize_screening_doc(doc: dict) -> dict:
 @router.get("/api/screenings", dependencies=[Depends(get_api_key)])
 async def list_screenings(limit: int = 50, skip: int = 0):
     if is_cloudsql_enabled():
-        rows = cloudsql_fetch_screenings(limit=limit, offset=skip)
+        rows = await cloudsql_fetch_screenings(limit=limit, offset=skip)
         res = [_normalize_screening_doc(r) for r in rows]
         return {"items": res, "count": len(res)}
     db = get_db()
@@ -39,7 +39,7 @@ async def list_screenings(limit: int = 50, skip: int = 0):
 @router.get("/api/screenings/{screening_id}", dependencies=[Depends(get_api_key)])
 async def get_screening(screening_id: str):
     if is_cloudsql_enabled():
-        doc = cloudsql_fetch_screening(screening_id)
+        doc = await cloudsql_fetch_screening(screening_id)
         if not doc:
             raise HTTPException(status_code=404, detail="Not found")
         return _normalize_screening_doc(doc)
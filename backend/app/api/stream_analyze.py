@@ -13,47 +13,24 @@ from typing import AsyncGenerator, Optional
 from fastapi import APIRouter, Depends, Request
 from fastapi.responses import StreamingResponse
 
-from app.core.config import settings
 from app.core.logger import logger
 from app.core.security import get_api_key
 from app.errors import ApiError, ErrorCodes
+from app.services.medgemma_provider import get_medgemma_service
 from app.services.medgemma_service import MedGemmaService
 from app.services.model_wrapper import analyze as run_analysis
 from app.services.phi_redactor import redact_text
 
 router = APIRouter()
 
-_medgemma_svc: Optional[MedGemmaService] = None
-
-
-def _get_medgemma_svc() -> Optional[MedGemmaService]:
-    global _medgemma_svc
-    if _medgemma_svc is None and (
-        (settings.HF_MODEL and settings.HF_API_KEY)
-        or (settings.VERTEX_PROJECT and settings.VERTEX_LOCATION)
-    ):
-        _medgemma_svc = MedGemmaService({
-            "HF_MODEL": settings.HF_MODEL,
-            "HF_API_KEY": settings.HF_API_KEY,
-            "VERTEX_PROJECT": settings.VERTEX_PROJECT,
-            "VERTEX_LOCATION": settings.VERTEX_LOCATION,
-            "VERTEX_TEXT_ENDPOINT_ID": settings.VERTEX_TEXT_ENDPOINT_ID,
-            "VERTEX_VISION_ENDPOINT_ID": settings.VERTEX_VISION_ENDPOINT_ID,
-            "REDIS_URL": settings.REDIS_URL,
-            "ALLOW_PHI": settings.ALLOW_PHI,
-            "MEDSIGLIP_ENABLE_LOCAL": getattr(settings, "MEDSIGLIP_ENABLE_LOCAL", True),
-            "LORA_ADAPTER_PATH": getattr(settings, "LORA_ADAPTER_PATH", None),
-            "BASE_MODEL_ID": getattr(settings, "BASE_MODEL_ID", "google/medgemma-2b-it"),
-        })
-    return _medgemma_svc
-
-
 def _sse_event(data: dict) -> str:
     """Format dict as SSE event (data line + double newline)."""
     return f"data: {json.dumps(data)}\n\n"
 
 
-async def _stream_screening_process(request_data: dict) -> AsyncGenerator[str, None]:
+async def _stream_screening_process(
+    request_data: dict, medgemma_svc: Optional[MedGemmaService] = None
+) -> AsyncGenerator[str, None]:
     """Token-by-token streaming of complete agent pipeline."""
     case_id = request_data.get("case_id") or f"ps-{int(time.time())}-{uuid.uuid4().hex[:8]}"
     age = int(request_data.get("age_months", request_data.get("childAge", 24)))
@@ -130,7 +107,6 @@ async def _stream_screening_process(request_data: dict) -> AsyncGenerator[str, N
         "progress": int(60 / total_steps * 100),
     })
 
-    medgemma_svc = _get_medgemma_svc()
     try:
         if medgemma_svc:
             image_bytes = None
@@ -253,7 +229,10 @@ async def _stream_screening_process(request_data: dict) -> AsyncGenerator[str, N
 
 
 @router.post("/api/stream-analyze", dependencies=[Depends(get_api_key)])
-async def stream_analyze(request: Request):
+async def stream_analyze(
+    request: Request,
+    medgemma_svc: Optional[MedGemmaService] = Depends(get_medgemma_service),
+):
     """
     Streaming SSE endpoint for real-time screening.
     Accepts JSON: { age_months, domain, observations, image_b64?, case_id? }
@@ -268,7 +247,7 @@ async def stream_analyze(request: Request):
         "case_id": body.get("case_id"),
     }
     return StreamingResponse(
-        _stream_screening_process(request_data),
+        _stream_screening_process(request_data, medgemma_svc),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -34,6 +34,7 @@ class Settings(BaseSettings):
     # MedGemmaService: Vertex AI / Hugging Face
     HF_MODEL: Optional[str] = Field(None, env="HF_MODEL")
     HF_API_KEY: Optional[str] = Field(None, env="HF_API_KEY")
+    HF_INFERENCE_URL: Optional[str] = Field(None, env="HF_INFERENCE_URL")  # self-hosted / stub HF-compatible server
     VERTEX_PROJECT: Optional[str] = Field(None, env="VERTEX_PROJECT")
     VERTEX_LOCATION: Optional[str] = Field(None, env="VERTEX_LOCATION")
     VERTEX_TEXT_ENDPOINT_ID: Optional[str] = Field(None, env="VERTEX_TEXT_ENDPOINT_ID")
@@ -41,6 +42,14 @@ class Settings(BaseSettings):
     VERTEX_RADIOLOGY_ENDPOINT_ID: Optional[str] = Field(None, env="VERTEX_RADIOLOGY_ENDPOINT_ID")
     REDIS_URL: Optional[str] = Field(None, env="REDIS_URL")
     ALLOW_PHI: bool = Field(False, env="ALLOW_PHI")  # default False for privacy
+    # Shared MedGemmaService (one per process, created in the app lifespan)
+    MEDGEMMA_HTTP_MAX_CONNECTIONS: int = Field(64, env="MEDGEMMA_HTTP_MAX_CONNECTIONS")
+    MEDGEMMA_HTTP_MAX_KEEPALIVE: int = Field(32, env="MEDGEMMA_HTTP_MAX_KEEPALIVE")
+    MEDGEMMA_REDIS_MAX_CONNECTIONS: int = Field(32, env="MEDGEMMA_REDIS_MAX_CONNECTIONS")
+    MEDGEMMA_WARMUP: bool = Field(True, env="MEDGEMMA_WARMUP")  # open pools at startup
+    RESPONSE_CACHE_ENABLED: bool = Field(True, env="RESPONSE_CACHE_ENABLED")
+    RESPONSE_CACHE_MAX_ENTRIES: int = Field(1024, env="RESPONSE_CACHE_MAX_ENTRIES")
+    RESPONSE_CACHE_TTL_S: float = Field(3600.0, env="RESPONSE_CACHE_TTL_S")
 
     # FHIR / EHR integration (SMART on FHIR)
     FHIR_BASE_URL: Optional[str] = Field(None, env="FHIR_BASE_URL")
@@ -66,6 +75,9 @@ class Settings(BaseSettings):
     VERTEX_MEDSIGLIP_ENDPOINT_ID: Optional[str] = Field(None, env="VERTEX_MEDSIGLIP_ENDPOINT_ID")
     HF_MEDSIGLIP_MODEL: Optional[str] = Field("google/medsiglip-base", env="HF_MEDSIGLIP_MODEL")
     HF_MEDSIGLIP_TOKEN: Optional[str] = Field(None, env="HF_MEDSIGLIP_TOKEN")
+    # Local encoder tuning: fp32 | bf16 | int8 (bf16/int8 apply on CPU only); 0 threads = torch default
+    MEDSIGLIP_LOCAL_PRECISION: str = Field("fp32", env="MEDSIGLIP_LOCAL_PRECISION")
+    MEDSIGLIP_LOCAL_THREADS: int = Field(0, env="MEDSIGLIP_LOCAL_THREADS")
 
     # Supabase JWT (for Bearer token validation when frontend uses Supabase Auth)
     SUPABASE_URL: Optional[str] = Field(None, env="SUPABASE_URL")
@@ -103,7 +103,7 @@ class HAIAdapterRouter:
     def __init__(self) -> None:
         self._use_hai = getattr(settings, "USE_HAI_PIPELINE", False)
 
-    def _run_controller(
+    async def _run_controller(
         self,
         case_id: str,
         age_months: int,
@@ -115,7 +115,7 @@ class HAIAdapterRouter:
         if not self._use_hai:
             return None
         try:
-            from app.services.inference_controller import run_inference_sync
+            from app.services.inference_controller import run_inference
 
             shape = [1, 256]
             if not embedding_b64:
@@ -125,7 +125,7 @@ class HAIAdapterRouter:
                 n = 256 * 4  # float32
                 buf = struct.pack(f"{n}f", *([0.0] * 256))
                 embedding_b64 = base64.b64encode(buf).decode("ascii")
-            return run_inference_sync(
+            return await run_inference(
                 case_id=case_id,
                 age_months=age_months,
                 observations=observations,
@@ -181,7 +181,7 @@ class HAIAdapterRouter:
             },
         )
 
-    def ensemble_predict(
+    async def ensemble_predict(
         self,
         screening: ScreeningInput,
         request_id: Optional[str] = None,
@@ -197,7 +197,7 @@ class HAIAdapterRouter:
             f"{screening.chw_id}:{screening.child_age_months}:{time.time()}".encode()
         ).hexdigest()[:16]
 
-        raw = self._run_controller(
+        raw = await self._run_controller(
             case_id=case_id,
             age_months=screening.child_age_months,
             observations=observations,
@@ -1,4 +1,7 @@
 # backend/app/main.py
+import asyncio
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
@@ -40,9 +43,31 @@ from app.api import (
     telemetry,
 )
 from app.errors import ErrorResponse, ErrorCodes
+from app.services.medgemma_provider import provider as medgemma_provider
 from app.utils.error_formatter import api_error
 
-app = FastAPI(title=settings.APP_NAME)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Starting PediScreen backend...")
+    # One MedGemmaService (HTTP + Redis pools, caches) shared by every router
+    await medgemma_provider.startup(warmup=settings.MEDGEMMA_WARMUP)
+    yield
+    logger.info("Shutting down PediScreen backend...")
+    await medgemma_provider.shutdown()
+    from app.services.model_wrapper import aclose_http_client
+    await aclose_http_client()
+    # Write out buffered inference records, then close the asyncpg pool
+    from app.services.feedback_store import flush_inference_buffer
+    await flush_inference_buffer()
+    from app.services.cloudsql_connector import dispose_async_engine
+    await dispose_async_engine()
+    # Drain batched audit events before the process exits
+    from app.services.audit import shutdown_audit
+    await asyncio.to_thread(shutdown_audit)
+
+
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
 
 
 def _status_to_code(status_code: int) -> str:
@@ -167,13 +192,5 @@ app.include_router(data_quality.router)
 app.include_router(interoperability.router)
 app.include_router(feedback.router)
 
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Starting PediScreen backend...")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("Shutting down PediScreen backend...")
-
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host=settings.HOST, port=settings.PORT, reload=settings.DEBUG)
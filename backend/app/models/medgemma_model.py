@@ -94,19 +94,12 @@ class MedGemmaModel(BaseModel):
         if self._service_factory:
             self._service = self._service_factory()
             return self._service
-        # Lazy init from app config if available
+        # Process-wide shared service when the app is configured
         try:
-            from app.core.config import settings
-            if settings.HF_MODEL and settings.HF_API_KEY or (getattr(settings, "VERTEX_PROJECT", None) and getattr(settings, "VERTEX_LOCATION", None)):
-                from app.services.medgemma_service import MedGemmaService
-                self._service = MedGemmaService({
-                    "HF_MODEL": settings.HF_MODEL,
-                    "HF_API_KEY": getattr(settings, "HF_API_KEY", None),
-                    "VERTEX_PROJECT": getattr(settings, "VERTEX_PROJECT", None),
-                    "VERTEX_LOCATION": getattr(settings, "VERTEX_LOCATION", None),
-                    "LORA_ADAPTER_PATH": getattr(settings, "LORA_ADAPTER_PATH", None),
-                    "BASE_MODEL_ID": getattr(settings, "BASE_MODEL_ID", "google/medgemma-2b-it"),
-                })
+            from app.services.medgemma_provider import provider
+
+            self._service = provider.get()
+            if self._service is not None:
                 return self._service
         except Exception as e:
             logger.warning("MedGemma service not configured: %s", e)
@@ -19,33 +19,11 @@ from app.services.safety_agent import apply_safety_to_result
 
 logger = logging.getLogger("ai_model_manager")
 
-# Lazy singleton
-_medgemma_svc = None
-
-
 def _get_medgemma_service():
-    """Lazy init MedGemmaService when Vertex or HF is configured."""
-    global _medgemma_svc
-    if _medgemma_svc is None and (
-        (settings.HF_MODEL and settings.HF_API_KEY)
-        or (settings.VERTEX_PROJECT and settings.VERTEX_LOCATION)
-    ):
-        from app.services.medgemma_service import MedGemmaService
-
-        _medgemma_svc = MedGemmaService({
-            "HF_MODEL": settings.HF_MODEL,
-            "HF_API_KEY": settings.HF_API_KEY,
-            "VERTEX_PROJECT": settings.VERTEX_PROJECT,
-            "VERTEX_LOCATION": settings.VERTEX_LOCATION,
-            "VERTEX_TEXT_ENDPOINT_ID": settings.VERTEX_TEXT_ENDPOINT_ID,
-            "VERTEX_VISION_ENDPOINT_ID": settings.VERTEX_VISION_ENDPOINT_ID,
-            "REDIS_URL": settings.REDIS_URL,
-            "ALLOW_PHI": settings.ALLOW_PHI,
-            "MEDSIGLIP_ENABLE_LOCAL": getattr(settings, "MEDSIGLIP_ENABLE_LOCAL", True),
-            "LORA_ADAPTER_PATH": getattr(settings, "LORA_ADAPTER_PATH", None),
-            "BASE_MODEL_ID": getattr(settings, "BASE_MODEL_ID", "google/medgemma-2b-it"),
-        })
-    return _medgemma_svc
+    """Shared MedGemmaService when Vertex or HF is configured (see medgemma_provider)."""
+    from app.services.medgemma_provider import provider
+
+    return provider.get()
 
 
 def _mock_screening_result(payload: ScreeningPayload) -> ScreeningResult:
@@ -2,16 +2,263 @@
 """
 Audit logging: generic write_audit and compact inference log for every inference.
 Inference events go to data/audit.log (JSONL) with request_id, success, fallback_used; no raw images.
+
+Writes go through AuditSink: callers serialize the event and enqueue it (no
+disk I/O on the request path); a background thread appends batches per file,
+flushing when AUDIT_FLUSH_MAX_EVENTS are queued or AUDIT_FLUSH_INTERVAL_S has
+passed. Failed writes are retried on the next flush and the sink drains on
+shutdown (app lifespan, plus atexit as a backstop). write() never blocks the
+caller: when the queue (AUDIT_QUEUE_MAX) or the retry backlog
+(AUDIT_PENDING_MAX) is full, events are dropped, counted in `dropped` and logged.
+
+AUDIT_FSYNC: "batch" (fsync after every flush), "interval" (at most every
+AUDIT_FSYNC_INTERVAL_S) or "never". AUDIT_ROTATE_BYTES > 0 enables size-based
+rotation keeping AUDIT_ROTATE_BACKUPS files (audit.log.1 is the newest).
 """
+import atexit
 import json
+import logging
 import os
+import queue
+import threading
 import time
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("audit")
 
-AUDIT_PATH = "infra_audit.log"
+AUDIT_PATH = os.getenv("INFRA_AUDIT_PATH", "infra_audit.log")
 INFERENCE_AUDIT_PATH = os.getenv("AUDIT_LOG_PATH", "data/audit.log")
 
+AUDIT_FLUSH_MAX_EVENTS = int(os.getenv("AUDIT_FLUSH_MAX_EVENTS", "256"))
+AUDIT_FLUSH_INTERVAL_S = float(os.getenv("AUDIT_FLUSH_INTERVAL_S", "0.5"))
+AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "100000"))
+# Events kept for retry while writes fail; the oldest are dropped beyond this
+AUDIT_PENDING_MAX = int(os.getenv("AUDIT_PENDING_MAX", "100000"))
+AUDIT_FSYNC = os.getenv("AUDIT_FSYNC", "interval").lower()
+AUDIT_FSYNC_INTERVAL_S = float(os.getenv("AUDIT_FSYNC_INTERVAL_S", "5"))
+AUDIT_ROTATE_BYTES = int(os.getenv("AUDIT_ROTATE_BYTES", "0"))
+AUDIT_ROTATE_BACKUPS = int(os.getenv("AUDIT_ROTATE_BACKUPS", "5"))
+
+_FLUSH = object()  # queue marker: flush now and signal the waiting _FlushWaiter
+
+
+class _FlushWaiter:
+    __slots__ = ("event", "ok")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.ok = False
+
+
+class AuditSink:
+    """Batched, append-only JSONL writer running on one background thread."""
+
+    def __init__(
+        self,
+        max_batch: int = AUDIT_FLUSH_MAX_EVENTS,
+        flush_interval_s: float = AUDIT_FLUSH_INTERVAL_S,
+        queue_max: int = AUDIT_QUEUE_MAX,
+        fsync: str = AUDIT_FSYNC,
+        fsync_interval_s: float = AUDIT_FSYNC_INTERVAL_S,
+        rotate_bytes: int = AUDIT_ROTATE_BYTES,
+        rotate_backups: int = AUDIT_ROTATE_BACKUPS,
+        pending_max: int = AUDIT_PENDING_MAX,
+    ):
+        self.max_batch = max(1, max_batch)
+        self.flush_interval_s = flush_interval_s
+        self.fsync = fsync
+        self.fsync_interval_s = fsync_interval_s
+        self.rotate_bytes = rotate_bytes
+        self.rotate_backups = max(1, rotate_backups)
+        self.pending_max = max(1, pending_max)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_max)
+        self._pending: Dict[str, List[str]] = {}
+        self._pending_count = 0
+        self._last_fsync: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.written = 0
+        self.write_errors = 0
+        self.dropped = 0
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+                    self._thread.start()
+
+    def write(self, path: str, event: Dict[str, Any]) -> None:
+        """Serialize now (snapshot of the event) and enqueue; never blocks (drops when full)."""
+        line = json.dumps(event, default=str) + "\n"
+        if self._closed:
+            self._write_batch(path, [line])
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((path, line))
+        except queue.Full:
+            self._drop(1, "queue full")
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """
+        Block until everything enqueued so far is on disk (or timeout). Returns True
+        only if it was all written; False on timeout or when writes are failing.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return self._flush_pending()
+        waiter = _FlushWaiter()
+        try:
+            self._queue.put((_FLUSH, waiter), timeout=timeout)
+        except queue.Full:
+            return False
+        return waiter.event.wait(timeout) and waiter.ok
+
+    def close(self, timeout: Optional[float] = 10.0) -> bool:
+        drained = self.flush(timeout)
+        self._closed = True
+        return drained
+
+    # --- background thread ---
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.flush_interval_s
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            waiters: List[_FlushWaiter] = []
+            while item is not None:
+                path, payload = item
+                if path is _FLUSH:
+                    waiters.append(payload)
+                else:
+                    self._pending.setdefault(path, []).append(payload)
+                    self._pending_count += 1
+                if self._pending_count >= self.max_batch:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+            if waiters or self._pending_count >= self.max_batch or time.monotonic() >= deadline:
+                ok = self._flush_pending()
+                deadline = time.monotonic() + self.flush_interval_s
+                for w in waiters:
+                    w.ok = ok
+                    w.event.set()
+
+    def _flush_pending(self) -> bool:
+        """Write every pending batch; failed ones stay pending. True if all were written."""
+        pending, self._pending, self._pending_count = self._pending, {}, 0
+        for path, lines in pending.items():
+            if not self._write_batch(path, lines):
+                # Keep for the next flush rather than lose audit events
+                self._pending.setdefault(path, [])[:0] = lines
+                self._pending_count += len(lines)
+        excess = self._pending_count - self.pending_max
+        if excess > 0:
+            # Writes keep failing: bound memory by dropping the oldest events
+            for lines in self._pending.values():
+                n = min(excess, len(lines))
+                del lines[:n]
+                excess -= n
+                self._pending_count -= n
+                self._drop(n, "retry backlog full")
+                if excess <= 0:
+                    break
+        return self._pending_count == 0
+
+    def _drop(self, n: int, reason: str) -> None:
+        if n <= 0:
+            return
+        before = self.dropped
+        self.dropped += n
+        # First drop, then roughly every 1000, so a stuck sink does not flood the log
+        if before == 0 or before // 1000 != self.dropped // 1000:
+            logger.error("Audit events dropped (%s): %d so far", reason, self.dropped)
+
+    def _write_batch(self, path: str, lines: List[str]) -> bool:
+        data = "".join(lines)
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            if self.rotate_bytes > 0:
+                self._maybe_rotate(path, len(data))
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                if self._should_fsync(path):
+                    os.fsync(f.fileno())
+            self.written += len(lines)
+            return True
+        except Exception as e:
+            self.write_errors += 1
+            logger.warning("Audit write to %s failed (%d events kept for retry): %s", path, len(lines), e)
+            return False
+
+    def _should_fsync(self, path: str) -> bool:
+        if self.fsync == "batch":
+            return True
+        if self.fsync == "interval":
+            now = time.monotonic()
+            if now - self._last_fsync.get(path, 0.0) >= self.fsync_interval_s:
+                self._last_fsync[path] = now
+                return True
+        return False
+
+    def _maybe_rotate(self, path: str, incoming: int) -> None:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        if size == 0 or size + incoming <= self.rotate_bytes:
+            return
+        for i in range(self.rotate_backups - 1, 0, -1):
+            src = f"{path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{path}.{i + 1}")
+        os.replace(path, f"{path}.1")
+        self._last_fsync.pop(path, None)
+
+
+_sink: Optional[AuditSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_audit_sink() -> AuditSink:
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = AuditSink()
+                atexit.register(_sink.close)
+    return _sink
+
+
+def flush_audit(timeout: Optional[float] = 10.0) -> bool:
+    """Wait until queued audit events are written (tests, health checks, shutdown)."""
+    return get_audit_sink().flush(timeout) if _sink is not None else True
+
+
+def shutdown_audit(timeout: Optional[float] = 10.0) -> bool:
+    """Drain the sink; later writes go straight to disk. Call from the app lifespan."""
+    return _sink.close(timeout) if _sink is not None else True
+
+
+def submit_audit(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+    """
+    Run an audit logging function without blocking on disk I/O. The log_* helpers
+    only serialize and enqueue into the AuditSink, so they are called inline;
+    ordering follows submission order.
+    """
+    try:
+        fn(*args, **kwargs)
+    except Exception as e:
+        logger.warning("Audit event failed: %s", e)
+
 
 def _now_iso():
     return datetime.utcnow().replace(tzinfo=timezone.utc).isoformat()
@@ -25,11 +272,7 @@ def write_audit(action: str, actor: str, target: str, payload: dict):
         "target": target,
         "payload": payload
     }
-    try:
-        with open(AUDIT_PATH, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry) + "\n")
-    except Exception as e:
-        print("Failed to write audit:", e)
+    get_audit_sink().write(AUDIT_PATH, entry)
 
 
 def log_inference_audit(
@@ -108,10 +351,4 @@ def log_inference_audit_expanded(
 
 def _append_audit_event(event: dict) -> None:
     path = os.getenv("AUDIT_LOG_PATH", INFERENCE_AUDIT_PATH)
-    try:
-        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-        with open(path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(event) + "\n")
-    except Exception as e:
-        import logging
-        logging.getLogger("audit").warning("Inference audit write failed: %s", e)
+    get_audit_sink().write(path, event)
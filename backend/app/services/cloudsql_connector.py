@@ -1,8 +1,13 @@
 """
 Cloud SQL Python Connector integration (recommended for Cloud Run).
 Creates a SQLAlchemy engine backed by the Cloud SQL Python Connector using pg8000.
+Async endpoints use get_async_engine() (asyncpg via the connector's async API) so
+a DB round-trip does not hold an event loop thread; asyncpg caches prepared
+statements per connection (DB_PREPARED_STATEMENT_CACHE).
 Docs reference: https://cloud.google.com/sql/docs/postgres/connect-instance-auth-proxy
 """
+import asyncio
+import importlib.util
 import os
 from google.cloud.sql.connector import Connector, IPTypes
 import sqlalchemy
@@ -11,6 +16,13 @@ from sqlalchemy.engine import Engine
 # Module-level connector and engine are safe to reuse across requests/revisions.
 _connector: Connector | None = None
 _engine: Engine | None = None
+_async_connector = None
+_async_engine = None
+_async_lock: asyncio.Lock | None = None
+
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_PREPARED_STATEMENT_CACHE = int(os.environ.get("DB_PREPARED_STATEMENT_CACHE", "256"))
 
 
 def get_connector() -> Connector:
@@ -59,11 +71,84 @@ def get_engine() -> Engine:
         return conn
 
     _engine = sqlalchemy.create_engine(
-        "postgresql+pg8000://", creator=getconn, pool_size=5, max_overflow=10
+        "postgresql+pg8000://", creator=getconn, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW
     )
     return _engine
 
 
+def _connect_kwargs() -> dict:
+    instance_connection_name = os.environ.get("INSTANCE_CONNECTION_NAME")
+    if not instance_connection_name:
+        raise RuntimeError("INSTANCE_CONNECTION_NAME must be set (project:region:instance)")
+    return {
+        "instance_connection_string": instance_connection_name,
+        "user": os.environ.get("DB_USER", "postgres"),
+        "password": os.environ.get("DB_PASS"),
+        "db": os.environ.get("DB_NAME", "pediscreen"),
+        "ip_type": IPTypes.PRIVATE if os.environ.get("PRIVATE_IP") else IPTypes.PUBLIC,
+        "enable_iam_auth": os.environ.get("CLOUDSQL_ENABLE_IAM_AUTH", "false").lower() in ("1", "true", "yes"),
+    }
+
+
+def async_engine_available() -> bool:
+    """True when asyncpg is installed; otherwise async callers fall back to the sync engine in a thread."""
+    return importlib.util.find_spec("asyncpg") is not None
+
+
+async def get_async_engine():
+    """
+    Returns a SQLAlchemy AsyncEngine (asyncpg) backed by the Connector's async API.
+    Same environment variables as get_engine(). Bound to the running event loop.
+    """
+    global _async_engine, _async_connector, _async_lock
+    if _async_engine is not None:
+        return _async_engine
+    if _async_lock is None:
+        _async_lock = asyncio.Lock()
+    async with _async_lock:
+        if _async_engine is not None:
+            return _async_engine
+        from google.cloud.sql.connector import create_async_connector
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        kwargs = _connect_kwargs()
+        name = kwargs.pop("instance_connection_string")
+        _async_connector = await create_async_connector(refresh_strategy="LAZY")
+
+        async def getconn():
+            return await _async_connector.connect_async(name, "asyncpg", **kwargs)
+
+        # "creator" form (not async_creator) so the prepared statement cache size is honoured
+        def creator():
+            return engine.sync_engine.dialect.dbapi.connect(
+                async_creator_fn=getconn,
+                prepared_statement_cache_size=DB_PREPARED_STATEMENT_CACHE,
+            )
+
+        engine = create_async_engine(
+            "postgresql+asyncpg://",
+            creator=creator,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+        )
+        _async_engine = engine
+    return _async_engine
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_connector
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+    if _async_connector is not None:
+        try:
+            await _async_connector.close_async()
+        except Exception:
+            pass
+        _async_connector = None
+
+
 def dispose_engine():
     global _engine, _connector
     if _engine:
@@ -2,19 +2,59 @@
 Cloud SQL DB helpers (PostgreSQL via Cloud SQL Connector).
 Used when INSTANCE_CONNECTION_NAME is set (e.g. Cloud Run deployment).
 Schema matches supabase/migrations: screenings (child_age_months, domain, observations, image_path, report jsonb).
+*_async variants run on the asyncpg engine (run_async) for use from async endpoints.
 """
+import asyncio
 import json
 import os
+from typing import Any, Dict, List, Optional
+
 from sqlalchemy import text
-from app.services.cloudsql_connector import get_engine
+from app.services.cloudsql_connector import async_engine_available, get_async_engine, get_engine
 from app.core.logger import logger
 
+# Statements are built once; identical SQL text hits asyncpg's prepared statement cache
+_INSERT_SCREENING_SQL = text("""
+    INSERT INTO screenings (screening_id, child_age_months, domain, observations, image_path, report)
+    VALUES (:screening_id, :child_age_months, :domain, :observations, :image_path, CAST(:report AS jsonb))
+""")
+_FETCH_SCREENINGS_SQL = text("""
+    SELECT screening_id, child_age_months, domain, observations, image_path, report, created_at
+    FROM screenings ORDER BY created_at DESC LIMIT :limit OFFSET :offset
+""")
+_FETCH_SCREENING_SQL = text("""
+    SELECT screening_id, child_age_months, domain, observations, image_path, report, created_at
+    FROM screenings WHERE screening_id = :screening_id
+""")
+
 
 def is_cloudsql_enabled() -> bool:
     """True when Cloud SQL should be used (INSTANCE_CONNECTION_NAME set)."""
     return bool(os.environ.get("INSTANCE_CONNECTION_NAME"))
 
 
+def _run_sync(stmt, params: Any, write: bool) -> List[Dict[str, Any]]:
+    engine = get_engine()
+    with (engine.begin() if write else engine.connect()) as conn:
+        res = conn.execute(stmt, params)
+        return [dict(r._mapping) for r in res] if res.returns_rows else []
+
+
+async def run_async(stmt, params: Any = None, write: bool = False) -> List[Dict[str, Any]]:
+    """
+    Execute one statement without blocking the event loop. Uses the asyncpg engine
+    when installed, else the sync pg8000 engine in a worker thread. params may be a
+    list of dicts (executemany). Returns result rows as dicts ([] for writes).
+    """
+    params = params if params is not None else {}
+    if not async_engine_available():
+        return await asyncio.to_thread(_run_sync, stmt, params, write)
+    engine = await get_async_engine()
+    async with (engine.begin() if write else engine.connect()) as conn:
+        res = await conn.execute(stmt, params)
+        return [dict(r._mapping) for r in res] if res.returns_rows else []
+
+
 def insert_screening_record(
     screening_id: str,
     child_age_months: int,
@@ -27,22 +67,10 @@ def insert_screening_record(
     Inserts a screening record into the 'screenings' table.
     Schema: (screening_id, child_age_months, domain, observations, image_path, report jsonb, created_at)
     """
-    engine = get_engine()
-    insert_sql = text("""
-        INSERT INTO screenings (screening_id, child_age_months, domain, observations, image_path, report)
-        VALUES (:screening_id, :child_age_months, :domain, :observations, :image_path, :report::jsonb)
-    """)
-    params = {
-        "screening_id": screening_id,
-        "child_age_months": child_age_months,
-        "domain": domain,
-        "observations": observations,
-        "image_path": image_path,
-        "report": json.dumps(report),
-    }
+    params = _screening_params(screening_id, child_age_months, domain, observations, image_path, report)
     try:
-        with engine.begin() as conn:
-            conn.execute(insert_sql, params)
+        with get_engine().begin() as conn:
+            conn.execute(_INSERT_SCREENING_SQL, params)
     except Exception as e:
         logger.error("Failed to insert screening record: %s", e)
         raise
@@ -50,30 +78,63 @@ def insert_screening_record(
 
 def fetch_screenings(limit: int = 50, offset: int = 0):
     """Fetch screenings ordered by created_at DESC."""
-    engine = get_engine()
-    sql = text("""
-        SELECT screening_id, child_age_months, domain, observations, image_path, report, created_at
-        FROM screenings ORDER BY created_at DESC LIMIT :limit OFFSET :offset
-    """)
-    with engine.connect() as conn:
-        res = conn.execute(sql, {"limit": limit, "offset": offset})
+    with get_engine().connect() as conn:
+        res = conn.execute(_FETCH_SCREENINGS_SQL, {"limit": limit, "offset": offset})
         rows = [dict(r._mapping) for r in res]
     return rows
 
 
 def fetch_screening_by_id(screening_id: str):
     """Fetch a single screening by screening_id."""
-    engine = get_engine()
-    sql = text("""
-        SELECT screening_id, child_age_months, domain, observations, image_path, report, created_at
-        FROM screenings WHERE screening_id = :screening_id
-    """)
-    with engine.connect() as conn:
-        res = conn.execute(sql, {"screening_id": screening_id})
+    with get_engine().connect() as conn:
+        res = conn.execute(_FETCH_SCREENING_SQL, {"screening_id": screening_id})
         row = res.first()
         return dict(row._mapping) if row else None
 
 
+def _screening_params(
+    screening_id: str,
+    child_age_months: int,
+    domain: str,
+    observations: str,
+    image_path: str | None,
+    report: dict,
+) -> Dict[str, Any]:
+    return {
+        "screening_id": screening_id,
+        "child_age_months": child_age_months,
+        "domain": domain,
+        "observations": observations,
+        "image_path": image_path,
+        "report": json.dumps(report),
+    }
+
+
+async def insert_screening_record_async(
+    screening_id: str,
+    child_age_months: int,
+    domain: str,
+    observations: str,
+    image_path: str | None,
+    report: dict,
+) -> None:
+    params = _screening_params(screening_id, child_age_months, domain, observations, image_path, report)
+    try:
+        await run_async(_INSERT_SCREENING_SQL, params, write=True)
+    except Exception as e:
+        logger.error("Failed to insert screening record: {}", e)
+        raise
+
+
+async def fetch_screenings_async(limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+    return await run_async(_FETCH_SCREENINGS_SQL, {"limit": limit, "offset": offset})
+
+
+async def fetch_screening_by_id_async(screening_id: str) -> Optional[Dict[str, Any]]:
+    rows = await run_async(_FETCH_SCREENING_SQL, {"screening_id": screening_id})
+    return rows[0] if rows else None
+
+
 # --- Reports (for end2end flow when Cloud SQL is used) ---
 
 def insert_report(report_id: str, screening_id: str, patient_info: dict, draft_json: dict) -> None:
@@ -81,7 +142,7 @@ def insert_report(report_id: str, screening_id: str, patient_info: dict, draft_j
     engine = get_engine()
     sql = text("""
         INSERT INTO reports (report_id, screening_id, patient_info, draft_json, status, created_at)
-        VALUES (:report_id, :screening_id, :patient_info::jsonb, :draft_json::jsonb, 'draft', now())
+        VALUES (:report_id, :screening_id, CAST(:patient_info AS jsonb), CAST(:draft_json AS jsonb), 'draft', now())
     """)
     with engine.begin() as conn:
         conn.execute(sql, {
@@ -97,7 +158,7 @@ def insert_report_audit(report_id: str, action: str, actor: str, payload: dict)
     engine = get_engine()
     sql = text("""
         INSERT INTO report_audit (report_id, action, actor, payload, created_at)
-        VALUES (:report_id, :action, :actor, :payload::jsonb, now())
+        VALUES (:report_id, :action, :actor, CAST(:payload AS jsonb), now())
     """)
     with engine.begin() as conn:
         conn.execute(sql, {
@@ -134,7 +195,7 @@ def update_report_draft(report_id: str, draft_json: dict) -> dict | None:
     """Update draft_json for a report. Returns updated draft or None if not found."""
     engine = get_engine()
     sel = text("SELECT draft_json FROM reports WHERE report_id = :rid FOR UPDATE")
-    upd = text("UPDATE reports SET draft_json = :djson::jsonb WHERE report_id = :rid")
+    upd = text("UPDATE reports SET draft_json = CAST(:djson AS jsonb) WHERE report_id = :rid")
     with engine.begin() as conn:
         row = conn.execute(sel, {"rid": report_id}).first()
         if not row:
@@ -147,7 +208,7 @@ def finalize_report(report_id: str, final_json: dict, clinician_id: str) -> None
     """Finalize a report: set final_json, status, clinician_id."""
     engine = get_engine()
     sql = text("""
-        UPDATE reports SET final_json = :fjson::jsonb, status = 'finalized',
+        UPDATE reports SET final_json = CAST(:fjson AS jsonb), status = 'finalized',
         clinician_id = :cid, clinician_signed_at = now()
         WHERE report_id = :rid
     """)
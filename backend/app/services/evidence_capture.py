@@ -1,13 +1,22 @@
 """
 Evidence capture for explainability: FAISS nearest neighbors, feature highlights.
 Returns EvidenceItem list for InferenceExplainable schema.
+
+The FAISS index is resident: loaded once per process by EvidenceIndex and
+hot-swapped when faiss_index.bin / faiss_meta.jsonl (or the faiss_meta.bin
+sidecar written by the offline builder) change on disk.
 """
 import json
+import mmap
 import os
-from typing import List, Optional
+import struct
+import threading
+import time
+from typing import Any, List, Optional, Tuple
 
 import numpy as np
 
+from app.core.logger import logger
 from app.models.explainability_schema import EvidenceItem
 
 # Optional FAISS
@@ -22,69 +31,217 @@ INFRA_DIR = os.environ.get("FAISS_INFRA_DIR", "infra")
 INDEX_PATH = os.path.join(INFRA_DIR, "faiss_index.bin")
 META_PATH = os.path.join(INFRA_DIR, "faiss_meta.jsonl")
 META_PKL_PATH = os.path.join(INFRA_DIR, "faiss_meta.pkl")
+# Binary sidecar written by model-dev/eval/faiss_index_builder.py
+META_BIN_PATH = os.path.join(INFRA_DIR, "faiss_meta.bin")
 
 
-def _load_faiss_index(dim: int):
-    """Load FAISS index and metadata. Returns (index, meta_list) or (None, [])."""
-    if not FAISS_AVAILABLE:
-        return None, []
-    if not os.path.exists(INDEX_PATH) or os.path.getsize(INDEX_PATH) == 0:
-        return None, []
-    try:
-        index = faiss.read_index(INDEX_PATH)
-    except Exception:
-        return None, []
-
-    meta: List[dict] = []
-    if os.path.exists(META_PATH):
-        with open(META_PATH, "r", encoding="utf-8") as fh:
-            for line in fh:
-                try:
-                    meta.append(json.loads(line.strip()))
-                except Exception:
-                    continue
-    elif os.path.exists(META_PKL_PATH):
+# Seconds between on-disk change checks (stat only; the index is reloaded
+# only when the index/meta file mtime or size actually changes).
+RELOAD_CHECK_INTERVAL_S = float(os.environ.get("FAISS_RELOAD_CHECK_S", "5"))
+
+
+class _JsonlMeta:
+    """
+    Metadata for faiss_meta.jsonl held as one bytes object plus int64 row offsets.
+    Rows are parsed lazily, only for the ids a search actually returns. The file
+    is read, not mmap'd: writers append to and rewrite it in place, and a mapped
+    file truncated underneath a reader faults the whole process (SIGBUS).
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as fh:
+            self._data = fh.read()
+        buf = np.frombuffer(self._data, dtype=np.uint8)
+        newlines = np.flatnonzero(buf == 10).astype(np.int64)
+        starts = np.concatenate(([0], newlines + 1))
+        ends = np.concatenate((newlines, [len(buf)]))
+        keep = ends > starts  # drop blank lines, as the line-by-line parser did
+        self._starts = starts[keep]
+        self._ends = ends[keep]
+
+    def __len__(self) -> int:
+        return int(self._starts.shape[0])
+
+    def __getitem__(self, idx: int) -> Optional[dict]:
+        line = self._data[int(self._starts[idx]):int(self._ends[idx])]
         try:
-            import pickle
-            with open(META_PKL_PATH, "rb") as fh:
-                meta = pickle.load(fh)
+            return json.loads(line)
         except Exception:
-            meta = []
+            return None
 
-    return index, meta
+    def close(self) -> None:
+        self._data = b""
 
 
-def get_nearest_neighbor_evidence(
-    embedding: np.ndarray,
-    k: int = 5,
-    dim: int = 256,
-) -> List[EvidenceItem]:
+class _BinaryMeta:
     """
-    Search FAISS for nearest neighbors and return EvidenceItem list.
-    Embedding should be L2-normalized float32; FAISS IndexFlatIP uses inner product (= cosine if normalized).
+    faiss_meta.bin: b"PSMETA01" | uint64 n | int64 offsets[n + 1] | compact JSON rows.
+    The offset table is read in place from the mmap; no scan at load time. Safe to
+    map because the builder only ever swaps the file in with os.replace: a mapped
+    inode is never truncated or rewritten. Anything else writing this path must
+    do the same.
     """
-    index, meta = _load_faiss_index(dim)
-    if index is None or index.ntotal == 0 or not meta:
-        return []
 
-    # Ensure correct shape and dtype
-    emb = np.asarray(embedding, dtype=np.float32)
-    if emb.ndim == 1:
-        emb = emb.reshape(1, -1)
-    if emb.shape[1] != dim:
-        return []
+    _HEADER = struct.Struct("<8sQ")
+
+    def __init__(self, path: str):
+        self._fh = open(path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n = self._HEADER.unpack_from(self._mm, 0)
+        if magic != b"PSMETA01":
+            self.close()
+            raise ValueError(f"{path} is not a FAISS metadata sidecar")
+        try:
+            self._offsets = np.frombuffer(self._mm, dtype=np.int64, count=n + 1, offset=self._HEADER.size)
+        except ValueError:
+            self.close()
+            raise
+        self._data_start = self._HEADER.size + self._offsets.nbytes
+        if self._data_start + int(self._offsets[-1]) > len(self._mm):
+            self.close()
+            raise ValueError(f"{path} is truncated")
+
+    def __len__(self) -> int:
+        return int(self._offsets.shape[0]) - 1
+
+    def __getitem__(self, idx: int) -> Optional[dict]:
+        start = self._data_start + int(self._offsets[idx])
+        end = self._data_start + int(self._offsets[idx + 1])
+        try:
+            return json.loads(self._mm[start:end])
+        except Exception:
+            return None
+
+    def close(self) -> None:
+        self._offsets = None  # release the buffer export before unmapping
+        self._mm.close()
+        self._fh.close()
 
-    if FAISS_AVAILABLE:
+
+def _file_sig(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class EvidenceIndex:
+    """
+    Process-wide FAISS index + metadata, loaded once and swapped atomically
+    when the files on disk change. Searches never see a half-loaded index:
+    a new (index, meta) snapshot is built fully before the reference flips.
+    """
+
+    def __init__(
+        self,
+        index_path: str = INDEX_PATH,
+        meta_path: str = META_PATH,
+        meta_pkl_path: str = META_PKL_PATH,
+        check_interval_s: float = RELOAD_CHECK_INTERVAL_S,
+        meta_bin_path: str = META_BIN_PATH,
+    ):
+        self.index_path = index_path
+        self.meta_path = meta_path
+        self.meta_pkl_path = meta_pkl_path
+        self.meta_bin_path = meta_bin_path
+        self.check_interval_s = check_interval_s
+        self._lock = threading.Lock()
+        self._snapshot: Tuple[Any, Any] = (None, [])
+        self._sig: Optional[tuple] = None
+        self._next_check = 0.0
+
+    def _signature(self) -> tuple:
+        return (
+            _file_sig(self.index_path),
+            _file_sig(self.meta_path),
+            _file_sig(self.meta_pkl_path),
+            _file_sig(self.meta_bin_path),
+        )
+
+    def _load(self) -> Tuple[Any, Any]:
+        if not FAISS_AVAILABLE:
+            return None, []
+        if not os.path.exists(self.index_path) or os.path.getsize(self.index_path) == 0:
+            return None, []
+        try:
+            index = faiss.read_index(self.index_path)
+        except Exception:
+            return None, []
+
+        meta: Any = []
+        bin_sig, jsonl_sig = _file_sig(self.meta_bin_path), _file_sig(self.meta_path)
+        # The sidecar wins unless the JSONL was appended to after it was written
+        if bin_sig and (jsonl_sig is None or bin_sig[0] >= jsonl_sig[0]):
+            try:
+                return index, _BinaryMeta(self.meta_bin_path)
+            except Exception:
+                pass
+        if os.path.exists(self.meta_path):
+            meta = _JsonlMeta(self.meta_path)
+        elif os.path.exists(self.meta_pkl_path):
+            try:
+                import pickle
+                with open(self.meta_pkl_path, "rb") as fh:
+                    meta = pickle.load(fh)
+            except Exception:
+                meta = []
+        return index, meta
+
+    def get(self) -> Tuple[Any, Any]:
+        """Return the current (index, meta) snapshot, reloading if files changed."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return self._snapshot
+        with self._lock:
+            if now < self._next_check:
+                return self._snapshot
+            sig = self._signature()
+            if sig != self._sig:
+                # The old snapshot is not closed: an in-flight search may still
+                # hold it; its mmap is released once the last reference drops.
+                self._snapshot = self._load()
+                self._sig = sig
+                logger.info("Evidence index (re)loaded from {}", self.index_path)
+            self._next_check = now + self.check_interval_s
+        return self._snapshot
+
+    def reload(self) -> None:
+        """Force a change check on the next get() (e.g. after writing new files)."""
+        with self._lock:
+            self._sig = None
+            self._next_check = 0.0
+
+    def search(self, embeddings: np.ndarray, k: int = 5) -> List[List[EvidenceItem]]:
+        """
+        Nearest-neighbor evidence for a batch of embeddings with a single
+        index.search call. Returns one list per input row.
+        """
+        emb = np.asarray(embeddings, dtype=np.float32)
+        if emb.ndim == 1:
+            emb = emb.reshape(1, -1)
+        index, meta = self.get()
+        if index is None or index.ntotal == 0 or not len(meta):
+            return [[] for _ in range(emb.shape[0])]
+        if emb.shape[1] != index.d:
+            return [[] for _ in range(emb.shape[0])]
+
+        emb = np.ascontiguousarray(emb).copy()  # normalize_L2 is in-place
         faiss.normalize_L2(emb)
         k = min(k, index.ntotal)
         scores, ids = index.search(emb, k)
 
-        evidence_items: List[EvidenceItem] = []
-        for i, (score, idx) in enumerate(zip(scores[0], ids[0])):
-            if 0 <= idx < len(meta):
+        out: List[List[EvidenceItem]] = []
+        for row_scores, row_ids in zip(scores, ids):
+            items: List[EvidenceItem] = []
+            for score, idx in zip(row_scores, row_ids):
+                if not 0 <= idx < len(meta):
+                    continue
                 m = meta[idx]
+                if m is None:
+                    continue
                 case_id = m.get("id", m.get("case_id", f"nn-{idx}"))
-                evidence_items.append(
+                items.append(
                     EvidenceItem(
                         type="nearest_neighbor",
                         description=f"Similar case: {m.get('description', m.get('source', case_id))}",
@@ -92,9 +249,47 @@ def get_nearest_neighbor_evidence(
                         influence=float(score) if score <= 1.0 else 1.0,
                     )
                 )
-        return evidence_items
+            out.append(items)
+        return out
+
+
+_evidence_index: Optional[EvidenceIndex] = None
+_evidence_index_lock = threading.Lock()
+
+
+def get_evidence_index() -> EvidenceIndex:
+    """Process-wide EvidenceIndex singleton."""
+    global _evidence_index
+    if _evidence_index is None:
+        with _evidence_index_lock:
+            if _evidence_index is None:
+                _evidence_index = EvidenceIndex()
+    return _evidence_index
+
 
-    return []
+def get_nearest_neighbor_evidence(
+    embedding: np.ndarray,
+    k: int = 5,
+    dim: int = 256,
+) -> List[EvidenceItem]:
+    """
+    Search FAISS for nearest neighbors and return EvidenceItem list.
+    Embedding should be L2-normalized float32; FAISS IndexFlatIP uses inner product (= cosine if normalized).
+    """
+    emb = np.asarray(embedding, dtype=np.float32)
+    if emb.ndim == 1:
+        emb = emb.reshape(1, -1)
+    if emb.shape[1] != dim:
+        return []
+    return get_evidence_index().search(emb[:1], k=k)[0]
+
+
+def get_nearest_neighbor_evidence_batch(
+    embeddings: np.ndarray,
+    k: int = 5,
+) -> List[List[EvidenceItem]]:
+    """Batch variant: several queued cases share one index.search call."""
+    return get_evidence_index().search(embeddings, k=k)
 
 
 def extract_evidence_from_model_output(
@@ -2,19 +2,77 @@
 """
 Feedback store for clinician feedback on AI inferences.
 Uses Cloud SQL (PostgreSQL) when available, else in-memory store for local dev.
+
+Async endpoints use the *_async functions, which run on the asyncpg engine
+(db_cloudsql.run_async). With INFERENCE_INSERT_BUFFER=1, inference records are
+collected and written with one multi-row INSERT per INFERENCE_INSERT_BATCH rows
+or INFERENCE_INSERT_FLUSH_S seconds; the buffer is drained on app shutdown.
 """
+import asyncio
 import json
+import os
 import uuid
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import Uuid, column, insert, table, text
 
 from app.core.logger import logger
 from app.services.db_cloudsql import is_cloudsql_enabled
 
+INFERENCE_INSERT_BUFFER = os.environ.get("INFERENCE_INSERT_BUFFER", "0").lower() in ("1", "true", "yes")
+INFERENCE_INSERT_BATCH = int(os.environ.get("INFERENCE_INSERT_BATCH", "100"))
+INFERENCE_INSERT_FLUSH_S = float(os.environ.get("INFERENCE_INSERT_FLUSH_S", "1.0"))
+
 # In-memory store for dev when no Postgres is configured
 _feedback_store: List[Dict[str, Any]] = []
 _inference_store: Dict[str, Dict[str, Any]] = {}
 
+# Statements are built once; identical SQL text hits asyncpg's prepared statement cache
+_INSERT_INFERENCE_SQL = text("""
+    INSERT INTO inferences (inference_id, case_id, screening_id, input_hash, result_summary, result_risk)
+    VALUES (CAST(:inference_id AS uuid), :case_id, :screening_id, :input_hash, :result_summary, :result_risk)
+""")
+_INSERT_FEEDBACK_SQL = text("""
+    INSERT INTO clinician_feedback (
+        feedback_id, case_id, inference_id, clinician_id, feedback_type,
+        corrected_risk, corrected_summary, rating, comment, clinician_notes, metadata
+    )
+    VALUES (
+        CAST(:feedback_id AS uuid), :case_id, CAST(:inference_id AS uuid), CAST(:clinician_id AS uuid),
+        :feedback_type, :corrected_risk, :corrected_summary, :rating,
+        :comment, :clinician_notes, CAST(:metadata AS jsonb)
+    )
+""")
+_FEEDBACK_BY_INFERENCE_SQL = text("""
+    SELECT feedback_id, case_id, inference_id, clinician_id, provided_at,
+           feedback_type, corrected_risk, corrected_summary, rating, comment,
+           clinician_notes, metadata
+    FROM clinician_feedback
+    WHERE inference_id = CAST(:inference_id AS uuid)
+    ORDER BY provided_at DESC
+""")
+_FEEDBACK_BY_CASE_SQL = text("""
+    SELECT feedback_id, case_id, inference_id, clinician_id, provided_at,
+           feedback_type, corrected_risk, corrected_summary, rating, comment,
+           clinician_notes, metadata
+    FROM clinician_feedback
+    WHERE case_id = :case_id
+    ORDER BY provided_at DESC
+""")
+_INFERENCE_EXISTS_SQL = text("SELECT 1 FROM inferences WHERE inference_id = CAST(:inference_id AS uuid) LIMIT 1")
+
+# Core table for multi-row INSERT ... VALUES (...), (...) of buffered inference records
+_INFERENCES = table(
+    "inferences",
+    column("inference_id", Uuid(as_uuid=False)),
+    column("case_id"),
+    column("screening_id"),
+    column("input_hash"),
+    column("result_summary"),
+    column("result_risk"),
+)
+
 
 def insert_inference(
     inference_id: str,
@@ -26,23 +84,12 @@ def insert_inference(
 ) -> None:
     """Insert an inference record for feedback linkage."""
     if is_cloudsql_enabled():
-        from sqlalchemy import text
         from app.services.cloudsql_connector import get_engine
-        engine = get_engine()
-        sql = text("""
-            INSERT INTO inferences (inference_id, case_id, screening_id, input_hash, result_summary, result_risk)
-            VALUES (:inference_id::uuid, :case_id, :screening_id, :input_hash, :result_summary, :result_risk)
-        """)
         try:
-            with engine.begin() as conn:
-                conn.execute(sql, {
-                    "inference_id": inference_id,
-                    "case_id": case_id,
-                    "screening_id": screening_id,
-                    "input_hash": input_hash,
-                    "result_summary": result_summary,
-                    "result_risk": result_risk,
-                })
+            with get_engine().begin() as conn:
+                conn.execute(_INSERT_INFERENCE_SQL, _inference_params(
+                    inference_id, case_id, screening_id, input_hash, result_summary, result_risk
+                ))
         except Exception as e:
             logger.warning("Failed to insert inference record: %s", e)
     else:
@@ -61,114 +108,281 @@ def insert_feedback(data: dict) -> str:
     """Insert feedback. Returns feedback_id."""
     feedback_id = str(uuid.uuid4())
     if is_cloudsql_enabled():
-        from sqlalchemy import text
         from app.services.cloudsql_connector import get_engine
-        engine = get_engine()
-        sql = text("""
-            INSERT INTO clinician_feedback (
-                feedback_id, case_id, inference_id, clinician_id, feedback_type,
-                corrected_risk, corrected_summary, rating, comment, clinician_notes, metadata
-            )
-            VALUES (
-                :feedback_id::uuid, :case_id, :inference_id::uuid, :clinician_id::uuid,
-                :feedback_type, :corrected_risk, :corrected_summary, :rating,
-                :comment, :clinician_notes, :metadata::jsonb
-            )
-        """)
-        params = {
-            "feedback_id": feedback_id,
-            "case_id": str(data["case_id"]),
-            "inference_id": str(data["inference_id"]),
-            "clinician_id": str(data["clinician_id"]),
-            "feedback_type": data["feedback_type"],
-            "corrected_risk": data.get("corrected_risk"),
-            "corrected_summary": data.get("corrected_summary"),
-            "rating": data.get("rating"),
-            "comment": data.get("comment"),
-            "clinician_notes": data.get("clinician_notes"),
-            "metadata": json.dumps(data.get("metadata", {})),
-        }
-        with engine.begin() as conn:
-            conn.execute(sql, params)
+        with get_engine().begin() as conn:
+            conn.execute(_INSERT_FEEDBACK_SQL, _feedback_params(feedback_id, data))
     else:
-        doc = {
-            "feedback_id": feedback_id,
-            "case_id": data["case_id"],
-            "inference_id": data["inference_id"],
-            "clinician_id": data["clinician_id"],
-            "provided_at": datetime.now(timezone.utc).isoformat(),
-            "feedback_type": data["feedback_type"],
-            "corrected_risk": data.get("corrected_risk"),
-            "corrected_summary": data.get("corrected_summary"),
-            "rating": data.get("rating"),
-            "comment": data.get("comment"),
-            "clinician_notes": data.get("clinician_notes"),
-            "metadata": data.get("metadata", {}),
-        }
-        _feedback_store.append(doc)
+        _feedback_store.append(_feedback_doc(feedback_id, data))
     return feedback_id
 
 
+def _feedback_doc(feedback_id: str, data: dict) -> Dict[str, Any]:
+    return {
+        "feedback_id": feedback_id,
+        "case_id": data["case_id"],
+        "inference_id": data["inference_id"],
+        "clinician_id": data["clinician_id"],
+        "provided_at": datetime.now(timezone.utc).isoformat(),
+        "feedback_type": data["feedback_type"],
+        "corrected_risk": data.get("corrected_risk"),
+        "corrected_summary": data.get("corrected_summary"),
+        "rating": data.get("rating"),
+        "comment": data.get("comment"),
+        "clinician_notes": data.get("clinician_notes"),
+        "metadata": data.get("metadata", {}),
+    }
+
+
 def get_feedback_by_inference(inference_id: str) -> List[Dict[str, Any]]:
     """Fetch feedback for an inference."""
     if is_cloudsql_enabled():
-        from sqlalchemy import text
         from app.services.cloudsql_connector import get_engine
-        engine = get_engine()
-        sql = text("""
-            SELECT feedback_id, case_id, inference_id, clinician_id, provided_at,
-                   feedback_type, corrected_risk, corrected_summary, rating, comment,
-                   clinician_notes, metadata
-            FROM clinician_feedback
-            WHERE inference_id = :inference_id::uuid
-            ORDER BY provided_at DESC
-        """)
-        with engine.connect() as conn:
-            res = conn.execute(sql, {"inference_id": inference_id})
-            rows = [dict(r._mapping) for r in res]
-        for r in rows:
-            if r.get("provided_at"):
-                r["provided_at"] = r["provided_at"].isoformat()
-            if r.get("metadata") and hasattr(r["metadata"], "copy"):
-                r["metadata"] = dict(r["metadata"])
-        return rows
+        with get_engine().connect() as conn:
+            res = conn.execute(_FEEDBACK_BY_INFERENCE_SQL, {"inference_id": inference_id})
+            return _normalize_feedback_rows([dict(r._mapping) for r in res])
     return [f for f in _feedback_store if f.get("inference_id") == inference_id]
 
 
 def get_feedback_by_case(case_id: str) -> List[Dict[str, Any]]:
     """Fetch feedback for a case."""
     if is_cloudsql_enabled():
-        from sqlalchemy import text
         from app.services.cloudsql_connector import get_engine
-        engine = get_engine()
-        sql = text("""
-            SELECT feedback_id, case_id, inference_id, clinician_id, provided_at,
-                   feedback_type, corrected_risk, corrected_summary, rating, comment,
-                   clinician_notes, metadata
-            FROM clinician_feedback
-            WHERE case_id = :case_id
-            ORDER BY provided_at DESC
-        """)
-        with engine.connect() as conn:
-            res = conn.execute(sql, {"case_id": case_id})
-            rows = [dict(r._mapping) for r in res]
-        for r in rows:
-            if r.get("provided_at"):
-                r["provided_at"] = r["provided_at"].isoformat()
-            if r.get("metadata") and hasattr(r["metadata"], "copy"):
-                r["metadata"] = dict(r["metadata"])
-        return rows
+        with get_engine().connect() as conn:
+            res = conn.execute(_FEEDBACK_BY_CASE_SQL, {"case_id": case_id})
+            return _normalize_feedback_rows([dict(r._mapping) for r in res])
     return [f for f in _feedback_store if f.get("case_id") == case_id]
 
 
 def inference_exists(inference_id: str) -> bool:
     """Check if inference exists."""
     if is_cloudsql_enabled():
-        from sqlalchemy import text
+        if _buffer is not None and _buffer.pending(inference_id):
+            return True
         from app.services.cloudsql_connector import get_engine
-        engine = get_engine()
-        sql = text("SELECT 1 FROM inferences WHERE inference_id = :inference_id::uuid LIMIT 1")
-        with engine.connect() as conn:
-            res = conn.execute(sql, {"inference_id": inference_id})
+        with get_engine().connect() as conn:
+            res = conn.execute(_INFERENCE_EXISTS_SQL, {"inference_id": inference_id})
             return res.first() is not None
     return inference_id in _inference_store
+
+
+def _inference_params(
+    inference_id: str,
+    case_id: str,
+    screening_id: Optional[str],
+    input_hash: Optional[str],
+    result_summary: Optional[str],
+    result_risk: Optional[str],
+) -> Dict[str, Any]:
+    return {
+        "inference_id": inference_id,
+        "case_id": case_id,
+        "screening_id": screening_id,
+        "input_hash": input_hash,
+        "result_summary": result_summary,
+        "result_risk": result_risk,
+    }
+
+
+def _feedback_params(feedback_id: str, data: dict) -> Dict[str, Any]:
+    return {
+        "feedback_id": feedback_id,
+        "case_id": str(data["case_id"]),
+        "inference_id": str(data["inference_id"]),
+        "clinician_id": str(data["clinician_id"]),
+        "feedback_type": data["feedback_type"],
+        "corrected_risk": data.get("corrected_risk"),
+        "corrected_summary": data.get("corrected_summary"),
+        "rating": data.get("rating"),
+        "comment": data.get("comment"),
+        "clinician_notes": data.get("clinician_notes"),
+        "metadata": json.dumps(data.get("metadata", {})),
+    }
+
+
+def _normalize_feedback_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for r in rows:
+        if r.get("provided_at"):
+            r["provided_at"] = r["provided_at"].isoformat()
+        if r.get("metadata") and hasattr(r["metadata"], "copy"):
+            r["metadata"] = dict(r["metadata"])
+    return rows
+
+
+# --- Async path (asyncpg) ---
+
+async def _insert_inference_rows(rows: List[Dict[str, Any]]) -> None:
+    """One multi-row INSERT for a batch of inference records."""
+    from app.services.db_cloudsql import run_async
+    await run_async(insert(_INFERENCES).values(rows), write=True)
+
+
+class InferenceWriteBuffer:
+    """
+    Collects inference rows on the event loop and flushes them in multi-row INSERTs.
+    A failed batch is retried row by row, so one bad row does not drop the rest.
+    """
+
+    def __init__(
+        self,
+        execute: Callable[[List[Dict[str, Any]]], Awaitable[None]] = _insert_inference_rows,
+        max_rows: int = INFERENCE_INSERT_BATCH,
+        flush_interval_s: float = INFERENCE_INSERT_FLUSH_S,
+    ):
+        self._execute = execute
+        self.max_rows = max(1, max_rows)
+        self.flush_interval_s = flush_interval_s
+        self._rows: List[Dict[str, Any]] = []
+        self._pending_ids: Set[str] = set()
+        # inference_id -> write task for rows already handed to the database
+        self._writing: Dict[str, asyncio.Task] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._flushes: Set[asyncio.Task] = set()
+        self.failed = 0
+
+    def pending(self, inference_id: str) -> bool:
+        return inference_id in self._pending_ids
+
+    def add(self, row: Dict[str, Any]) -> None:
+        self._rows.append(row)
+        self._pending_ids.add(row["inference_id"])
+        if len(self._rows) >= self.max_rows:
+            self._start_write()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.get_running_loop().create_task(self._flush_later())
+
+    def _start_write(self) -> Optional[asyncio.Task]:
+        rows, self._rows = self._rows, []
+        if not rows:
+            return None
+        task = asyncio.get_running_loop().create_task(self._write(rows))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+        for r in rows:
+            self._writing[r["inference_id"]] = task
+        return task
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval_s)
+        await self.flush()
+
+    async def flush(self) -> int:
+        task = self._start_write()
+        # Shielded: cancelling the interval timer must not abandon rows mid-write
+        return await asyncio.shield(task) if task is not None else 0
+
+    async def wait_written(self, inference_id: str) -> None:
+        """Flush now if the row is still buffered, then wait until its write has finished."""
+        if not self.pending(inference_id):
+            return
+        task = self._writing.get(inference_id) or self._start_write()
+        if task is not None:
+            await asyncio.shield(task)
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> int:
+        try:
+            try:
+                await self._execute(rows)
+                return len(rows)
+            except Exception as e:
+                if len(rows) == 1:
+                    self.failed += 1
+                    logger.warning("Failed to insert inference record: {}", e)
+                    return 0
+                logger.warning("Multi-row insert of {} inference records failed ({}); retrying row by row", len(rows), e)
+            written = 0
+            for row in rows:
+                try:
+                    await self._execute([row])
+                    written += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.warning("Failed to insert inference record {}: {}", row["inference_id"], e)
+            return written
+        finally:
+            for r in rows:
+                self._pending_ids.discard(r["inference_id"])
+                self._writing.pop(r["inference_id"], None)
+
+    async def close(self) -> None:
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        await self.flush()
+
+
+_buffer: Optional[InferenceWriteBuffer] = None
+
+
+def _get_buffer() -> InferenceWriteBuffer:
+    global _buffer
+    if _buffer is None:
+        _buffer = InferenceWriteBuffer()
+    return _buffer
+
+
+async def flush_inference_buffer() -> None:
+    """Drain buffered inference records (call on app shutdown)."""
+    global _buffer
+    buf, _buffer = _buffer, None
+    if buf is not None:
+        await buf.close()
+
+
+async def insert_inference_async(
+    inference_id: str,
+    case_id: str,
+    screening_id: Optional[str],
+    input_hash: Optional[str],
+    result_summary: Optional[str],
+    result_risk: Optional[str],
+) -> None:
+    """insert_inference for async endpoints (buffered when INFERENCE_INSERT_BUFFER is set)."""
+    if not is_cloudsql_enabled():
+        insert_inference(inference_id, case_id, screening_id, input_hash, result_summary, result_risk)
+        return
+    params = _inference_params(inference_id, case_id, screening_id, input_hash, result_summary, result_risk)
+    if INFERENCE_INSERT_BUFFER:
+        _get_buffer().add(params)
+        return
+    from app.services.db_cloudsql import run_async
+    try:
+        await run_async(_INSERT_INFERENCE_SQL, params, write=True)
+    except Exception as e:
+        logger.warning("Failed to insert inference record: {}", e)
+
+
+async def insert_feedback_async(data: dict) -> str:
+    if not is_cloudsql_enabled():
+        return insert_feedback(data)
+    from app.services.db_cloudsql import run_async
+    if _buffer is not None:
+        # The inference row may still be buffered; feedback references it (fk_inference)
+        await _buffer.wait_written(str(data["inference_id"]))
+    feedback_id = str(uuid.uuid4())
+    await run_async(_INSERT_FEEDBACK_SQL, _feedback_params(feedback_id, data), write=True)
+    return feedback_id
+
+
+async def get_feedback_by_inference_async(inference_id: str) -> List[Dict[str, Any]]:
+    if not is_cloudsql_enabled():
+        return get_feedback_by_inference(inference_id)
+    from app.services.db_cloudsql import run_async
+    return _normalize_feedback_rows(await run_async(_FEEDBACK_BY_INFERENCE_SQL, {"inference_id": inference_id}))
+
+
+async def get_feedback_by_case_async(case_id: str) -> List[Dict[str, Any]]:
+    if not is_cloudsql_enabled():
+        return get_feedback_by_case(case_id)
+    from app.services.db_cloudsql import run_async
+    return _normalize_feedback_rows(await run_async(_FEEDBACK_BY_CASE_SQL, {"case_id": case_id}))
+
+
+async def inference_exists_async(inference_id: str) -> bool:
+    if not is_cloudsql_enabled():
+        return inference_exists(inference_id)
+    if _buffer is not None and _buffer.pending(inference_id):
+        return True
+    from app.services.db_cloudsql import run_async
+    return bool(await run_async(_INFERENCE_EXISTS_SQL, {"inference_id": inference_id}))
@@ -4,7 +4,9 @@ Uses MODEL_BACKEND to select model; runs orchestrator pipeline.
 """
 import asyncio
 import logging
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, Optional
 
 from app.core.config import settings
@@ -16,7 +18,7 @@ from app.schemas.explainability_structured import (
     ensure_hai_structured_output,
 )
 from app.calibration import apply_calibration
-from app.services.audit import log_inference_audit_expanded
+from app.services.audit import log_inference_audit_expanded, submit_audit
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +30,13 @@ _embedding_model = None
 INFERENCE_TIMEOUT_S = 5.0
 MAX_RETRIES = 2
 
+# Dedicated pool for the sync pipeline so model calls are not capped by the
+# loop's default executor (min(32, cpu+4) threads shared with everything else).
+_pipeline_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("INFERENCE_MAX_WORKERS", "32")),
+    thread_name_prefix="hai-infer",
+)
+
 
 def _get_registry():
     global _registry
@@ -55,7 +64,7 @@ def _get_embedding_model():
     return _embedding_model
 
 
-def run_inference_sync(
+async def run_inference(
     case_id: str,
     age_months: int,
     observations: str,
@@ -66,7 +75,9 @@ def run_inference_sync(
 ) -> Dict[str, Any]:
     """
     Run full pipeline: optional embed -> model -> tools -> post-process -> calibration -> audit.
-    Sync wrapper; respects timeout and retries.
+    Native coroutine: the sync pipeline runs in a worker thread per attempt, so the
+    event loop keeps serving other requests. Respects timeout and retries; audit
+    writes are queued to the background audit thread.
     """
     request_id = request_id or ""
     shape = shape or [1, 256]
@@ -82,13 +93,12 @@ def run_inference_sync(
     try:
         orch = _get_orchestrator()
         run_fn = orch.run if hasattr(orch, "run") else orch.run_pipeline
+        loop = asyncio.get_running_loop()
         for attempt in range(MAX_RETRIES + 1):
             try:
-                result = asyncio.run(
-                    asyncio.wait_for(
-                        asyncio.to_thread(run_fn, input_data),
-                        timeout=INFERENCE_TIMEOUT_S,
-                    )
+                result = await asyncio.wait_for(
+                    loop.run_in_executor(_pipeline_executor, run_fn, input_data),
+                    timeout=INFERENCE_TIMEOUT_S,
                 )
                 break
             except asyncio.TimeoutError:
@@ -111,7 +121,8 @@ def run_inference_sync(
         elapsed_ms = int((time.perf_counter() - start) * 1000)
         result["inference_time_ms"] = elapsed_ms
         # Audit: include agent decision_log (timestamp, risk, tool_chain) when present
-        log_inference_audit_expanded(
+        submit_audit(
+            log_inference_audit_expanded,
             request_id=request_id,
             case_id=case_id,
             model_id=result.get("model_id"),
@@ -128,7 +139,8 @@ def run_inference_sync(
         return result
     except Exception as e:
         logger.exception("Inference controller failed: %s", e)
-        log_inference_audit_expanded(
+        submit_audit(
+            log_inference_audit_expanded,
             request_id=request_id,
             case_id=case_id,
             model_id="",
@@ -140,3 +152,29 @@ def run_inference_sync(
             "case_id": case_id,
             "inference_time_ms": int((time.perf_counter() - start) * 1000),
         }
+
+
+def run_inference_sync(
+    case_id: str,
+    age_months: int,
+    observations: str,
+    embedding_b64: str,
+    shape: Optional[list] = None,
+    emb_version: str = "medsiglip-v1",
+    request_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Blocking wrapper around run_inference for scripts and CLI tools (e.g. evaluation).
+    Do not call from async handlers; await run_inference instead.
+    """
+    return asyncio.run(
+        run_inference(
+            case_id=case_id,
+            age_months=age_months,
+            observations=observations,
+            embedding_b64=embedding_b64,
+            shape=shape,
+            emb_version=emb_version,
+            request_id=request_id,
+        )
+    )
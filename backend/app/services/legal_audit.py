@@ -4,12 +4,13 @@ Used by LegalMiddleware, policy engine, and consent/retention flows.
 """
 import json
 import logging
+import os
 import time
 from datetime import datetime, timezone
 
 logger = logging.getLogger("legal.audit")
 
-AUDIT_FALLBACK_PATH = "legal_audit.log"
+AUDIT_FALLBACK_PATH = os.getenv("LEGAL_AUDIT_PATH", "legal_audit.log")
 
 
 def _now_iso():
@@ -0,0 +1,128 @@
+"""
+Process-wide MedGemmaService provider.
+
+One instance per process, so every router shares the same httpx pool, Redis
+pool, response cache and single-flight tables. The FastAPI lifespan in
+app.main calls startup()/shutdown(); routers take the service through the
+get_medgemma_service dependency. Outside the app (scripts, tests, pedi_screen)
+provider.get() lazily creates the same instance.
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict
+
+from app.core.config import settings
+
+logger = logging.getLogger("medgemma.provider")
+
+# Prometheus metrics (lazy init; optional dependency)
+_POOL_GAUGE = None
+
+
+def medgemma_configured() -> bool:
+    return bool(
+        (settings.HF_MODEL and settings.HF_API_KEY)
+        or (settings.VERTEX_PROJECT and settings.VERTEX_LOCATION)
+    )
+
+
+def medgemma_config() -> Dict[str, Any]:
+    return {
+        "HF_MODEL": settings.HF_MODEL,
+        "HF_API_KEY": settings.HF_API_KEY,
+        "HF_INFERENCE_URL": settings.HF_INFERENCE_URL,
+        "VERTEX_PROJECT": settings.VERTEX_PROJECT,
+        "VERTEX_LOCATION": settings.VERTEX_LOCATION,
+        "VERTEX_TEXT_ENDPOINT_ID": settings.VERTEX_TEXT_ENDPOINT_ID,
+        "VERTEX_VISION_ENDPOINT_ID": settings.VERTEX_VISION_ENDPOINT_ID,
+        "REDIS_URL": settings.REDIS_URL,
+        "ALLOW_PHI": settings.ALLOW_PHI,
+        "MEDSIGLIP_ENABLE_LOCAL": settings.MEDSIGLIP_ENABLE_LOCAL,
+        "LORA_ADAPTER_PATH": settings.LORA_ADAPTER_PATH,
+        "BASE_MODEL_ID": settings.BASE_MODEL_ID,
+        "HTTP_MAX_CONNECTIONS": settings.MEDGEMMA_HTTP_MAX_CONNECTIONS,
+        "HTTP_MAX_KEEPALIVE": settings.MEDGEMMA_HTTP_MAX_KEEPALIVE,
+        "REDIS_MAX_CONNECTIONS": settings.MEDGEMMA_REDIS_MAX_CONNECTIONS,
+        "RESPONSE_CACHE_ENABLED": settings.RESPONSE_CACHE_ENABLED,
+        "RESPONSE_CACHE_MAX_ENTRIES": settings.RESPONSE_CACHE_MAX_ENTRIES,
+        "RESPONSE_CACHE_TTL_S": settings.RESPONSE_CACHE_TTL_S,
+    }
+
+
+def _default_factory():
+    if not medgemma_configured():
+        return None
+    from app.services.medgemma_service import MedGemmaService
+    return MedGemmaService(medgemma_config())
+
+
+class MedGemmaProvider:
+    def __init__(self, factory: Callable[[], Any] = _default_factory):
+        self._factory = factory
+        self._service = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Shared MedGemmaService, or None when no backend is configured."""
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    self._service = self._factory()
+        return self._service
+
+    def set(self, service) -> None:
+        """Replace the shared instance (tests, custom wiring)."""
+        self._service = service
+
+    async def startup(self, warmup: bool = True) -> None:
+        svc = self.get()
+        if svc is None:
+            logger.info("MedGemmaService not configured; routers use fallbacks")
+            return
+        _register_pool_metrics(self)
+        if warmup and hasattr(svc, "warmup"):
+            logger.info("MedGemmaService warm-up: %s", await svc.warmup())
+
+    async def shutdown(self) -> None:
+        svc, self._service = self._service, None
+        if svc is not None:
+            try:
+                await svc.close()
+            except Exception as e:
+                logger.warning("MedGemmaService close failed: %s", e)
+
+    def pool_stats(self) -> Dict[str, Dict[str, int]]:
+        svc = self._service
+        if svc is None or not hasattr(svc, "pool_stats"):
+            return {}
+        return svc.pool_stats()
+
+
+def _register_pool_metrics(p: MedGemmaProvider) -> None:
+    """Gauges evaluated at scrape time from the live pools."""
+    global _POOL_GAUGE
+    if _POOL_GAUGE is not None:
+        return
+    try:
+        from prometheus_client import Gauge
+    except ImportError:
+        logger.debug("prometheus_client not installed; pool metrics disabled")
+        return
+    _POOL_GAUGE = Gauge(
+        "medgemma_pool_connections",
+        "Shared MedGemmaService connection pool utilization",
+        ["pool", "state"],
+    )
+    for pool, states in (("http", ("max", "active", "idle")), ("redis", ("max", "in_use", "available"))):
+        for state in states:
+            _POOL_GAUGE.labels(pool=pool, state=state).set_function(
+                lambda pool=pool, state=state: p.pool_stats().get(pool, {}).get(state, 0)
+            )
+
+
+provider = MedGemmaProvider()
+
+
+def get_medgemma_service():
+    """FastAPI dependency: the process-wide MedGemmaService (None if not configured)."""
+    return provider.get()
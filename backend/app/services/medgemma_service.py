@@ -10,12 +10,14 @@ import hashlib
 import json
 import logging
 import os
-import re
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 import httpx
 
+from app.services.response_cache import ResponseCache, make_cache_key
+from app.services.phi_redactor import contains_phi
+
 # Vertex imports optional — guard import to avoid hard dependency during testing
 try:
     from google.cloud import aiplatform
@@ -53,14 +55,11 @@ def _load_explainable_prompt() -> Optional[str]:
         pass
     return None
 
-CANONICAL_PROMPT_TEMPLATE = """[METADATA]
-Child age (months): {age_months}
-Context: {context_text}
-
-[IMAGE_EMBEDDING]
-{embedding_note}
-
-Task:
+# Static instruction + schema block first, per-request fields last: every prompt shares
+# CANONICAL_PROMPT_PREFIX byte-for-byte, so prefix-caching servers (self-hosted
+# MedGemmaService engine, TGI/vLLM behind HF_INFERENCE_URL, Vertex implicit caching)
+# reuse its KV cache and only prefill the tail.
+CANONICAL_PROMPT_PREFIX = """Task:
 You are a clinical decision support assistant. Based on the child's age and the observations below, produce:
 1) a short clinical summary (2-4 bullet points),
 2) risk level ("low", "monitor", "high", "refer"),
@@ -71,18 +70,27 @@ You are a clinical decision support assistant. Based on the child's age and the
 
 Do NOT provide a diagnosis. Return JSON only in this exact format:
 ===BEGIN_OUTPUT===
-{{
+{
   "summary": ["...","..."],
   "risk": "monitor",
   "reasoning_chain": ["step 1", "step 2", "..."],
-  "evidence": [{{"type":"text","description":"...","reference_ids":[]}}],
+  "evidence": [{"type":"text","description":"...","reference_ids":[]}],
   "confidence": 0.72,
   "recommendations": ["...","...","..."],
   "parent_text": "...",
   "explain": "..."
-}}
+}
 ===END_OUTPUT===
 
+"""
+
+CANONICAL_PROMPT_TEMPLATE = CANONICAL_PROMPT_PREFIX.replace("{", "{{").replace("}", "}}") + """[METADATA]
+Child age (months): {age_months}
+Context: {context_text}
+
+[IMAGE_EMBEDDING]
+{embedding_note}
+
 Observations:
 {observations_text}
 """
@@ -92,6 +100,61 @@ def prompt_hash(text: str) -> str:
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 
+# Prometheus metrics (lazy init; optional dependency)
+_COALESCED_COUNTER = None
+
+
+def _coalesced_counter():
+    global _COALESCED_COUNTER
+    if _COALESCED_COUNTER is None:
+        try:
+            from prometheus_client import Counter
+            _COALESCED_COUNTER = Counter(
+                "medgemma_singleflight_coalesced_total",
+                "Callers that awaited an identical in-flight MedGemma call instead of issuing their own",
+                ["kind"],
+            )
+        except ImportError:
+            logger.debug("prometheus_client not installed; single-flight metrics disabled")
+    return _COALESCED_COUNTER
+
+
+class SingleFlight:
+    """
+    Request coalescing: while a call for `key` is in flight, later callers await
+    the same task instead of starting another. The shared work runs as its own
+    task, so cancelling one waiter (e.g. a client disconnect) does not cancel it
+    for the others. Results are not retained once the call completes.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._inflight: Dict[str, "asyncio.Task"] = {}
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+        else:
+            self.coalesced += 1
+            counter = _coalesced_counter()
+            if counter is not None:
+                counter.labels(kind=self.kind).inc()
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: "asyncio.Task") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved; waiters re-raise it themselves
+
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+
 class MedGemmaService:
     """
     High-level multimodal service wrapper for MedGemma + MedSigLIP.
@@ -104,15 +167,19 @@ class MedGemmaService:
         config keys (examples):
           - HF_MODEL (str)
           - HF_API_KEY (str)
+          - HF_INFERENCE_URL (str) -- base URL of an HF-compatible server (default: hosted Inference API)
           - VERTEX_PROJECT, VERTEX_LOCATION, VERTEX_TEXT_ENDPOINT_ID, VERTEX_VISION_ENDPOINT_ID
           - REDIS_URL (optional)
           - ALLOW_PHI (bool) -- default False
           - LORA_ADAPTER_PATH (str) -- GCS path or local dir for traceability
           - BASE_MODEL_ID (str) -- e.g. google/medgemma-2b-it
+          - RESPONSE_CACHE_ENABLED (bool), RESPONSE_CACHE_MAX_ENTRIES (int), RESPONSE_CACHE_TTL_S (float)
+          - HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, REDIS_MAX_CONNECTIONS (int) -- pool sizing
         """
         self.cfg = config
         self.hf_model = config.get("HF_MODEL")
         self.hf_api_key = config.get("HF_API_KEY")
+        self.hf_base_url = (config.get("HF_INFERENCE_URL") or "https://api-inference.huggingface.co").rstrip("/")
         self.allow_phi = bool(config.get("ALLOW_PHI", False))
         self.adapter_id = config.get("LORA_ADAPTER_PATH") or config.get("adapter_id")
         self.base_model_id = config.get("BASE_MODEL_ID", "google/medgemma-2b-it")
@@ -144,18 +211,79 @@ class MedGemmaService:
         self.redis = None
         if _HAS_REDIS and config.get("REDIS_URL"):
             try:
-                self.redis = aioredis.from_url(config["REDIS_URL"])
+                self.redis = aioredis.from_url(
+                    config["REDIS_URL"], max_connections=int(config.get("REDIS_MAX_CONNECTIONS", 32))
+                )
             except Exception:
                 self.redis = None
 
-        # httpx async client
-        self._http = httpx.AsyncClient(timeout=30.0)
+        # Prompt-level response cache (LRU in process, Redis as shared tier)
+        self.response_cache = ResponseCache(
+            redis_client=self.redis,
+            max_entries=int(config.get("RESPONSE_CACHE_MAX_ENTRIES", 1024)),
+            ttl_s=float(config.get("RESPONSE_CACHE_TTL_S", 3600)),
+            enabled=bool(config.get("RESPONSE_CACHE_ENABLED", True)),
+        )
+
+        # Single-flight: coalesce concurrent identical text / embedding calls
+        self._text_flight = SingleFlight("text")
+        self._embed_flight = SingleFlight("embedding")
+
+        # httpx async client (sized explicitly; shared by every caller of this instance)
+        self.http_limits = httpx.Limits(
+            max_connections=int(config.get("HTTP_MAX_CONNECTIONS", 64)),
+            max_keepalive_connections=int(config.get("HTTP_MAX_KEEPALIVE", 32)),
+        )
+        self._http = httpx.AsyncClient(timeout=30.0, limits=self.http_limits)
 
     async def close(self):
         await self._http.aclose()
         if self.redis:
             await self.redis.close()
 
+    async def warmup(self) -> Dict[str, Any]:
+        """Open the Redis pool and a keep-alive connection to the text backend before traffic arrives."""
+        out: Dict[str, Any] = {"redis": None, "http": None}
+        if self.redis is not None:
+            try:
+                out["redis"] = bool(await self.redis.ping())
+            except Exception as e:
+                logger.warning("MedGemma warm-up: redis ping failed: %s", e)
+                out["redis"] = False
+        if self.hf_model and self.hf_api_key and self.vertex_text_endpoint is None:
+            try:
+                r = await self._http.head(
+                    f"{self.hf_base_url}/models/{self.hf_model}",
+                    headers={"Authorization": f"Bearer {self.hf_api_key}"},
+                    timeout=5.0,
+                )
+                out["http"] = r.status_code
+            except Exception as e:
+                logger.warning("MedGemma warm-up: HF connect failed: %s", e)
+                out["http"] = False
+        return out
+
+    def pool_stats(self) -> Dict[str, Dict[str, int]]:
+        """Current HTTP and Redis pool utilization (best effort; library internals vary by version)."""
+        stats: Dict[str, Dict[str, int]] = {
+            "http": {"max": self.http_limits.max_connections or 0, "active": 0, "idle": 0},
+            "redis": {"max": 0, "in_use": 0, "available": 0},
+        }
+        try:
+            conns = list(getattr(self._http._transport._pool, "connections", []))
+            idle = sum(1 for c in conns if c.is_idle())
+            stats["http"].update(active=len(conns) - idle, idle=idle)
+        except Exception:
+            pass
+        pool = getattr(self.redis, "connection_pool", None)
+        if pool is not None:
+            stats["redis"].update(
+                max=int(getattr(pool, "max_connections", 0) or 0),
+                in_use=len(getattr(pool, "_in_use_connections", ()) or ()),
+                available=len(getattr(pool, "_available_connections", ()) or ()),
+            )
+        return stats
+
     # -------------------------
     # Public analyze entrypoint
     # -------------------------
@@ -167,8 +295,10 @@ class MedGemmaService:
         image_bytes: Optional[bytes] = None,
         image_filename: Optional[str] = None,
         screening_id: Optional[str] = None,
+        bypass_cache: bool = False,
     ) -> Dict[str, Any]:
         """
+        Set bypass_cache=True to force a fresh model call (result still refreshes the cache).
         Returns a dict with keys:
          - report: { riskLevel, keyFindings, recommendations, confidence, ... }
          - image_embedding: [] or None
@@ -212,23 +342,10 @@ class MedGemmaService:
 
         # 5) Call text model (Vertex or HF). If both available, prefer Vertex.
         t0 = time.perf_counter()
-        model_raw = None
         model_parsed = None
-        used_vertex = False
-        if self.vertex_text_endpoint:
-            try:
-                model_raw = await asyncio.to_thread(self._call_vertex_text, prompt)
-                used_vertex = True
-            except Exception as e:
-                logger.exception("Vertex text call failed: %s", e)
-                model_raw = None
-
-        if not model_raw and self.hf_model and self.hf_api_key:
-            try:
-                model_raw = await self._call_hf_inference(prompt, self.hf_model, self.hf_api_key)
-            except Exception as e:
-                logger.exception("HF call failed: %s", e)
-                model_raw = None
+        model_raw, used_vertex, cache_hit = await self._generate_synthesis(
+            prompt, phash, bypass_cache=bypass_cache
+        )
 
         # 6) Parse model response safely to JSON if possible
         if model_raw:
@@ -270,6 +387,7 @@ class MedGemmaService:
             "adapter_id": self.adapter_id,
             "model_raw_snippet": (model_raw or "")[:2000],
             "used_vertex": bool(used_vertex),
+            "cache_hit": cache_hit,
             "inference_time_ms": inference_time_ms,
         }
 
@@ -291,13 +409,24 @@ class MedGemmaService:
         emb_version: str = "medsiglip-v1",
         consent_id: Optional[str] = None,
         user_id_pseudonym: Optional[str] = None,
+        bypass_cache: bool = False,
     ) -> Dict[str, Any]:
         """
         Privacy-first inference using precomputed image embedding (design spec Section 16.1).
         Raw images never leave device; client sends L2-normalized embedding only.
         Returns structured result with full provenance for audit.
+        stage_ms holds per-stage wall time (decode, prompt, model, parse, evidence).
         """
         t0 = time.perf_counter()
+        stage_ms: Dict[str, float] = {}
+        mark = t0
+
+        def lap(stage: str) -> None:
+            nonlocal mark
+            now = time.perf_counter()
+            stage_ms[stage] = round((now - mark) * 1000, 3)
+            mark = now
+
         try:
             from app.utils.embeddings import parse_embedding_b64
             emb_arr = parse_embedding_b64(embedding_b64, shape or [1, 256])
@@ -305,6 +434,7 @@ class MedGemmaService:
         except ValueError as e:
             logger.exception("Embedding decode failed: %s", e)
             raise ValueError(f"Invalid embedding_b64 or shape: {e}") from e
+        lap("decode")
 
         input_hash = hashlib.sha256((embedding_b64[:200] + str(age_months) + observations).encode()).hexdigest()
 
@@ -328,26 +458,19 @@ class MedGemmaService:
                 },
                 "provenance": {"note": "phi_blocked", "input_hash": input_hash},
                 "inference_time_ms": int((time.perf_counter() - t0) * 1000),
+                "stage_ms": stage_ms,
             }
 
         baseline = self._baseline_analysis(age_months, "", observations, "Precomputed embedding")
         prompt = self._build_synthesis_prompt(age_months, baseline, observations, "Embedding", emb)
         phash = prompt_hash(prompt)
+        lap("prompt")
 
-        model_raw = None
         model_parsed = None
-        used_vertex = False
-        if self.vertex_text_endpoint:
-            try:
-                model_raw = await asyncio.to_thread(self._call_vertex_text, prompt)
-                used_vertex = True
-            except Exception as e:
-                logger.exception("Vertex text call failed: %s", e)
-        if not model_raw and self.hf_model and self.hf_api_key:
-            try:
-                model_raw = await self._call_hf_inference(prompt, self.hf_model, self.hf_api_key)
-            except Exception as e:
-                logger.exception("HF call failed: %s", e)
+        model_raw, used_vertex, cache_hit = await self._generate_synthesis(
+            prompt, phash, bypass_cache=bypass_cache
+        )
+        lap("model")
 
         if model_raw:
             try:
@@ -375,12 +498,12 @@ class MedGemmaService:
                 final_report["confidence"] = float(model_parsed["confidence"])
         else:
             final_report["clinical_summary"] = final_report.get("clinical_summary") or "Automated draft (no model)."
+        lap("parse")
 
         # Evidence capture: FAISS nearest neighbors + model evidence
         evidence_items: List[Any] = []
         try:
             from app.services.evidence_capture import get_nearest_neighbor_evidence, extract_evidence_from_model_output
-            emb_arr = parse_embedding_b64(embedding_b64, shape or [1, 256])
             nn_evidence = get_nearest_neighbor_evidence(emb_arr, k=5, dim=emb_arr.shape[-1])
             evidence_items = extract_evidence_from_model_output(model_parsed or {}, nn_evidence)
         except Exception as e:
@@ -390,6 +513,7 @@ class MedGemmaService:
                 evidence_items = extract_evidence_from_model_output(model_parsed or {}, [])
             except Exception:
                 evidence_items = []
+        lap("evidence")
 
         inference_time_ms = int((time.perf_counter() - t0) * 1000)
         provenance = {
@@ -403,6 +527,7 @@ class MedGemmaService:
             "emb_version": emb_version,
             "inference_time_ms": inference_time_ms,
             "used_vertex": used_vertex,
+            "cache_hit": cache_hit,
         }
 
         # Build explainable response (InferenceExplainable schema)
@@ -457,6 +582,7 @@ class MedGemmaService:
             },
             "provenance": provenance,
             "inference_time_ms": inference_time_ms,
+            "stage_ms": stage_ms,
         }
 
     # -------------------------
@@ -523,22 +649,56 @@ class MedGemmaService:
         return json.dumps(prompt)
 
     def _detect_phi(self, text: Optional[str]) -> bool:
-        if not text:
-            return False
-        # Very conservative heuristics: if it contains an email, phone, MRN, or typical name/ DOB-like pattern
-        if re.search(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b", text):
-            return True
-        if re.search(r"\b\d{3}-\d{2}-\d{4}\b", text):
-            return True
-        if re.search(r"\bmrn\b|\bpatient id\b|\bssn\b", text, re.I):
-            return True
-        if re.search(r"\b\d{4}-\d{2}-\d{2}\b", text):
-            return True
-        return False
+        # Very conservative heuristics (email, SSN, MRN/patient id keywords, ISO dates); one compiled scan
+        return contains_phi(text or "")
 
     # -------------------------
     # Text model callers
     # -------------------------
+    async def _generate_synthesis(
+        self,
+        prompt: str,
+        phash: str,
+        temperature: float = 0.0,
+        bypass_cache: bool = False,
+    ) -> Tuple[Optional[str], bool, bool]:
+        """
+        Vertex (preferred) or HF text call behind the response cache.
+        Returns (model_raw, used_vertex, cache_hit); only non-empty outputs are cached.
+        """
+        key = make_cache_key(phash, self.base_model_id, self.adapter_id, temperature)
+        use_cache = self.response_cache.cacheable(temperature)
+        if use_cache and not bypass_cache:
+            cached = await self.response_cache.get(key)
+            if cached is not None:
+                return cached.get("raw"), bool(cached.get("used_vertex")), True
+
+        async def call_model() -> Tuple[Optional[str], bool]:
+            model_raw = None
+            used_vertex = False
+            if self.vertex_text_endpoint:
+                try:
+                    model_raw = await asyncio.to_thread(self._call_vertex_text, prompt)
+                    used_vertex = True
+                except Exception as e:
+                    logger.exception("Vertex text call failed: %s", e)
+                    model_raw = None
+            if not model_raw and self.hf_model and self.hf_api_key:
+                try:
+                    model_raw = await self._call_hf_inference(
+                        prompt, self.hf_model, self.hf_api_key, temperature=temperature
+                    )
+                except Exception as e:
+                    logger.exception("HF call failed: %s", e)
+                    model_raw = None
+            if model_raw and use_cache:
+                await self.response_cache.set(key, {"raw": model_raw, "used_vertex": used_vertex})
+            return model_raw, used_vertex
+
+        # Identical prompts already in flight share the one upstream call
+        model_raw, used_vertex = await self._text_flight.do(key, call_model)
+        return model_raw, used_vertex, False
+
     def _call_vertex_text(self, prompt: str) -> str:
         # sync wrapper because Vertex SDK is currently synchronous in many environments.
         if not self.vertex_text_endpoint:
@@ -604,7 +764,7 @@ class MedGemmaService:
             "options": {"wait_for_model": True},
             "parameters": {"max_new_tokens": max_new_tokens, "temperature": temperature},
         }
-        url = f"https://api-inference.huggingface.co/models/{model}"
+        url = f"{self.hf_base_url}/models/{model}"
         # Basic retry logic
         for attempt in range(3):
             try:
@@ -642,6 +802,12 @@ class MedGemmaService:
             except Exception:
                 pass
 
+        # Concurrent requests for the same image (retries, double submits) share one computation
+        return await self._embed_flight.do(k, lambda: self._compute_image_embedding(image_bytes, k))
+
+    async def _compute_image_embedding(
+        self, image_bytes: bytes, k: str
+    ) -> Tuple[Optional[List[float]], Optional[str]]:
         embedding, summary = None, None
 
         # 1. Local MedSigLIP (privacy-first, no external calls)
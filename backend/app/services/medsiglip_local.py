@@ -2,9 +2,15 @@
 MedSigLIP image embedding via local transformers (CPU/GPU).
 Fallback when Vertex AI and Hugging Face Inference API are unavailable.
 Use for edge deployment, development, or privacy-first on-premise.
+
+Each image batch runs exactly one encoder forward (get_image_features when the
+model has it, else the model's pooled/mean output) under torch.inference_mode.
+On CPU, MEDSIGLIP_LOCAL_PRECISION=bf16 runs under bf16 autocast and int8 applies
+dynamic quantization to Linear layers; MEDSIGLIP_LOCAL_THREADS sets torch threads.
+embed_images_local() returns float32 NumPy directly.
 """
 import io
-from typing import Dict, List, Optional
+from typing import Dict, List, Sequence, Union
 
 import numpy as np
 from PIL import Image
@@ -17,11 +23,12 @@ from app.services.embedding_utils import float32_arr_to_b64, normalize_l2
 _processor = None
 _model = None
 _device = None
+_precision = "fp32"
 
 
 def _load_model() -> bool:
     """Load MedSigLIP model once. Returns True if loaded successfully."""
-    global _processor, _model, _device
+    global _processor, _model, _device, _precision
     if _model is not None:
         return True
     try:
@@ -30,12 +37,15 @@ def _load_model() -> bool:
 
         model_name = settings.HF_MEDSIGLIP_MODEL or "google/medsiglip-base"
         _device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        if settings.MEDSIGLIP_LOCAL_THREADS > 0:
+            torch.set_num_threads(settings.MEDSIGLIP_LOCAL_THREADS)
         logger.info("Loading local MedSigLIP: %s on %s", model_name, _device)
 
         _processor = AutoImageProcessor.from_pretrained(model_name, trust_remote_code=True)
-        _model = AutoModel.from_pretrained(model_name, trust_remote_code=True).to(_device)
-        _model.eval()
-        logger.info("Local MedSigLIP loaded successfully")
+        model = AutoModel.from_pretrained(model_name, trust_remote_code=True).to(_device)
+        model.eval()
+        _model, _precision = _apply_precision(model, settings.MEDSIGLIP_LOCAL_PRECISION, _device)
+        logger.info("Local MedSigLIP loaded successfully (precision={})", _precision)
         return True
     except Exception as e:
         logger.warning("Local MedSigLIP load failed: %s", e)
@@ -44,40 +54,78 @@ def _load_model() -> bool:
         return False
 
 
-def get_medsiglip_embedding_local(image_bytes: bytes) -> Dict:
+def _apply_precision(model, precision: str, device):
+    """Returns (model, effective precision). bf16/int8 are CPU-only; GPU stays fp32."""
+    import torch
+
+    precision = (precision or "fp32").lower()
+    if device.type != "cpu" or precision not in ("bf16", "int8"):
+        return model, "fp32"
+    if precision == "int8":
+        try:
+            return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8), "int8"
+        except Exception as e:
+            logger.warning("int8 dynamic quantization failed, using fp32: {}", e)
+            return model, "fp32"
+    return model, "bf16"
+
+
+def _encode(model, inputs):
+    """Single forward pass to pooled image features."""
+    if hasattr(model, "get_image_features"):
+        return model.get_image_features(**inputs)
+    outputs = model(**inputs)
+    if getattr(outputs, "pooler_output", None) is not None:
+        return outputs.pooler_output
+    return outputs.last_hidden_state.mean(dim=1)
+
+
+def _to_pil(image: Union[bytes, Image.Image]) -> Image.Image:
+    if isinstance(image, Image.Image):
+        return image.convert("RGB")
+    return Image.open(io.BytesIO(image)).convert("RGB")
+
+
+def embed_images_local(images: Sequence[Union[bytes, Image.Image]]) -> np.ndarray:
     """
-    Compute MedSigLIP embedding locally.
-    Returns dict with: embedding (list), embedding_b64 (str), shape, summary, model.
+    Embed a batch of images (raw bytes or PIL) in one forward pass.
+    Returns (N, dim) float32, L2-normalized.
     """
     if not _load_model():
         raise RuntimeError("Local MedSigLIP not available (transformers/torch required)")
+    if not images:
+        return np.zeros((0, 0), dtype=np.float32)
 
     import torch
 
-    pil = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    inputs = _processor(images=pil, return_tensors="pt").to(_device)
-
-    with torch.no_grad():
-        outputs = _model(**inputs)
-        # MedSigLIP/SigLIP: try get_image_features first, else pooler_output, else mean
-        if hasattr(_model, "get_image_features"):
-            emb = _model.get_image_features(**inputs)
-        elif hasattr(outputs, "pooler_output") and outputs.pooler_output is not None:
-            emb = outputs.pooler_output
+    inputs = _processor(images=[_to_pil(im) for im in images], return_tensors="pt").to(_device)
+    with torch.inference_mode():
+        if _precision == "bf16":
+            with torch.autocast("cpu", dtype=torch.bfloat16):
+                emb = _encode(_model, inputs)
         else:
-            emb = outputs.last_hidden_state.mean(dim=1)
-        emb = torch.nn.functional.normalize(emb, dim=-1)
+            emb = _encode(_model, inputs)
+        emb = emb.float()
+    return normalize_l2(emb.cpu().numpy())
+
+
+def embed_image_local(image_bytes: bytes) -> np.ndarray:
+    """Single image -> (1, dim) float32, L2-normalized."""
+    return embed_images_local([image_bytes])
 
-    arr = emb.detach().cpu().numpy().astype(np.float32)
-    arr = normalize_l2(arr)
-    embedding = arr.flatten().tolist()
-    shape = list(arr.shape)
-    embedding_b64 = float32_arr_to_b64(arr)
 
+def get_medsiglip_embedding_local(image_bytes: bytes) -> Dict:
+    """
+    Compute MedSigLIP embedding locally.
+    Returns dict with: embedding (list), embedding_b64 (str), shape, summary, model.
+    Prefer embed_image_local() when a NumPy array is all that is needed.
+    """
+    arr = embed_image_local(image_bytes)
+    embedding: List[float] = arr.ravel().tolist()
     return {
         "embedding": embedding,
-        "embedding_b64": embedding_b64,
-        "shape": shape,
+        "embedding_b64": float32_arr_to_b64(arr),
+        "shape": list(arr.shape),
         "summary": "Local MedSigLIP embedding (no interpretable summary)",
         "model": "medsiglip-local",
     }
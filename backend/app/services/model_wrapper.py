@@ -2,12 +2,15 @@
 """
 Production-ready model integration for developmental screening.
 - Safe: deterministic rules as baseline; model output is supplemental evidence only.
-- Robust: retries, timeouts, response validation, fallbacks.
+- Robust: retries with jittered backoff, timeouts, per-upstream circuit breaker, response validation, fallbacks.
+- Pooled: one shared httpx.AsyncClient (keep-alive, optional HTTP/2) for all HF calls.
 - Structured: prompt for JSON; parse and validate; attach raw output as low-influence evidence on parse failure.
 - Configurable: HF_MODEL, HF_API_KEY via env.
 """
 
+import asyncio
 import os
+import random
 import time
 import uuid
 import json
@@ -30,6 +33,18 @@ except ImportError:
 DEFAULT_TIMEOUT = 15.0
 MAX_RETRIES = 2
 
+# Shared HTTP pool (see get_http_client)
+HF_MAX_CONNECTIONS = int(os.getenv("HF_MAX_CONNECTIONS", "20"))
+HF_MAX_KEEPALIVE = int(os.getenv("HF_MAX_KEEPALIVE", "10"))
+HF_KEEPALIVE_EXPIRY_S = float(os.getenv("HF_KEEPALIVE_EXPIRY_S", "30"))
+HF_HTTP2 = os.getenv("HF_HTTP2", "true").lower() in ("1", "true", "yes")
+
+# Retry backoff and per-upstream circuit breaker
+BACKOFF_BASE_S = float(os.getenv("HF_BACKOFF_BASE_S", "0.5"))
+BACKOFF_MAX_S = float(os.getenv("HF_BACKOFF_MAX_S", "8"))
+BREAKER_FAIL_MAX = int(os.getenv("HF_BREAKER_FAIL_MAX", "5"))
+BREAKER_RESET_TIMEOUT_S = float(os.getenv("HF_BREAKER_RESET_S", "30"))
+
 
 def _baseline_det(
     age_months: int,
@@ -128,6 +143,113 @@ def _validate_parsed(parsed: Dict[str, Any]) -> bool:
     return True
 
 
+class _CircuitBreaker:
+    """
+    Per-upstream breaker: opens after `fail_max` consecutive 5xx/timeout/transport
+    failures, rejects calls for `reset_timeout_s`, then lets one trial through
+    (half-open). Success closes it again.
+    """
+
+    def __init__(self, fail_max: int, reset_timeout_s: float):
+        self.fail_max = fail_max
+        self.reset_timeout_s = reset_timeout_s
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout_s:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self) -> None:
+        """Free the half-open slot without an outcome (the trial was cancelled)."""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.failures >= self.fail_max or self.opened_at is not None:
+            if self.opened_at is None:
+                logger.warning("HF circuit opened after %d consecutive failures", self.failures)
+            self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, _CircuitBreaker] = {}
+
+
+def _breaker_for(upstream: str) -> _CircuitBreaker:
+    br = _breakers.get(upstream)
+    if br is None:
+        br = _breakers[upstream] = _CircuitBreaker(BREAKER_FAIL_MAX, BREAKER_RESET_TIMEOUT_S)
+    return br
+
+
+def _backoff_s(attempt: int) -> float:
+    """Exponential backoff with equal jitter: half fixed, half random."""
+    ceiling = min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** attempt))
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+_http_client = None
+_http_client_loop = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def get_http_client():
+    """
+    Shared pooled AsyncClient (keep-alive, HTTP/2 when `h2` is installed).
+    Rebuilt if the running loop changed, since pooled connections are loop-bound.
+    """
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            http2=HF_HTTP2 and _http2_available(),
+            limits=httpx.Limits(
+                max_connections=HF_MAX_CONNECTIONS,
+                max_keepalive_connections=HF_MAX_KEEPALIVE,
+                keepalive_expiry=HF_KEEPALIVE_EXPIRY_S,
+            ),
+        )
+        _http_client_loop = loop
+    return _http_client
+
+
+async def aclose_http_client() -> None:
+    """Close the shared client (call from app shutdown)."""
+    global _http_client, _http_client_loop
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+    _http_client_loop = None
+
+
 async def _call_hf_inference(
     model_name: str,
     api_key: str,
@@ -137,6 +259,8 @@ async def _call_hf_inference(
     """
     Use Hugging Face Inference API (HTTP).
     If image_path provided, send multipart/form-data with file and 'inputs' prompt.
+    Reuses the shared pooled client; retries back off with asyncio.sleep and stop
+    as soon as the upstream's circuit breaker opens.
     """
     if not httpx:
         logger.error("httpx not installed; cannot use HF Inference API")
@@ -145,15 +269,20 @@ async def _call_hf_inference(
     headers = {"Authorization": f"Bearer {api_key}"}
     base_url = f"https://api-inference.huggingface.co/models/{model_name}"
     timeout = DEFAULT_TIMEOUT * 2 if image_path else DEFAULT_TIMEOUT
+    breaker = _breaker_for(model_name)
 
     for attempt in range(MAX_RETRIES + 1):
+        trial = breaker.state == "half_open"
+        if not breaker.allow():
+            return {"ok": False, "error": "circuit_open", "circuit_open": True}
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
+            client = get_http_client()
+            try:
                 if image_path and os.path.exists(image_path):
                     with open(image_path, "rb") as f:
                         files = {"data": (os.path.basename(image_path), f, "application/octet-stream")}
                         data = {"inputs": prompt}
-                        resp = await client.post(base_url, headers=headers, files=files, data=data)
+                        resp = await client.post(base_url, headers=headers, files=files, data=data, timeout=timeout)
                 else:
                     payload = {
                         "inputs": prompt,
@@ -163,41 +292,55 @@ async def _call_hf_inference(
                         base_url,
                         headers={**headers, "Content-Type": "application/json"},
                         json=payload,
+                        timeout=timeout,
                     )
-
-                if resp.status_code >= 400:
-                    logger.error("HF Inference API error %s: %s", resp.status_code, resp.text[:500])
-                    if attempt < MAX_RETRIES and resp.status_code >= 500:
-                        time.sleep(1.0 * (attempt + 1))
+            except asyncio.CancelledError:
+                # Client disconnect or an outer wait_for: no outcome, but the
+                # half-open slot must be freed or the breaker never closes again
+                if trial:
+                    breaker.release_trial()
+                raise
+
+            if resp.status_code >= 400:
+                logger.error("HF Inference API error %s: %s", resp.status_code, resp.text[:500])
+                if resp.status_code >= 500:
+                    breaker.record_failure()
+                    if attempt < MAX_RETRIES:
+                        await asyncio.sleep(_backoff_s(attempt))
                         continue
-                    return {"ok": False, "error": f"HF {resp.status_code}: {resp.text[:500]}"}
-
-                content_type = resp.headers.get("content-type", "")
-                if "application/json" in content_type:
-                    j = resp.json()
-                    text = None
-                    if isinstance(j, list) and j and isinstance(j[0], dict) and "generated_text" in j[0]:
-                        text = j[0]["generated_text"]
-                    elif isinstance(j, dict) and "generated_text" in j:
-                        text = j["generated_text"]
-                    else:
-                        text = json.dumps(j)
-                    parsed = _parse_model_text_output(text) if text else None
-                    return {"ok": True, "parsed": parsed, "raw": text or ""}
                 else:
-                    text = resp.text
-                    parsed = _parse_model_text_output(text)
-                    return {"ok": True, "parsed": parsed, "raw": text}
+                    breaker.record_success()
+                return {"ok": False, "error": f"HF {resp.status_code}: {resp.text[:500]}"}
+
+            breaker.record_success()
+            content_type = resp.headers.get("content-type", "")
+            if "application/json" in content_type:
+                j = resp.json()
+                text = None
+                if isinstance(j, list) and j and isinstance(j[0], dict) and "generated_text" in j[0]:
+                    text = j[0]["generated_text"]
+                elif isinstance(j, dict) and "generated_text" in j:
+                    text = j["generated_text"]
+                else:
+                    text = json.dumps(j)
+                parsed = _parse_model_text_output(text) if text else None
+                return {"ok": True, "parsed": parsed, "raw": text or ""}
+            else:
+                text = resp.text
+                parsed = _parse_model_text_output(text)
+                return {"ok": True, "parsed": parsed, "raw": text}
         except httpx.TimeoutException as e:
             logger.warning("HF inference timeout (attempt %d): %s", attempt + 1, e)
+            breaker.record_failure()
             if attempt < MAX_RETRIES:
-                time.sleep(1.0 * (attempt + 1))
+                await asyncio.sleep(_backoff_s(attempt))
                 continue
             return {"ok": False, "error": f"timeout: {e}"}
         except Exception as e:
             logger.exception("HF inference request failed")
+            breaker.record_failure()
             if attempt < MAX_RETRIES:
-                time.sleep(1.0 * (attempt + 1))
+                await asyncio.sleep(_backoff_s(attempt))
                 continue
             return {"ok": False, "error": str(e)}
 
@@ -237,6 +380,26 @@ async def analyze(
     prompt = _make_prompt(child_age_months, domain, observations)
     resp = await _call_hf_inference(HF_MODEL, HF_API_KEY, prompt, image_path)
 
+    if resp.get("circuit_open"):
+        # Upstream known-bad: serve the deterministic baseline without waiting on timeouts
+        return {
+            "success": True,
+            "screening_id": screening_id,
+            "report": {
+                **base,
+                "analysis_meta": {
+                    "age_months": child_age_months,
+                    "domain": domain,
+                    "observations_snippet": (observations or "")[:500],
+                    "image_provided": bool(image_path),
+                    "model_skipped": "circuit_open",
+                },
+            },
+            "timestamp": int(time.time()),
+            "model_used": False,
+            "model_parse_ok": True,
+        }
+
     if not resp.get("ok"):
         base["evidence"].append({
             "type": "model_error",
@@ -2,48 +2,90 @@
 PHI Redactor — redact personally identifiable information before external model calls.
 Use before any text is sent to MedGemma, Vertex, or other external APIs.
 Regex-based; optionally use spaCy NER for production (pip install spacy && python -m spacy download en_core_web_sm).
+
+All patterns are merged into one compiled alternation (PHI_REGEX), so each text is
+scanned once and every redaction span refers to the original text. At a given
+position the earliest rule in PHI_RULES wins; matches never overlap.
+redact_texts() is the batch API for dataset prep and report exports.
 """
 import re
-from typing import Dict, Any
+from typing import Any, Dict, Iterable, List
+
+# Common PHI patterns — conservative regexes to avoid over-redaction.
+# (rule name, pattern, replacement). Every rule is anchored at a word boundary,
+# which PHI_REGEX factors out; patterns must not contain capturing groups.
+_SSN = r"\d{3}-\d{2}-\d{4}\b"
+_ISO_DATE = r"\d{4}-\d{2}-\d{2}\b"
+_EMAIL = r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b"
 
-# Common PHI patterns — conservative regexes to avoid over-redaction
-PHI_PATTERNS = [
+PHI_RULES = [
     # SSN: XXX-XX-XXXX
-    (re.compile(r"\b\d{3}-\d{2}-\d{4}\b"), "[REDACTED_SSN]"),
+    ("ssn", _SSN, "[REDACTED_SSN]"),
     # SSN without dashes (only when 9 consecutive digits)
-    (re.compile(r"\b\d{3}\s?\d{2}\s?\d{4}\b"), "[REDACTED_SSN]"),
+    ("ssn_plain", r"\d{3}\s?\d{2}\s?\d{4}\b", "[REDACTED_SSN]"),
     # Date of birth patterns (MM/DD/YYYY, YYYY-MM-DD)
-    (re.compile(r"\b\d{1,2}/\d{1,2}/\d{4}\b"), "[REDACTED_DOB]"),
-    (re.compile(r"\b\d{4}-\d{2}-\d{2}\b"), "[REDACTED_DOB]"),
+    ("dob_us", r"\d{1,2}/\d{1,2}/\d{4}\b", "[REDACTED_DOB]"),
+    ("dob_iso", _ISO_DATE, "[REDACTED_DOB]"),
     # Phone numbers (US)
-    (re.compile(r"\b\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b"), "[REDACTED_PHONE]"),
+    ("phone", r"\d{3}[-.\s]?\d{3}[-.\s]?\d{4}\b", "[REDACTED_PHONE]"),
     # Email
-    (re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b"), "[REDACTED_EMAIL]"),
+    ("email", _EMAIL, "[REDACTED_EMAIL]"),
     # MRN / medical record numbers (common formats)
-    (re.compile(r"\bMRN\s*:?\s*\d{6,}\b", re.I), "[REDACTED_MRN]"),
-    (re.compile(r"\bmedical record\s*(?:#|number)?\s*:?\s*\d{6,}\b", re.I), "[REDACTED_MRN]"),
+    ("mrn", r"(?i:MRN\s*:?\s*\d{6,}\b)", "[REDACTED_MRN]"),
+    ("mrn_long", r"(?i:medical record\s*(?:#|number)?\s*:?\s*\d{6,}\b)", "[REDACTED_MRN]"),
 ]
 
 
+def _compile_rules(rules) -> "re.Pattern":
+    # One \b check per position instead of one per rule, and digit-led rules are
+    # skipped with a single lookahead; rule order (priority) is preserved.
+    digit_led = [r for r in rules if r[1].startswith(r"\d")]
+    if rules[: len(digit_led)] != digit_led:
+        raise ValueError("digit-led PHI rules must come first to keep rule priority")
+    digit = "|".join(f"(?P<{n}>{p})" for n, p, _ in digit_led)
+    other = "|".join(f"(?P<{n}>{p})" for n, p, _ in rules[len(digit_led):])
+    return re.compile(rf"\b(?:(?=\d)(?:{digit})|{other})")
+
+
+PHI_REGEX = _compile_rules(PHI_RULES)
+_REPLACEMENT = {name: repl for name, _, repl in PHI_RULES}
+
+# Backwards-compatible per-rule view (pattern, replacement)
+PHI_PATTERNS = [(re.compile(rf"\b{pat}"), repl) for _, pat, repl in PHI_RULES]
+
+# Cheaper yes/no check used to gate external calls: identifiers plus PHI keywords
+PHI_DETECT_REGEX = re.compile(rf"\b(?:{_EMAIL}|{_SSN}|(?i:mrn\b|patient id\b|ssn\b)|{_ISO_DATE})")
+
+
+def contains_phi(text: str) -> bool:
+    """True if text looks like it contains PHI (single compiled search)."""
+    return bool(text) and PHI_DETECT_REGEX.search(text) is not None
+
+
 def redact_text(text: str) -> Dict[str, Any]:
     """
     Redact PHI from text. Returns dict with redacted_text and metadata.
     Run this before sending observations to any external model.
+    Spans are (start, end) offsets into the original text.
     """
     if not text or not isinstance(text, str):
         return {"redacted_text": text or "", "redactions": [], "redaction_applied": True}
 
-    out = text
+    parts: List[str] = []
     redactions = []
-
-    for pat, repl in PHI_PATTERNS:
-        for m in pat.finditer(out):
-            if callable(repl):
-                replacement = repl(m)
-            else:
-                replacement = repl
-            redactions.append({"type": replacement.strip("[]"), "span": m.span()})
-        out = pat.sub(repl if not callable(repl) else lambda m: repl(m), out)
+    pos = 0
+    for m in PHI_REGEX.finditer(text):
+        replacement = _REPLACEMENT[m.lastgroup]
+        start, end = m.span()
+        parts.append(text[pos:start])
+        parts.append(replacement)
+        pos = end
+        redactions.append({"type": replacement.strip("[]"), "span": (start, end)})
+    if redactions:
+        parts.append(text[pos:])
+        out = "".join(parts)
+    else:
+        out = text
 
     return {
         "redacted_text": out,
@@ -51,3 +93,24 @@ def redact_text(text: str) -> Dict[str, Any]:
         "redaction_applied": True,
         "redaction_count": len(redactions),
     }
+
+
+def _replace(m: "re.Match") -> str:
+    return _REPLACEMENT[m.lastgroup]
+
+
+def redact_texts(texts: Iterable[str], include_spans: bool = True) -> List[Dict[str, Any]]:
+    """
+    Batch redaction for bulk text (dataset prep, report exports).
+    With include_spans=False only redacted_text/redaction_count are computed (faster).
+    """
+    if include_spans:
+        return [redact_text(t) for t in texts]
+    results = []
+    for t in texts:
+        if not t or not isinstance(t, str):
+            results.append({"redacted_text": t or "", "redaction_applied": True, "redaction_count": 0})
+            continue
+        out, n = PHI_REGEX.subn(_replace, t)
+        results.append({"redacted_text": out, "redaction_applied": True, "redaction_count": n})
+    return results
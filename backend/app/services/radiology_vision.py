@@ -108,26 +108,8 @@ async def analyze_radiology_image(
     }
 
 
-_medgemma_svc = None
-
-
 def _get_medgemma_svc():
-    """Lazy init MedGemmaService for radiology vision."""
-    global _medgemma_svc
-    if _medgemma_svc is None and (
-        (settings.HF_MODEL and settings.HF_API_KEY)
-        or (settings.VERTEX_PROJECT and settings.VERTEX_LOCATION)
-    ):
-        from app.services.medgemma_service import MedGemmaService
-
-        _medgemma_svc = MedGemmaService({
-            "HF_MODEL": settings.HF_MODEL,
-            "HF_API_KEY": settings.HF_API_KEY,
-            "VERTEX_PROJECT": settings.VERTEX_PROJECT,
-            "VERTEX_LOCATION": settings.VERTEX_LOCATION,
-            "VERTEX_TEXT_ENDPOINT_ID": settings.VERTEX_TEXT_ENDPOINT_ID,
-            "VERTEX_VISION_ENDPOINT_ID": settings.VERTEX_VISION_ENDPOINT_ID,
-            "REDIS_URL": settings.REDIS_URL,
-            "ALLOW_PHI": settings.ALLOW_PHI,
-        })
-    return _medgemma_svc
+    """Shared MedGemmaService for radiology vision (see medgemma_provider)."""
+    from app.services.medgemma_provider import provider
+
+    return provider.get()
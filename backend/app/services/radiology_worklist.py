@@ -0,0 +1,295 @@
+# backend/app/services/radiology_worklist.py
+"""
+Index-backed radiology worklist: keyset pagination, lazy heatmaps, live feed.
+
+Pending studies are read in (status, priority_rank, uploaded_at, _id) order
+straight off the WORKLIST_INDEX compound index, one page at a time; the opaque
+cursor carries the last row's sort key. priority_rank is numeric
+(stat=1 < urgent=2 < routine=3) so Mongo sorts it correctly.
+
+Grad-CAM PNGs live in HEATMAP_COLLECTION (one doc per study) and are fetched
+only by the explainability endpoints, keeping study documents small.
+
+worklist_events() yields incremental upsert/remove events for reading-room
+clients: from a Mongo change stream when the deployment supports it (replica
+set / Atlas), otherwise from the in-process WorklistFeed that upload/review
+publish to.
+"""
+import asyncio
+import base64
+import json
+import logging
+from contextlib import aclosing
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+
+from bson import ObjectId
+from bson.binary import Binary
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger("medgemma.radiology_worklist")
+
+STUDIES_COLLECTION = "radiology_studies"
+HEATMAP_COLLECTION = "radiology_heatmaps"
+
+# Priority sort order: stat=1, urgent=2, routine=3
+PRIORITY_RANK = {"stat": 1, "urgent": 2, "routine": 3}
+DEFAULT_RANK = PRIORITY_RANK["routine"]
+
+WORKLIST_INDEX = [("status", 1), ("priority_rank", 1), ("uploaded_at", 1), ("_id", 1)]
+WORKLIST_SORT = WORKLIST_INDEX[1:]
+
+# Fields returned per worklist row (no blobs)
+WORKLIST_PROJECTION = {
+    "study_id": 1,
+    "patient_id": 1,
+    "modality": 1,
+    "body_part": 1,
+    "uploaded_at": 1,
+    "priority_score": 1,
+    "priority_label": 1,
+    "priority_rank": 1,
+    "status": 1,
+    "ai_summary": 1,
+    "override_priority": 1,
+    "reviewed_by": 1,
+    "has_explainability": 1,
+}
+
+MAX_PAGE_SIZE = 500
+
+_indexes_ready = False
+_indexes_lock = asyncio.Lock()
+
+
+def priority_rank(label: Optional[str]) -> int:
+    return PRIORITY_RANK.get(label or "routine", DEFAULT_RANK)
+
+
+# -------------------------
+# Indexes / migration
+# -------------------------
+async def ensure_indexes(db) -> None:
+    """Create worklist/heatmap indexes and backfill rank/flag fields once per process."""
+    global _indexes_ready
+    if _indexes_ready:
+        return
+    async with _indexes_lock:
+        if _indexes_ready:
+            return
+        studies = db[STUDIES_COLLECTION]
+        await studies.create_index(WORKLIST_INDEX, name="worklist_status_rank_uploaded")
+        await studies.create_index([("study_id", 1)], name="study_id")
+        await db[HEATMAP_COLLECTION].create_index([("study_id", 1)], name="study_id", unique=True)
+        for label, rank in PRIORITY_RANK.items():
+            await studies.update_many(
+                {"priority_rank": {"$exists": False}, "priority_label": label},
+                {"$set": {"priority_rank": rank}},
+            )
+        await studies.update_many({"priority_rank": {"$exists": False}}, {"$set": {"priority_rank": DEFAULT_RANK}})
+        await studies.update_many(
+            {"explainability_image": {"$exists": True}, "has_explainability": {"$exists": False}},
+            {"$set": {"has_explainability": True}},
+        )
+        _indexes_ready = True
+
+
+async def migrate_inline_heatmaps(db, batch_size: int = 100) -> int:
+    """Move legacy inline explainability_image blobs into HEATMAP_COLLECTION. Returns studies moved."""
+    studies = db[STUDIES_COLLECTION]
+    moved = 0
+    while True:
+        docs = await studies.find(
+            {"explainability_image": {"$exists": True}},
+            {"study_id": 1, "explainability_image": 1},
+        ).limit(batch_size).to_list(batch_size)
+        if not docs:
+            return moved
+        for doc in docs:
+            await save_heatmap(db, doc["study_id"], bytes(doc["explainability_image"]))
+            await studies.update_one(
+                {"_id": doc["_id"]},
+                {"$unset": {"explainability_image": ""}, "$set": {"has_explainability": True}},
+            )
+            moved += 1
+
+
+# -------------------------
+# Heatmaps
+# -------------------------
+async def save_heatmap(db, study_id: str, png: bytes) -> None:
+    await db[HEATMAP_COLLECTION].update_one(
+        {"study_id": study_id},
+        {"$set": {"study_id": study_id, "image": Binary(png), "created_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+async def load_heatmap(db, study_id: str) -> Optional[bytes]:
+    """Heatmap PNG for a study; falls back to the legacy inline field for unmigrated documents."""
+    doc = await db[HEATMAP_COLLECTION].find_one({"study_id": study_id}, {"image": 1})
+    if doc and doc.get("image"):
+        return bytes(doc["image"])
+    legacy = await db[STUDIES_COLLECTION].find_one({"study_id": study_id}, {"explainability_image": 1})
+    if legacy and legacy.get("explainability_image"):
+        return bytes(legacy["explainability_image"])
+    return None
+
+
+# -------------------------
+# Keyset pagination
+# -------------------------
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    """Opaque cursor from the last row's sort key."""
+    key = {
+        "r": doc.get("priority_rank", DEFAULT_RANK),
+        "t": doc["uploaded_at"].isoformat(),
+        "id": str(doc["_id"]),
+    }
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, datetime, ObjectId]:
+    """Inverse of encode_cursor; raises ValueError on malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(key["r"]), datetime.fromisoformat(key["t"]), ObjectId(key["id"])
+    except Exception as e:
+        raise ValueError(f"Invalid worklist cursor: {e}") from e
+
+
+def page_filter(status: str = "pending", cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Filter for the page after `cursor` in WORKLIST_SORT order (an index range scan)."""
+    query: Dict[str, Any] = {"status": status}
+    if cursor:
+        rank, uploaded_at, oid = decode_cursor(cursor)
+        query["$or"] = [
+            {"priority_rank": {"$gt": rank}},
+            {"priority_rank": rank, "uploaded_at": {"$gt": uploaded_at}},
+            {"priority_rank": rank, "uploaded_at": uploaded_at, "_id": {"$gt": oid}},
+        ]
+    return query
+
+
+def worklist_item(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe worklist row."""
+    item = {k: v for k, v in doc.items() if k in WORKLIST_PROJECTION or k == "_id"}
+    item["_id"] = str(doc["_id"])
+    if hasattr(item.get("uploaded_at"), "isoformat"):
+        item["uploaded_at"] = item["uploaded_at"].isoformat()
+    item.setdefault("priority_rank", priority_rank(doc.get("priority_label")))
+    item["has_explainability"] = bool(doc.get("has_explainability") or doc.get("explainability_image"))
+    return item
+
+
+async def fetch_page(
+    db,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    status: str = "pending",
+) -> Dict[str, Any]:
+    """One worklist page: {"items": [...], "next_cursor": str | None}."""
+    await ensure_indexes(db)
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    docs = await (
+        db[STUDIES_COLLECTION]
+        .find(page_filter(status, cursor), WORKLIST_PROJECTION)
+        .sort(WORKLIST_SORT)
+        .hint(WORKLIST_INDEX)
+        .limit(limit + 1)
+        .to_list(limit + 1)
+    )
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    return {
+        "items": [worklist_item(d) for d in docs],
+        "next_cursor": encode_cursor(docs[-1]) if has_more else None,
+    }
+
+
+# -------------------------
+# Live feed
+# -------------------------
+_FEED_CLOSED = object()
+
+
+class WorklistFeed:
+    """In-process fan-out of worklist events (used when change streams are unavailable)."""
+
+    def __init__(self, max_queue: int = 256):
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._max_queue = max_queue
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        for q in list(self._subscribers):
+            try:
+                q.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow client: its events are already incomplete, so end its stream.
+                # The SSE client reconnects and re-syncs from the paged API.
+                self._subscribers.discard(q)
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(_FEED_CLOSED)
+                logger.warning("Worklist subscriber dropped (queue full)")
+
+    async def subscribe(self) -> AsyncIterator[Dict[str, Any]]:
+        q: asyncio.Queue = asyncio.Queue(self._max_queue)
+        self._subscribers.add(q)
+        try:
+            while True:
+                event = await q.get()
+                if event is _FEED_CLOSED:
+                    return
+                yield event
+        finally:
+            self._subscribers.discard(q)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+feed = WorklistFeed()
+
+
+def study_event(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """upsert while the study is pending, remove once it leaves the worklist."""
+    if doc.get("status") == "pending":
+        return {"type": "upsert", "item": worklist_item(doc)}
+    return {"type": "remove", "study_id": doc.get("study_id")}
+
+
+def publish_study(doc: Dict[str, Any]) -> None:
+    feed.publish(study_event(doc))
+
+
+async def _change_stream_events(db) -> AsyncIterator[Dict[str, Any]]:
+    pipeline = [
+        {"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}},
+        {"$project": {"fullDocument.explainability_image": 0}},
+    ]
+    async with db[STUDIES_COLLECTION].watch(pipeline, full_document="updateLookup") as stream:
+        async for change in stream:
+            doc = change.get("fullDocument")
+            if doc:
+                yield study_event(doc)
+
+
+async def worklist_events(db) -> AsyncIterator[Dict[str, Any]]:
+    """Mongo change stream when supported, else the in-process feed."""
+    # aclosing: a client disconnect must close the inner stream / unsubscribe right away
+    try:
+        async with aclosing(_change_stream_events(db)) as changes:
+            async for event in changes:
+                yield event
+        return
+    except OperationFailure as e:
+        # Standalone mongod: "The $changeStream stage is only supported on replica sets"
+        logger.info("Change streams unavailable (%s); using in-process worklist feed", e.code)
+    except PyMongoError as e:
+        logger.warning("Worklist change stream failed: %s; using in-process feed", e)
+    async with aclosing(feed.subscribe()) as local:
+        async for event in local:
+            yield event
@@ -0,0 +1,138 @@
+"""
+Two-tier cache for model text generations: in-process LRU (with TTL) in front of
+the optional Redis client MedGemmaService already holds.
+
+Key: (prompt_hash, base_model_id, adapter_id, temperature). By default only
+deterministic calls (temperature 0) are cached, so sampled outputs stay fresh.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("medgemma.response_cache")
+
+# Prometheus metrics (lazy init; optional dependency)
+_CACHE_REQUESTS = None
+
+
+def _get_metrics():
+    global _CACHE_REQUESTS
+    if _CACHE_REQUESTS is None:
+        try:
+            from prometheus_client import Counter
+            _CACHE_REQUESTS = Counter(
+                "medgemma_response_cache_requests_total",
+                "MedGemma response cache lookups",
+                ["tier", "result"],
+            )
+        except ImportError:
+            logger.debug("prometheus_client not installed; cache metrics disabled")
+    return _CACHE_REQUESTS
+
+
+def make_cache_key(
+    prompt_hash: str,
+    base_model_id: Optional[str],
+    adapter_id: Optional[str],
+    temperature: float,
+) -> str:
+    return f"gen:{prompt_hash}:{base_model_id or ''}:{adapter_id or ''}:{float(temperature):.3f}"
+
+
+class ResponseCache:
+    """
+    LRU + TTL in process, Redis (optional) as the shared second tier.
+    get/set never raise: a cache failure degrades to a miss.
+    """
+
+    def __init__(
+        self,
+        redis_client: Any = None,
+        max_entries: int = 1024,
+        ttl_s: float = 3600.0,
+        enabled: bool = True,
+        cache_sampled: bool = False,
+    ):
+        self.redis = redis_client
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.enabled = enabled
+        self.cache_sampled = cache_sampled
+        self._lru: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = {"memory": 0, "redis": 0}
+        self.misses = 0
+
+    def cacheable(self, temperature: float) -> bool:
+        return self.enabled and (temperature <= 0.0 or self.cache_sampled)
+
+    def _count(self, tier: str, result: str) -> None:
+        counter = _get_metrics()
+        if counter is not None:
+            counter.labels(tier=tier, result=result).inc()
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._lru.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._lru[key]
+                return None
+            self._lru.move_to_end(key)
+            return value
+
+    def _set_local(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._lru[key] = (time.monotonic() + self.ttl_s, value)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self._get_local(key)
+        if value is not None:
+            self.hits["memory"] += 1
+            self._count("memory", "hit")
+            return value
+        if self.redis is not None:
+            try:
+                raw = await self.redis.get(key)
+                if raw:
+                    value = json.loads(raw)
+                    self._set_local(key, value)
+                    self.hits["redis"] += 1
+                    self._count("redis", "hit")
+                    return value
+            except Exception as e:
+                logger.debug("Redis cache get failed: %s", e)
+        self.misses += 1
+        self._count("all", "miss")
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        self._set_local(key, value)
+        if self.redis is not None:
+            try:
+                await self.redis.set(key, json.dumps(value), ex=int(self.ttl_s))
+            except Exception as e:
+                logger.debug("Redis cache set failed: %s", e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._lru.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits["memory"] + self.hits["redis"] + self.misses
+        return {
+            "entries": len(self._lru),
+            "max_entries": self.max_entries,
+            "hits_memory": self.hits["memory"],
+            "hits_redis": self.hits["redis"],
+            "misses": self.misses,
+            "hit_rate": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Images/second for the local MedSigLIP encoder.
+
+Compares the previous path (model(**inputs) followed by get_image_features,
+one image per call) with the single-forward batched encoder at several batch
+sizes and the configured precision. Requires torch + transformers.
+
+  python scripts/bench_medsiglip_local.py --images 64 --batch-sizes 1,8,32
+  MEDSIGLIP_LOCAL_PRECISION=int8 MEDSIGLIP_LOCAL_THREADS=4 python scripts/bench_medsiglip_local.py
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _images(n: int, size: int = 448):
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    out = []
+    for _ in range(n):
+        buf = io.BytesIO()
+        Image.fromarray(rng.integers(0, 255, (size, size, 3), dtype=np.uint8)).save(buf, format="PNG")
+        out.append(buf.getvalue())
+    return out
+
+
+def legacy_embed(mod, image_bytes: bytes) -> np.ndarray:
+    """Previous behaviour: full forward, then get_image_features (two encoder passes)."""
+    import torch
+    from PIL import Image
+
+    pil = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    inputs = mod._processor(images=pil, return_tensors="pt").to(mod._device)
+    with torch.no_grad():
+        outputs = mod._model(**inputs)
+        if hasattr(mod._model, "get_image_features"):
+            emb = mod._model.get_image_features(**inputs)
+        elif getattr(outputs, "pooler_output", None) is not None:
+            emb = outputs.pooler_output
+        else:
+            emb = outputs.last_hidden_state.mean(dim=1)
+    return emb.float().cpu().numpy()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=32)
+    parser.add_argument("--batch-sizes", default="1,4,16")
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    from app.services import medsiglip_local as mod
+
+    if not mod._load_model():
+        print("Local MedSigLIP unavailable (install torch + transformers)")
+        return 1
+    images = _images(args.images)
+    mod.embed_images_local(images[:1])  # warm-up
+
+    print(f"device={mod._device} precision={mod._precision} images={len(images)}")
+    if not args.skip_legacy:
+        t0 = time.perf_counter()
+        for img in images:
+            legacy_embed(mod, img)
+        print(f"{'legacy (2 passes, bs=1)':<26} {len(images) / (time.perf_counter() - t0):>8.1f} img/s")
+    for bs in [int(x) for x in args.batch_sizes.split(",") if x]:
+        t0 = time.perf_counter()
+        for i in range(0, len(images), bs):
+            mod.embed_images_local(images[i:i + bs])
+        print(f"{f'single-pass bs={bs}':<26} {len(images) / (time.perf_counter() - t0):>8.1f} img/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
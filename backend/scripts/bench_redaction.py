@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for PHI redaction on a synthetic observation corpus.
+
+Compares the single-pass engine (redact_texts, with and without spans) against
+the previous approach: each pattern applied in turn with finditer + sub.
+
+  python scripts/bench_redaction.py                      # 20k observations
+  python scripts/bench_redaction.py --docs 100000 --phi-rate 0.3
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.phi_redactor import PHI_PATTERNS, redact_texts  # noqa: E402
+
+SENTENCES = [
+    "Child says about 20 words and points to request items.",
+    "Walks independently, climbs stairs with support.",
+    "Parent reports limited eye contact during play at 18 months.",
+    "Follows two-step commands; stacks 4 blocks.",
+    "Does not yet combine words; babbles frequently.",
+    "Responds to name inconsistently in noisy settings.",
+]
+PHI = [
+    "Contact mom at 555-123-4567.",
+    "MRN: 00482913 on file.",
+    "DOB 03/14/2022.",
+    "Email parent.name@example.com for follow-up.",
+    "SSN 123-45-6789 recorded in intake.",
+    "Seen 2024-11-02 at clinic.",
+]
+
+
+def build_corpus(n: int, phi_rate: float, seed: int = 0):
+    rng = random.Random(seed)
+    docs = []
+    for _ in range(n):
+        parts = rng.sample(SENTENCES, k=rng.randint(2, 5))
+        if rng.random() < phi_rate:
+            parts.insert(rng.randrange(len(parts) + 1), rng.choice(PHI))
+        docs.append(" ".join(parts))
+    return docs
+
+
+def legacy_redact(text: str):
+    """Previous implementation: finditer + sub per pattern over the mutating string."""
+    out = text
+    redactions = []
+    for pat, repl in PHI_PATTERNS:
+        for m in pat.finditer(out):
+            redactions.append({"type": repl.strip("[]"), "span": m.span()})
+        out = pat.sub(repl, out)
+    return {"redacted_text": out, "redactions": redactions}
+
+
+def _run(label: str, fn, docs, size_mb: float) -> None:
+    t0 = time.perf_counter()
+    fn(docs)
+    dt = time.perf_counter() - t0
+    print(f"{label:<22} {dt * 1000:>9.1f} ms {len(docs) / dt:>12,.0f} docs/s {size_mb / dt:>8.1f} MB/s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--phi-rate", type=float, default=0.2)
+    args = parser.parse_args()
+
+    docs = build_corpus(args.docs, args.phi_rate)
+    size_mb = sum(len(d) for d in docs) / 1e6
+    print(f"{len(docs)} observations, {size_mb:.2f} MB, phi_rate={args.phi_rate}")
+    _run("legacy (8 passes)", lambda d: [legacy_redact(t) for t in d], docs, size_mb)
+    _run("single-pass + spans", redact_texts, docs, size_mb)
+    _run("single-pass, no spans", lambda d: redact_texts(d, include_spans=False), docs, size_mb)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
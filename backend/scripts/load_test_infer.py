@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Concurrent load test for POST /api/infer (HAI pipeline path).
+
+Fires N concurrent requests at several concurrency levels and prints p50/p99
+latency per level. With the async controller, p99 should stay close to the
+single-request latency instead of growing linearly with concurrency.
+
+  python scripts/load_test_infer.py                        # in-process infer router
+  python scripts/load_test_infer.py --url http://localhost:8000 --levels 1,8,32
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _payload(i: int) -> dict:
+    emb = base64.b64encode(b"\x00" * 256 * 4).decode("ascii")
+    return {
+        "case_id": f"load-{i}",
+        "age_months": 24,
+        "observations": "Says about 10 words; points to objects.",
+        "embedding_b64": emb,
+        "shape": [1, 256],
+    }
+
+
+def _pct(values, q: float) -> float:
+    vals = sorted(values)
+    idx = min(len(vals) - 1, max(0, int(round(q * (len(vals) - 1)))))
+    return vals[idx]
+
+
+async def _run_level(client, concurrency: int, requests_per_level: int, api_key: str) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            resp = await client.post("/api/infer", json=_payload(i), headers={"X-API-Key": api_key})
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if resp.status_code != 200:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(requests_per_level)])
+    wall = time.perf_counter() - t0
+    return {
+        "concurrency": concurrency,
+        "requests": requests_per_level,
+        "errors": errors,
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p99_ms": round(_pct(latencies, 0.99), 1),
+        "throughput_rps": round(requests_per_level / wall, 1) if wall else 0.0,
+    }
+
+
+def _in_process_app(model_delay_ms: int, audit_dir: str):
+    """Bare app with only the infer router (no Mongo-backed audit middleware)."""
+    os.environ.setdefault("USE_HAI_PIPELINE", "true")
+    os.environ.setdefault("MODEL_BACKEND", "mock")
+    # Audit writes are part of the measured path; keep the synthetic load-N records
+    # out of the real logs (set before app imports: paths are read at import time)
+    os.makedirs(audit_dir, exist_ok=True)
+    os.environ.setdefault("AUDIT_LOG_PATH", os.path.join(audit_dir, "audit.log"))
+    os.environ.setdefault("INFRA_AUDIT_PATH", os.path.join(audit_dir, "infra_audit.log"))
+    os.environ.setdefault("LEGAL_AUDIT_PATH", os.path.join(audit_dir, "legal_audit.log"))
+    from fastapi import FastAPI
+    from app.api import infer
+    from app.services import inference_controller
+
+    app = FastAPI()
+    app.include_router(infer.router)
+
+    if model_delay_ms:
+        orch = inference_controller._get_orchestrator()
+        inner = orch.run if hasattr(orch, "run") else orch.run_pipeline
+
+        def slow_run(input_data):
+            time.sleep(model_delay_ms / 1000.0)
+            return inner(input_data)
+
+        orch.run_pipeline = slow_run
+        if hasattr(orch, "run"):
+            orch.run = slow_run
+    return app
+
+
+async def main_async(args) -> list:
+    import httpx
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60.0)
+    else:
+        audit_dir = args.audit_dir or tempfile.mkdtemp(prefix="load_test_audit_")
+        print(f"Audit logs: {audit_dir}")
+        app = _in_process_app(args.model_delay_ms, audit_dir)
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=60.0
+        )
+    report = []
+    async with client:
+        for level in [int(x) for x in args.levels.split(",") if x]:
+            row = await _run_level(client, level, max(args.requests, level), args.api_key)
+            report.append(row)
+            print(
+                f"concurrency={row['concurrency']:>4}  p50={row['p50_ms']:>8.1f}ms  "
+                f"p99={row['p99_ms']:>8.1f}ms  rps={row['throughput_rps']:>7.1f}  errors={row['errors']}"
+            )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent /api/infer load test")
+    parser.add_argument("--url", default=None, help="Target server; default runs the app in-process")
+    parser.add_argument("--levels", default="1,4,16,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per level")
+    parser.add_argument("--model-delay-ms", type=int, default=200, help="Simulated model latency (in-process only)")
+    parser.add_argument("--api-key", default=os.environ.get("API_KEY", "dev-example-key"))
+    parser.add_argument("--output", default=None, help="Write JSON report here")
+    parser.add_argument("--audit-dir", default=None, help="Audit logs for in-process runs (default: a temp dir)")
+    args = parser.parse_args()
+    report = asyncio.run(main_async(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
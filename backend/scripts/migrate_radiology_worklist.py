@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+One-off migration for the index-backed radiology worklist.
+
+Creates the (status, priority_rank, uploaded_at) index, backfills priority_rank,
+and moves inline explainability_image blobs into radiology_heatmaps.
+Safe to re-run.
+
+  MONGO_URI=mongodb://... python scripts/migrate_radiology_worklist.py
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.db import get_db  # noqa: E402
+from app.services.radiology_worklist import ensure_indexes, migrate_inline_heatmaps  # noqa: E402
+
+
+async def _migrate() -> int:
+    db = get_db()
+    await ensure_indexes(db)
+    return await migrate_inline_heatmaps(db)
+
+
+def main():
+    moved = asyncio.run(_migrate())
+    print(f"Worklist indexes ready; moved {moved} heatmaps out of radiology_studies")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Batched audit sink: enqueue-only writes, size/time flushes, rotation, no loss on shutdown.
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services import audit
+from app.services.audit import AuditSink
+
+
+def _lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_events_written_in_order_after_flush(tmp_path):
+    path = str(tmp_path / "a.log")
+    sink = AuditSink(max_batch=1000, flush_interval_s=60, fsync="never")
+    for i in range(250):
+        sink.write(path, {"i": i})
+    assert sink.flush()
+    assert [e["i"] for e in _lines(path)] == list(range(250))
+    sink.close()
+
+
+def test_size_threshold_flushes_without_explicit_flush(tmp_path):
+    path = str(tmp_path / "b.log")
+    sink = AuditSink(max_batch=10, flush_interval_s=60, fsync="batch")
+    for i in range(10):
+        sink.write(path, {"i": i})
+    for _ in range(200):
+        if os.path.exists(path) and len(_lines(path)) == 10:
+            break
+        time.sleep(0.01)
+    assert len(_lines(path)) == 10
+    sink.close()
+
+
+def test_event_is_snapshotted_at_enqueue(tmp_path):
+    path = str(tmp_path / "c.log")
+    sink = AuditSink(flush_interval_s=60)
+    event = {"status": "before"}
+    sink.write(path, event)
+    event["status"] = "after"
+    sink.close()
+    assert _lines(path) == [{"status": "before"}]
+
+
+def test_rotation_keeps_backups(tmp_path):
+    path = str(tmp_path / "d.log")
+    sink = AuditSink(max_batch=1, flush_interval_s=60, rotate_bytes=200, rotate_backups=2)
+    for i in range(40):
+        sink.write(path, {"i": i, "pad": "x" * 20})
+    sink.close()
+    assert os.path.exists(path + ".1") and os.path.exists(path + ".2")
+    assert not os.path.exists(path + ".3")
+    assert all(os.path.getsize(p) <= 200 for p in (path, path + ".1", path + ".2"))
+    assert _lines(path)[-1]["i"] == 39
+
+
+def test_failed_write_is_retried(tmp_path):
+    blocker = tmp_path / "dir"
+    blocker.write_text("not a directory")
+    path = str(blocker / "e.log")
+    sink = AuditSink(flush_interval_s=60)
+    sink.write(path, {"i": 1})
+    assert sink.flush() is False  # not reported as drained while writes fail
+    assert sink.write_errors >= 1
+    blocker.unlink()
+    assert sink.close() is True
+    assert _lines(path) == [{"i": 1}]
+
+
+def test_retry_backlog_is_bounded(tmp_path):
+    blocker = tmp_path / "dir"
+    blocker.write_text("not a directory")
+    path = str(blocker / "f.log")
+    sink = AuditSink(max_batch=5, flush_interval_s=60, pending_max=10)
+    for i in range(30):
+        sink.write(path, {"i": i})
+    assert sink.flush() is False
+    assert sink.dropped == 20 and sink._pending_count == 10
+    blocker.unlink()
+    assert sink.close()
+    assert [e["i"] for e in _lines(path)] == list(range(20, 30))  # oldest dropped
+
+
+def test_write_does_not_block_when_queue_is_full(tmp_path):
+    sink = AuditSink(queue_max=2, flush_interval_s=60)
+    sink._ensure_thread = lambda: None  # no consumer: the queue stays full
+    t0 = time.monotonic()
+    for i in range(5):
+        sink.write(str(tmp_path / "g.log"), {"i": i})
+    assert time.monotonic() - t0 < 1
+    assert sink.dropped == 3
+
+
+def test_log_inference_audit_uses_sink(tmp_path, monkeypatch):
+    path = tmp_path / "audit.log"
+    monkeypatch.setenv("AUDIT_LOG_PATH", str(path))
+    audit.log_inference_audit(
+        request_id="r1", case_id="c1", model_id="m", adapter_id="", emb_version="v1",
+        success=True, fallback_used=True,
+    )
+    assert audit.flush_audit()
+    (event,) = _lines(str(path))
+    assert event["request_id"] == "r1" and event["fallback_used"] is True
@@ -57,3 +57,76 @@ class TestGetNearestNeighborEvidence:
         result = get_nearest_neighbor_evidence(emb, k=5, dim=256)
         # With no FAISS index, returns []
         assert isinstance(result, list)
+
+
+class TestEvidenceIndex:
+    def _write(self, tmp_path, vectors, ids):
+        faiss = pytest.importorskip("faiss")
+        import json
+
+        vecs = np.asarray(vectors, dtype=np.float32)
+        faiss.normalize_L2(vecs)
+        index = faiss.IndexFlatIP(vecs.shape[1])
+        index.add(vecs)
+        faiss.write_index(index, str(tmp_path / "faiss_index.bin"))
+        with open(tmp_path / "faiss_meta.jsonl", "w", encoding="utf-8") as fh:
+            for case_id in ids:
+                fh.write(json.dumps({"id": case_id, "description": f"case {case_id}"}) + "\n")
+
+    def _holder(self, tmp_path):
+        from app.services.evidence_capture import EvidenceIndex
+
+        return EvidenceIndex(
+            index_path=str(tmp_path / "faiss_index.bin"),
+            meta_path=str(tmp_path / "faiss_meta.jsonl"),
+            meta_pkl_path=str(tmp_path / "faiss_meta.pkl"),
+            check_interval_s=0,
+            meta_bin_path=str(tmp_path / "faiss_meta.bin"),
+        )
+
+    def test_loads_once_and_batch_search(self, tmp_path):
+        self._write(tmp_path, np.eye(4), ["a", "b", "c", "d"])
+        holder = self._holder(tmp_path)
+        index, meta = holder.get()
+        assert holder.get()[0] is index
+        assert len(meta) == 4
+        results = holder.search(np.eye(4)[[2, 0]], k=1)
+        assert [r[0].reference_ids for r in results] == [["c"], ["a"]]
+
+    def test_hot_swaps_when_files_change(self, tmp_path):
+        self._write(tmp_path, np.eye(4), ["a", "b", "c", "d"])
+        holder = self._holder(tmp_path)
+        first = holder.get()[0]
+        self._write(tmp_path, np.eye(4)[:2], ["x", "y"])
+        holder.reload()
+        index, meta = holder.get()
+        assert index is not first
+        assert index.ntotal == 2 and len(meta) == 2
+        assert holder.search(np.eye(4)[1], k=1)[0][0].reference_ids == ["y"]
+
+    def test_dim_mismatch_returns_empty(self, tmp_path):
+        self._write(tmp_path, np.eye(4), ["a", "b", "c", "d"])
+        holder = self._holder(tmp_path)
+        assert holder.search(np.zeros((2, 8), dtype=np.float32)) == [[], []]
+
+    def test_jsonl_truncated_in_place_is_safe(self, tmp_path):
+        self._write(tmp_path, np.eye(4), ["a", "b", "c", "d"])
+        holder = self._holder(tmp_path)
+        _, meta = holder.get()
+        # A writer rewriting the file in place must not fault readers of the old snapshot
+        with open(tmp_path / "faiss_meta.jsonl", "r+b") as fh:
+            fh.truncate(0)
+        assert meta[3]["id"] == "d"
+
+    def test_prefers_binary_sidecar(self, tmp_path):
+        import json
+        import struct
+
+        self._write(tmp_path, np.eye(4), ["a", "b", "c", "d"])
+        # Layout written by model-dev/eval/faiss_index_builder.py
+        blobs = [json.dumps({"id": f"bin-{i}"}).encode() for i in range(4)]
+        offsets = np.concatenate(([0], np.cumsum([len(b) for b in blobs]))).astype(np.int64)
+        with open(tmp_path / "faiss_meta.bin", "wb") as fh:
+            fh.write(struct.pack("<8sQ", b"PSMETA01", 4) + offsets.tobytes() + b"".join(blobs))
+        holder = self._holder(tmp_path)
+        assert holder.search(np.eye(4)[3], k=1)[0][0].reference_ids == ["bin-3"]
@@ -0,0 +1,206 @@
+"""
+Async feedback store: buffered multi-row inference inserts and async read/write paths.
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services import feedback_store
+from app.services.feedback_store import InferenceWriteBuffer
+
+
+def _row(i):
+    return {
+        "inference_id": f"00000000-0000-0000-0000-{i:012d}",
+        "case_id": f"case-{i}",
+        "screening_id": None,
+        "input_hash": None,
+        "result_summary": "ok",
+        "result_risk": "low",
+    }
+
+
+@pytest.mark.asyncio
+async def test_buffer_writes_multi_row_insert_to_db():
+    pytest.importorskip("aiosqlite")
+    from sqlalchemy import insert, text
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TABLE inferences (inference_id TEXT, case_id TEXT, screening_id TEXT,"
+            " input_hash TEXT, result_summary TEXT, result_risk TEXT)"
+        ))
+    statements = []
+
+    async def execute(rows):
+        stmt = insert(feedback_store._INFERENCES).values(rows)
+        statements.append(stmt)
+        async with engine.begin() as conn:
+            await conn.execute(stmt)
+
+    buf = InferenceWriteBuffer(execute=execute, max_rows=3, flush_interval_s=60)
+    for i in range(7):
+        buf.add(_row(i))
+    assert buf.pending(_row(6)["inference_id"])
+    await buf.close()
+    async with engine.connect() as conn:
+        count = (await conn.execute(text("SELECT count(*) FROM inferences"))).scalar()
+    await engine.dispose()
+    assert count == 7
+    assert len(statements) == 3  # two full batches of 3 + the remainder on close
+    assert not buf.pending(_row(6)["inference_id"])
+
+
+@pytest.mark.asyncio
+async def test_buffer_flushes_on_interval():
+    written = []
+
+    async def execute(rows):
+        written.append(len(rows))
+
+    buf = InferenceWriteBuffer(execute=execute, max_rows=100, flush_interval_s=0.01)
+    buf.add(_row(1))
+    buf.add(_row(2))
+    for _ in range(100):
+        if written:
+            break
+        await asyncio.sleep(0.01)
+    assert written == [2]
+    await buf.close()
+
+
+@pytest.mark.asyncio
+async def test_buffer_failure_is_logged_not_raised():
+    async def execute(rows):
+        raise RuntimeError("db down")
+
+    buf = InferenceWriteBuffer(execute=execute, max_rows=100, flush_interval_s=60)
+    buf.add(_row(1))
+    assert await buf.flush() == 0
+    assert buf.failed == 1 and not buf.pending(_row(1)["inference_id"])
+    await buf.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_falls_back_to_row_inserts():
+    written = []
+
+    async def execute(rows):
+        if any(r["case_id"] == "case-2" for r in rows):
+            raise RuntimeError("bad row")
+        written.extend(r["case_id"] for r in rows)
+
+    buf = InferenceWriteBuffer(execute=execute, max_rows=100, flush_interval_s=60)
+    for i in range(4):
+        buf.add(_row(i))
+    assert await buf.flush() == 3
+    assert written == ["case-0", "case-1", "case-3"] and buf.failed == 1
+    await buf.close()
+
+
+@pytest.mark.asyncio
+async def test_feedback_waits_for_buffered_inference(monkeypatch):
+    from app.services import db_cloudsql
+
+    stored = set()
+    statements = []
+
+    async def execute(rows):
+        await asyncio.sleep(0.01)
+        stored.update(r["inference_id"] for r in rows)
+
+    async def run_async(stmt, params=None, write=False):
+        # Stand-in for the fk_inference constraint
+        assert params["inference_id"] in stored
+        statements.append(stmt)
+
+    buf = InferenceWriteBuffer(execute=execute, max_rows=100, flush_interval_s=60)
+    monkeypatch.setattr(feedback_store, "_buffer", buf)
+    monkeypatch.setattr(feedback_store, "is_cloudsql_enabled", lambda: True)
+    monkeypatch.setattr(db_cloudsql, "run_async", run_async)
+    buf.add(_row(7))
+    assert await feedback_store.inference_exists_async(_row(7)["inference_id"])
+    await feedback_store.insert_feedback_async({
+        "inference_id": _row(7)["inference_id"],
+        "case_id": "case-7",
+        "clinician_id": "c1",
+        "feedback_type": "rating",
+        "rating": 4,
+    })
+    assert len(statements) == 1 and not buf.pending(_row(7)["inference_id"])
+    await buf.close()
+
+
+@pytest.mark.asyncio
+async def test_async_api_uses_memory_store_without_cloudsql(monkeypatch):
+    monkeypatch.delenv("INSTANCE_CONNECTION_NAME", raising=False)
+    await feedback_store.insert_inference_async(_row(42)["inference_id"], "case-42", None, None, "s", "low")
+    assert await feedback_store.inference_exists_async(_row(42)["inference_id"])
+    fid = await feedback_store.insert_feedback_async({
+        "inference_id": _row(42)["inference_id"],
+        "case_id": "case-42",
+        "clinician_id": "c1",
+        "feedback_type": "rating",
+        "rating": 5,
+    })
+    items = await feedback_store.get_feedback_by_case_async("case-42")
+    assert [f["feedback_id"] for f in items] == [fid]
+
+
+@pytest.mark.parametrize("stmt, params", [
+    (feedback_store._INSERT_INFERENCE_SQL,
+     {"inference_id", "case_id", "screening_id", "input_hash", "result_summary", "result_risk"}),
+    (feedback_store._INSERT_FEEDBACK_SQL,
+     {"feedback_id", "case_id", "inference_id", "clinician_id", "feedback_type", "corrected_risk",
+      "corrected_summary", "rating", "comment", "clinician_notes", "metadata"}),
+    (feedback_store._FEEDBACK_BY_INFERENCE_SQL, {"inference_id"}),
+    (feedback_store._FEEDBACK_BY_CASE_SQL, {"case_id"}),
+    (feedback_store._INFERENCE_EXISTS_SQL, {"inference_id"}),
+])
+def test_feedback_sql_bind_names(stmt, params):
+    # ":name::uuid" would be parsed as a bind called "nam"/"name:" instead of "name"
+    assert set(stmt.compile().params) == params
+
+
+def test_cloudsql_sql_bind_names(monkeypatch):
+    from app.services import db_cloudsql
+
+    assert set(db_cloudsql._INSERT_SCREENING_SQL.compile().params) == {
+        "screening_id", "child_age_months", "domain", "observations", "image_path", "report"}
+
+    executed = []
+
+    class _Conn:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, stmt, params=None):
+            executed.append((set(stmt.compile().params), set(params or {})))
+
+            class _Result:
+                def first(self):
+                    return {"draft_json": {}}
+
+            return _Result()
+
+    class _Engine:
+        def begin(self):
+            return _Conn()
+
+    monkeypatch.setattr(db_cloudsql, "get_engine", lambda: _Engine())
+    db_cloudsql.insert_report("r1", "s1", {}, {})
+    db_cloudsql.insert_report_audit("r1", "edit", "c1", {})
+    db_cloudsql.update_report_draft("r1", {})
+    db_cloudsql.finalize_report("r1", {}, "c1")
+    assert len(executed) == 5
+    for binds, params in executed:
+        assert binds == params
@@ -0,0 +1,69 @@
+"""
+Tests for the async HAI inference controller: concurrency, timeout fallback, audit queueing.
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services import inference_controller
+
+
+class _SlowOrchestrator:
+    def __init__(self, delay_s: float):
+        self.delay_s = delay_s
+
+    def run_pipeline(self, input_data):
+        time.sleep(self.delay_s)
+        return {
+            "risk": "monitor",
+            "confidence": 0.7,
+            "summary": [f"ok {input_data['case_id']}"],
+            "model_id": "mock",
+        }
+
+
+@pytest.fixture
+def audits(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        inference_controller, "submit_audit", lambda fn, **kw: calls.append(kw)
+    )
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_do_not_serialize(monkeypatch, audits):
+    monkeypatch.setattr(inference_controller, "_get_orchestrator", lambda: _SlowOrchestrator(0.2))
+    n = 8
+    t0 = time.perf_counter()
+    results = await asyncio.gather(*[
+        inference_controller.run_inference(
+            case_id=f"c{i}", age_months=24, observations="", embedding_b64=""
+        )
+        for i in range(n)
+    ])
+    elapsed = time.perf_counter() - t0
+    assert [r["case_id"] for r in results] == [f"c{i}" for i in range(n)]
+    assert elapsed < 0.2 * n / 2
+    assert len(audits) == n and all(a["success"] for a in audits)
+
+
+@pytest.mark.asyncio
+async def test_timeout_falls_back_after_retries(monkeypatch, audits):
+    monkeypatch.setattr(inference_controller, "_get_orchestrator", lambda: _SlowOrchestrator(0.3))
+    monkeypatch.setattr(inference_controller, "INFERENCE_TIMEOUT_S", 0.05)
+    result = await inference_controller.run_inference(
+        case_id="slow", age_months=24, observations="", embedding_b64=""
+    )
+    assert result["fallback"] is True
+    assert audits[-1]["fallback_used"] is True
+
+
+def test_sync_wrapper_runs_outside_event_loop(monkeypatch, audits):
+    monkeypatch.setattr(inference_controller, "_get_orchestrator", lambda: _SlowOrchestrator(0))
+    result = inference_controller.run_inference_sync(
+        case_id="sync", age_months=24, observations="", embedding_b64=""
+    )
+    assert result["case_id"] == "sync"
+    assert "fallback" not in result or result["fallback"] is False
@@ -0,0 +1,91 @@
+"""
+Shared MedGemmaService provider: one instance per process, lifespan close, DI in routers.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.medgemma_provider import MedGemmaProvider, get_medgemma_service
+
+
+class _FakeService:
+    def __init__(self):
+        self.closed = False
+        self.warmed = False
+
+    async def warmup(self):
+        self.warmed = True
+        return {"redis": None, "http": None}
+
+    async def close(self):
+        self.closed = True
+
+    def pool_stats(self):
+        return {"http": {"max": 64, "active": 1, "idle": 2}, "redis": {"max": 0, "in_use": 0, "available": 0}}
+
+
+def test_provider_builds_one_instance():
+    built = []
+    p = MedGemmaProvider(factory=lambda: built.append(1) or _FakeService())
+    assert p.get() is p.get()
+    assert len(built) == 1
+
+
+def test_provider_returns_none_when_unconfigured():
+    p = MedGemmaProvider(factory=lambda: None)
+    assert p.get() is None
+    assert p.pool_stats() == {}
+
+
+@pytest.mark.asyncio
+async def test_startup_warms_and_shutdown_closes():
+    svc = _FakeService()
+    p = MedGemmaProvider(factory=lambda: svc)
+    await p.startup(warmup=True)
+    assert svc.warmed
+    assert p.pool_stats()["http"]["idle"] == 2
+    await p.shutdown()
+    assert svc.closed
+    assert p.pool_stats() == {}
+
+
+@pytest.mark.asyncio
+async def test_service_pool_stats_and_sizing():
+    from app.services.medgemma_service import MedGemmaService
+
+    svc = MedGemmaService({"HTTP_MAX_CONNECTIONS": 7, "HTTP_MAX_KEEPALIVE": 3})
+    try:
+        stats = svc.pool_stats()
+        assert stats["http"] == {"max": 7, "active": 0, "idle": 0}
+        assert svc.http_limits.max_keepalive_connections == 3
+    finally:
+        await svc.close()
+
+
+def test_routers_receive_shared_service_via_dependency():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api import stream_analyze
+
+    seen = []
+
+    class _Svc:
+        async def analyze_input(self, **kwargs):
+            seen.append(self)
+            raise RuntimeError("stop after DI check")
+
+    shared = _Svc()
+    app = FastAPI()
+    app.include_router(stream_analyze.router)
+    app.dependency_overrides[get_medgemma_service] = lambda: shared
+    client = TestClient(app)
+    resp = client.post(
+        "/api/stream-analyze",
+        json={"age_months": 24, "observations": "Says a few words"},
+        headers={"x-api-key": "dev-example-key"},
+    )
+    assert resp.status_code == 200
+    assert seen == [shared]
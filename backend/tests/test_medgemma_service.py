@@ -46,3 +46,116 @@ async def test_medgemma_service_phi_blocked():
     assert res.get("provenance", {}).get("note") == "phi_blocked"
     # Should still return a valid baseline report
     assert "riskLevel" in res["report"]
+
+
+def _counting_service(monkeypatch, **cfg):
+    svc = MedGemmaService({"ALLOW_PHI": False, "HF_MODEL": "m", "HF_API_KEY": "k", **cfg})
+    calls = []
+
+    async def fake_hf(prompt, model, api_key, **kwargs):
+        calls.append(prompt)
+        return '{"clinical_summary": "ok", "recommendations": ["read together"]}'
+
+    monkeypatch.setattr(svc, "_call_hf_inference", fake_hf)
+    return svc, calls
+
+
+@pytest.mark.asyncio
+async def test_analyze_input_caches_deterministic_generation(monkeypatch):
+    svc, calls = _counting_service(monkeypatch)
+    first = await svc.analyze_input(24, "language", "Parent reports child says few words", None)
+    second = await svc.analyze_input(24, "language", "Parent reports child says few words", None)
+    assert len(calls) == 1
+    assert first["provenance"]["cache_hit"] is False
+    assert second["provenance"]["cache_hit"] is True
+    assert second["model_raw"] == first["model_raw"]
+    assert svc.response_cache.stats()["hits_memory"] == 1
+
+    await svc.analyze_input(24, "language", "Parent reports child says few words", None, bypass_cache=True)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_response_cache_disabled_by_config(monkeypatch):
+    svc, calls = _counting_service(monkeypatch, RESPONSE_CACHE_ENABLED=False)
+    for _ in range(2):
+        await svc.analyze_input(24, "language", "Parent reports child says few words", None)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_response_cache_lru_and_ttl(monkeypatch):
+    from app.services import response_cache as rc
+
+    cache = rc.ResponseCache(max_entries=2, ttl_s=60)
+    for k in ("a", "b", "c"):
+        await cache.set(k, {"raw": k})
+    assert await cache.get("a") is None  # evicted
+    assert (await cache.get("c"))["raw"] == "c"
+    assert not cache.cacheable(0.7) and cache.cacheable(0.0)
+
+    clock = [1000.0]
+    monkeypatch.setattr(rc.time, "monotonic", lambda: clock[0])
+    await cache.set("d", {"raw": "d"})
+    clock[0] += 61
+    assert await cache.get("d") is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_prompts_are_coalesced(monkeypatch):
+    import asyncio
+
+    svc, calls = _counting_service(monkeypatch)
+    inner = svc._call_hf_inference
+
+    async def slow_hf(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return await inner(*args, **kwargs)
+
+    monkeypatch.setattr(svc, "_call_hf_inference", slow_hf)
+    results = await asyncio.gather(*[
+        svc.analyze_input(24, "language", "Parent reports child says few words", None)
+        for _ in range(5)
+    ])
+    assert len(calls) == 1
+    assert svc._text_flight.coalesced == 4
+    assert svc._text_flight.in_flight() == 0
+    assert len({r["model_raw"] for r in results}) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_image_embeddings_are_coalesced(monkeypatch):
+    import asyncio
+
+    svc = MedGemmaService({"ALLOW_PHI": False})
+    computed = []
+
+    async def fake_compute(image_bytes, k):
+        computed.append(k)
+        await asyncio.sleep(0.05)
+        return [0.1, 0.2], "summary"
+
+    monkeypatch.setattr(svc, "_compute_image_embedding", fake_compute)
+    out = await asyncio.gather(
+        *[svc._get_image_embedding(b"same-image") for _ in range(3)],
+        svc._get_image_embedding(b"other-image"),
+    )
+    assert len(computed) == 2
+    assert out[0] == out[1] == out[2] == ([0.1, 0.2], "summary")
+    assert svc._embed_flight.coalesced == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_propagates_errors_to_all_waiters():
+    import asyncio
+    from app.services.medgemma_service import SingleFlight
+
+    flight = SingleFlight("test")
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(*[flight.do("k", boom) for _ in range(3)], return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.in_flight() == 0
@@ -0,0 +1,86 @@
+"""
+Local MedSigLIP encoder: one forward per batch, float32 NumPy output, CPU precision modes.
+"""
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+torch = pytest.importorskip("torch")
+
+from PIL import Image  # noqa: E402
+
+from app.services import medsiglip_local  # noqa: E402
+
+
+class _Inputs(dict):
+    def to(self, device):
+        return self
+
+
+class _Processor:
+    def __call__(self, images, return_tensors="pt"):
+        return _Inputs(pixel_values=torch.stack([
+            torch.tensor(np.asarray(im.resize((4, 4)), dtype=np.float32)).permute(2, 0, 1)
+            for im in images
+        ]))
+
+
+class _Model(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.proj = torch.nn.Linear(48, 8)
+        self.forward_calls = 0
+        self.feature_calls = 0
+
+    def forward(self, pixel_values):
+        self.forward_calls += 1
+        raise AssertionError("full forward should not run when get_image_features exists")
+
+    def get_image_features(self, pixel_values):
+        self.feature_calls += 1
+        return self.proj(pixel_values.flatten(1))
+
+
+def _png(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (6, 6), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    model = _Model().eval()
+    monkeypatch.setattr(medsiglip_local, "_processor", _Processor())
+    monkeypatch.setattr(medsiglip_local, "_model", model)
+    monkeypatch.setattr(medsiglip_local, "_device", torch.device("cpu"))
+    monkeypatch.setattr(medsiglip_local, "_precision", "fp32")
+    return model
+
+
+def test_batch_runs_single_forward(fake_model):
+    arr = medsiglip_local.embed_images_local([_png("red"), _png("blue"), _png("green")])
+    assert fake_model.feature_calls == 1 and fake_model.forward_calls == 0
+    assert arr.dtype == np.float32 and arr.shape == (3, 8)
+    np.testing.assert_allclose(np.linalg.norm(arr, axis=1), 1.0, rtol=1e-5)
+
+
+def test_legacy_dict_matches_array(fake_model):
+    out = medsiglip_local.get_medsiglip_embedding_local(_png("red"))
+    arr = medsiglip_local.embed_image_local(_png("red"))
+    assert out["shape"] == [1, 8]
+    np.testing.assert_allclose(out["embedding"], arr.ravel(), rtol=1e-6)
+
+
+@pytest.mark.parametrize("precision", ["bf16", "int8"])
+def test_cpu_precision_modes(fake_model, monkeypatch, precision):
+    model, effective = medsiglip_local._apply_precision(fake_model, precision, torch.device("cpu"))
+    assert effective == precision
+    monkeypatch.setattr(medsiglip_local, "_model", model)
+    monkeypatch.setattr(medsiglip_local, "_precision", effective)
+    arr = medsiglip_local.embed_images_local([_png("red")])
+    assert arr.dtype == np.float32 and arr.shape == (1, 8)
@@ -0,0 +1,115 @@
+"""
+Tests for model_wrapper HF transport: shared client, async backoff, circuit breaker.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import model_wrapper
+
+
+@pytest.fixture(autouse=True)
+def _fresh_state(monkeypatch):
+    monkeypatch.setattr(model_wrapper, "_breakers", {})
+    monkeypatch.setattr(model_wrapper, "BACKOFF_BASE_S", 0.0)
+    monkeypatch.setattr(model_wrapper, "_http_client", None)
+    monkeypatch.setattr(model_wrapper, "_http_client_loop", None)
+
+
+def _install_transport(monkeypatch, handler):
+    calls = []
+
+    def wrapped(request):
+        calls.append(request)
+        return handler(request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(wrapped))
+    monkeypatch.setattr(model_wrapper, "get_http_client", lambda: client)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_success_returns_parsed_json(monkeypatch):
+    body = [{"generated_text": '{"riskLevel": "low", "confidence": 0.9, "keyFindings": [], "recommendations": []}'}]
+    calls = _install_transport(monkeypatch, lambda r: httpx.Response(200, json=body))
+    resp = await model_wrapper._call_hf_inference("m", "k", "prompt")
+    assert resp["ok"] and resp["parsed"]["riskLevel"] == "low"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_5xx_retries_then_opens_breaker(monkeypatch):
+    monkeypatch.setattr(model_wrapper, "BREAKER_FAIL_MAX", 3)
+    calls = _install_transport(monkeypatch, lambda r: httpx.Response(503, text="down"))
+    first = await model_wrapper._call_hf_inference("m", "k", "prompt")
+    assert not first["ok"]
+    assert len(calls) == model_wrapper.MAX_RETRIES + 1
+    assert model_wrapper._breaker_for("m").state == "open"
+
+    second = await model_wrapper._call_hf_inference("m", "k", "prompt")
+    assert second.get("circuit_open") is True
+    assert len(calls) == model_wrapper.MAX_RETRIES + 1  # no upstream call while open
+
+
+@pytest.mark.asyncio
+async def test_4xx_does_not_trip_breaker(monkeypatch):
+    monkeypatch.setattr(model_wrapper, "BREAKER_FAIL_MAX", 1)
+    _install_transport(monkeypatch, lambda r: httpx.Response(400, text="bad"))
+    resp = await model_wrapper._call_hf_inference("m", "k", "prompt")
+    assert not resp["ok"]
+    assert model_wrapper._breaker_for("m").state == "closed"
+
+
+def test_breaker_half_open_allows_single_trial(monkeypatch):
+    br = model_wrapper._CircuitBreaker(fail_max=1, reset_timeout_s=0.0)
+    br.record_failure()
+    assert br.state == "half_open"
+    assert br.allow() is True
+    assert br.allow() is False
+    br.record_success()
+    assert br.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_trial_frees_the_slot(monkeypatch):
+    monkeypatch.setattr(model_wrapper, "BREAKER_RESET_TIMEOUT_S", 0.0)
+    br = model_wrapper._breaker_for("m")
+    br.record_failure()
+    br.opened_at = 0.0  # half-open
+
+    async def hang(request):
+        await asyncio.sleep(10)
+
+    _install_transport(monkeypatch, hang)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(model_wrapper._call_hf_inference("m", "k", "prompt"), 0.05)
+    assert br.state == "half_open" and br.allow() is True
+    br.release_trial()
+
+    body = [{"generated_text": '{"riskLevel": "low", "keyFindings": [], "recommendations": []}'}]
+    _install_transport(monkeypatch, lambda r: httpx.Response(200, json=body))
+    assert (await model_wrapper._call_hf_inference("m", "k", "prompt"))["ok"]
+    assert br.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_analyze_uses_baseline_when_circuit_open(monkeypatch):
+    monkeypatch.setattr(model_wrapper, "HF_API_KEY", "k")
+    monkeypatch.setattr(model_wrapper, "HF_MODEL", "m")
+    br = model_wrapper._breaker_for("m")
+    br.failures = br.fail_max
+    br.opened_at = float("inf")  # keep open regardless of clock
+    calls = _install_transport(monkeypatch, lambda r: httpx.Response(200, json={}))
+    out = await model_wrapper.analyze(24, "language", "says about 10 words")
+    assert out["model_used"] is False
+    assert out["report"]["riskLevel"] == "medium"
+    assert calls == []
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    monkeypatch.setattr(model_wrapper, "BACKOFF_BASE_S", 1.0)
+    monkeypatch.setattr(model_wrapper, "BACKOFF_MAX_S", 4.0)
+    for attempt in range(6):
+        ceiling = min(4.0, 2 ** attempt)
+        assert ceiling / 2 <= model_wrapper._backoff_s(attempt) <= ceiling
@@ -29,3 +29,40 @@ def test_redact_preserves_safe_text():
     result = redact_text(text)
     assert result["redacted_text"] == text
     assert result["redaction_count"] == 0
+
+
+def test_spans_refer_to_original_text():
+    text = "Email jane@example.org, SSN 123-45-6789, born 03/14/2019."
+    result = redact_text(text)
+    found = {r["type"]: text[r["span"][0]:r["span"][1]] for r in result["redactions"]}
+    assert found == {
+        "REDACTED_EMAIL": "jane@example.org",
+        "REDACTED_SSN": "123-45-6789",
+        "REDACTED_DOB": "03/14/2019",
+    }
+    assert result["redacted_text"] == "Email [REDACTED_EMAIL], SSN [REDACTED_SSN], born [REDACTED_DOB]."
+
+
+def test_mrn_label_wins_over_phone_digits():
+    result = redact_text("MRN: 1234567890 seen today")
+    assert result["redacted_text"] == "[REDACTED_MRN] seen today"
+    assert result["redaction_count"] == 1
+
+
+def test_batch_matches_single():
+    from app.services.phi_redactor import redact_texts
+
+    texts = ["call 555-123-4567", "", "no phi here", "medical record # 00123456"]
+    full = redact_texts(texts)
+    fast = redact_texts(texts, include_spans=False)
+    assert [r["redacted_text"] for r in full] == [r["redacted_text"] for r in fast]
+    assert [r.get("redaction_count", 0) for r in full] == [r["redaction_count"] for r in fast]
+
+
+def test_contains_phi():
+    from app.services.phi_redactor import contains_phi
+
+    assert contains_phi("patient id 42")
+    assert contains_phi("dob 2019-03-14")
+    assert not contains_phi("Says 20 words at 24 months")
+    assert not contains_phi("")
@@ -0,0 +1,208 @@
+"""
+Radiology worklist: keyset pagination on the compound index, separate heatmap storage, live feed.
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services import radiology_worklist as worklist
+
+
+def _match(doc, query):
+    for key, cond in query.items():
+        if key == "$or":
+            if not any(_match(doc, q) for q in cond):
+                return False
+        elif isinstance(cond, dict):
+            if "$exists" in cond and (key in doc) != cond["$exists"]:
+                return False
+            if "$gt" in cond and not (key in doc and doc[key] > cond["$gt"]):
+                return False
+        elif doc.get(key) != cond:
+            return False
+    return True
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, keys):
+        for key, direction in reversed(keys):
+            self._docs.sort(key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def hint(self, index):
+        return self
+
+    def limit(self, n):
+        self._docs = self._docs[:n]
+        return self
+
+    async def to_list(self, n):
+        return self._docs[:n]
+
+
+class _Collection:
+    """Just enough of Motor's collection API for the worklist service."""
+
+    def __init__(self):
+        self.docs = []
+        self.indexes = []
+
+    async def create_index(self, keys, **kwargs):
+        self.indexes.append(keys)
+
+    async def insert_one(self, doc):
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+
+    def find(self, query, projection=None):
+        return _Cursor([dict(d) for d in self.docs if _match(d, query)])
+
+    async def find_one(self, query, projection=None):
+        return next((dict(d) for d in self.docs if _match(d, query)), None)
+
+    async def update_one(self, query, update, upsert=False):
+        doc = next((d for d in self.docs if _match(d, query)), None)
+        if doc is None and upsert:
+            doc = {"_id": ObjectId()}
+            self.docs.append(doc)
+        if doc is not None:
+            doc.update(update.get("$set", {}))
+            for key in update.get("$unset", {}):
+                doc.pop(key, None)
+
+    async def update_many(self, query, update):
+        for doc in [d for d in self.docs if _match(d, query)]:
+            doc.update(update["$set"])
+
+    def watch(self, *args, **kwargs):
+        raise OperationFailure("The $changeStream stage is only supported on replica sets", code=40573)
+
+
+class _DB(dict):
+    def __missing__(self, name):
+        self[name] = _Collection()
+        return self[name]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(worklist, "_indexes_ready", False)
+    return _DB()
+
+
+def _seed(db, n=23):
+    base = datetime(2026, 1, 1)
+    labels = ["routine", "stat", "urgent"]
+    for i in range(n):
+        label = labels[i % 3]
+        doc = {
+            "_id": ObjectId(),
+            "study_id": f"S{i:03d}",
+            "status": "pending" if i % 7 else "reviewed",
+            "priority_label": label,
+            # Several studies share an upload time to exercise the _id tie-break
+            "uploaded_at": base + timedelta(minutes=i // 2),
+        }
+        if i % 5:
+            doc["priority_rank"] = worklist.priority_rank(label)
+        db[worklist.STUDIES_COLLECTION].docs.append(doc)
+
+
+@pytest.mark.asyncio
+async def test_pages_follow_priority_then_fifo(db):
+    _seed(db)
+    seen, cursor = [], None
+    while True:
+        page = await worklist.fetch_page(db, limit=4, cursor=cursor)
+        seen.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    pending = [d for d in db[worklist.STUDIES_COLLECTION].docs if d["status"] == "pending"]
+    expected = sorted(pending, key=lambda d: (worklist.PRIORITY_RANK[d["priority_label"]], d["uploaded_at"], d["_id"]))
+    assert [i["study_id"] for i in seen] == [d["study_id"] for d in expected]
+    assert seen[0]["priority_label"] == "stat" and seen[-1]["priority_label"] == "routine"
+    # Legacy docs got a rank backfilled and the compound index was created
+    assert all("priority_rank" in d for d in db[worklist.STUDIES_COLLECTION].docs)
+    assert worklist.WORKLIST_INDEX in db[worklist.STUDIES_COLLECTION].indexes
+
+
+def test_cursor_round_trip_and_rejects_garbage():
+    doc = {"_id": ObjectId(), "priority_rank": 2, "uploaded_at": datetime(2026, 3, 1, 8, 30, 0, 123000)}
+    assert worklist.decode_cursor(worklist.encode_cursor(doc)) == (2, doc["uploaded_at"], doc["_id"])
+    with pytest.raises(ValueError):
+        worklist.page_filter(cursor="not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_heatmaps_stored_separately_and_legacy_migrated(db):
+    studies = db[worklist.STUDIES_COLLECTION]
+    await studies.insert_one({"study_id": "old", "status": "pending", "explainability_image": b"PNGOLD"})
+    assert await worklist.load_heatmap(db, "old") == b"PNGOLD"
+    assert await worklist.migrate_inline_heatmaps(db) == 1
+    assert "explainability_image" not in studies.docs[0] and studies.docs[0]["has_explainability"]
+    assert await worklist.load_heatmap(db, "old") == b"PNGOLD"
+    await worklist.save_heatmap(db, "new", b"PNGNEW")
+    assert await worklist.load_heatmap(db, "new") == b"PNGNEW"
+    assert await worklist.load_heatmap(db, "missing") is None
+
+
+@pytest.mark.asyncio
+async def test_events_fall_back_to_in_process_feed(db):
+    events = worklist.worklist_events(db)
+    first = asyncio.ensure_future(events.__anext__())
+    while worklist.feed.subscriber_count == 0:
+        await asyncio.sleep(0)
+    doc = {"_id": ObjectId(), "study_id": "S1", "status": "pending", "priority_label": "stat",
+           "uploaded_at": datetime(2026, 1, 1)}
+    worklist.publish_study(doc)
+    worklist.publish_study({**doc, "status": "reviewed"})
+    upsert = await asyncio.wait_for(first, 1)
+    assert upsert["type"] == "upsert" and upsert["item"]["priority_rank"] == 1
+    assert await asyncio.wait_for(events.__anext__(), 1) == {"type": "remove", "study_id": "S1"}
+    await events.aclose()
+    assert worklist.feed.subscriber_count == 0
+
+
+@pytest.mark.asyncio
+async def test_overflowing_subscriber_stream_ends():
+    feed = worklist.WorklistFeed(max_queue=2)
+    events = feed.subscribe()
+    first = asyncio.ensure_future(events.__anext__())
+    while feed.subscriber_count == 0:
+        await asyncio.sleep(0)
+    for i in range(4):
+        feed.publish({"type": "remove", "study_id": f"S{i}"})
+    # Backlog is discarded and the generator finishes, which closes the SSE response
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(first, 1)
+    assert feed.subscriber_count == 0
+
+
+def test_queue_endpoint_paginates(db, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api import radiology
+
+    _seed(db, n=10)
+    monkeypatch.setattr(radiology, "get_db", lambda: db)
+    app = FastAPI()
+    app.include_router(radiology.router)
+    client = TestClient(app)
+    headers = {"x-api-key": "dev-example-key"}
+    first = client.get("/api/radiology/queue?limit=5", headers=headers).json()
+    assert len(first["items"]) == 5 and first["next_cursor"]
+    rest = client.get(f"/api/radiology/queue?limit=5&cursor={first['next_cursor']}", headers=headers).json()
+    assert rest["next_cursor"] is None
+    assert len(first["items"]) + len(rest["items"]) == 8
+    assert client.get("/api/radiology/queue?cursor=bogus", headers=headers).status_code == 400
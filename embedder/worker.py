@@ -10,7 +10,7 @@ root = Path(__file__).resolve().parents[1]
 if str(root) not in sys.path:
     sys.path.insert(0, str(root))
 
-from orchestrator.workers.embedder_worker import process_task, run_worker
+from orchestrator.workers.embedder_worker import main
 
 if __name__ == "__main__":
-    run_worker(consumer_id="embedder-1", process_fn=process_task)
+    main()
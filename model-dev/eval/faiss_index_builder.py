@@ -1,41 +1,486 @@
 """
 FAISS index builder for explainability (model-dev).
 
-Purpose: Build index from training/validation embeddings + de-identified metadata;
-save .faiss + _metadata.json for reasoner-server nearest-neighbor lookup.
-Inputs: Embeddings file or dataset path, metadata (id, snippet). Outputs: index.faiss, index_metadata.json.
+Purpose: Build the nearest-neighbor index served by backend evidence_capture.py
+(and agent_system RetrieverAgent) from training/validation embeddings plus
+de-identified metadata, without loading the corpus into RAM.
+
+Inputs:
+  --embeddings  one or more float .npy shards (files, directories or globs), read
+                memory-mapped; rows across shards, in order, are the corpus
+  --metadata    optional JSONL, one de-identified row per embedding row
+                (id, description/snippet, ...); streamed line by line
+Outputs (in --output-dir, default infra/):
+  faiss_index.bin    inner-product index over L2-normalized vectors
+  faiss_meta.bin     compact binary metadata sidecar (see write_meta_sidecar)
+  faiss_meta.jsonl   JSONL metadata for append-log consumers (--no-jsonl to skip)
+
+Index type (--index-type auto picks by corpus size):
+  n < 20k       Flat      exact
+  n < 200k      HNSW32    graph; no training
+  n < 2M        IVF-Flat  ~4*sqrt(n) lists
+  otherwise     IVF-PQ    d/8 sub-quantizers x 8 bits (~d/8 bytes per vector)
+IVF indexes are trained on a uniform sample (--train-size) and vectors are added
+in --chunk-size pieces.
+
+--benchmark reports recall@k and QPS against exact search (streamed brute force
+over the shards) for the built index, or for every type in --compare, so the
+index type can be picked with data.
+
 Usage:
-  python model-dev/eval/faiss_index_builder.py --embeddings embeddings.npy --metadata metadata.jsonl --output model-dev/artifacts/faiss/index
+  python model-dev/eval/faiss_index_builder.py --embeddings data/emb/*.npy --metadata data/emb/meta.jsonl --output-dir infra
+  python model-dev/eval/faiss_index_builder.py --embeddings data/emb/ --benchmark --compare flat,hnsw,ivf_flat,ivf_pq --report faiss_bench.json
 """
 from __future__ import annotations
 
 import argparse
+import glob
 import json
 import logging
+import os
+import struct
+import time
 from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+INDEX_FILE = "faiss_index.bin"
+META_BIN_FILE = "faiss_meta.bin"
+META_JSONL_FILE = "faiss_meta.jsonl"
+
+# Corpus-size thresholds for --index-type auto
+FLAT_MAX = 20_000
+HNSW_MAX = 200_000
+IVF_FLAT_MAX = 2_000_000
+
+# Sidecar layout: MAGIC | uint64 n | int64 offsets[n + 1] | concatenated compact-JSON rows
+META_MAGIC = b"PSMETA01"
+_HEADER = struct.Struct("<8sQ")
+
+
+# -------------------------
+# Shards
+# -------------------------
+class EmbeddingShards:
+    """Row-concatenation of memory-mapped .npy shards (float16/32/64, shape (n, d))."""
+
+    def __init__(self, paths: Sequence[str]):
+        if not paths:
+            raise ValueError("No embedding shards given")
+        self.paths = list(paths)
+        self.shards = [np.load(p, mmap_mode="r") for p in self.paths]
+        dims = {s.shape[1] if s.ndim == 2 else -1 for s in self.shards}
+        if len(dims) != 1 or -1 in dims:
+            raise ValueError(f"Shards must all be 2-D with the same width, got {[s.shape for s in self.shards]}")
+        self.dim = dims.pop()
+        self.offsets = np.cumsum([0] + [s.shape[0] for s in self.shards])
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def chunks(self, chunk_size: int) -> Iterator[Tuple[int, np.ndarray]]:
+        """(global start row, normalized float32 copy) pieces of at most chunk_size rows."""
+        for base, shard in zip(self.offsets, self.shards):
+            for start in range(0, shard.shape[0], chunk_size):
+                yield int(base + start), _normalized(shard[start:start + chunk_size])
+
+    def take(self, rows: np.ndarray) -> np.ndarray:
+        """Normalized float32 rows at sorted global indices (reads only those rows)."""
+        out = np.empty((len(rows), self.dim), dtype=np.float32)
+        shard_ids = np.searchsorted(self.offsets, rows, side="right") - 1
+        for sid in np.unique(shard_ids):
+            sel = shard_ids == sid
+            out[sel] = self.shards[sid][rows[sel] - self.offsets[sid]]
+        return _normalized(out)
+
+    def sample_rows(self, n: int, seed: int = 0) -> np.ndarray:
+        """Sorted global indices of n distinct rows drawn uniformly."""
+        n = min(n, len(self))
+        return np.sort(np.random.default_rng(seed).choice(len(self), size=n, replace=False))
+
+    def sample(self, n: int, seed: int = 0) -> np.ndarray:
+        return self.take(self.sample_rows(n, seed=seed))
+
+
+def _normalized(x: np.ndarray) -> np.ndarray:
+    x = np.array(x, dtype=np.float32, order="C")  # copy: the mmap is read-only
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    np.divide(x, norms, out=x, where=norms > 0)
+    return x
+
+
+def resolve_shards(specs: Sequence[str]) -> List[str]:
+    """Expand files, directories (*.npy inside, sorted) and globs."""
+    paths: List[str] = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            paths.extend(sorted(glob.glob(os.path.join(spec, "*.npy"))))
+        elif any(c in spec for c in "*?["):
+            paths.extend(sorted(glob.glob(spec)))
+        else:
+            paths.append(spec)
+    return paths
+
+
+# -------------------------
+# Index construction
+# -------------------------
+def choose_index_type(n: int) -> str:
+    if n < FLAT_MAX:
+        return "flat"
+    if n < HNSW_MAX:
+        return "hnsw"
+    if n < IVF_FLAT_MAX:
+        return "ivf_flat"
+    return "ivf_pq"
+
+
+def _nlist(n: int) -> int:
+    # ~4*sqrt(n) lists, each with at least 39 training points
+    return max(1, min(int(4 * n ** 0.5), n // 39))
+
+
+def _pq_m(dim: int) -> int:
+    """Sub-quantizer count: ~8 dims each, and it must divide dim."""
+    m = max(1, dim // 8)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def index_spec(index_type: str, n: int, dim: int) -> str:
+    """faiss.index_factory string for an index type and corpus size."""
+    if index_type == "auto":
+        index_type = choose_index_type(n)
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return "HNSW32"
+    if index_type == "ivf_flat":
+        return f"IVF{_nlist(n)},Flat"
+    if index_type == "ivf_pq":
+        return f"IVF{_nlist(n)},PQ{_pq_m(dim)}x8"
+    raise ValueError(f"Unknown index type: {index_type}")
+
+
+def default_train_size(spec: str, n: int) -> int:
+    if not spec.startswith("IVF"):
+        return 0
+    nlist = int(spec[3:spec.index(",")])
+    # 64 points per centroid, and enough for the 256-centroid PQ codebooks
+    return min(n, max(64 * nlist, 256 * 39))
+
+
+def build_index(
+    shards: EmbeddingShards,
+    index_type: str = "auto",
+    chunk_size: int = 65_536,
+    train_size: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    ef_search: int = 64,
+    seed: int = 0,
+):
+    """Train (IVF) on a sample, then add the corpus chunk by chunk. Returns (index, spec)."""
+    import faiss
+
+    n, dim = len(shards), shards.dim
+    spec = index_spec(index_type, n, dim)
+    index = faiss.index_factory(dim, spec, faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        size = train_size or default_train_size(spec, n)
+        t0 = time.perf_counter()
+        index.train(shards.sample(size, seed=seed))
+        logger.info("Trained %s on %d sampled vectors in %.1fs", spec, size, time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    for start, chunk in shards.chunks(chunk_size):
+        index.add(chunk)
+        logger.debug("Added rows %d..%d", start, start + len(chunk))
+    logger.info("Added %d vectors to %s in %.1fs", n, spec, time.perf_counter() - t0)
+    tune_index(index, nprobe=nprobe, ef_search=ef_search)
+    return index, spec
+
+
+def tune_index(index, nprobe: Optional[int] = None, ef_search: int = 64) -> None:
+    import faiss
+
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        ivf.nprobe = nprobe or max(1, min(ivf.nlist, 16))
+    except Exception:
+        pass
+    hnsw = getattr(index, "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search
+
+
+# -------------------------
+# Metadata
+# -------------------------
+def iter_metadata(path: Optional[str], n: int) -> Iterator[Dict[str, Any]]:
+    """Exactly n rows: from the JSONL when given (must have n rows), else {"id": "row-<i>"}."""
+    if not path:
+        for i in range(n):
+            yield {"id": f"row-{i}"}
+        return
+    count = 0
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            if count == n:
+                raise ValueError(f"{path} has more rows than the {n} embeddings")
+            yield json.loads(line)
+            count += 1
+    if count != n:
+        raise ValueError(f"{path} has {count} rows for {n} embeddings")
+
+
+def write_meta_sidecar(rows: Iterable[Dict[str, Any]], n: int, path: str, jsonl_path: Optional[str] = None) -> None:
+    """
+    Stream n metadata rows to the binary sidecar (and optionally JSONL). Row i is the
+    compact JSON at data[offsets[i]:offsets[i + 1]], so readers mmap the file and
+    decode only the rows a search returns.
+    """
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    data_start = _HEADER.size + offsets.nbytes
+    jsonl = open(jsonl_path, "w", encoding="utf-8") if jsonl_path else None
+    try:
+        with open(path, "wb") as fh:
+            fh.write(_HEADER.pack(META_MAGIC, n))
+            fh.seek(data_start)
+            pos = 0
+            for i, row in enumerate(rows):
+                line = json.dumps(row, separators=(",", ":"), ensure_ascii=False)
+                blob = line.encode("utf-8")
+                fh.write(blob)
+                pos += len(blob)
+                offsets[i + 1] = pos
+                if jsonl:
+                    jsonl.write(line + "\n")
+            if jsonl:
+                # Closed before the offset table lands, so the sidecar is never older than the JSONL
+                jsonl.close()
+                jsonl = None
+            fh.seek(_HEADER.size)
+            fh.write(offsets.tobytes())
+    finally:
+        if jsonl:
+            jsonl.close()
+
+
+class MetaSidecar:
+    """Random-access reader for write_meta_sidecar files (mmap; rows decoded on demand)."""
+
+    def __init__(self, path: str):
+        import mmap
+
+        self._fh = open(path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n = _HEADER.unpack_from(self._mm, 0)
+        if magic != META_MAGIC:
+            raise ValueError(f"{path} is not a metadata sidecar")
+        self._offsets = np.frombuffer(self._mm, dtype=np.int64, count=n + 1, offset=_HEADER.size)
+        self._data_start = _HEADER.size + self._offsets.nbytes
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idx: int) -> Dict[str, Any]:
+        start = self._data_start + int(self._offsets[idx])
+        end = self._data_start + int(self._offsets[idx + 1])
+        return json.loads(self._mm[start:end])
+
+
+# -------------------------
+# Benchmark
+# -------------------------
+def exact_search(shards: EmbeddingShards, queries: np.ndarray, k: int, chunk_size: int = 16_384) -> np.ndarray:
+    """Exact top-k ids by inner product, streaming over the shards (running top-k merge)."""
+    import faiss
+
+    nq = len(queries)
+    best_s = np.full((nq, k), -np.inf, dtype=np.float32)
+    best_i = np.full((nq, k), -1, dtype=np.int64)
+    for start, chunk in shards.chunks(chunk_size):
+        kk = min(k, len(chunk))
+        s, i = faiss.knn(queries, chunk, kk, metric=faiss.METRIC_INNER_PRODUCT)
+        cand_s = np.concatenate([best_s, s], axis=1)
+        cand_i = np.concatenate([best_i, i + start], axis=1)
+        top = np.argsort(-cand_s, axis=1, kind="stable")[:, :k]
+        best_s = np.take_along_axis(cand_s, top, axis=1)
+        best_i = np.take_along_axis(cand_i, top, axis=1)
+    return best_i
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray, k: int) -> float:
+    """Mean |found[:k] ∩ truth[:k]| / k over queries."""
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (k * len(truth))
+
+
+def drop_self_matches(ids: np.ndarray, rows: np.ndarray, k: int) -> np.ndarray:
+    """
+    Top-k ids per query without the query's own corpus row. Queries are sampled
+    from the indexed vectors, so every index finds them at distance 0 and
+    recall@1 would read 1.0 regardless of index quality. Search k + 1 and drop it.
+    """
+    keep = ids != rows[:, None]
+    return np.stack([r[m][:k] for r, m in zip(ids, keep)]) if len(ids) else ids[:, :k]
+
+
+def ground_truth(shards: EmbeddingShards, n_queries: int, k: int, seed: int = 0) -> Dict[str, Any]:
+    """Sampled corpus queries, their exact top-k (self-match excluded), and the exact-search QPS."""
+    rows = shards.sample_rows(n_queries, seed=seed + 1)
+    queries = shards.take(rows)
+    k = max(1, min(k, len(shards) - 1))
+    t0 = time.perf_counter()
+    truth = drop_self_matches(exact_search(shards, queries, k + 1), rows, k)
+    seconds = time.perf_counter() - t0
+    return {"queries": queries, "rows": rows, "truth": truth, "k": k,
+            "exact": {"qps": round(len(queries) / seconds, 1), "seconds": round(seconds, 3)}}
+
+
+def measure(index, spec: str, gt: Dict[str, Any]) -> Dict[str, Any]:
+    """recall@1 / recall@k and QPS of one index against ground_truth()."""
+    k, queries, truth = gt["k"], gt["queries"], gt["truth"]
+    t0 = time.perf_counter()
+    _, found = index.search(queries, k + 1)
+    seconds = time.perf_counter() - t0
+    found = drop_self_matches(found, gt["rows"], k)
+    return {
+        "spec": spec,
+        "recall@1": round(recall_at_k(found, truth, 1), 4),
+        f"recall@{k}": round(recall_at_k(found, truth, k), 4),
+        "qps": round(len(queries) / seconds, 1),
+        "index_bytes": _index_bytes(index),
+    }
+
+
+def benchmark(
+    shards: EmbeddingShards,
+    index_types: Sequence[str],
+    k: int = 10,
+    n_queries: int = 1000,
+    chunk_size: int = 65_536,
+    nprobe: Optional[int] = None,
+    ef_search: int = 64,
+    seed: int = 0,
+    built: Optional[Dict[str, Tuple[Any, str]]] = None,
+) -> Dict[str, Any]:
+    """
+    recall@1/k and QPS per index type vs exact search on sampled corpus queries.
+    `built` maps index types to already-built (index, spec) pairs to measure as-is.
+    """
+    gt = ground_truth(shards, n_queries, k, seed=seed)
+    report: Dict[str, Any] = {
+        "n_vectors": len(shards),
+        "dim": shards.dim,
+        "n_queries": len(gt["queries"]),
+        "k": gt["k"],
+        "exact": gt["exact"],
+        "indexes": {},
+    }
+    for index_type in index_types:
+        t0 = time.perf_counter()
+        if built and index_type in built:
+            index, spec = built[index_type]
+        else:
+            index, spec = build_index(shards, index_type, chunk_size=chunk_size, nprobe=nprobe,
+                                      ef_search=ef_search, seed=seed)
+        build_s = time.perf_counter() - t0
+        result = measure(index, spec, gt)
+        if not (built and index_type in built):
+            result["build_seconds"] = round(build_s, 3)
+        report["indexes"][index_type] = result
+        logger.info("%s (%s): %s", index_type, spec, result)
+    return report
+
+
+def _index_bytes(index) -> int:
+    import faiss
+
+    return int(faiss.serialize_index(index).nbytes)
+
+
+# -------------------------
+# CLI
+# -------------------------
+def write_index(index, output_dir: str, metadata: Optional[str], n: int, jsonl: bool = True) -> Dict[str, str]:
+    """Write all outputs under temp names, then swap them in (metadata before the index)."""
+    import faiss
+
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    paths = {
+        "index": str(out / INDEX_FILE),
+        "meta_bin": str(out / META_BIN_FILE),
+    }
+    if jsonl:
+        paths["meta_jsonl"] = str(out / META_JSONL_FILE)
+    write_meta_sidecar(
+        iter_metadata(metadata, n),
+        n,
+        paths["meta_bin"] + ".tmp",
+        jsonl_path=paths["meta_jsonl"] + ".tmp" if jsonl else None,
+    )
+    faiss.write_index(index, paths["index"] + ".tmp")
+    for key in ("meta_jsonl", "meta_bin", "index"):
+        if key in paths:
+            os.replace(paths[key] + ".tmp", paths[key])
+    # Stale append log from agent_system ReferenceIndex would be replayed onto the new index
+    log = out / "faiss_vectors.log"
+    if log.exists():
+        log.unlink()
+    return paths
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the FAISS nearest-neighbor index from .npy embedding shards.")
+    parser.add_argument("--embeddings", nargs="+", required=True, help=".npy shards, directories of shards, or globs")
+    parser.add_argument("--metadata", default=None, help="JSONL, one de-identified row per embedding row")
+    parser.add_argument("--output-dir", default="infra", help="Where faiss_index.bin / faiss_meta.* are written")
+    parser.add_argument("--index-type", default="auto", choices=["auto", "flat", "hnsw", "ivf_flat", "ivf_pq"])
+    parser.add_argument("--chunk-size", type=int, default=65_536, help="Rows added per index.add call")
+    parser.add_argument("--train-size", type=int, default=None, help="Training sample size for IVF types")
+    parser.add_argument("--nprobe", type=int, default=None, help="IVF lists probed at search time (default 16)")
+    parser.add_argument("--ef-search", type=int, default=64, help="HNSW efSearch")
+    parser.add_argument("--no-jsonl", action="store_true", help="Only write the binary metadata sidecar")
+    parser.add_argument("--benchmark", action="store_true", help="Report recall@k and QPS vs exact search")
+    parser.add_argument("--compare", default=None, help="Comma-separated index types to benchmark (implies --benchmark, no index written)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=1000, help="Benchmark queries sampled from the corpus")
+    parser.add_argument("--report", default=None, help="Write the benchmark report JSON here")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    shards = EmbeddingShards(resolve_shards(args.embeddings))
+    logger.info("Corpus: %d vectors x %d dims in %d shard(s)", len(shards), shards.dim, len(shards.paths))
+
+    report = None
+    if args.compare:
+        types = [t.strip() for t in args.compare.split(",") if t.strip()]
+        report = benchmark(shards, types, k=args.k, n_queries=args.queries, chunk_size=args.chunk_size,
+                           nprobe=args.nprobe, ef_search=args.ef_search, seed=args.seed)
+    else:
+        index, spec = build_index(shards, args.index_type, chunk_size=args.chunk_size, train_size=args.train_size,
+                                  nprobe=args.nprobe, ef_search=args.ef_search, seed=args.seed)
+        paths = write_index(index, args.output_dir, args.metadata, len(shards), jsonl=not args.no_jsonl)
+        logger.info("Wrote %s index: %s", spec, paths)
+        if args.benchmark:
+            report = benchmark(shards, [args.index_type], k=args.k, n_queries=args.queries, seed=args.seed,
+                               built={args.index_type: (index, spec)})
 
-def main() -> None:
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--embeddings", required=True, help=".npy or path to embedding matrix")
-    parser.add_argument("--metadata", required=True, help="JSONL: id, snippet (de-identified)")
-    parser.add_argument("--output", required=True, help="Output prefix: {output}.faiss, {output}_metadata.json")
-    args = parser.parse_args()
-    # TODO: Load embeddings (numpy), build faiss.IndexFlatIP or IndexFlatL2, add vectors; load metadata; save
-    items = []
-    with open(args.metadata, "r", encoding="utf-8") as f:
-        for line in f:
-            items.append(json.loads(line.strip()))
-    out_path = Path(args.output)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    meta_path = str(out_path) + "_metadata.json"
-    with open(meta_path, "w", encoding="utf-8") as f:
-        json.dump({"items": items}, f, indent=2)
-    logger.info("Metadata written to %s (FAISS index build stub)", meta_path)
+    if report is not None:
+        text = json.dumps(report, indent=2)
+        print(text)
+        if args.report:
+            Path(args.report).write_text(text + "\n", encoding="utf-8")
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
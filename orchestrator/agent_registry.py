@@ -2,11 +2,19 @@
 Agent capability discovery and health registry.
 Simple in-memory store keyed by agent_id; optional Redis backing.
 Agents register on startup and send heartbeats; TTL drops stale agents.
+
+Lookups go through an inverted capability -> agent index that only holds live
+agents. Staleness is tracked with a min-heap of expiry times (lazy deletion), so
+find() pops due entries instead of comparing every agent's last_seen. Each
+capability has a version counter bumped whenever its live membership or a
+routing-relevant field changes; ranking() caches per-capability candidate
+orderings against those versions.
 """
+import heapq
 import os
 import time
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
 
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
 AGENT_TTL_SECONDS = int(os.environ.get("ORCHESTRATOR_AGENT_TTL", "120"))
@@ -39,10 +47,60 @@ class AgentRegistry:
     def __init__(self, ttl_seconds: int = AGENT_TTL_SECONDS):
         self._agents: dict[str, AgentRecord] = {}
         self._ttl = ttl_seconds
+        self._seq: Dict[str, int] = {}  # registration order, for stable candidate ordering
+        self._by_cap: Dict[str, Set[str]] = {}  # live agents only
+        self._live: Set[str] = set()
+        self._expiry: List[Tuple[float, str]] = []  # (expires_at, agent_id), lazily pruned
+        self._cap_version: Dict[str, int] = {}
+        self._rank_cache: Dict[Hashable, Tuple[Tuple[int, ...], List[Any]]] = {}
+
+    # --- index maintenance ---
+
+    def _bump(self, caps) -> None:
+        for c in caps:
+            self._cap_version[c] = self._cap_version.get(c, 0) + 1
+
+    def _index(self, rec: AgentRecord) -> None:
+        self._live.add(rec.agent_id)
+        for c in rec.capabilities:
+            self._by_cap.setdefault(c, set()).add(rec.agent_id)
+        self._bump(rec.capabilities)
+
+    def _unindex(self, rec: AgentRecord, caps: Optional[List[str]] = None) -> None:
+        caps = rec.capabilities if caps is None else caps
+        self._live.discard(rec.agent_id)
+        for c in caps:
+            members = self._by_cap.get(c)
+            if members is not None:
+                members.discard(rec.agent_id)
+                if not members:
+                    del self._by_cap[c]
+        self._bump(caps)
+
+    def _schedule_expiry(self, rec: AgentRecord) -> None:
+        heapq.heappush(self._expiry, (rec.last_seen + self._ttl, rec.agent_id))
+        if len(self._expiry) > 4 * max(16, len(self._agents)):
+            # Heartbeats leave superseded entries behind; rebuild from current state.
+            self._expiry = [(r.last_seen + self._ttl, a) for a, r in self._agents.items() if a in self._live]
+            heapq.heapify(self._expiry)
+
+    def _expire(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        heap = self._expiry
+        while heap and heap[0][0] < now:
+            _, agent_id = heapq.heappop(heap)
+            rec = self._agents.get(agent_id)
+            # Entry may be superseded by a later heartbeat
+            if rec is not None and agent_id in self._live and rec.last_seen + self._ttl < now:
+                self._unindex(rec)
+
+    # --- public API ---
 
     def register(self, agent_id: str, capabilities: List[str], endpoint: str, **kwargs) -> None:
         rec = self._agents.get(agent_id)
         if rec:
+            if agent_id in self._live:
+                self._unindex(rec)
             rec.capabilities = capabilities
             rec.endpoint = endpoint
             rec.last_seen = time.time()
@@ -50,40 +108,62 @@ class AgentRegistry:
                 if hasattr(rec, k):
                     setattr(rec, k, v)
         else:
-            self._agents[agent_id] = AgentRecord(
+            kwargs.setdefault("last_seen", time.time())
+            rec = self._agents[agent_id] = AgentRecord(
                 agent_id=agent_id,
                 capabilities=capabilities,
                 endpoint=endpoint,
                 **kwargs,
             )
+            self._seq[agent_id] = len(self._seq)
+        if time.time() - rec.last_seen <= self._ttl:
+            self._index(rec)
+            self._schedule_expiry(rec)
 
     def heartbeat(self, agent_id: str, health_status: str = "ok", latency_ms: Optional[float] = None, load_score: float = 0.0) -> None:
         rec = self._agents.get(agent_id)
         if rec:
+            changed = rec.health_status != health_status or rec.latency_ms != latency_ms
             rec.last_seen = time.time()
             rec.health_status = health_status
             rec.latency_ms = latency_ms
             rec.load_score = load_score
+            if agent_id not in self._live:
+                self._index(rec)
+            elif changed:
+                self._bump(rec.capabilities)
+            self._schedule_expiry(rec)
 
     def find(self, capabilities: List[str]) -> List[AgentRecord]:
         """Return agents that advertise any of the given capabilities and are not stale."""
-        now = time.time()
-        out = []
-        for rec in self._agents.values():
-            if now - rec.last_seen > self._ttl:
-                continue
-            if not rec.capabilities:
-                continue
-            if any(c in rec.capabilities for c in capabilities):
-                out.append(rec)
-        return out
+        self._expire()
+        ids: Set[str] = set()
+        for c in capabilities:
+            ids.update(self._by_cap.get(c, ()))
+        return [self._agents[a] for a in sorted(ids, key=self._seq.__getitem__)]
+
+    def version(self, capabilities: List[str]) -> Tuple[int, ...]:
+        """Per-capability change counters; equal versions mean find() results are unchanged."""
+        return tuple(self._cap_version.get(c, 0) for c in capabilities)
+
+    def ranking(self, key: Hashable, capabilities: List[str], compute: Callable[[List[AgentRecord]], List[Any]]) -> List[Any]:
+        """
+        Cached compute(find(capabilities)) for this key; recomputed only when a
+        capability's membership or an agent's health/latency changed.
+        """
+        self._expire()
+        version = self.version(capabilities)
+        hit = self._rank_cache.get(key)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+        ranked = compute(self.find(capabilities))
+        self._rank_cache[key] = (version, ranked)
+        return ranked
 
     def get(self, agent_id: str) -> Optional[AgentRecord]:
-        rec = self._agents.get(agent_id)
-        if rec and (time.time() - rec.last_seen) <= self._ttl:
-            return rec
-        return None
+        self._expire()
+        return self._agents.get(agent_id) if agent_id in self._live else None
 
     def list_all(self) -> List[AgentRecord]:
-        now = time.time()
-        return [r for r in self._agents.values() if now - r.last_seen <= self._ttl]
+        self._expire()
+        return [r for a, r in self._agents.items() if a in self._live]
@@ -1,59 +1,351 @@
 """
 Temporal Agent: fetches past embeddings for case_id, computes cosine distance vs previous visits.
 Outputs: stability label (unknown|stable|minor_change|significant_change).
+
+History lives in a preallocated float32 ring buffer per case (rows are stored
+L2-normalised, so cosine similarity against every stored visit is one matvec).
+Backends:
+  memory — process-local (default)
+  mmap   — one memory-mapped file per case under TEMPORAL_STORE_DIR (survives restart)
+  redis  — one hash per case in REDIS_URL (shared across orchestrator replicas)
 """
+import hashlib
 import logging
-from typing import Dict, List, Optional
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
 
 logger = logging.getLogger("orchestrator.temporal")
 
-# In-memory store for demo; replace with DB in production
-_embedding_store: Dict[str, List[List[float]]] = {}
+TEMPORAL_STORE_BACKEND = os.getenv("TEMPORAL_STORE_BACKEND", "memory").lower()
+TEMPORAL_STORE_DIR = os.getenv("TEMPORAL_STORE_DIR", "data/temporal_store")
+TEMPORAL_HISTORY = int(os.getenv("TEMPORAL_HISTORY", "10"))
+# mmap backend: case files kept mapped at once (each mapping holds a file descriptor)
+TEMPORAL_MMAP_OPEN = int(os.getenv("TEMPORAL_MMAP_OPEN", "256"))
+TEMPORAL_REDIS_PREFIX = os.getenv("TEMPORAL_REDIS_PREFIX", "temporal:")
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+
+STABLE_MAX = 0.1
+MINOR_CHANGE_MAX = 0.3
+
+
+@dataclass
+class TemporalScore:
+    stability: str
+    cosine_distance: Optional[float]  # mean distance to all stored visits
+    last_distance: Optional[float]  # distance to the most recent visit
+    max_distance: Optional[float]
+    history_count: int
+
+    def as_tuple(self) -> tuple:
+        return self.stability, self.cosine_distance, self.history_count
+
+
+_UNKNOWN = TemporalScore("unknown", None, None, None, 0)
+
+
+def _label(dist: float) -> str:
+    if dist < STABLE_MAX:
+        return "stable"
+    if dist < MINOR_CHANGE_MAX:
+        return "minor_change"
+    return "significant_change"
 
 
-def _cosine_distance(a: List[float], b: List[float]) -> float:
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Row-wise L2 normalisation; zero vectors stay zero (distance 1.0 to anything)."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 1e-9)
+
+
+def _cosine_distance(a: Sequence[float], b: Sequence[float]) -> float:
     """Cosine distance = 1 - cosine_similarity."""
-    if not a or not b or len(a) != len(b):
-        return 1.0
-    dot = sum(x * y for x, y in zip(a, b))
-    norm_a = sum(x * x for x in a) ** 0.5
-    norm_b = sum(x * x for x in b) ** 0.5
-    if norm_a < 1e-9 or norm_b < 1e-9:
+    if a is None or b is None or len(a) == 0 or len(a) != len(b):
         return 1.0
-    sim = dot / (norm_a * norm_b)
-    return max(0.0, 1.0 - sim)
+    va, vb = _normalize(np.asarray([a, b], dtype=np.float32))
+    return max(0.0, 1.0 - float(va @ vb))
+
+
+class _Ring:
+    """Fixed-capacity ring of normalised embeddings. head = next slot to write."""
+
+    __slots__ = ("buf", "count", "head", "mm")
+
+    def __init__(self, buf: np.ndarray, count: int = 0, head: int = 0, mm: Optional[np.memmap] = None):
+        self.buf = buf
+        self.count = count
+        self.head = head
+        self.mm = mm
+
+    @property
+    def dim(self) -> int:
+        return self.buf.shape[1]
+
+    def push(self, row: np.ndarray) -> None:
+        capacity = self.buf.shape[0]
+        self.buf[self.head] = row
+        self.head = (self.head + 1) % capacity
+        self.count = min(self.count + 1, capacity)
+
+    def rows(self) -> np.ndarray:
+        return self.buf[: self.count]
+
+    def last_index(self) -> int:
+        return (self.head - 1) % self.buf.shape[0]
+
+
+class _MemoryBackend:
+    def __init__(self):
+        self._rings: Dict[str, _Ring] = {}
+
+    def append(self, case_id: str, row: np.ndarray, capacity: int) -> None:
+        """Push one normalised row onto the case's ring (a new ring if the dim changed)."""
+        ring = self.load(case_id)
+        if ring is None or ring.dim != row.shape[0]:
+            if ring is not None:
+                logger.info("Embedding dim changed for case %s (%d -> %d); resetting history", case_id, ring.dim, row.shape[0])
+            ring = self.create(case_id, capacity, row.shape[0])
+        ring.push(row)
+        self.save(case_id, ring)
+
+    def load(self, case_id: str) -> Optional[_Ring]:
+        return self._rings.get(case_id)
+
+    def create(self, case_id: str, capacity: int, dim: int) -> _Ring:
+        ring = _Ring(np.zeros((capacity, dim), dtype=np.float32))
+        self._rings[case_id] = ring
+        return ring
+
+    def save(self, case_id: str, ring: _Ring) -> None:
+        pass
+
+    def clear(self) -> None:
+        self._rings.clear()
+
+
+class _MmapBackend(_MemoryBackend):
+    """
+    One raw float32 file per case of shape (capacity + 1, dim). Row 0 is the
+    header: [count, head, dim, 0, ...]; rows 1.. are the ring. At most
+    `max_open` cases stay mapped (LRU); older ones are reopened from disk.
+    """
+
+    def __init__(self, directory: str, max_open: int = TEMPORAL_MMAP_OPEN):
+        super().__init__()
+        self._rings: "OrderedDict[str, _Ring]" = OrderedDict()
+        self.directory = directory
+        self.max_open = max(1, max_open)
+        os.makedirs(directory, exist_ok=True)
+
+    def _cache(self, case_id: str, ring: _Ring) -> None:
+        old = self._rings.pop(case_id, None)
+        if old is not None and old is not ring:
+            old.mm.flush()
+        self._rings[case_id] = ring
+        while len(self._rings) > self.max_open:
+            _, evicted = self._rings.popitem(last=False)
+            evicted.mm.flush()
+            # Dropping the last reference unmaps the file and closes its fd. Not
+            # closed explicitly: score_batch may still hold views of its rows.
+
+    def _path(self, case_id: str) -> str:
+        digest = hashlib.sha256(case_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.f32")
+
+    def _open(self, path: str, mode: str, capacity: int, dim: int) -> _Ring:
+        mm = np.memmap(path, dtype=np.float32, mode=mode, shape=(capacity + 1, dim))
+        return _Ring(mm[1:], int(mm[0, 0]), int(mm[0, 1]), mm)
+
+    def load(self, case_id: str) -> Optional[_Ring]:
+        ring = self._rings.get(case_id)
+        if ring is not None:
+            self._rings.move_to_end(case_id)
+            return ring
+        path = self._path(case_id)
+        if not os.path.exists(path):
+            return None
+        header = np.fromfile(path, dtype=np.float32, count=3)
+        dim = int(header[2]) if header.size == 3 else 0
+        if dim < 3:
+            return None
+        capacity = os.path.getsize(path) // (4 * dim) - 1
+        ring = self._open(path, "r+", capacity, dim)
+        self._cache(case_id, ring)
+        return ring
+
+    def create(self, case_id: str, capacity: int, dim: int) -> _Ring:
+        if dim < 3:
+            raise ValueError("mmap temporal store needs embeddings with dim >= 3")
+        ring = self._open(self._path(case_id), "w+", capacity, dim)
+        ring.mm[0, 2] = dim
+        self._cache(case_id, ring)
+        return ring
+
+    def save(self, case_id: str, ring: _Ring) -> None:
+        ring.mm[0, 0] = ring.count
+        ring.mm[0, 1] = ring.head
+        ring.mm.flush()
+
+    def clear(self) -> None:
+        self._rings.clear()
+        for name in os.listdir(self.directory):
+            if name.endswith(".f32"):
+                os.remove(os.path.join(self.directory, name))
+
+
+class _RedisBackend:
+    """
+    One hash per case: buf (raw float32 bytes), count, head, dim. Rings are read
+    from Redis on every access so replicas see each other's writes; appends are
+    WATCH/MULTI transactions, retried when another replica wrote the case first.
+    """
+
+    def __init__(self, client, prefix: str = TEMPORAL_REDIS_PREFIX):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, case_id: str) -> str:
+        return f"{self.prefix}{case_id}"
+
+    def append(self, case_id: str, row: np.ndarray, capacity: int) -> None:
+        key = self._key(case_id)
+
+        def push(pipe) -> None:
+            ring = self._decode(pipe.hgetall(key))  # immediate: the key is WATCHed
+            if ring is None or ring.dim != row.shape[0]:
+                ring = self.create(case_id, capacity, row.shape[0])
+            ring.push(row)
+            pipe.multi()
+            pipe.hset(key, mapping=self._encode(ring))
+
+        self.client.transaction(push, key)
+
+    def load(self, case_id: str) -> Optional[_Ring]:
+        return self._decode(self.client.hgetall(self._key(case_id)))
+
+    @staticmethod
+    def _encode(ring: _Ring) -> dict:
+        return {"buf": ring.buf.tobytes(), "count": ring.count, "head": ring.head, "dim": ring.dim}
+
+    @staticmethod
+    def _decode(data) -> Optional[_Ring]:
+        if not data:
+            return None
+        data = {k.decode() if isinstance(k, bytes) else k: v for k, v in data.items()}
+        dim = int(data["dim"])
+        buf = np.frombuffer(data["buf"], dtype=np.float32).reshape(-1, dim).copy()
+        return _Ring(buf, int(data["count"]), int(data["head"]))
+
+    def create(self, case_id: str, capacity: int, dim: int) -> _Ring:
+        return _Ring(np.zeros((capacity, dim), dtype=np.float32))
+
+    def save(self, case_id: str, ring: _Ring) -> None:
+        self.client.hset(self._key(case_id), mapping=self._encode(ring))
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(match=f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+class TemporalStore:
+    """Per-case embedding history with vectorised stability scoring."""
+
+    def __init__(self, backend=None, capacity: int = TEMPORAL_HISTORY):
+        self.backend = backend or _MemoryBackend()
+        self.capacity = max(1, capacity)
+
+    def add(self, case_id: str, embedding: Sequence[float]) -> None:
+        row = _normalize(np.asarray(embedding, dtype=np.float32).reshape(-1))
+        self.backend.append(case_id, row, self.capacity)
+
+    def history_count(self, case_id: str) -> int:
+        ring = self.backend.load(case_id)
+        return ring.count if ring is not None else 0
+
+    def score(self, case_id: str, embedding: Optional[Sequence[float]]) -> TemporalScore:
+        if embedding is None or len(embedding) == 0:
+            return _UNKNOWN
+        return self.score_batch([case_id], np.asarray([embedding], dtype=np.float32))[0]
+
+    def score_batch(self, case_ids: Sequence[str], embeddings) -> List[TemporalScore]:
+        """
+        Score many (case_id, embedding) pairs at once. Histories are stacked into
+        one matrix so all similarities come from a single einsum; per-case
+        mean/max are segment reductions over that result.
+        """
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(case_ids), -1))
+        results: List[TemporalScore] = [_UNKNOWN] * len(case_ids)
+        blocks, owners, lasts, counts = [], [], [], []
+        for i, case_id in enumerate(case_ids):
+            ring = self.backend.load(case_id)
+            if ring is None or ring.count == 0 or ring.dim != queries.shape[1]:
+                continue
+            blocks.append(ring.rows())
+            owners.append(i)
+            lasts.append(ring.last_index())
+            counts.append(ring.count)
+        if not blocks:
+            return results
+
+        history = np.concatenate(blocks)
+        counts_arr = np.asarray(counts)
+        segment = np.repeat(np.arange(len(owners)), counts_arr)
+        dist = np.maximum(0.0, 1.0 - np.einsum("ij,ij->i", history, queries[owners][segment]))
+        starts = np.concatenate(([0], np.cumsum(counts_arr)[:-1]))
+        mean = np.add.reduceat(dist, starts) / counts_arr
+        worst = np.maximum.reduceat(dist, starts)
+        last = dist[starts + np.asarray(lasts)]
+
+        for j, i in enumerate(owners):
+            d = float(mean[j])
+            results[i] = TemporalScore(_label(d), d, float(last[j]), float(worst[j]), int(counts_arr[j]))
+        return results
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+def _build_backend(kind: str):
+    if kind == "mmap":
+        return _MmapBackend(TEMPORAL_STORE_DIR)
+    if kind == "redis":
+        try:
+            import redis
+            client = redis.Redis.from_url(REDIS_URL, decode_responses=False)
+            client.ping()
+            return _RedisBackend(client)
+        except Exception as e:
+            logger.warning("Redis temporal store unavailable (%s); using in-memory store", e)
+    return _MemoryBackend()
+
+
+_store: Optional[TemporalStore] = None
+
+
+def get_temporal_store() -> TemporalStore:
+    global _store
+    if _store is None:
+        _store = TemporalStore(_build_backend(TEMPORAL_STORE_BACKEND))
+    return _store
 
 
 def run_temporal(case_id: str, current_embedding: Optional[List[float]]) -> tuple:
     """
     Compute temporal stability. Returns (stability, cosine_distance, history_count).
     stability: "unknown" | "stable" | "minor_change" | "significant_change"
+    cosine_distance is the mean distance to all stored visits for the case.
     """
-    if not current_embedding:
-        return "unknown", None, 0
-
-    history = _embedding_store.get(case_id, [])
-    if not history:
-        return "unknown", None, 0
-
-    prev = history[-1]
-    dist = _cosine_distance(current_embedding, prev)
+    return get_temporal_store().score(case_id, current_embedding).as_tuple()
 
-    if dist < 0.1:
-        stability = "stable"
-    elif dist < 0.3:
-        stability = "minor_change"
-    else:
-        stability = "significant_change"
 
-    return stability, dist, len(history)
+def score_temporal_batch(case_ids: Sequence[str], embeddings) -> List[TemporalScore]:
+    """Bulk variant of run_temporal for many cases at once."""
+    return get_temporal_store().score_batch(case_ids, embeddings)
 
 
 def store_embedding(case_id: str, embedding: List[float]) -> None:
-    """Store embedding for future temporal comparison."""
-    if case_id not in _embedding_store:
-        _embedding_store[case_id] = []
-    _embedding_store[case_id].append(embedding)
-    # Keep last 10
-    if len(_embedding_store[case_id]) > 10:
-        _embedding_store[case_id] = _embedding_store[case_id][-10:]
+    """Store embedding for future temporal comparison (last TEMPORAL_HISTORY kept)."""
+    get_temporal_store().add(case_id, embedding)
@@ -18,7 +18,14 @@ from orchestrator.agent_base import HTTPAgent
 from orchestrator.db.audit import AuditStore
 from orchestrator.db.idempotency import IdempotencyStore
 from orchestrator.policies import TASK_TYPE_CAPABILITY
-from orchestrator.queue import enqueue_task, stream_length, PRIORITY_STREAM_MAP
+from orchestrator.queue import (
+    PRIORITY_STREAM_MAP,
+    aclose_async_client,
+    enqueue_task_async,
+    queue_depths,
+    start_depth_sampler,
+    stop_depth_sampler,
+)
 from orchestrator.router import Router
 from orchestrator.router_simple import route as route_simple
 
@@ -142,7 +149,7 @@ async def route_task(req: RouteTaskReq, request: Request):
 
     # Async: enqueue
     queue_name = decision.get("queue") or PRIORITY_STREAM_MAP.get(req.priority, "tasks:normal")
-    enqueue_task(task, queue_name=queue_name)
+    await enqueue_task_async(task, queue_name=queue_name)
     try:
         orchestrator_tasks_queued_total.labels(queue=queue_name).inc()
     except NameError:
@@ -231,13 +238,14 @@ try:
     orchestrator_sync_attempts_total = Counter("orchestrator_sync_attempts_total", "Sync attempts", ["outcome"])
     pedi_orch_queue_length = Gauge("pedi_orch_queue_length", "RQ job queue length (pedi-screen)")
 
+    def _set_queue_sizes(depths: Dict[str, int]) -> None:
+        for stream, depth in depths.items():
+            orchestrator_queue_size.labels(queue=stream).set(depth)
+
     @app.get("/metrics")
     def metrics():
-        for name, stream in PRIORITY_STREAM_MAP.items():
-            try:
-                orchestrator_queue_size.labels(queue=stream).set(stream_length(stream))
-            except Exception:
-                pass
+        # Queue sizes come from the background sampler (no XLEN per scrape)
+        _set_queue_sizes(queue_depths())
         try:
             from orchestrator.queue_rq import queue
             pedi_orch_queue_length.set(len(queue))
@@ -251,6 +259,7 @@ except ImportError:
 @app.on_event("startup")
 def _startup():
     _init_otel_and_logging()
+    start_depth_sampler()
     try:
         from orchestrator.models import init_db
         init_db()
@@ -258,6 +267,12 @@ def _startup():
     except ImportError:
         pass
 
+@app.on_event("shutdown")
+async def _shutdown():
+    stop_depth_sampler()
+    await aclose_async_client()
+
+
 # ----- RQ-based orchestrator API (submit / status / jobs) -----
 try:
     from orchestrator.api_router import router as api_router
@@ -71,10 +71,11 @@ async def process_case(req: ProcessCaseRequest):
         import struct
         b = struct.pack(f"{len(embedding)}f", *embedding)
         emb_b64 = base64.b64encode(b).decode("ascii")
-        store_embedding(req.case_id, embedding)
 
-    # 3. Temporal Agent
+    # 3. Temporal Agent (score against prior visits, then record this one)
     stability, cos_dist, hist_count = run_temporal(req.case_id, embedding)
+    if embedding:
+        store_embedding(req.case_id, embedding)
     temporal = TemporalAnalysis(
         stability=stability,
         cosine_distance=cos_dist,
@@ -152,9 +153,10 @@ async def process_case_with_memory(req: ProcessCaseRequest):
         import struct
         b = struct.pack(f"{len(embedding)}f", *embedding)
         emb_b64 = base64.b64encode(b).decode("ascii")
-        store_embedding(req.case_id, embedding)
 
     stability, cos_dist, hist_count = run_temporal(req.case_id, embedding)
+    if embedding:
+        store_embedding(req.case_id, embedding)
     temporal = TemporalAnalysis(
         stability=stability,
         cosine_distance=cos_dist,
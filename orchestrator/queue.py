@@ -1,13 +1,29 @@
 """
 Queue layer: Redis Streams for priority task queues.
 Streams: tasks:urgent, tasks:high, tasks:normal, tasks:low.
+
+All callers share one connection pool per process (and one async pool per event
+loop), so enqueueing does not open a new TCP connection per task. Queue depth
+for metrics is sampled by a background thread (start_depth_sampler) instead of
+an XLEN per scrape/request.
 """
+import asyncio
 import json
+import logging
 import os
-from typing import Any, Dict, Optional
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    import redis
+    import redis.asyncio
+
+logger = logging.getLogger("orchestrator.queue")
 
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
 STREAM_MAXLEN = int(os.environ.get("ORCHESTRATOR_STREAM_MAXLEN", "10000"))
+REDIS_MAX_CONNECTIONS = int(os.environ.get("ORCHESTRATOR_REDIS_MAX_CONNECTIONS", "50"))
+QUEUE_DEPTH_SAMPLE_S = float(os.environ.get("ORCHESTRATOR_QUEUE_DEPTH_SAMPLE_S", "5"))
 
 PRIORITY_STREAM_MAP = {
     "urgent": "tasks:urgent",
@@ -18,10 +34,49 @@ PRIORITY_STREAM_MAP = {
 
 DLQ_STREAM = "tasks:dlq"
 
+_pool = None
+_pool_lock = threading.Lock()
+_async_clients: Dict[int, tuple] = {}  # id(loop) -> (loop, client)
+
 
 def _redis() -> "redis.Redis":
+    """Client on the process-wide connection pool (cheap to create)."""
+    global _pool
     import redis
-    return redis.Redis.from_url(REDIS_URL, decode_responses=False)
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = redis.ConnectionPool.from_url(REDIS_URL, max_connections=REDIS_MAX_CONNECTIONS)
+    return redis.Redis(connection_pool=_pool)
+
+
+def _aredis() -> "redis.asyncio.Redis":
+    """Async client for the running event loop; pools cannot be shared across loops."""
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(id(loop))
+    if entry is None or entry[0] is not loop:
+        import redis.asyncio as aredis
+        for key, (other, _) in list(_async_clients.items()):
+            if other.is_closed():
+                del _async_clients[key]
+        client = aredis.Redis.from_url(REDIS_URL, decode_responses=False, max_connections=REDIS_MAX_CONNECTIONS)
+        entry = _async_clients[id(loop)] = (loop, client)
+    return entry[1]
+
+
+async def aclose_async_client() -> None:
+    """Close this loop's async client (call on app shutdown)."""
+    entry = _async_clients.pop(id(asyncio.get_running_loop()), None)
+    if entry is not None:
+        await entry[1].aclose()
+
+
+def _decode(msg_id) -> str:
+    return msg_id.decode() if isinstance(msg_id, bytes) else msg_id
+
+
+def _stream_for(task: Dict[str, Any], queue_name: Optional[str]) -> str:
+    return queue_name or PRIORITY_STREAM_MAP.get(task.get("priority", "normal"), "tasks:normal")
 
 
 def enqueue_task(task: Dict[str, Any], queue_name: Optional[str] = None) -> str:
@@ -30,27 +85,145 @@ def enqueue_task(task: Dict[str, Any], queue_name: Optional[str] = None) -> str:
     Returns message id.
     """
     r = _redis()
-    stream = queue_name or PRIORITY_STREAM_MAP.get(task.get("priority", "normal"), "tasks:normal")
     msg_id = r.xadd(
-        stream,
+        _stream_for(task, queue_name),
         {"data": json.dumps(task)},
         maxlen=STREAM_MAXLEN,
         approximate=True,
     )
-    return msg_id.decode() if isinstance(msg_id, bytes) else msg_id
+    return _decode(msg_id)
+
+
+def enqueue_tasks(tasks: Iterable[Dict[str, Any]], queue_name: Optional[str] = None) -> List[str]:
+    """Bulk enqueue: all XADDs go out in one pipelined round-trip. Returns message ids in order."""
+    tasks = list(tasks)
+    if not tasks:
+        return []
+    pipe = _redis().pipeline(transaction=False)
+    for task in tasks:
+        pipe.xadd(_stream_for(task, queue_name), {"data": json.dumps(task)}, maxlen=STREAM_MAXLEN, approximate=True)
+    return [_decode(m) for m in pipe.execute()]
+
+
+async def enqueue_task_async(task: Dict[str, Any], queue_name: Optional[str] = None) -> str:
+    """enqueue_task for async handlers (does not block the event loop)."""
+    msg_id = await _aredis().xadd(
+        _stream_for(task, queue_name),
+        {"data": json.dumps(task)},
+        maxlen=STREAM_MAXLEN,
+        approximate=True,
+    )
+    return _decode(msg_id)
+
+
+async def enqueue_tasks_async(tasks: Iterable[Dict[str, Any]], queue_name: Optional[str] = None) -> List[str]:
+    tasks = list(tasks)
+    if not tasks:
+        return []
+    pipe = _aredis().pipeline(transaction=False)
+    for task in tasks:
+        pipe.xadd(_stream_for(task, queue_name), {"data": json.dumps(task)}, maxlen=STREAM_MAXLEN, approximate=True)
+    return [_decode(m) for m in await pipe.execute()]
 
 
 def stream_length(stream: str) -> int:
-    """Return current length of stream (for orchestrator_queue_size metric)."""
+    """Return current length of stream. Prefer queue_depths() for metrics."""
     r = _redis()
     return r.xlen(stream)
 
 
-def enqueue_dlq(task: Dict[str, Any], reason: str = "max_retries") -> str:
-    """Move task to dead-letter stream."""
+def stream_lengths(streams: Iterable[str]) -> Dict[str, int]:
+    """XLEN for several streams in one pipelined round-trip."""
+    streams = list(streams)
+    pipe = _redis().pipeline(transaction=False)
+    for stream in streams:
+        pipe.xlen(stream)
+    return dict(zip(streams, pipe.execute()))
+
+
+class QueueDepthSampler:
+    """Daemon thread that refreshes stream depths every interval_s."""
+
+    def __init__(
+        self,
+        streams: Iterable[str],
+        interval_s: float = QUEUE_DEPTH_SAMPLE_S,
+        on_sample: Optional[Callable[[Dict[str, int]], None]] = None,
+        sample_fn: Callable[[Iterable[str]], Dict[str, int]] = stream_lengths,
+    ):
+        self.streams = list(streams)
+        self.interval_s = interval_s
+        self.on_sample = on_sample
+        self.sample_fn = sample_fn
+        self.depths: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample_once(self) -> Dict[str, int]:
+        try:
+            self.depths = dict(self.sample_fn(self.streams))
+        except Exception as e:
+            logger.debug("queue depth sample failed: %s", e)
+            return self.depths
+        if self.on_sample is not None:
+            self.on_sample(self.depths)
+        return self.depths
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self.sample_once()
+            self._stop.wait(self.interval_s)
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="queue-depth-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_s + 1)
+
+
+_sampler: Optional[QueueDepthSampler] = None
+
+
+def start_depth_sampler(
+    on_sample: Optional[Callable[[Dict[str, int]], None]] = None,
+    streams: Optional[Iterable[str]] = None,
+    interval_s: float = QUEUE_DEPTH_SAMPLE_S,
+) -> QueueDepthSampler:
+    global _sampler
+    if _sampler is None:
+        streams = list(streams or PRIORITY_STREAM_MAP.values()) + [DLQ_STREAM]
+        _sampler = QueueDepthSampler(streams, interval_s=interval_s, on_sample=on_sample)
+    _sampler.start()
+    return _sampler
+
+
+def stop_depth_sampler() -> None:
+    global _sampler
+    if _sampler is not None:
+        _sampler.stop()
+        _sampler = None
+
+
+def queue_depths() -> Dict[str, int]:
+    """Last sampled depths (empty until the sampler has run)."""
+    return dict(_sampler.depths) if _sampler is not None else {}
+
+
+def dlq_fields(task: Dict[str, Any], reason: str = "max_retries") -> Dict[str, str]:
+    """Stream fields for a dead-lettered task (dlq_reason recorded in meta)."""
     task = dict(task)
-    task["meta"] = task.get("meta") or {}
+    task["meta"] = dict(task.get("meta") or {})
     task["meta"]["dlq_reason"] = reason
+    return {"data": json.dumps(task)}
+
+
+def enqueue_dlq(task: Dict[str, Any], reason: str = "max_retries") -> str:
+    """Move task to dead-letter stream."""
     r = _redis()
-    msg_id = r.xadd(DLQ_STREAM, {"data": json.dumps(task)}, maxlen=STREAM_MAXLEN, approximate=True)
-    return msg_id.decode() if isinstance(msg_id, bytes) else msg_id
+    msg_id = r.xadd(DLQ_STREAM, dlq_fields(task, reason), maxlen=STREAM_MAXLEN, approximate=True)
+    return _decode(msg_id)
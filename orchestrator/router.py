@@ -10,7 +10,7 @@ from typing import Any, Dict, List, Optional, Tuple
 import httpx
 
 from orchestrator.agent_registry import AgentRecord, AgentRegistry
-from orchestrator.policies import capability_for, filter_by_consent, prefer_edge
+from orchestrator.policies import allows_raw_media, capability_for, filter_by_consent, prefer_edge
 
 SYNC_TIMEOUT = float(os.environ.get("ORCHESTRATOR_SYNC_TIMEOUT", "0.8"))
 ROUTER_TOP_N = int(os.environ.get("ORCHESTRATOR_ROUTER_TOP_N", "3"))
@@ -66,17 +66,23 @@ def route_candidates(
         hints = capability_for(task_type)
     urgency = request.get("priority", "normal")
     consent = request.get("payload", {}).get("consent_given", False) or (request.get("consent") or {}).get("consent_given", False)
-    candidates = registry.find(hints if hints else [task_type or "analyze_light"])
-    candidates = filter_by_consent(candidates, request.get("consent") or {"consent_given": consent})
-    scored: List[Tuple[float, AgentRecord]] = []
-    for c in candidates:
-        if not c.health_ok:
-            continue
-        ad = _agent_to_scoring_dict(c)
-        s = score_agent(ad, hints or ad["capabilities"], urgency, consent)
-        scored.append((s, c))
-    scored.sort(reverse=True, key=lambda x: x[0])
-    return [a for _, a in scored[:top_n]]
+    consent_filter = request.get("consent") or {"consent_given": consent}
+    caps = list(hints) if hints else [task_type or "analyze_light"]
+
+    def rank(candidates: List[AgentRecord]) -> List[AgentRecord]:
+        scored: List[Tuple[float, AgentRecord]] = []
+        for c in filter_by_consent(candidates, consent_filter):
+            if c.health_status != "ok":  # staleness is already handled by the registry index
+                continue
+            ad = _agent_to_scoring_dict(c)
+            s = score_agent(ad, hints or ad["capabilities"], urgency, consent)
+            scored.append((s, c))
+        scored.sort(reverse=True, key=lambda x: x[0])
+        return [a for _, a in scored]
+
+    # score_agent only depends on urgency via the high/urgent triage boost
+    key = (tuple(caps), bool(hints), urgency in ("high", "urgent"), bool(consent), allows_raw_media(consent_filter))
+    return registry.ranking(key, caps, rank)[:top_n]
 
 
 class Router:
@@ -0,0 +1,92 @@
+"""
+Microbenchmark: route_candidates cost vs registry size.
+Compares a warm ranking cache, a cold cache (heartbeat change before every
+route) and the legacy linear scan + per-request scoring.
+Run from repo root: python orchestrator/scripts/bench_routing.py --sizes 10,100,1000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(root))
+
+from orchestrator.agent_registry import AgentRegistry  # noqa: E402
+from orchestrator.policies import filter_by_consent  # noqa: E402
+from orchestrator.router import _agent_to_scoring_dict, route_candidates, score_agent  # noqa: E402
+
+CAPS = ["embed", "vision", "triage", "analyze_light", "analyze_monitor", "analyze_heavy", "analyze_refer", "audit", "indexing"]
+
+
+def build_registry(n: int, seed: int = 0) -> AgentRegistry:
+    rng = random.Random(seed)
+    reg = AgentRegistry(ttl_seconds=3600)
+    for i in range(n):
+        reg.register(
+            f"agent-{i}",
+            rng.sample(CAPS, k=rng.randint(1, 3)),
+            f"http://agent-{i}:8000",
+            location=rng.choice(["edge", "cloud"]),
+            latency_ms=rng.uniform(50, 3000),
+            gpu=rng.choice([0, 0, 1]),
+        )
+    return reg
+
+
+def legacy_route(request, reg: AgentRegistry, top_n: int = 3):
+    """Pre-index behaviour: scan every agent, then score and sort all candidates."""
+    hints = request["capability"]
+    now = time.time()
+    candidates = [
+        r for r in reg._agents.values()
+        if now - r.last_seen <= reg._ttl and r.capabilities and any(c in r.capabilities for c in hints)
+    ]
+    candidates = filter_by_consent(candidates, {"consent_given": True})
+    scored = []
+    for c in candidates:
+        if not c.health_ok:
+            continue
+        ad = _agent_to_scoring_dict(c)
+        scored.append((score_agent(ad, hints, request["priority"], True), c))
+    scored.sort(reverse=True, key=lambda x: x[0])
+    return [a for _, a in scored[:top_n]]
+
+
+def _time_us(fn, iterations: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - t0) / iterations * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,500,1000,5000")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    request = {"capability": ["analyze_light", "analyze_monitor"], "priority": "normal", "payload": {"consent_given": True}}
+    print(f"{'agents':>7} {'cached_us':>10} {'invalidated_us':>15} {'legacy_us':>10}")
+    for n in [int(x) for x in args.sizes.split(",") if x]:
+        reg = build_registry(n)
+        route_candidates(request, reg)
+        cached = _time_us(lambda reg=reg: route_candidates(request, reg), args.iterations)
+
+        flip = [0]
+        member = reg.find(request["capability"])[0].agent_id  # heartbeat must touch a routed capability
+
+        def invalidated(flip=flip, member=member, reg=reg):
+            flip[0] ^= 1
+            reg.heartbeat(member, latency_ms=100.0 + flip[0])
+            return route_candidates(request, reg)
+
+        cold = _time_us(invalidated, max(1, args.iterations // 10))
+        legacy = _time_us(lambda reg=reg: legacy_route(request, reg), max(1, args.iterations // 10))
+        print(f"{n:>7} {cached:>10.1f} {cold:>15.1f} {legacy:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,23 @@
 """
 Base worker: Redis Streams consumer with XREADGROUP, XACK, retry and DLQ.
 Subclass and implement process_task(task) -> result.
+
+Two modes:
+  run_worker        — legacy loop, one message per XREADGROUP, synchronous.
+  run_worker_async  — BatchWorker: reads up to ORCHESTRATOR_WORKER_BATCH messages per
+                      call, runs them through a bounded async pool, pipelines XACK/DLQ
+                      writes, and reclaims stale pending entries with XAUTOCLAIM.
+                      Failed messages stay pending (no re-XADD), so retries keep
+                      their original stream position; the delivery count drives DLQ.
 """
+import asyncio
 import json
+import logging
 import os
+import time
 import uuid
-from typing import Any, Dict, List, Optional
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
 
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
 STREAMS = ["tasks:urgent", "tasks:high", "tasks:normal"]
@@ -13,12 +25,63 @@ GROUP = "workers"
 MAX_RETRIES = int(os.environ.get("ORCHESTRATOR_TASK_MAX_RETRIES", "3"))
 DLQ_STREAM = "tasks:dlq"
 
+WORKER_BATCH_SIZE = int(os.environ.get("ORCHESTRATOR_WORKER_BATCH", "32"))
+WORKER_CONCURRENCY = int(os.environ.get("ORCHESTRATOR_WORKER_CONCURRENCY", "16"))
+WORKER_BLOCK_MS = int(os.environ.get("ORCHESTRATOR_WORKER_BLOCK_MS", "5000"))
+CLAIM_IDLE_MS = int(os.environ.get("ORCHESTRATOR_CLAIM_IDLE_MS", "60000"))
+CLAIM_INTERVAL_S = float(os.environ.get("ORCHESTRATOR_CLAIM_INTERVAL_S", "15"))
+STATS_INTERVAL_S = float(os.environ.get("ORCHESTRATOR_WORKER_STATS_INTERVAL_S", "30"))
+
+logger = logging.getLogger("orchestrator.worker")
+
+# Prometheus metrics (lazy init; optional dependency)
+_METRICS: Optional[Dict[str, Any]] = None
+
 
 def _redis():
     import redis
     return redis.Redis.from_url(REDIS_URL, decode_responses=False)
 
 
+def _aredis(max_connections: int = 8):
+    import redis.asyncio as aredis
+    return aredis.Redis.from_url(REDIS_URL, decode_responses=False, max_connections=max_connections)
+
+
+_http_client = None
+
+
+def get_http_client():
+    """Shared pooled httpx.AsyncClient for async process functions (one per worker process)."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        import httpx
+        limits = httpx.Limits(max_connections=WORKER_CONCURRENCY * 2, max_keepalive_connections=WORKER_CONCURRENCY)
+        _http_client = httpx.AsyncClient(limits=limits)
+    return _http_client
+
+
+def _get_metrics() -> Optional[Dict[str, Any]]:
+    global _METRICS
+    if _METRICS is None:
+        try:
+            from prometheus_client import Counter, Gauge, Histogram
+            _METRICS = {
+                "tasks": Counter("orchestrator_worker_tasks_total", "Worker task outcomes", ["stream", "outcome"]),
+                "age": Histogram(
+                    "orchestrator_worker_task_age_seconds",
+                    "Time from enqueue to pickup",
+                    ["stream"],
+                    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 15, 60, 300),
+                ),
+                "lag": Gauge("orchestrator_worker_group_lag", "Entries not yet delivered to the group", ["stream"]),
+                "pending": Gauge("orchestrator_worker_group_pending", "Delivered but unacked entries", ["stream"]),
+            }
+        except ImportError:
+            _METRICS = {}
+    return _METRICS or None
+
+
 def ensure_consumer_groups(r, streams: List[str], group: str):
     for stream in streams:
         try:
@@ -78,3 +141,312 @@ def run_worker(consumer_id: Optional[str] = None, process_fn=None):
                         # re-add to stream (or leave unacked for reclaim)
                         r.xadd(stream_name, {"data": json.dumps(task)}, maxlen=10000, approximate=True)
                         r.xack(stream_name, GROUP, msg_id)
+
+
+def _s(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _msg_age_s(msg_id: str) -> float:
+    try:
+        return max(0.0, time.time() - int(msg_id.split("-", 1)[0]) / 1000.0)
+    except ValueError:
+        return 0.0
+
+
+class StreamStats:
+    """Per-stream counters; snapshot() also reports throughput since the previous snapshot."""
+
+    def __init__(self):
+        self.counts: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.max_age_s: Dict[str, float] = defaultdict(float)
+        self.group: Dict[str, Dict[str, int]] = {}
+        self._last_t = time.monotonic()
+        self._last_done: Dict[str, int] = defaultdict(int)
+
+    def record(self, stream: str, outcome: str, n: int = 1) -> None:
+        self.counts[stream][outcome] += n
+        m = _get_metrics()
+        if m:
+            m["tasks"].labels(stream=stream, outcome=outcome).inc(n)
+
+    def observe_age(self, stream: str, age_s: float) -> None:
+        self.max_age_s[stream] = max(self.max_age_s[stream], age_s)
+        m = _get_metrics()
+        if m:
+            m["age"].labels(stream=stream).observe(age_s)
+
+    def set_group(self, stream: str, lag: Optional[int], pending: int) -> None:
+        self.group[stream] = {"lag": lag, "pending": pending}
+        m = _get_metrics()
+        if m:
+            if lag is not None:
+                m["lag"].labels(stream=stream).set(lag)
+            m["pending"].labels(stream=stream).set(pending)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        elapsed = max(now - self._last_t, 1e-9)
+        out = {}
+        for stream in set(self.counts) | set(self.group):
+            counts = self.counts[stream]
+            done = counts["ok"] + counts["dlq"]
+            out[stream] = {
+                **dict(counts),
+                "throughput_per_s": round((done - self._last_done[stream]) / elapsed, 2),
+                "max_age_s": round(self.max_age_s[stream], 3),
+                **self.group.get(stream, {}),
+            }
+            self._last_done[stream] = done
+            self.max_age_s[stream] = 0.0
+        self._last_t = now
+        return out
+
+
+class BatchWorker:
+    """
+    Batched Redis Streams consumer. process_fn may be sync (run in the default
+    executor) or async (awaited directly, e.g. using get_http_client()).
+    """
+
+    def __init__(
+        self,
+        process_fn: Callable[[Dict[str, Any]], Any],
+        consumer_id: Optional[str] = None,
+        redis_client=None,
+        streams: Optional[List[str]] = None,
+        group: str = GROUP,
+        batch_size: int = WORKER_BATCH_SIZE,
+        concurrency: int = WORKER_CONCURRENCY,
+        block_ms: int = WORKER_BLOCK_MS,
+        claim_idle_ms: int = CLAIM_IDLE_MS,
+        claim_interval_s: float = CLAIM_INTERVAL_S,
+        stats_interval_s: float = STATS_INTERVAL_S,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.process_fn = process_fn
+        self._is_async = asyncio.iscoroutinefunction(process_fn)
+        self.consumer_id = consumer_id or f"worker-{uuid.uuid4().hex[:8]}"
+        self.redis = redis_client if redis_client is not None else _aredis(max_connections=4)
+        self.streams = list(streams or STREAMS)
+        self.group = group
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.claim_interval_s = claim_interval_s
+        self.stats_interval_s = stats_interval_s
+        self.max_retries = max_retries
+        self.stats = StreamStats()
+        self._inflight: set = set()
+        self._inflight_ids: set = set()
+        self._acks: Dict[str, List[str]] = defaultdict(list)
+        self._dlq: List[Dict[str, str]] = []
+        self._claim_cursor: Dict[str, str] = {}
+        self._stopping = False
+
+    async def ensure_groups(self) -> None:
+        for stream in self.streams:
+            try:
+                await self.redis.xgroup_create(stream, self.group, id="0", mkstream=True)
+            except Exception as e:
+                if "BUSYGROUP" not in str(e):
+                    logger.warning("xgroup_create %s failed: %s", stream, e)
+
+    async def _run_fn(self, task: Dict[str, Any]) -> Any:
+        if self._is_async:
+            return await self.process_fn(task)
+        return await asyncio.get_running_loop().run_in_executor(None, self.process_fn, task)
+
+    async def _execute(self, stream: str, msg_id: str, body: Dict, attempts: int) -> None:
+        try:
+            data = body.get(b"data", body.get("data", b"{}"))
+            task = json.loads(_s(data))
+        except Exception:
+            logger.warning("Dropping unparseable message %s on %s", msg_id, stream)
+            self._acks[stream].append(msg_id)
+            self.stats.record(stream, "invalid")
+            return
+        meta = task.get("meta") or {}
+        try:
+            result = await self._run_fn(task)
+        except Exception as e:
+            if attempts > self.max_retries:
+                task["meta"] = {**meta, "retries": attempts, "last_error": str(e)}
+                from orchestrator.queue import dlq_fields
+                self._dlq.append(dlq_fields(task, reason="max_retries"))
+                self._acks[stream].append(msg_id)
+                self.stats.record(stream, "dlq")
+            else:
+                # Leave pending; XAUTOCLAIM redelivers it after claim_idle_ms.
+                logger.info("Task %s failed (attempt %d): %s", task.get("task_id"), attempts, e)
+                self.stats.record(stream, "retry")
+            return
+        self._acks[stream].append(msg_id)
+        self.stats.record(stream, "ok")
+        publish_result(task.get("task_id"), result)
+
+    def _schedule(self, stream: str, messages, attempts: Dict[str, int]) -> int:
+        scheduled = 0
+        for msg_id, body in messages:
+            msg_id = _s(msg_id)
+            if body is None:  # entry trimmed from the stream while pending
+                self._acks[stream].append(msg_id)
+                continue
+            if (stream, msg_id) in self._inflight_ids:  # reclaimed while still running here
+                continue
+            self.stats.observe_age(stream, _msg_age_s(msg_id))
+            key = (stream, msg_id)
+            self._inflight_ids.add(key)
+            t = asyncio.ensure_future(self._execute(stream, msg_id, body, attempts.get(msg_id, 1)))
+            self._inflight.add(t)
+            t.add_done_callback(lambda fut, key=key: (self._inflight.discard(fut), self._inflight_ids.discard(key)))
+            scheduled += 1
+        return scheduled
+
+    async def flush(self) -> None:
+        """Write DLQ entries and XACKs for completed tasks in one pipelined round-trip."""
+        if not self._acks and not self._dlq:
+            return
+        acks, dlq = self._acks, self._dlq
+        self._acks, self._dlq = defaultdict(list), []
+        from orchestrator.queue import DLQ_STREAM as dlq_stream, STREAM_MAXLEN
+        pipe = self.redis.pipeline(transaction=False)
+        for fields in dlq:
+            pipe.xadd(dlq_stream, fields, maxlen=STREAM_MAXLEN, approximate=True)
+        for stream, ids in acks.items():
+            if ids:
+                pipe.xack(stream, self.group, *ids)
+        try:
+            await pipe.execute()
+        except Exception as e:
+            # Unacked entries stay pending and are reclaimed later (at-least-once).
+            logger.warning("ack/DLQ pipeline failed: %s", e)
+
+    async def read_once(self, block_ms: Optional[int]) -> int:
+        """
+        Read new entries into the free concurrency slots. XREADGROUP's count applies
+        per stream, so streams are polled in turn (priority order), each capped at the
+        slots still free. Only when all are empty does it block, with count=1 on at
+        most `free` streams, so a wake-up cannot overfill either.
+        """
+        scheduled = 0
+        for stream in self.streams:
+            free = self.concurrency - len(self._inflight)
+            if free <= 0:
+                return scheduled
+            res = await self.redis.xreadgroup(
+                self.group, self.consumer_id, {stream: ">"}, count=min(self.batch_size, free)
+            )
+            scheduled += self._schedule_read(res)
+        free = self.concurrency - len(self._inflight)
+        if scheduled or block_ms is None or free <= 0:
+            return scheduled
+        res = await self.redis.xreadgroup(
+            self.group,
+            self.consumer_id,
+            {s: ">" for s in self.streams[:free]},
+            count=1,
+            block=block_ms,
+        )
+        return self._schedule_read(res)
+
+    def _schedule_read(self, res) -> int:
+        return sum(self._schedule(_s(stream_name), messages, {}) for stream_name, messages in res or [])
+
+    async def reclaim_once(self) -> int:
+        """XAUTOCLAIM entries idle longer than claim_idle_ms (failed or orphaned by dead consumers)."""
+        scheduled = 0
+        for stream in self.streams:
+            free = self.concurrency - len(self._inflight)
+            if free <= 0:
+                break
+            res = await self.redis.xautoclaim(
+                stream,
+                self.group,
+                self.consumer_id,
+                min_idle_time=self.claim_idle_ms,
+                start_id=self._claim_cursor.get(stream, "0-0"),
+                count=min(self.batch_size, free),
+            )
+            self._claim_cursor[stream] = _s(res[0])
+            messages = res[1]
+            deleted = res[2] if len(res) > 2 else []
+            self._acks[stream].extend(_s(d) for d in deleted)
+            if not messages:
+                continue
+            ids = [_s(m[0]) for m in messages]
+            pending = await self.redis.xpending_range(
+                stream, self.group, min=ids[0], max=ids[-1], count=len(ids), consumername=self.consumer_id
+            )
+            attempts = {_s(p["message_id"]): int(p["times_delivered"]) for p in pending}
+            self.stats.record(stream, "claimed", len(messages))
+            scheduled += self._schedule(stream, messages, attempts)
+        return scheduled
+
+    async def sample_groups(self) -> None:
+        for stream in self.streams:
+            try:
+                for g in await self.redis.xinfo_groups(stream):
+                    if _s(g.get("name")) == self.group:
+                        self.stats.set_group(stream, g.get("lag"), int(g.get("pending", 0)))
+            except Exception as e:
+                logger.debug("xinfo_groups %s failed: %s", stream, e)
+
+    async def _wait_some(self, timeout: Optional[float]) -> None:
+        if self._inflight:
+            await asyncio.wait(set(self._inflight), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+    async def drain(self) -> None:
+        if self._inflight:
+            await asyncio.wait(set(self._inflight))
+        await self.flush()
+
+    def stop(self) -> None:
+        self._stopping = True
+
+    async def run(self, max_iterations: Optional[int] = None) -> None:
+        await self.ensure_groups()
+        next_claim = 0.0
+        next_stats = time.monotonic() + self.stats_interval_s
+        iterations = 0
+        try:
+            while not self._stopping and (max_iterations is None or iterations < max_iterations):
+                iterations += 1
+                now = time.monotonic()
+                if now >= next_claim:
+                    await self.reclaim_once()
+                    next_claim = now + self.claim_interval_s
+                # Block on Redis only when idle; otherwise poll and go back to collecting completions.
+                got = await self.read_once(self.block_ms if not self._inflight else None)
+                if self._inflight:
+                    full = len(self._inflight) >= self.concurrency
+                    await self._wait_some(None if full else (0 if got else self.block_ms / 1000.0))
+                await self.flush()
+                if time.monotonic() >= next_stats:
+                    await self.sample_groups()
+                    logger.info("worker %s stats: %s", self.consumer_id, self.stats.snapshot())
+                    next_stats = time.monotonic() + self.stats_interval_s
+        finally:
+            await self.drain()
+
+
+async def run_worker_async(
+    consumer_id: Optional[str] = None,
+    process_fn: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    **kwargs,
+) -> None:
+    """Batched counterpart of run_worker; see BatchWorker for options."""
+    port = os.environ.get("ORCHESTRATOR_WORKER_METRICS_PORT")
+    if port:
+        try:
+            from prometheus_client import start_http_server
+            start_http_server(int(port))
+        except ImportError:
+            logger.warning("prometheus_client not installed; worker metrics endpoint disabled")
+    worker = BatchWorker(process_fn or process_task, consumer_id=consumer_id, **kwargs)
+    try:
+        await worker.run()
+    finally:
+        if _http_client is not None:
+            await _http_client.aclose()
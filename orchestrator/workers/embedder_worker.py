@@ -2,12 +2,13 @@
 Embedder queue worker: consumes embed tasks, calls embedder agent, acks.
 Run: python -m orchestrator.workers.embedder_worker
 """
+import asyncio
 import os
 from typing import Any, Dict
 
 import httpx
 
-from orchestrator.workers.base_worker import run_worker
+from orchestrator.workers.base_worker import get_http_client, run_worker, run_worker_async
 
 EMBEDDER_ENDPOINT = os.environ.get("EMBEDDER_ENDPOINT", "http://localhost:8001")
 TIMEOUT = float(os.environ.get("EMBEDDER_TIMEOUT", "10.0"))
@@ -30,5 +31,29 @@ def process_task(task: Dict[str, Any]) -> Dict[str, Any]:
     return data.get("output") or data
 
 
+async def aprocess_task(task: Dict[str, Any]) -> Dict[str, Any]:
+    """Async variant of process_task on the worker's shared pooled client."""
+    url = f"{EMBEDDER_ENDPOINT.rstrip('/')}/call"
+    payload = {
+        "request_id": task.get("task_id", ""),
+        "case_id": task.get("case_id", ""),
+        "payload": task.get("payload", {}),
+        "meta": task.get("meta", {}),
+    }
+    r = await get_http_client().post(url, json=payload, timeout=TIMEOUT)
+    r.raise_for_status()
+    data = r.json()
+    if not data.get("success"):
+        raise RuntimeError(data.get("error", {}).get("message", "agent error"))
+    return data.get("output") or data
+
+
+def main() -> None:
+    if os.environ.get("ORCHESTRATOR_WORKER_MODE", "batched") == "legacy":
+        run_worker(consumer_id="embedder-1", process_fn=process_task)
+    else:
+        asyncio.run(run_worker_async(consumer_id="embedder-1", process_fn=aprocess_task))
+
+
 if __name__ == "__main__":
-    run_worker(consumer_id="embedder-1", process_fn=process_task)
+    main()
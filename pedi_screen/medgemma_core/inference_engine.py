@@ -87,33 +87,18 @@ class InferenceEngine:
     Uses backend MedGemmaService when backend is available.
     """
 
-    def __init__(self, config: Optional[Dict[str, Any]] = None):
+    def __init__(self, config: Optional[Dict[str, Any]] = None, service: Any = None):
         self.config = config or {}
-        self._service = None
+        self._service = service
 
     def _get_service(self):
-        """Lazy-load MedGemmaService from backend if configured."""
+        """Backend's process-wide MedGemmaService (shared with the API routers) if configured."""
         if self._service is not None:
             return self._service
         try:
-            from app.core.config import settings
-            from app.services.medgemma_service import MedGemmaService
-
-            if (settings.HF_MODEL and settings.HF_API_KEY) or (
-                settings.VERTEX_PROJECT and settings.VERTEX_LOCATION
-            ):
-                self._service = MedGemmaService({
-                    "HF_MODEL": settings.HF_MODEL,
-                    "HF_API_KEY": settings.HF_API_KEY,
-                    "VERTEX_PROJECT": settings.VERTEX_PROJECT,
-                    "VERTEX_LOCATION": settings.VERTEX_LOCATION,
-                    "VERTEX_TEXT_ENDPOINT_ID": settings.VERTEX_TEXT_ENDPOINT_ID,
-                    "VERTEX_VISION_ENDPOINT_ID": settings.VERTEX_VISION_ENDPOINT_ID,
-                    "REDIS_URL": settings.REDIS_URL,
-                    "ALLOW_PHI": settings.ALLOW_PHI,
-                    "LORA_ADAPTER_PATH": settings.LORA_ADAPTER_PATH,
-                    "BASE_MODEL_ID": settings.BASE_MODEL_ID,
-                })
+            from app.services.medgemma_provider import provider
+
+            self._service = provider.get()
         except Exception:
             self._service = None
         return self._service
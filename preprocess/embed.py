@@ -10,21 +10,34 @@ Primary behavior:
 Outputs:
 - Numpy L2-normalized float32 vectors (shape: (1, D)) saved to .npy or returned as numpy arrays.
 - Optional base64 encoded payload helper.
+
+Batch mode (directory or manifest input, see embed_paths):
+- The model is loaded once per (model, size, dim) and images are read, hashed and
+  decoded by a prefetch thread pool while the previous batch is embedded.
+- Results go to a content-addressed EmbeddingCache keyed by SHA-256 of the image
+  bytes plus model/dim/size, stored as one memory-mapped .npy shard with a JSON
+  index, so re-runs only embed new or changed images.
 """
 
 import argparse
 import base64
 import hashlib
+import importlib.util
+import io
+import json
 import logging
-from typing import Optional
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 import numpy as np
+from PIL import Image
 
 from preprocess.image import (
     load_image_rgb,
     normalize_image_float32,
     resize_and_center_crop,
-    to_numpy_uint8,
 )
 
 logger = logging.getLogger(__name__)
@@ -56,6 +69,114 @@ def embedding_to_b64_float32(emb: np.ndarray) -> str:
     return base64.b64encode(emb.tobytes()).decode("ascii")
 
 
+class ImageEmbedder:
+    """
+    Holds one loaded processor + model (or the pseudo fallback) for repeated batches.
+    The model is loaded lazily on the first embed() call.
+    """
+
+    def __init__(self, model_name: Optional[str] = None, target_size: tuple = (224, 224), dim: int = 256):
+        self.model_name = model_name
+        self.target_size = tuple(target_size)
+        self.dim = dim
+        self._loaded = False
+        self._processor = None
+        self._model = None
+        self._device = None
+        self._proj = None
+        self.pseudo = model_name is None or not (
+            importlib.util.find_spec("transformers") and importlib.util.find_spec("torch")
+        )
+
+    @property
+    def tag(self) -> str:
+        """Identifies what produces the vectors (part of the cache key)."""
+        if self.pseudo:
+            return f"pseudo|{self.dim}"
+        w, h = self.target_size
+        return f"{self.model_name}|{self.dim}|{w}x{h}"
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if self.model_name is None:
+            logger.info("No model_name provided — using pseudo embedding")
+            self.pseudo = True
+            return
+        try:
+            from transformers import AutoModel, AutoProcessor
+            import torch
+        except Exception:
+            logger.info("transformers or torch not available — using pseudo embedding")
+            self.pseudo = True
+            return
+        try:
+            self._processor = AutoProcessor.from_pretrained(self.model_name, trust_remote_code=True)
+            self._model = AutoModel.from_pretrained(self.model_name, trust_remote_code=True)
+            self._model.eval()
+            self._device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            self._model.to(self._device)
+        except Exception as e:
+            logger.exception("Model load failed, falling back to pseudo embedding: %s", e)
+            self.pseudo = True
+
+    def embed(self, images: Sequence[Image.Image], raw: Sequence[bytes]) -> np.ndarray:
+        """Embed preprocessed images (raw file bytes feed the pseudo fallback). Returns (N, dim)."""
+        self._load()
+        if not self.pseudo:
+            try:
+                return self._embed_model(images)
+            except Exception as e:
+                logger.exception("Model extraction failed, falling back to pseudo embedding: %s", e)
+        if not raw:
+            return np.zeros((0, self.dim), dtype="float32")
+        return np.concatenate([pseudo_embedding_from_image(b, dim=self.dim) for b in raw], axis=0)
+
+    def _embed_model(self, images: Sequence[Image.Image]) -> np.ndarray:
+        import torch
+
+        inputs = self._processor(images=list(images), return_tensors="pt", padding=True)
+        inputs = {k: v.to(self._device) for k, v in inputs.items()}
+        with torch.no_grad():
+            out = (
+                self._model.get_image_features(**inputs)
+                if hasattr(self._model, "get_image_features")
+                else self._model(**inputs).last_hidden_state
+            )
+        emb = out.cpu().numpy()
+        if emb.ndim == 3:
+            emb = emb.mean(axis=1)
+        emb = l2_normalize(emb.astype("float32"))
+        if emb.shape[-1] != self.dim:
+            if self._proj is None:
+                logger.info(
+                    "Embedding size %d differs from requested %d — applying deterministic transform",
+                    emb.shape[-1],
+                    self.dim,
+                )
+                rng = np.random.RandomState(0)
+                self._proj = rng.randn(emb.shape[-1], self.dim).astype("float32")
+            emb = l2_normalize(np.dot(emb, self._proj))
+        return emb.astype("float32")
+
+
+_EMBEDDERS: Dict[Tuple, ImageEmbedder] = {}
+
+
+def get_embedder(model_name: Optional[str] = None, target_size: tuple = (224, 224), dim: int = 256) -> ImageEmbedder:
+    """Process-wide embedder per (model, size, dim) so the model is loaded once."""
+    key = (model_name, tuple(target_size), dim)
+    if key not in _EMBEDDERS:
+        _EMBEDDERS[key] = ImageEmbedder(model_name, target_size, dim)
+    return _EMBEDDERS[key]
+
+
+def _preprocess(img_bytes: bytes, target_size: tuple) -> Image.Image:
+    img = load_image_rgb(io.BytesIO(img_bytes))
+    return resize_and_center_crop(img, target_size)
+
+
 def extract_embedding_from_image_path(
     image_path: str,
     model_name: Optional[str] = None,
@@ -71,76 +192,247 @@ def extract_embedding_from_image_path(
     Returns:
         numpy array shape (1, dim) float32, L2-normalized
     """
-    img = load_image_rgb(image_path)
-    img = resize_and_center_crop(img, target_size)
-    arr_uint8 = to_numpy_uint8(img)
-    try:
-        from transformers import AutoModel, AutoProcessor
-        import torch
-    except Exception:
-        logger.info("transformers or torch not available — using pseudo embedding")
-        with open(image_path, "rb") as f:
-            img_bytes = f.read()
-        return pseudo_embedding_from_image(img_bytes, dim=dim)
+    with open(image_path, "rb") as f:
+        img_bytes = f.read()
+    img = _preprocess(img_bytes, target_size)
+    return get_embedder(model_name, target_size, dim).embed([img], [img_bytes])
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding store: one memory-mapped float32 .npy shard
+    (rows) plus index.json mapping key -> row. The index is rewritten only
+    after the shard is flushed, so a crash never points at unwritten rows.
+    """
+
+    SHARD = "embeddings.npy"
+    INDEX = "index.json"
+
+    def __init__(self, cache_dir: str, dim: int):
+        self.cache_dir = cache_dir
+        self.dim = dim
+        os.makedirs(cache_dir, exist_ok=True)
+        self._shard_path = os.path.join(cache_dir, self.SHARD)
+        self._index_path = os.path.join(cache_dir, self.INDEX)
+        self.index: Dict[str, int] = {}
+        self.count = 0
+        self._mm: Optional[np.ndarray] = None
+        if os.path.exists(self._index_path) and os.path.exists(self._shard_path):
+            with open(self._index_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("dim") == dim:
+                self.index = meta["keys"]
+                self.count = meta["count"]
+                self._mm = np.load(self._shard_path, mmap_mode="r+")
+            else:
+                logger.warning("Embedding cache %s has dim %s, expected %d; starting fresh", cache_dir, meta.get("dim"), dim)
 
-    if model_name is None:
-        logger.info("No model_name provided — using pseudo embedding")
-        with open(image_path, "rb") as f:
-            return pseudo_embedding_from_image(f.read(), dim=dim)
+    @staticmethod
+    def key(img_bytes: bytes, tag: str) -> str:
+        return hashlib.sha256(hashlib.sha256(img_bytes).digest() + b"|" + tag.encode("utf-8")).hexdigest()
 
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        row = self.index.get(key)
+        return None if row is None else np.array(self._mm[row : row + 1])
+
+    def _ensure_capacity(self, n: int) -> None:
+        capacity = 0 if self._mm is None else self._mm.shape[0]
+        if n <= capacity:
+            return
+        new_capacity = max(n, capacity * 2, 1024)
+        tmp = self._shard_path + ".tmp"
+        grown = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(new_capacity, self.dim))
+        if self.count:
+            grown[: self.count] = self._mm[: self.count]
+        grown.flush()
+        del grown
+        self._mm = None
+        os.replace(tmp, self._shard_path)
+        self._mm = np.load(self._shard_path, mmap_mode="r+")
+
+    def put_many(self, keys: Sequence[str], embs: np.ndarray) -> None:
+        new = [(k, i) for i, k in enumerate(keys) if k not in self.index]
+        if not new:
+            return
+        self._ensure_capacity(self.count + len(new))
+        rows = np.arange(self.count, self.count + len(new))
+        self._mm[rows] = embs[[i for _, i in new]].astype(np.float32)
+        for (k, _), row in zip(new, rows):
+            self.index[k] = int(row)
+        self.count += len(new)
+
+    def flush(self) -> None:
+        if self._mm is not None:
+            self._mm.flush()
+        tmp = self._index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "count": self.count, "keys": self.index}, f)
+        os.replace(tmp, self._index_path)
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+
+
+def iter_image_paths(source: str) -> List[str]:
+    """Image paths from a directory (recursive), a .jsonl manifest (image_path/path/image) or a .txt list."""
+    if os.path.isdir(source):
+        found = []
+        for root, _, files in os.walk(source):
+            found.extend(os.path.join(root, f) for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+        return sorted(found)
+    base = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if source.endswith(".jsonl"):
+                rec = json.loads(line)
+                line = rec.get("image_path") or rec.get("path") or rec.get("image")
+                if not line:
+                    continue
+            paths.append(line if os.path.isabs(line) else os.path.join(base, line))
+    return paths
+
+
+def _prefetch(items: Sequence, fn, pool: ThreadPoolExecutor, batch_size: int, depth: int) -> Iterator[List]:
+    """Yield fn(item) results batch by batch while the next `depth` batches load in the pool."""
+    chunks = (items[i : i + batch_size] for i in range(0, len(items), batch_size))
+    pending: deque = deque()
+    for chunk in chunks:
+        pending.append([pool.submit(fn, it) for it in chunk])
+        if len(pending) > depth:
+            yield [f.result() for f in pending.popleft()]
+    while pending:
+        yield [f.result() for f in pending.popleft()]
+
+
+def embed_paths(
+    paths: Sequence[str],
+    model_name: Optional[str] = None,
+    target_size: tuple = (224, 224),
+    dim: int = 256,
+    cache_dir: Optional[str] = None,
+    batch_size: int = 32,
+    workers: int = 4,
+    prefetch: int = 2,
+    flush_every: int = 16,
+) -> Tuple[List[str], np.ndarray, Dict[str, int]]:
+    """
+    Embed many images with one loaded model, skipping any already in the cache.
+
+    The cache index is flushed every `flush_every` batches that added rows and
+    again on exit (also on error), so an interrupted run keeps its progress.
+    Returns (embedded_paths, embeddings (N, dim) float32, stats). Unreadable
+    images are logged and left out of embedded_paths.
+    """
+    embedder = get_embedder(model_name, target_size, dim)
+    cache = EmbeddingCache(cache_dir, dim) if cache_dir else None
+    stats = {"images": 0, "cache_hits": 0, "embedded": 0, "failed": 0}
+
+    def load(path: str):
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            key = EmbeddingCache.key(raw, embedder.tag)
+            if cache is not None and key in cache:
+                return path, raw, key, None
+            return path, raw, key, _preprocess(raw, target_size)
+        except Exception as e:
+            logger.warning("Skipping %s: %s", path, e)
+            return path, None, None, None
+
+    out_paths: List[str] = []
+    out_rows: List[np.ndarray] = []
+    unflushed = 0
     try:
-        processor = AutoProcessor.from_pretrained(model_name, trust_remote_code=True)
-        model = AutoModel.from_pretrained(model_name, trust_remote_code=True)
-        model.eval()
-        inputs = processor(images=img, return_tensors="pt", padding=True)
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        model.to(device)
-        inputs = {k: v.to(device) for k, v in inputs.items()}
-        with torch.no_grad():
-            out = (
-                model.get_image_features(**inputs)
-                if hasattr(model, "get_image_features")
-                else model(**inputs).last_hidden_state
-            )
-        emb = out.cpu().numpy()
-        if emb.ndim == 3:
-            emb = emb.mean(axis=1)
-        emb = emb.astype("float32")
-        emb = l2_normalize(emb)
-        if emb.shape[-1] != dim:
-            logger.info(
-                "Embedding size %d differs from requested %d — applying deterministic transform",
-                emb.shape[-1],
-                dim,
-            )
-            rng = np.random.RandomState(0)
-            W = rng.randn(emb.shape[-1], dim).astype("float32")
-            emb = np.dot(emb, W)
-            emb = l2_normalize(emb)
-        return emb.astype("float32")
-    except Exception as e:
-        logger.exception("Model extraction failed, falling back to pseudo embedding: %s", e)
-        with open(image_path, "rb") as f:
-            return pseudo_embedding_from_image(f.read(), dim=dim)
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="embed-prefetch") as pool:
+            for batch in _prefetch(list(paths), load, pool, max(1, batch_size), max(0, prefetch)):
+                rows: List[Optional[np.ndarray]] = []
+                misses = []
+                for path, raw, key, img in batch:
+                    if raw is None:
+                        stats["failed"] += 1
+                        continue
+                    cached = cache.get(key) if (cache is not None and img is None) else None
+                    out_paths.append(path)
+                    rows.append(cached)
+                    if cached is None:
+                        misses.append((len(rows) - 1, raw, img if img is not None else _preprocess(raw, target_size)))
+                if misses:
+                    embs = embedder.embed([m[2] for m in misses], [m[1] for m in misses])
+                    for (pos, _, _), emb in zip(misses, embs):
+                        rows[pos] = emb[None, :]
+                    if cache is not None:
+                        # Key by the tag that actually produced the vectors (model load may have fallen back)
+                        cache.put_many([EmbeddingCache.key(m[1], embedder.tag) for m in misses], embs)
+                        unflushed += 1
+                        if unflushed >= max(1, flush_every):
+                            cache.flush()
+                            unflushed = 0
+                stats["embedded"] += len(misses)
+                stats["cache_hits"] += len(rows) - len(misses)
+                out_rows.extend(rows)
+    finally:
+        if cache is not None and unflushed:
+            cache.flush()
+    stats["images"] = len(out_paths)
+    embs = np.concatenate(out_rows, axis=0) if out_rows else np.zeros((0, dim), dtype="float32")
+    return out_paths, embs.astype("float32"), stats
 
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--input", "-i", required=True, help="input image path (PNG/JPG)")
-    parser.add_argument("--out", "-o", required=True, help="output .npy path for embedding")
+    parser.add_argument(
+        "--input", "-i", required=True,
+        help="input image path (PNG/JPG), or a directory / .jsonl / .txt manifest for batch mode",
+    )
+    parser.add_argument("--out", "-o", required=True, help="output .npy path for embedding(s)")
     parser.add_argument("--model_name", "-m", default=None, help="optional model name/path for real extraction")
     parser.add_argument("--dim", type=int, default=256, help="embedding dimension (default 256)")
     parser.add_argument("--size", type=int, default=224, help="image target size (square)")
+    parser.add_argument("--cache-dir", default=None, help="batch mode: embedding cache dir (default: <out dir>/embedding_cache)")
+    parser.add_argument("--no-cache", action="store_true", help="batch mode: do not read or write the cache")
+    parser.add_argument("--batch-size", type=int, default=32, help="batch mode: images per forward pass")
+    parser.add_argument("--workers", type=int, default=4, help="batch mode: prefetch threads")
     args = parser.parse_args()
 
-    emb = extract_embedding_from_image_path(
-        args.input,
+    is_batch = os.path.isdir(args.input) or args.input.endswith((".jsonl", ".txt"))
+    if not is_batch:
+        emb = extract_embedding_from_image_path(
+            args.input,
+            model_name=args.model_name,
+            target_size=(args.size, args.size),
+            dim=args.dim,
+        )
+        np.save(args.out, emb)
+        print(f"Saved embedding to {args.out} with shape {emb.shape} and dtype {emb.dtype}")
+        return
+
+    cache_dir = None if args.no_cache else (
+        args.cache_dir or os.path.join(os.path.dirname(os.path.abspath(args.out)), "embedding_cache")
+    )
+    paths, embs, stats = embed_paths(
+        iter_image_paths(args.input),
         model_name=args.model_name,
         target_size=(args.size, args.size),
         dim=args.dim,
+        cache_dir=cache_dir,
+        batch_size=args.batch_size,
+        workers=args.workers,
     )
-    np.save(args.out, emb)
-    print(f"Saved embedding to {args.out} with shape {emb.shape} and dtype {emb.dtype}")
+    np.save(args.out, embs)
+    paths_out = os.path.splitext(args.out)[0] + ".paths.json"
+    with open(paths_out, "w", encoding="utf-8") as f:
+        json.dump(paths, f)
+    print(f"Saved {embs.shape[0]} embeddings to {args.out} (row order in {paths_out}); {stats}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+CPU throughput benchmark: one-at-a-time model.generate vs the continuous-batching engine.
+
+Uses a tiny Hugging Face causal LM so it runs without a GPU. Every request
+generates exactly --new-tokens tokens (no EOS stop) so both paths do the same work.
+Prompts share a long static header (like build_prompt's instruction + schema
+block); the engine is run with and without shared-prefix KV reuse and mean
+time-to-first-token is reported for each.
+
+  python scripts/bench_continuous_batching.py
+  python scripts/bench_continuous_batching.py --model sshleifer/tiny-gpt2 --requests 64 --batch 16
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, ROOT)
+
+
+def make_prompts(tokenizer, n: int, header_repeats: int = 8, seed: int = 0):
+    """(prompt token ids per request, number of leading tokens shared by all of them)."""
+    rng = random.Random(seed)
+    words = "child says words points walks climbs stacks blocks follows commands babbles plays".split()
+    header = "SYSTEM: You are a pediatric developmental screening support model. You do not diagnose. " * header_repeats
+    header_ids = tokenizer(header)["input_ids"]
+    prompts = []
+    for _ in range(n):
+        obs = "INPUT CONTEXT: " + " ".join(rng.choice(words) for _ in range(rng.randint(8, 64)))
+        prompts.append(header_ids + tokenizer(obs, add_special_tokens=False)["input_ids"])
+    return prompts, len(header_ids)
+
+
+def run_sequential(model, tokenizer, prompts, new_tokens: int) -> float:
+    import torch
+
+    t0 = time.perf_counter()
+    with torch.no_grad():
+        for ids in prompts:
+            input_ids = torch.tensor([ids])
+            model.generate(
+                input_ids=input_ids,
+                attention_mask=torch.ones_like(input_ids),
+                max_new_tokens=new_tokens,
+                min_new_tokens=new_tokens,
+                do_sample=False,
+                pad_token_id=tokenizer.eos_token_id,
+            )
+    return time.perf_counter() - t0
+
+
+def run_engine(model, tokenizer, prompts, new_tokens: int, batch: int, prefix_len: int = 0):
+    from app.backend.generation_engine import ContinuousBatchingEngine
+
+    engine = ContinuousBatchingEngine(model, tokenizer, max_batch_size=batch)
+    t0 = time.perf_counter()
+    futures = [engine.submit(ids, max_new_tokens=new_tokens, prefix_len=prefix_len) for ids in prompts]
+    results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - t0
+    stats = engine.stats()
+    engine.stop()
+    assert all(len(r.token_ids) == new_tokens for r in results)
+    stats["mean_ttft_ms"] = round(1000 * sum(r.time_to_first_token_s for r in results) / len(results), 2)
+    return elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="sshleifer/tiny-gpt2")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--new-tokens", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=8, help="Engine max batch size")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--header-repeats", type=int, default=8, help="Length of the shared static prompt header")
+    args = parser.parse_args()
+
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    tokenizer = AutoTokenizer.from_pretrained(args.model)
+    model = AutoModelForCausalLM.from_pretrained(args.model).eval()
+    prompts, prefix_len = make_prompts(tokenizer, args.requests, args.header_repeats)
+    total = args.requests * args.new_tokens
+    print(f"{args.model}: {args.requests} requests x {args.new_tokens} new tokens, {prefix_len}-token shared prefix")
+
+    seq_s = run_sequential(model, tokenizer, prompts, args.new_tokens)
+    print(f"sequential generate   {seq_s:8.2f} s  {total / seq_s:10.1f} tok/s")
+    eng_s, stats = run_engine(model, tokenizer, prompts, args.new_tokens, args.batch)
+    print(
+        f"continuous batch={args.batch:<3} {eng_s:8.2f} s  {total / eng_s:10.1f} tok/s  "
+        f"(x{seq_s / eng_s:.1f}; mean decode batch {stats['mean_decode_batch']}, "
+        f"padding {stats['padding_tokens']}/{stats['prefill_tokens'] + stats['padding_tokens']} prefill tokens)"
+    )
+    pre_s, pre_stats = run_engine(model, tokenizer, prompts, args.new_tokens, args.batch, prefix_len=prefix_len)
+    print(f"  + prefix reuse        {pre_s:8.2f} s  {total / pre_s:10.1f} tok/s")
+    print(
+        f"time to first token: {stats['mean_ttft_ms']} ms without prefix reuse, "
+        f"{pre_stats['mean_ttft_ms']} ms with ({pre_stats['prefix_tokens_reused']} prompt tokens served from cache)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
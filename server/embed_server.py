@@ -3,16 +3,24 @@ Standalone MedSigLIP embedding server (production-grade).
 Run: uvicorn server.embed_server:app --host 0.0.0.0 --port 5000
 
 Supports: image_meta, health with memory, request size limits, canonical embedding format.
+
+Requests are micro-batched: EmbedBatcher collects images for up to
+EMBED_BATCH_WAIT_MS or EMBED_BATCH_MAX images and runs one batched forward pass
+on a dedicated executor thread, so the event loop never blocks on torch.
+POST /embed/batch accepts several images at once. Batch size, queue wait and
+image throughput are exported on /metrics (prometheus_client optional) and /health.
 """
+import asyncio
 import base64
 import io
 import os
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
 
 import numpy as np
 from fastapi import FastAPI, File, HTTPException, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from loguru import logger
 from PIL import Image
 from pydantic import BaseModel
@@ -28,6 +36,9 @@ app = FastAPI(
 MODEL_NAME = os.getenv("MEDSIGLIP_MODEL_NAME", "google/medsiglip-base")
 USE_REAL_MODEL = os.getenv("USE_REAL_MEDSIGLIP", "1") == "1"
 EMB_VERSION = os.getenv("MEDSIGLIP_EMB_VERSION", "medsiglip-v1")
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "16"))
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "5"))
+EMBED_BATCH_MAX_FILES = int(os.getenv("EMBED_BATCH_MAX_FILES", "64"))
 
 device = None
 processor = None
@@ -47,6 +58,10 @@ class EmbeddingResponse(BaseModel):
     image_meta: Optional[ImageMeta] = None
 
 
+class BatchEmbeddingResponse(BaseModel):
+    embeddings: List[EmbeddingResponse]
+
+
 def _mock_embedding_from_bytes(b: bytes, dim: int = 256) -> np.ndarray:
     seed = int.from_bytes(base64.b16encode(b)[:8], "little") % (2**32)
     rng = np.random.RandomState(seed)
@@ -74,11 +89,205 @@ def _load_medsiglip():
         model = None
 
 
-def _tensor_to_base64_float32(t):
-    import torch
-    arr = t.detach().cpu().numpy().astype(np.float32)
-    b = arr.tobytes()
-    return base64.b64encode(b).decode("ascii"), list(arr.shape)
+def _embed_images(images: List[Tuple[Image.Image, bytes]]) -> Tuple[np.ndarray, str]:
+    """One batched forward pass. Returns (N, dim) float32 L2-normalized rows and emb_version."""
+    if processor is not None and model is not None:
+        import torch
+        inputs = processor(images=[pil for pil, _ in images], return_tensors="pt").to(device)
+        with torch.no_grad():
+            outputs = model(**inputs)
+            if hasattr(outputs, "pooler_output") and outputs.pooler_output is not None:
+                emb = outputs.pooler_output
+            else:
+                emb = outputs.last_hidden_state.mean(dim=1)
+            emb = torch.nn.functional.normalize(emb, dim=-1)
+        return emb.detach().cpu().numpy().astype(np.float32), EMB_VERSION
+    rows = np.concatenate([_mock_embedding_from_bytes(raw) for _, raw in images], axis=0)
+    return rows, "mock-" + EMB_VERSION
+
+
+_METRICS = None
+
+
+def _get_metrics():
+    """Lazy Prometheus metrics (optional dependency)."""
+    global _METRICS
+    if _METRICS is None:
+        try:
+            from prometheus_client import Counter, Histogram
+            _METRICS = {
+                "batch_size": Histogram(
+                    "embed_batch_size", "Images per batched forward pass",
+                    buckets=(1, 2, 4, 8, 16, 32, 64),
+                ),
+                "queue_wait": Histogram(
+                    "embed_queue_wait_seconds", "Time from enqueue to batch start",
+                    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+                ),
+                "forward": Histogram("embed_forward_seconds", "Batched forward pass latency"),
+                "images": Counter("embed_images_total", "Images embedded"),
+            }
+        except ImportError:
+            _METRICS = {}
+    return _METRICS
+
+
+class EmbedBatcher:
+    """
+    Dynamic micro-batching: the first queued image opens a window of max_wait_ms;
+    the batch closes when the window expires or max_batch images are queued.
+    Forward passes run one at a time on a dedicated thread.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[Tuple[Image.Image, bytes]]], Tuple[np.ndarray, str]] = _embed_images,
+        max_batch: int = EMBED_BATCH_MAX,
+        max_wait_ms: float = EMBED_BATCH_WAIT_MS,
+    ):
+        self.embed_fn = embed_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait_s = max_wait_ms / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed-forward")
+        self.batches = 0
+        self.images = 0
+        self.busy_s = 0.0
+
+    def _ensure_started(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            # A queue is bound to the loop that first used it
+            self._queue, self._loop = asyncio.Queue(), loop
+        if self._task is None or self._task.done():
+            if self._task is not None and not self._task.cancelled() and self._task.exception():
+                logger.error("Embed batching task died, restarting: {}", self._task.exception())
+            # Restart on the same queue so requests already waiting in it are still served
+            self._task = loop.create_task(self._run())
+        return self._queue
+
+    async def submit(self, pil: Image.Image, raw: bytes) -> Tuple[np.ndarray, str]:
+        """Embed one image; resolves with a (1, dim) row once its batch has run."""
+        return (await self.submit_many([(pil, raw)]))[0]
+
+    async def submit_many(self, images: List[Tuple[Image.Image, bytes]]) -> List[Tuple[np.ndarray, str]]:
+        queue = self._ensure_started()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for pil, raw in images:
+            fut = loop.create_future()
+            queue.put_nowait((pil, raw, fut, time.perf_counter()))
+            futures.append(fut)
+        return list(await asyncio.gather(*futures))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.max_wait_s
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    except asyncio.QueueEmpty:
+                        pass
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                await self._run_batch(loop, batch)
+                batch = []
+        except BaseException as e:
+            # Don't strand requests already taken off the queue
+            for _, _, fut, _ in batch:
+                if fut.done():
+                    continue
+                if isinstance(e, asyncio.CancelledError):
+                    fut.cancel()
+                else:
+                    fut.set_exception(e)
+            raise
+
+    async def _run_batch(self, loop, batch) -> None:
+        batch = [item for item in batch if not item[2].cancelled()]
+        if not batch:
+            return
+        metrics = _get_metrics()
+        started = time.perf_counter()
+        if metrics:
+            for _, _, _, enqueued in batch:
+                metrics["queue_wait"].observe(started - enqueued)
+        try:
+            rows, version = await loop.run_in_executor(
+                self._executor, self.embed_fn, [(pil, raw) for pil, raw, _, _ in batch]
+            )
+        except Exception as e:
+            for _, _, fut, _ in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        elapsed = time.perf_counter() - started
+        self.batches += 1
+        self.images += len(batch)
+        self.busy_s += elapsed
+        if metrics:
+            metrics["batch_size"].observe(len(batch))
+            metrics["forward"].observe(elapsed)
+            metrics["images"].inc(len(batch))
+        for i, (_, _, fut, _) in enumerate(batch):
+            if not fut.done():
+                fut.set_result((rows[i:i + 1], version))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "images": self.images,
+            "avg_batch_size": round(self.images / self.batches, 2) if self.batches else 0.0,
+            "images_per_s": round(self.images / self.busy_s, 1) if self.busy_s else 0.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while self._queue is not None and not self._queue.empty():
+            fut = self._queue.get_nowait()[2]
+            if not fut.done():
+                fut.cancel()
+        self._executor.shutdown(wait=False)
+
+
+batcher = EmbedBatcher()
+
+
+def _decode_image(contents: bytes) -> Image.Image:
+    if len(contents) > MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Image exceeds max size ({MAX_UPLOAD_BYTES // (1024*1024)}MB)",
+        )
+    try:
+        return Image.open(io.BytesIO(contents)).convert("RGB")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"bad image: {e}")
+
+
+def _to_response(pil: Image.Image, row: np.ndarray, version: str) -> EmbeddingResponse:
+    return EmbeddingResponse(
+        embedding_b64=base64.b64encode(row.astype(np.float32).tobytes()).decode("ascii"),
+        shape=list(row.shape),
+        emb_version=version,
+        image_meta=ImageMeta(width=pil.width, height=pil.height, color_space="RGB"),
+    )
 
 
 def _get_memory_mb() -> Optional[float]:
@@ -98,52 +307,42 @@ async def startup():
         _load_medsiglip()
 
 
+@app.on_event("shutdown")
+async def shutdown():
+    await batcher.stop()
+
+
 @app.post("/embed", response_model=EmbeddingResponse)
 async def embed(file: UploadFile = File(...)):
     start = time.time()
     contents = await file.read()
+    pil = await asyncio.to_thread(_decode_image, contents)
+    row, version = await batcher.submit(pil, contents)
+    logger.info("embed done: shape=%s time=%.3fs", list(row.shape), time.time() - start)
+    return _to_response(pil, row, version)
 
-    if len(contents) > MAX_UPLOAD_BYTES:
-        raise HTTPException(
-            status_code=413,
-            detail=f"Image exceeds max size ({MAX_UPLOAD_BYTES // (1024*1024)}MB)",
-        )
 
-    try:
-        pil = Image.open(io.BytesIO(contents)).convert("RGB")
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"bad image: {e}")
+@app.post("/embed/batch", response_model=BatchEmbeddingResponse)
+async def embed_batch(files: List[UploadFile] = File(...)):
+    """Embed several images; they join the same micro-batches as single /embed calls."""
+    if len(files) > EMBED_BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {EMBED_BATCH_MAX_FILES} images per request")
+    contents = [await f.read() for f in files]
+    pils = await asyncio.to_thread(lambda: [_decode_image(c) for c in contents])
+    results = await batcher.submit_many(list(zip(pils, contents)))
+    return BatchEmbeddingResponse(
+        embeddings=[_to_response(pil, row, version) for pil, (row, version) in zip(pils, results)]
+    )
 
-    image_meta = ImageMeta(width=pil.width, height=pil.height, color_space="RGB")
 
-    if processor is not None and model is not None:
-        import torch
-        inputs = processor(images=pil, return_tensors="pt").to(device)
-        with torch.no_grad():
-            outputs = model(**inputs)
-            if hasattr(outputs, "pooler_output") and outputs.pooler_output is not None:
-                emb = outputs.pooler_output
-            else:
-                emb = outputs.last_hidden_state.mean(dim=1)
-            emb = torch.nn.functional.normalize(emb, dim=-1)
-            b64, shape = _tensor_to_base64_float32(emb)
-        elapsed = time.time() - start
-        logger.info("embed done: shape=%s time=%.3fs", shape, elapsed)
-        return EmbeddingResponse(
-            embedding_b64=b64,
-            shape=shape,
-            emb_version=EMB_VERSION,
-            image_meta=image_meta,
-        )
-    else:
-        arr = _mock_embedding_from_bytes(contents)
-        b64 = base64.b64encode(arr.tobytes()).decode("ascii")
-        return EmbeddingResponse(
-            embedding_b64=b64,
-            shape=list(arr.shape),
-            emb_version="mock-" + EMB_VERSION,
-            image_meta=image_meta,
-        )
+@app.get("/metrics")
+def metrics():
+    try:
+        from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+    except ImportError:
+        raise HTTPException(status_code=404, detail="prometheus_client not installed")
+    _get_metrics()
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 @app.get("/health")
@@ -156,4 +355,5 @@ def health():
         "device": str(device) if device else "none",
         "memory_mb": round(mem_mb, 2) if mem_mb is not None else None,
         "emb_version": EMB_VERSION,
+        "batching": batcher.stats(),
     }
@@ -22,6 +22,8 @@ import {
   uploadRadiologyStudy,
   reviewStudy,
   fetchRadiologyBenchmark,
+  subscribeRadiologyQueue,
+  compareRadiologyStudies,
   type RadiologyStudy,
   type RadiologyBenchmark,
 } from "@/services/radiologyApi";
@@ -85,6 +87,19 @@ export default function RadiologyQueue() {
     load();
   }, []);
 
+  // Apply live upsert/remove events instead of re-fetching the whole worklist
+  useEffect(
+    () =>
+      subscribeRadiologyQueue((event) =>
+        setItems((prev) => {
+          const studyId = event.type === "remove" ? event.study_id : event.item.study_id;
+          const rest = prev.filter((s) => s.study_id !== studyId);
+          return event.type === "remove" ? rest : [...rest, event.item].sort(compareRadiologyStudies);
+        })
+      ),
+    []
+  );
+
   const handleUpload = async (e: React.FormEvent<HTMLFormElement>) => {
     e.preventDefault();
     const form = e.currentTarget;
@@ -27,6 +27,8 @@ export type RadiologyStudy = {
   uploaded_at: string;
   priority_score: number;
   priority_label: "stat" | "urgent" | "routine";
+  /** Numeric sort key (stat=1, urgent=2, routine=3) */
+  priority_rank?: number;
   status: string;
   ai_summary?: string;
   override_priority?: string;
@@ -80,17 +82,72 @@ const MOCK_RADIOLOGY_QUEUE: RadiologyStudy[] = [
   },
 ];
 
+export type RadiologyQueuePage = { items: RadiologyStudy[]; next_cursor?: string | null };
+
+/** Server-sent worklist update from /api/radiology/queue/stream */
+export type RadiologyQueueEvent =
+  | { type: "upsert"; item: RadiologyStudy }
+  | { type: "remove"; study_id: string };
+
+const PRIORITY_RANK: Record<string, number> = { stat: 1, urgent: 2, routine: 3 };
+
+/** Worklist order used by the backend: priority rank, then oldest upload first. */
+export function compareRadiologyStudies(a: RadiologyStudy, b: RadiologyStudy): number {
+  const rank = (s: RadiologyStudy) => s.priority_rank ?? PRIORITY_RANK[s.priority_label] ?? PRIORITY_RANK.routine;
+  return (
+    rank(a) - rank(b) ||
+    a.uploaded_at.localeCompare(b.uploaded_at) ||
+    a.study_id.localeCompare(b.study_id)
+  );
+}
+
+export async function fetchRadiologyQueuePage(
+  cursor?: string | null,
+  limit = 100
+): Promise<RadiologyQueuePage> {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (cursor) params.set("cursor", cursor);
+  const res = await fetch(`${API_BASE}/api/radiology/queue?${params}`, { headers: headers() });
+  if (!res.ok) throw new Error(await res.text());
+  return res.json();
+}
+
+/** Fetch the whole pending worklist by following next_cursor across pages. */
 export async function fetchRadiologyQueue(): Promise<{ items: RadiologyStudy[] }> {
   try {
-    const res = await fetch(`${API_BASE}/api/radiology/queue`, { headers: headers() });
-    if (!res.ok) throw new Error(await res.text());
-    return res.json();
+    const items: RadiologyStudy[] = [];
+    let cursor: string | null | undefined;
+    do {
+      const page = await fetchRadiologyQueuePage(cursor);
+      items.push(...(page.items || []));
+      cursor = page.next_cursor;
+    } while (cursor);
+    return { items };
   } catch {
     // Return mock data when backend is unreachable
     return { items: MOCK_RADIOLOGY_QUEUE };
   }
 }
 
+/**
+ * Subscribe to live worklist updates. EventSource cannot send headers, so the
+ * API key goes in the query string. Returns a function that closes the stream.
+ */
+export function subscribeRadiologyQueue(onEvent: (event: RadiologyQueueEvent) => void): () => void {
+  if (typeof EventSource === "undefined") return () => {};
+  const url = `${API_BASE}/api/radiology/queue/stream`;
+  const source = new EventSource(API_KEY ? `${url}?api_key=${encodeURIComponent(API_KEY)}` : url);
+  source.onmessage = (msg) => {
+    try {
+      const event = JSON.parse(msg.data);
+      if (event.type === "upsert" || event.type === "remove") onEvent(event);
+    } catch {
+      // Ignore malformed events; the next refresh resyncs the list
+    }
+  };
+  return () => source.close();
+}
+
 export async function uploadRadiologyStudy(
   studyId: string,
   patientId: string,
@@ -0,0 +1,200 @@
+"""
+Vectorized bootstrap for confusion-matrix metrics.
+
+Every replicate's confusion matrix comes from one bincount over a combined
+index (replicate * K² + true * K + pred), so B replicates cost a few array
+operations instead of B metric objects. Resample indices are drawn in chunks
+(bounded memory on large holdouts), optionally stratified by true class, and
+replicate chunks can be spread over a process pool.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import stats
+
+# Upper bound on resample indices held in memory at once (per worker)
+MAX_INDEX_ELEMENTS = 1 << 22
+
+
+def _safe_div(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    """num / den with 0.0 where den == 0 (matches ClinicalMetrics conventions)."""
+    num = np.asarray(num, dtype=np.float64)
+    den = np.asarray(den, dtype=np.float64)
+    out = np.zeros(np.broadcast(num, den).shape, dtype=np.float64)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def confusion_metrics(
+    cms: np.ndarray,
+    labels: Sequence[str],
+    positive: Sequence[int] = (3,),
+) -> Dict[str, np.ndarray]:
+    """
+    All confusion-matrix metrics for one matrix (K, K) or a stack (..., K, K).
+
+    Returns binary metrics for `positive` classes (sensitivity, specificity,
+    ppv, npv) and one-vs-rest per-class metrics named e.g. "sensitivity_refer".
+    """
+    cms = np.asarray(cms, dtype=np.int64)
+    total = cms.sum(axis=(-2, -1))
+    tp = np.diagonal(cms, axis1=-2, axis2=-1)
+    row = cms.sum(axis=-1)
+    col = cms.sum(axis=-2)
+    fn = row - tp
+    fp = col - tp
+    tn = total[..., None] - tp - fn - fp
+
+    out: Dict[str, np.ndarray] = {}
+    pos = np.zeros(cms.shape[-1], dtype=bool)
+    pos[list(positive)] = True
+    b_tp = cms[..., pos, :][..., :, pos].sum(axis=(-2, -1))
+    b_fn = cms[..., pos, :][..., :, ~pos].sum(axis=(-2, -1))
+    b_fp = cms[..., ~pos, :][..., :, pos].sum(axis=(-2, -1))
+    b_tn = total - b_tp - b_fn - b_fp
+    out["sensitivity"] = _safe_div(b_tp, b_tp + b_fn)
+    out["specificity"] = _safe_div(b_tn, b_tn + b_fp)
+    out["ppv"] = _safe_div(b_tp, b_tp + b_fp)
+    out["npv"] = _safe_div(b_tn, b_tn + b_fn)
+    for i, label in enumerate(labels):
+        out[f"sensitivity_{label}"] = _safe_div(tp[..., i], tp[..., i] + fn[..., i])
+        out[f"specificity_{label}"] = _safe_div(tn[..., i], tn[..., i] + fp[..., i])
+        out[f"ppv_{label}"] = _safe_div(tp[..., i], tp[..., i] + fp[..., i])
+        out[f"npv_{label}"] = _safe_div(tn[..., i], tn[..., i] + fn[..., i])
+    return out
+
+
+def _draw_indices(
+    rng: np.random.Generator,
+    n_rep: int,
+    n: int,
+    strata: Optional[List[np.ndarray]],
+) -> np.ndarray:
+    """(n_rep, n) resample indices; with strata, each stratum keeps its size."""
+    if strata is None:
+        return rng.integers(0, n, size=(n_rep, n))
+    parts = [members[rng.integers(0, len(members), size=(n_rep, len(members)))] for members in strata]
+    return np.concatenate(parts, axis=1)
+
+
+def replicate_confusion_matrices(
+    codes: np.ndarray,
+    n_classes: int,
+    n_bootstrap: int,
+    seed=None,
+    stratify: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Bootstrap confusion matrices (n_bootstrap, K, K) from combined codes
+    (true * K + pred). Indices are drawn in chunks of at most MAX_INDEX_ELEMENTS.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    n = len(codes)
+    k2 = n_classes * n_classes
+    rng = np.random.default_rng(seed)
+    strata = None
+    if stratify is not None:
+        strata = [np.flatnonzero(stratify == s) for s in np.unique(stratify)]
+    out = np.empty((n_bootstrap, n_classes, n_classes), dtype=np.int64)
+    chunk = max(1, min(n_bootstrap, MAX_INDEX_ELEMENTS // max(n, 1)))
+    for start in range(0, n_bootstrap, chunk):
+        c = min(chunk, n_bootstrap - start)
+        idx = _draw_indices(rng, c, n, strata)
+        combined = codes[idx] + (np.arange(c, dtype=np.int64) * k2)[:, None]
+        out[start:start + c] = np.bincount(combined.ravel(), minlength=c * k2).reshape(c, n_classes, n_classes)
+    return out
+
+
+def bootstrap_confusion_matrices(
+    y_true: np.ndarray,
+    y_pred: np.ndarray,
+    n_classes: int,
+    n_bootstrap: int = 1000,
+    random_state: Optional[int] = None,
+    stratified: bool = False,
+    n_jobs: int = 1,
+) -> np.ndarray:
+    """
+    (n_bootstrap, K, K) replicate confusion matrices. n_jobs > 1 splits the
+    replicates over a process pool with independent child seeds (results are
+    reproducible for a fixed random_state and n_jobs).
+    """
+    codes = np.asarray(y_true, dtype=np.int64) * n_classes + np.asarray(y_pred, dtype=np.int64)
+    stratify = np.asarray(y_true) if stratified else None
+    if n_jobs <= 1 or n_bootstrap < 2 * n_jobs:
+        return replicate_confusion_matrices(codes, n_classes, n_bootstrap, random_state, stratify)
+    seeds = np.random.SeedSequence(random_state).spawn(n_jobs)
+    sizes = [len(part) for part in np.array_split(np.arange(n_bootstrap), n_jobs)]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        parts = pool.map(
+            replicate_confusion_matrices,
+            [codes] * n_jobs,
+            [n_classes] * n_jobs,
+            sizes,
+            seeds,
+            [stratify] * n_jobs,
+        )
+        return np.concatenate(list(parts), axis=0)
+
+
+def _jackknife_values(cm: np.ndarray, metric_fn) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Leave-one-out metric values. Removing a sample only changes one cell, so
+    there is one jackknife matrix per non-empty cell, weighted by its count.
+    """
+    k = cm.shape[0]
+    cells = np.flatnonzero(cm.ravel())
+    loo = np.repeat(cm[None], len(cells), axis=0).reshape(len(cells), k * k)
+    loo[np.arange(len(cells)), cells] -= 1
+    return metric_fn(loo.reshape(len(cells), k, k)), cm.ravel()[cells].astype(np.float64)
+
+
+def confidence_intervals(
+    cm: np.ndarray,
+    replicate_cms: np.ndarray,
+    labels: Sequence[str],
+    positive: Sequence[int] = (3,),
+    confidence: float = 0.95,
+    method: str = "percentile",
+) -> Dict[str, Tuple[float, float, float]]:
+    """
+    (point, lower, upper) for every metric in confusion_metrics, from one set
+    of replicate matrices. method: "percentile" or "bca" (bias-corrected and
+    accelerated; acceleration from the exact jackknife).
+    """
+    def metric_fn(m):
+        return confusion_metrics(m, labels, positive)
+
+    point = metric_fn(cm)
+    reps = metric_fn(replicate_cms)
+    names = list(point)
+    boot = np.stack([reps[name] for name in names])  # (M, B)
+    theta = np.array([float(point[name]) for name in names])
+    alpha = 1 - confidence
+
+    if method == "percentile":
+        lo_q = np.full(len(names), alpha / 2)
+        hi_q = np.full(len(names), 1 - alpha / 2)
+    elif method == "bca":
+        b = boot.shape[1]
+        prop = (boot < theta[:, None]).mean(axis=1) + 0.5 * (boot == theta[:, None]).mean(axis=1)
+        z0 = stats.norm.ppf(np.clip(prop, 1.0 / (b + 1), b / (b + 1.0)))
+        jack, weights = _jackknife_values(np.asarray(cm), metric_fn)
+        jv = np.stack([jack[name] for name in names])  # (M, cells)
+        mean = (jv * weights).sum(axis=1) / weights.sum()
+        d = mean[:, None] - jv
+        num = (weights * d ** 3).sum(axis=1)
+        den = 6.0 * ((weights * d ** 2).sum(axis=1)) ** 1.5
+        a = _safe_div(num, den)
+        z = stats.norm.ppf([alpha / 2, 1 - alpha / 2])
+        adj = [stats.norm.cdf(z0 + (z0 + zq) / (1 - a * (z0 + zq))) for zq in z]
+        lo_q, hi_q = adj[0], adj[1]
+    else:
+        raise ValueError(f"Unknown CI method: {method!r} (use 'percentile' or 'bca')")
+
+    lower = np.array([np.quantile(boot[i], lo_q[i]) for i in range(len(names))])
+    upper = np.array([np.quantile(boot[i], hi_q[i]) for i in range(len(names))])
+    return {name: (float(theta[i]), float(lower[i]), float(upper[i])) for i, name in enumerate(names)}
@@ -21,6 +21,8 @@ from sklearn.metrics import (
     cohen_kappa_score,
 )
 
+from .bootstrap import bootstrap_confusion_matrices, confidence_intervals
+
 RISK_LABELS = ["on_track", "monitor", "discuss", "refer"]
 RISK_ORDER = {r: i for i, r in enumerate(RISK_LABELS)}
 
@@ -148,6 +150,10 @@ class ClinicalMetrics:
         """
         Bootstrap 95% CI for a scalar metric.
         Returns (point_estimate, lower_ci, upper_ci).
+
+        Generic (any metric_func over a ClinicalMetrics), so it rebuilds one
+        object per replicate; for confusion-matrix metrics use the vectorized
+        bootstrap_metric_cis instead.
         """
         rng = np.random.default_rng(random_state)
         n = len(self.y_true)
@@ -165,6 +171,40 @@ class ClinicalMetrics:
         point = metric_func(self)
         return float(point), float(lower), float(upper)
 
+    def bootstrap_metric_cis(
+        self,
+        n_bootstrap: int = 1000,
+        confidence: float = 0.95,
+        method: str = "percentile",
+        stratified: bool = False,
+        random_state: Optional[int] = None,
+        n_jobs: int = 1,
+        positive_classes: Optional[List[str]] = None,
+    ) -> Dict[str, Tuple[float, float, float]]:
+        """
+        Vectorized bootstrap CIs for every confusion-matrix metric in one pass:
+        binary (refer) sensitivity/specificity/ppv/npv plus per-class
+        one-vs-rest values ("sensitivity_refer", "ppv_monitor", ...).
+
+        method: "percentile" or "bca". stratified resamples within each true
+        class. n_jobs > 1 spreads replicates over a process pool.
+        Returns name -> (point_estimate, lower_ci, upper_ci).
+        """
+        pos = positive_classes or ["refer"]
+        positive = [self.labels.index(p) for p in pos if p in self.labels]
+        k = len(self.labels)
+        reps = bootstrap_confusion_matrices(
+            self.y_true, self.y_pred, k,
+            n_bootstrap=n_bootstrap,
+            random_state=random_state,
+            stratified=stratified,
+            n_jobs=n_jobs,
+        )
+        return confidence_intervals(
+            self.confusion_matrix, reps, self.labels,
+            positive=positive, confidence=confidence, method=method,
+        )
+
     def auc_roc(self) -> float:
         """AUC-ROC for binary (refer vs non-refer) or multiclass."""
         if self.y_scores is None:
@@ -186,8 +226,12 @@ class ClinicalMetrics:
         self,
         n_bootstrap: int = 1000,
         include_ci: bool = True,
+        ci_method: str = "percentile",
+        stratified: bool = False,
+        random_state: Optional[int] = None,
+        n_jobs: int = 1,
     ) -> Dict:
-        """Compute full metric suite with optional CIs."""
+        """Compute full metric suite with optional CIs (one vectorized bootstrap pass)."""
         binary = self.binary_sensitivity_specificity(positive_classes=["refer"])
         out = {
             "sensitivity": binary["sensitivity"],
@@ -204,14 +248,16 @@ class ClinicalMetrics:
             out["auc_roc"] = self.auc_roc()
 
         if include_ci and n_bootstrap > 0:
-            def sens(m):
-                return m.binary_sensitivity_specificity()["sensitivity"]
-            def spec(m):
-                return m.binary_sensitivity_specificity()["specificity"]
-            _, s_lo, s_hi = self.bootstrap_ci(sens, n_bootstrap=n_bootstrap)
-            _, p_lo, p_hi = self.bootstrap_ci(spec, n_bootstrap=n_bootstrap)
-            out["sensitivity_ci_95"] = [s_lo, s_hi]
-            out["specificity_ci_95"] = [p_lo, p_hi]
+            cis = self.bootstrap_metric_cis(
+                n_bootstrap=n_bootstrap,
+                method=ci_method,
+                stratified=stratified,
+                random_state=random_state,
+                n_jobs=n_jobs,
+            )
+            out["sensitivity_ci_95"] = list(cis["sensitivity"][1:])
+            out["specificity_ci_95"] = list(cis["specificity"][1:])
+            out["ci_95"] = {name: [lo, hi] for name, (_, lo, hi) in cis.items()}
 
         return out
 
@@ -234,4 +280,5 @@ class ClinicalMetrics:
         }
         if self.y_scores is not None:
             gates["auc_roc"] = self.auc_roc() >= targets["auc_roc_min"]
-        return gates
+        # numpy comparisons yield np.bool_, which json cannot serialize
+        return {name: bool(passed) for name, passed in gates.items()}
@@ -137,8 +137,8 @@ class SafetyMetrics:
         fnr = fn_analysis["false_negative_rate"]
         high_risk_fn = self.false_on_track_for_refer()
         return {
-            "false_negative_rate": fnr <= targets["fnr_max"],
-            "high_risk_fn_count": high_risk_fn <= targets["high_risk_fn_max"],
+            "false_negative_rate": bool(fnr <= targets["fnr_max"]),
+            "high_risk_fn_count": bool(high_risk_fn <= targets["high_risk_fn_max"]),
         }
 
 
@@ -1,5 +1,6 @@
 # telemetry_service/app/celery_app.py
 from celery import Celery
+from celery.schedules import crontab
 from .config import settings
 
 celery_app = Celery(
@@ -14,4 +15,14 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    beat_schedule={
+        "rollup-telemetry": {
+            "task": "app.tasks.rollup_telemetry",
+            "schedule": 300.0,
+        },
+        "reconcile-rollup-yesterday": {
+            "task": "app.tasks.reconcile_rollup_day",
+            "schedule": crontab(hour=0, minute=30),
+        },
+    },
 )
@@ -1,9 +1,9 @@
 # telemetry_service/app/crud.py
 import logging
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time, timedelta, timezone
 
 import sqlalchemy as sa
-from sqlalchemy import select, func, and_, cast, case
+from sqlalchemy import select, func, and_, case
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import models
@@ -35,89 +35,300 @@ async def create_event(session: AsyncSession, ev: dict):
     return db
 
 
-async def get_overview(session: AsyncSession, days: int = 7):
-    now = datetime.utcnow()
-    start = now - timedelta(days=days)
-    total_q = await session.execute(
-        select(func.count(models.TelemetryEvent.id)).where(
-            models.TelemetryEvent.timestamp >= start
+ROLLUP_WATERMARK = "telemetry_rollups"
+
+
+def _naive_utc(dt: datetime | None) -> datetime | None:
+    """Normalize DB timestamps (aware on Postgres, naive on SQLite) to naive UTC."""
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _floor_hour(dt: datetime) -> datetime:
+    return dt.replace(minute=0, second=0, microsecond=0)
+
+
+def _empty_stats() -> dict:
+    return {
+        "calls": 0,
+        "error_count": 0,
+        "fallback_count": 0,
+        "latency_count": 0,
+        "latency_sum_ms": 0,
+        "latency_buckets": [0] * (len(models.LATENCY_BUCKETS_MS) + 1),
+        "cost_usd": 0.0,
+        "last_event_at": None,
+    }
+
+
+def _merge_stats(into: dict, other: dict) -> dict:
+    for k in ("calls", "error_count", "fallback_count", "latency_count", "latency_sum_ms", "cost_usd"):
+        into[k] += other[k] or 0
+    buckets = other.get("latency_buckets") or []
+    for i, n in enumerate(buckets[: len(into["latency_buckets"])]):
+        into["latency_buckets"][i] += n or 0
+    last = _naive_utc(other.get("last_event_at"))
+    if last is not None and (into["last_event_at"] is None or last > into["last_event_at"]):
+        into["last_event_at"] = last
+    return into
+
+
+def _percentile_from_buckets(buckets: list, q: float) -> int | None:
+    """Upper bound (ms) of the histogram bucket containing the q-th quantile."""
+    total = sum(buckets)
+    if not total:
+        return None
+    target = q * total
+    seen = 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if seen >= target:
+            if i < len(models.LATENCY_BUCKETS_MS):
+                return models.LATENCY_BUCKETS_MS[i]
+            return models.LATENCY_BUCKETS_MS[-1]
+    return models.LATENCY_BUCKETS_MS[-1]
+
+
+async def _aggregate_raw(
+    session: AsyncSession, start: datetime, end: datetime | None
+) -> dict:
+    """GROUP BY (org, model) over raw events in [start, end), computed in SQL.
+
+    end=None leaves the range open so events stamped slightly ahead of the
+    API clock still show up in the live tail.
+
+    Returns {(org_id, model_id): stats}; NULL ids are mapped to "".
+    """
+    ev = models.TelemetryEvent
+    latency = ev.latency_ms
+    bounds = models.LATENCY_BUCKETS_MS
+    bucket_cols = []
+    for i, upper in enumerate(bounds):
+        cond = latency <= upper if i == 0 else and_(latency > bounds[i - 1], latency <= upper)
+        bucket_cols.append(func.sum(case((cond, 1), else_=0)))
+    bucket_cols.append(func.sum(case((latency > bounds[-1], 1), else_=0)))
+
+    cond = ev.timestamp >= start
+    if end is not None:
+        cond = and_(cond, ev.timestamp < end)
+    q = (
+        select(
+            ev.org_id,
+            ev.model_id,
+            func.count(ev.id),
+            func.sum(case((ev.error_flag == True, 1), else_=0)),  # noqa: E712
+            func.sum(case((ev.fallback_to.isnot(None), 1), else_=0)),
+            func.count(latency),
+            func.coalesce(func.sum(latency), 0),
+            func.coalesce(func.sum(ev.raw_json["cost_estimate_usd"].as_float()), 0.0),
+            func.max(ev.timestamp),
+            *bucket_cols,
         )
+        .where(cond)
+        .group_by(ev.org_id, ev.model_id)
     )
-    total = total_q.scalar() or 0
+    res = await session.execute(q)
+    out = {}
+    for r in res.all():
+        out[(r[0] or "", r[1] or "")] = {
+            "calls": int(r[2] or 0),
+            "error_count": int(r[3] or 0),
+            "fallback_count": int(r[4] or 0),
+            "latency_count": int(r[5] or 0),
+            "latency_sum_ms": int(r[6] or 0),
+            "cost_usd": float(r[7] or 0.0),
+            "last_event_at": _naive_utc(r[8]),
+            "latency_buckets": [int(n or 0) for n in r[9:]],
+        }
+    return out
 
-    # Single pass over events for last_used and aggregates
-    events_q = await session.execute(
-        select(models.TelemetryEvent).where(
-            models.TelemetryEvent.timestamp >= start
-        )
+
+async def get_rollup_watermark(session: AsyncSession) -> datetime | None:
+    row = await session.get(models.RollupWatermark, ROLLUP_WATERMARK)
+    return _naive_utc(row.rolled_through) if row else None
+
+
+async def _upsert_rollups(session: AsyncSession, day: date, stats: dict) -> None:
+    if not stats:
+        return
+    existing_q = await session.execute(
+        select(models.TelemetryRollup).where(models.TelemetryRollup.day == day)
     )
-    events = events_q.scalars().all()
-    success_count = sum(1 for e in events if not e.error_flag)
-    error_count = sum(1 for e in events if e.error_flag)
-    fallback_count = sum(1 for e in events if e.fallback_to is not None)
-    latencies = [e.latency_ms for e in events if e.latency_ms is not None]
-    avg_latency_ms = round(sum(latencies) / len(latencies)) if latencies else 0
-    total_cost_usd = 0.0
-    for e in events:
-        if e.raw_json and isinstance(e.raw_json, dict):
-            total_cost_usd += float(e.raw_json.get("cost_estimate_usd") or 0)
-    total_cost_usd = round(total_cost_usd * 1_000_000) / 1_000_000
-    last_used = events[-1].timestamp if events else None
-    five_min_ago = now - timedelta(minutes=5)
-    active_connection = any(e.timestamp >= five_min_ago for e in events)
-
-    top_q = await session.execute(
-        select(
-            models.TelemetryEvent.model_id,
-            func.count(models.TelemetryEvent.id).label("calls"),
+    existing = {(r.org_id, r.model_id): r for r in existing_q.scalars().all()}
+    for (org_id, model_id), s in stats.items():
+        row = existing.get((org_id, model_id))
+        if row is None:
+            row = models.TelemetryRollup(day=day, org_id=org_id, model_id=model_id)
+            session.add(row)
+            current = _empty_stats()
+        else:
+            current = _merge_stats(_empty_stats(), {
+                "calls": row.calls,
+                "error_count": row.error_count,
+                "fallback_count": row.fallback_count,
+                "latency_count": row.latency_count,
+                "latency_sum_ms": row.latency_sum_ms,
+                "latency_buckets": row.latency_buckets,
+                "cost_usd": row.cost_usd,
+                "last_event_at": row.last_event_at,
+            })
+        _merge_stats(current, s)
+        row.calls = current["calls"]
+        row.error_count = current["error_count"]
+        row.fallback_count = current["fallback_count"]
+        row.latency_count = current["latency_count"]
+        row.latency_sum_ms = current["latency_sum_ms"]
+        # Reassign (not mutate) so the JSON column is marked dirty
+        row.latency_buckets = list(current["latency_buckets"])
+        row.cost_usd = current["cost_usd"]
+        row.last_event_at = current["last_event_at"]
+    await session.flush()
+
+
+async def advance_rollup(
+    session: AsyncSession, now: datetime | None = None, max_hours: int = 48
+) -> int:
+    """Fold every complete hour since the watermark into telemetry_rollups.
+
+    Each hour is aggregated in SQL and added to its day's rows; the watermark
+    moves in the same transaction, so re-running after a crash never double
+    counts. Caller commits. Returns the number of hours rolled.
+    """
+    now = now or datetime.utcnow()
+    limit = _floor_hour(now)
+    wm_row = await session.get(
+        models.RollupWatermark, ROLLUP_WATERMARK, with_for_update=True
+    )
+    if wm_row is None:
+        first_q = await session.execute(select(func.min(models.TelemetryEvent.timestamp)))
+        first = _naive_utc(first_q.scalar())
+        wm_row = models.RollupWatermark(
+            name=ROLLUP_WATERMARK,
+            rolled_through=_floor_hour(first) if first else limit,
         )
-        .where(models.TelemetryEvent.timestamp >= start)
-        .group_by(models.TelemetryEvent.model_id)
-        .order_by(func.count(models.TelemetryEvent.id).desc())
-        .limit(1)
+        session.add(wm_row)
+    hour = _naive_utc(wm_row.rolled_through)
+    rolled = 0
+    while hour < limit and rolled < max_hours:
+        nxt = hour + timedelta(hours=1)
+        await _upsert_rollups(session, hour.date(), await _aggregate_raw(session, hour, nxt))
+        hour = nxt
+        rolled += 1
+    wm_row.rolled_through = hour
+    await session.flush()
+    return rolled
+
+
+async def rebuild_rollup_day(session: AsyncSession, day: date) -> int:
+    """Recompute one day's rollups from raw events (picks up late arrivals).
+
+    Only the part of the day below the watermark is rebuilt; the rest belongs
+    to the raw tail until advance_rollup reaches it. The watermark row is
+    locked like in advance_rollup, so a concurrent roll cannot move it (and
+    re-add this day's hours) between the delete and the rebuild. Caller commits.
+    """
+    wm_row = await session.get(
+        models.RollupWatermark, ROLLUP_WATERMARK, with_for_update=True
     )
-    top = top_q.first()
-    top_model = {"model_id": top[0], "calls": top[1]} if top else None
+    wm = _naive_utc(wm_row.rolled_through) if wm_row else None
+    day_start = datetime.combine(day, time.min)
+    end = min(day_start + timedelta(days=1), wm) if wm else None
+    await session.execute(
+        sa.delete(models.TelemetryRollup).where(models.TelemetryRollup.day == day)
+    )
+    if end is None or end <= day_start:
+        await session.flush()
+        return 0
+    stats = await _aggregate_raw(session, day_start, end)
+    await _upsert_rollups(session, day, stats)
+    return len(stats)
 
-    model_count_q = await session.execute(
-        select(func.count(func.distinct(models.TelemetryEvent.model_id))).where(
-            and_(
-                models.TelemetryEvent.timestamp >= start,
-                models.TelemetryEvent.model_id.isnot(None),
-            )
-        )
+
+async def _window_stats(session: AsyncSession, first_day: date, now: datetime) -> list:
+    """[(day, org_id, model_id, stats)] for first_day..now.
+
+    Sealed hours come from telemetry_rollups; only events at or after the
+    watermark (normally the partial current hour) are aggregated from raw rows.
+    """
+    rows_q = await session.execute(
+        select(models.TelemetryRollup).where(models.TelemetryRollup.day >= first_day)
+    )
+    out = []
+    for r in rows_q.scalars().all():
+        out.append((r.day, r.org_id, r.model_id, {
+            "calls": r.calls,
+            "error_count": r.error_count,
+            "fallback_count": r.fallback_count,
+            "latency_count": r.latency_count,
+            "latency_sum_ms": r.latency_sum_ms,
+            "latency_buckets": r.latency_buckets,
+            "cost_usd": r.cost_usd,
+            "last_event_at": r.last_event_at,
+        }))
+
+    window_start = datetime.combine(first_day, time.min)
+    wm = await get_rollup_watermark(session)
+    tail_start = max(window_start, wm) if wm else window_start
+    # Split the raw tail at midnights so every bucket maps to a single day
+    seg_start = tail_start
+    while True:
+        next_midnight = datetime.combine(seg_start.date() + timedelta(days=1), time.min)
+        seg_end = next_midnight if next_midnight <= now else None
+        for (org_id, model_id), s in (await _aggregate_raw(session, seg_start, seg_end)).items():
+            out.append((seg_start.date(), org_id, model_id, s))
+        if seg_end is None:
+            return out
+        seg_start = seg_end
+
+
+async def get_overview(session: AsyncSession, days: int = 7):
+    """Dashboard overview for the last `days` calendar days (UTC, today included)."""
+    now = datetime.utcnow()
+    first_day = now.date() - timedelta(days=days - 1)
+    window = await _window_stats(session, first_day, now)
+
+    totals = _empty_stats()
+    by_day = {}
+    by_model = {}
+    for day, _org_id, model_id, s in window:
+        _merge_stats(totals, s)
+        _merge_stats(by_day.setdefault(day, _empty_stats()), s)
+        by_model[model_id] = by_model.get(model_id, 0) + (s["calls"] or 0)
+
+    last_used = totals["last_event_at"]
+    active_connection = last_used is not None and last_used >= now - timedelta(minutes=5)
+    avg_latency_ms = (
+        round(totals["latency_sum_ms"] / totals["latency_count"]) if totals["latency_count"] else 0
     )
-    number_of_models = model_count_q.scalar() or 0
+    top_model = None
+    if by_model:
+        top_id, top_calls = max(by_model.items(), key=lambda kv: kv[1])
+        top_model = {"model_id": top_id or None, "calls": top_calls}
+    number_of_models = sum(1 for m, calls in by_model.items() if m and calls)
 
     series = []
     for i in range(days):
-        dstart = (start + timedelta(days=i)).date()
-        dend = dstart + timedelta(days=1)
-        day_events = [e for e in events if dstart <= e.timestamp.date() < dend]
-        calls = len(day_events)
-        errors = sum(1 for e in day_events if e.error_flag)
-        fallbacks = sum(1 for e in day_events if e.fallback_to is not None)
-        cost = 0.0
-        for e in day_events:
-            if e.raw_json and isinstance(e.raw_json, dict):
-                cost += float(e.raw_json.get("cost_estimate_usd") or 0)
+        d = first_day + timedelta(days=i)
+        s = by_day.get(d, _empty_stats())
         series.append({
-            "date": dstart.isoformat(),
-            "calls": calls,
-            "errors": errors,
-            "fallbacks": fallbacks,
-            "cost": round(cost * 1_000_000) / 1_000_000,
+            "date": d.isoformat(),
+            "calls": s["calls"],
+            "errors": s["error_count"],
+            "fallbacks": s["fallback_count"],
+            "cost": round(s["cost_usd"] * 1_000_000) / 1_000_000,
         })
 
     return {
         "active_connection": active_connection,
         "last_used": last_used,
-        "total_requests": int(total),
-        "success_count": success_count,
-        "error_count": error_count,
-        "fallback_count": fallback_count,
+        "total_requests": totals["calls"],
+        "success_count": totals["calls"] - totals["error_count"],
+        "error_count": totals["error_count"],
+        "fallback_count": totals["fallback_count"],
         "avg_latency_ms": avg_latency_ms,
-        "total_cost_usd": total_cost_usd,
+        "p95_latency_ms": _percentile_from_buckets(totals["latency_buckets"], 0.95),
+        "total_cost_usd": round(totals["cost_usd"] * 1_000_000) / 1_000_000,
         "number_of_models": number_of_models,
         "top_model": top_model,
         "timeseries": series,
@@ -128,34 +339,19 @@ async def get_model_aggregates(
     session: AsyncSession, days: int = 7, limit: int = 20
 ):
     now = datetime.utcnow()
-    start = now - timedelta(days=days)
-    q = (
-        select(
-            models.TelemetryEvent.model_id,
-            func.count(models.TelemetryEvent.id).label("calls"),
-            func.avg(models.TelemetryEvent.latency_ms).label("avg_latency_ms"),
-            func.avg(cast(models.TelemetryEvent.error_flag, sa.Integer)).label(
-                "error_rate"
-            ),
-            func.sum(case((models.TelemetryEvent.fallback_to.isnot(None), 1), else_=0)).label(  # noqa: E501
-                "fallback_count"
-            ),
-        )
-        .where(models.TelemetryEvent.timestamp >= start)
-        .group_by(models.TelemetryEvent.model_id)
-        .order_by(func.count(models.TelemetryEvent.id).desc())
-        .limit(limit)
-    )
-    res = await session.execute(q)
-    rows = res.all()
+    first_day = now.date() - timedelta(days=days - 1)
+    by_model = {}
+    for _day, _org_id, model_id, s in await _window_stats(session, first_day, now):
+        _merge_stats(by_model.setdefault(model_id, _empty_stats()), s)
+    ranked = sorted(by_model.items(), key=lambda kv: kv[1]["calls"], reverse=True)[:limit]
     out = []
-    for r in rows:
+    for model_id, s in ranked:
         out.append({
-            "model_id": r[0],
-            "calls": int(r[1]),
-            "avg_latency_ms": float(r[2] or 0),
-            "error_rate": round(float(r[3] or 0) * 100, 2),
-            "fallback_count": int(r[4] or 0),
+            "model_id": model_id or None,
+            "calls": s["calls"],
+            "avg_latency_ms": float(s["latency_sum_ms"] / s["latency_count"]) if s["latency_count"] else 0.0,
+            "error_rate": round(s["error_count"] / s["calls"] * 100, 2) if s["calls"] else 0.0,
+            "fallback_count": s["fallback_count"],
         })
     return out
 
@@ -40,3 +40,40 @@ class DailyAggregate(Base):
     fallback_count = sa.Column(sa.Integer, nullable=True)
     psi = sa.Column(sa.Float, nullable=True)
     created_at = sa.Column(sa.DateTime(timezone=True), server_default=sa.func.now())
+
+
+# Upper bounds (ms) of the latency histogram kept per rollup row; the last
+# bucket counts everything above the final bound.
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class TelemetryRollup(Base):
+    """Pre-rolled daily counters per (day, org, model), maintained by Celery.
+
+    NULL org/model ids are stored as "" so the composite key stays unique.
+    """
+    __tablename__ = "telemetry_rollups"
+    id = sa.Column(sa.Integer, primary_key=True)
+    day = sa.Column(sa.Date, nullable=False)
+    org_id = sa.Column(sa.String(128), nullable=False, default="")
+    model_id = sa.Column(sa.String(256), nullable=False, default="")
+    calls = sa.Column(sa.Integer, nullable=False, default=0)
+    error_count = sa.Column(sa.Integer, nullable=False, default=0)
+    fallback_count = sa.Column(sa.Integer, nullable=False, default=0)
+    latency_count = sa.Column(sa.Integer, nullable=False, default=0)
+    latency_sum_ms = sa.Column(sa.BigInteger, nullable=False, default=0)
+    latency_buckets = sa.Column(sa.JSON, nullable=False, default=list)
+    cost_usd = sa.Column(sa.Float, nullable=False, default=0.0)
+    last_event_at = sa.Column(sa.DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        sa.UniqueConstraint("day", "org_id", "model_id", name="uq_telemetry_rollup_key"),
+        Index("ix_telemetry_rollup_day_model", "day", "model_id"),
+    )
+
+
+class RollupWatermark(Base):
+    """Exclusive upper bound of raw events already folded into telemetry_rollups."""
+    __tablename__ = "telemetry_rollup_watermark"
+    name = sa.Column(sa.String(64), primary_key=True)
+    rolled_through = sa.Column(sa.DateTime(timezone=True), nullable=False)
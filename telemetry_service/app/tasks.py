@@ -6,10 +6,9 @@ import logging
 from sqlalchemy import select, func, and_
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from celery import shared_task
-
+from .celery_app import celery_app
 from .config import settings
-from . import models
+from . import crud, models
 from .bigquery_client import bq_client
 from .telemetry.psi import calculate_psi
 
@@ -140,3 +139,38 @@ def compute_daily_aggregates(target_date_str: str = None):
     n = asyncio.run(_get_daily_aggregates_for_date(target_date))
     logger.info("Computed %d daily aggregates for %s", n, target_date)
     return {"date": target_date.isoformat(), "aggregates_count": n}
+
+
+async def _advance_rollup() -> int:
+    async with _AsyncSession() as session:
+        n = await crud.advance_rollup(session)
+        await session.commit()
+        return n
+
+
+async def _rebuild_rollup_day(target_date: date) -> int:
+    async with _AsyncSession() as session:
+        n = await crud.rebuild_rollup_day(session, target_date)
+        await session.commit()
+        return n
+
+
+@celery_app.task(name="app.tasks.rollup_telemetry")
+def rollup_telemetry():
+    """Fold completed hours of raw events into telemetry_rollups (run every few minutes)."""
+    n = asyncio.run(_advance_rollup())
+    if n:
+        logger.info("Rolled up %d hour(s) of telemetry", n)
+    return {"hours_rolled": n}
+
+
+@celery_app.task(name="app.tasks.reconcile_rollup_day")
+def reconcile_rollup_day(target_date_str: str = None):
+    """Rebuild one day's rollups from raw events to absorb late arrivals (default: yesterday)."""
+    if target_date_str:
+        target_date = date.fromisoformat(target_date_str)
+    else:
+        target_date = date.today() - timedelta(days=1)
+    n = asyncio.run(_rebuild_rollup_day(target_date))
+    logger.info("Rebuilt %d rollup rows for %s", n, target_date)
+    return {"date": target_date.isoformat(), "rollup_rows": n}
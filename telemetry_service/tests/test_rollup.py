@@ -0,0 +1,111 @@
+# telemetry_service/tests/test_rollup.py
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+
+pytest.importorskip("aiosqlite")
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+
+
+@pytest_asyncio.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    maker = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with maker() as s:
+        yield s
+    await engine.dispose()
+
+
+async def _add(session, i, ts, model_id="medgemma", status=200, latency=120, cost=0.01, fallback=None):
+    session.add(models.TelemetryEvent(
+        event_id=f"ev-{i}",
+        timestamp=ts,
+        org_id="org-1",
+        model_id=model_id,
+        latency_ms=latency,
+        status_code=status,
+        error_flag=status >= 300,
+        fallback_to=fallback,
+        raw_json={"event_id": f"ev-{i}", "cost_estimate_usd": cost},
+    ))
+    await session.flush()
+
+
+async def _seed(session, now=None):
+    now = now or datetime.utcnow()
+    hour = now.replace(minute=0, second=0, microsecond=0)
+    await _add(session, 1, hour - timedelta(days=1, minutes=-5))
+    await _add(session, 2, hour - timedelta(hours=2), status=500, latency=3000)
+    await _add(session, 3, hour - timedelta(hours=2), model_id="baseline", fallback="baseline")
+    # Partial current hour: only reachable through the raw tail
+    await _add(session, 4, now - timedelta(seconds=1), latency=40)
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_overview_matches_with_and_without_rollup(session):
+    await _seed(session)
+    raw_only = await crud.get_overview(session, days=7)
+
+    rolled = await crud.advance_rollup(session)
+    await session.commit()
+    assert rolled >= 2
+    assert await crud.get_rollup_watermark(session) is not None
+
+    from_rollup = await crud.get_overview(session, days=7)
+    for key in ("total_requests", "error_count", "fallback_count", "avg_latency_ms", "total_cost_usd", "number_of_models", "top_model", "timeseries"):
+        assert from_rollup[key] == raw_only[key], key
+    assert from_rollup["total_requests"] == 4
+    assert from_rollup["error_count"] == 1
+    assert from_rollup["fallback_count"] == 1
+    assert from_rollup["total_cost_usd"] == pytest.approx(0.04)
+    assert from_rollup["top_model"] == {"model_id": "medgemma", "calls": 3}
+    assert from_rollup["active_connection"] is True
+    assert sum(d["calls"] for d in from_rollup["timeseries"]) == 4
+
+
+@pytest.mark.asyncio
+async def test_advance_rollup_is_idempotent(session):
+    await _seed(session)
+    await crud.advance_rollup(session)
+    await session.commit()
+    assert await crud.advance_rollup(session) == 0
+    await session.commit()
+    aggs = await crud.get_model_aggregates(session, days=7)
+    by_model = {a["model_id"]: a for a in aggs}
+    assert by_model["medgemma"]["calls"] == 3
+    assert by_model["medgemma"]["error_rate"] == pytest.approx(33.33)
+    assert by_model["baseline"]["fallback_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_rebuild_rollup_day_absorbs_late_events(session):
+    # Noon yesterday: the late event three hours earlier is on the same day
+    now = (datetime.utcnow() - timedelta(days=1)).replace(hour=12, minute=30, second=0, microsecond=0)
+    await _seed(session, now)
+    await crud.advance_rollup(session, now=now)
+    await session.commit()
+    late_ts = now.replace(minute=0) - timedelta(hours=3)
+    await _add(session, 5, late_ts)
+    await session.commit()
+    before = (await crud.get_overview(session, days=7))["total_requests"]
+    await crud.rebuild_rollup_day(session, late_ts.date())
+    await session.commit()
+    after = (await crud.get_overview(session, days=7))["total_requests"]
+    assert after == before + 1
+
+
+def test_percentile_from_buckets():
+    buckets = [0] * (len(models.LATENCY_BUCKETS_MS) + 1)
+    buckets[1] = 90
+    buckets[4] = 10
+    assert crud._percentile_from_buckets(buckets, 0.5) == 100
+    assert crud._percentile_from_buckets(buckets, 0.95) == 1000
+    assert crud._percentile_from_buckets([0] * len(buckets), 0.95) is None
@@ -0,0 +1,151 @@
+# tests/test_agent_orchestrator.py
+"""CentralOrchestrator dependency-graph execution: concurrency, deterministic merge, timeouts, failure paths."""
+import asyncio
+import json
+import time
+
+import pytest
+
+from agent_system.orchestrator import core
+from agent_system.orchestrator.core import CentralOrchestrator
+from agent_system.orchestrator.graph import AgentNode, validate_graph
+from agent_system.schemas.models import AgentResponse, CaseInputs, CasePayload, ImageInput
+
+
+class SlowAgent:
+    """Wraps a real agent and delays its response; records start order."""
+
+    def __init__(self, agent, delay: float, started: list):
+        self._agent = agent
+        self._delay = delay
+        self._started = started
+        self.name = agent.name
+
+    async def process(self, payload):
+        self._started.append(self.name)
+        await asyncio.sleep(self._delay)
+        return await self._agent.process(payload)
+
+
+def _payload(case_id="case_123"):
+    return CasePayload(
+        case_id=case_id,
+        client_version="0.1.0",
+        consent_id="consent_abc",
+        age_months=24,
+        inputs=CaseInputs(images=[
+            ImageInput(id="img_1", uri="gs://b/1.jpg", capture_ts="2026-02-03T10:00:00"),
+            ImageInput(id="img_2", uri="gs://b/2.jpg", capture_ts="2026-02-03T11:00:00"),
+        ]),
+    )
+
+
+@pytest.fixture
+def orchestrator(monkeypatch, tmp_path):
+    # AuditAgent/RetrieverAgent write under ./infra
+    monkeypatch.chdir(tmp_path)
+    orch = CentralOrchestrator()
+    # Keep MedGemmaAgent off the network: point it at a closed port
+    orch.agents["medgemma"].api_url = "http://127.0.0.1:9/analyze"
+    return orch
+
+
+def _slow(orch, delays):
+    started = []
+    for key, delay in delays.items():
+        orch.agents[key] = SlowAgent(orch.agents[key], delay, started)
+    return started
+
+
+def test_independent_agents_run_concurrently(orchestrator):
+    _slow(orchestrator, {"temporal": 0.2, "vision_qa": 0.2, "retriever": 0.2, "metrics": 0.2})
+    t0 = time.perf_counter()
+    result = asyncio.run(orchestrator.run_workflow(_payload()))
+    elapsed = time.perf_counter() - t0
+
+    assert result.status == "completed"
+    # Two 0.2s stages, not four sequential agents
+    assert elapsed < 0.7
+    m = result.metrics
+    assert set(m["agent_latency_ms"]) == set(orchestrator.agents)
+    assert m["serial_latency_ms"] >= 800
+    assert m["critical_path"][:3] == ["intake", "edge", "embedding"]
+    assert m["critical_path"][-2:] == ["metrics", "audit"]
+    assert m["critical_path_ms"] < m["serial_latency_ms"]
+    assert "technical" in m  # MetricsAgent output still merged
+
+
+def test_merge_order_is_deterministic(orchestrator):
+    # Retriever finishes first, but commits (logs, features) follow declaration order
+    _slow(orchestrator, {"temporal": 0.15, "vision_qa": 0.1, "retriever": 0.0})
+    result = asyncio.run(orchestrator.run_workflow(_payload()))
+    agents = [log["agent"] for log in result.logs]
+    assert agents[:9] == [
+        "IntakeAgent", "EdgeAgent", "EmbeddingAgent", "TemporalAgent", "VisionQA_Agent",
+        "RetrieverAgent", "MedGemmaAgent", "SafetyAgent", "ParentCommunicationAgent",
+    ]
+    assert agents[9:] == ["MetricsAgent", "AuditAgent"]
+    assert list(result.features)[:1] == ["pincer_present"]
+    assert list(result.features)[-1] == "retrieval_examples"
+
+
+def test_agent_timeout_fails_the_case(orchestrator, monkeypatch):
+    workflow = [AgentNode(n.key, n.deps, 0.05 if n.key == "vision_qa" else n.timeout_s, n.optional) for n in core.WORKFLOW]
+    monkeypatch.setattr(core, "WORKFLOW", workflow)
+    _slow(orchestrator, {"vision_qa": 1.0})
+    result = asyncio.run(orchestrator.run_workflow(_payload()))
+    assert result.status == "failed"
+    failed = [log for log in result.logs if not log["success"]]
+    assert failed[0]["agent"] == "VisionQA_Agent" and "timed out" in failed[0]["message"]
+    assert result.medgemma_output is None
+
+
+def test_safety_failure_still_runs_sinks(orchestrator):
+    class UnsafeAgent:
+        name = "SafetyAgent"
+
+        async def process(self, payload):
+            return AgentResponse(success=False, error="Safety violation: Banned phrase 'diagnose' detected.")
+
+    orchestrator.agents["safety"] = UnsafeAgent()
+    result = asyncio.run(orchestrator.run_workflow(_payload()))
+    assert result.status == "failed"
+    assert result.metrics["safety_violation"] is True
+    assert result.parent_communication is None
+    assert {"MetricsAgent", "AuditAgent"} <= {log["agent"] for log in result.logs}
+
+
+def test_optional_edge_failure_does_not_stop_the_case(orchestrator):
+    class BrokenEdge:
+        name = "EdgeAgent"
+
+        async def process(self, payload):
+            raise RuntimeError("TFLite runtime missing")
+
+    orchestrator.agents["edge"] = BrokenEdge()
+    result = asyncio.run(orchestrator.run_workflow(_payload()))
+    assert result.status == "completed"
+    assert len(result.embeddings) == 2  # cloud embeddings used instead
+
+
+def test_graph_must_be_declared_in_dependency_order():
+    validate_graph(core.WORKFLOW)
+    with pytest.raises(ValueError):
+        validate_graph([AgentNode("b", ("a",)), AgentNode("a")])
+
+
+def test_audit_sees_committed_metrics(orchestrator):
+    # Metrics finishes last if started alongside Audit; the dependency makes Audit wait
+    _slow(orchestrator, {"metrics": 0.1})
+    result = asyncio.run(orchestrator.run_workflow(_payload()))
+    entry = next(log for log in result.logs if log["agent"] == "AuditAgent")
+    assert entry["success"]
+    with open("infra/audit.log.jsonl", encoding="utf-8") as fh:
+        audit = json.loads(fh.readlines()[-1])
+    assert "technical" in audit["metrics"] and "MetricsAgent" in audit["agent_decisions"]
+
+
+def test_unregistered_graph_agent_is_rejected(monkeypatch):
+    monkeypatch.setattr(core, "SINKS", core.SINKS + [AgentNode("billing", ("audit",))])
+    with pytest.raises(ValueError, match="billing"):
+        CentralOrchestrator()
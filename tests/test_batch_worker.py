@@ -0,0 +1,122 @@
+# tests/test_batch_worker.py
+"""BatchWorker: batched XREADGROUP, pipelined XACK, XAUTOCLAIM retries and DLQ."""
+import asyncio
+import json
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from orchestrator.workers.base_worker import BatchWorker
+
+STREAM = "tasks:normal"
+
+
+async def _enqueue(r, n, start=0):
+    for i in range(start, start + n):
+        await r.xadd(STREAM, {"data": json.dumps({"task_id": f"t{i}", "payload": {}})})
+
+
+def _worker(r, fn, **kw):
+    kw.setdefault("claim_idle_ms", 0)
+    kw.setdefault("claim_interval_s", 0)
+    return BatchWorker(fn, consumer_id="w1", redis_client=r, streams=[STREAM], block_ms=10, **kw)
+
+
+def test_processes_batch_concurrently_and_acks():
+    async def scenario():
+        r = fakeredis.FakeAsyncRedis()
+        await _enqueue(r, 20)
+        active = peak = 0
+
+        async def fn(task):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return {"ok": task["task_id"]}
+
+        worker = _worker(r, fn, batch_size=8, concurrency=8)
+        await worker.run(max_iterations=10)
+        groups = await r.xinfo_groups(STREAM)
+        return peak, groups[0]["pending"], worker.stats.snapshot()[STREAM]
+
+    peak, pending, stats = asyncio.run(scenario())
+    assert peak == 8
+    assert pending == 0
+    assert stats["ok"] == 20
+
+
+def test_failed_task_is_retried_in_place_then_dead_lettered():
+    async def scenario():
+        r = fakeredis.FakeAsyncRedis()
+        await _enqueue(r, 1)
+        calls = []
+
+        def fn(task):  # sync process functions run in the executor
+            calls.append(task["task_id"])
+            raise RuntimeError("agent down")
+
+        worker = _worker(r, fn, max_retries=2)
+        await worker.run(max_iterations=6)
+        dlq = await r.xrange("tasks:dlq")
+        return calls, dlq, await r.xlen(STREAM), (await r.xinfo_groups(STREAM))[0]["pending"]
+
+    calls, dlq, stream_len, pending = asyncio.run(scenario())
+    # One fresh delivery + two reclaims, then DLQ on the third failure beyond max_retries
+    assert calls == ["t0"] * 3
+    assert stream_len == 1  # no re-XADD copies
+    assert pending == 0
+    assert len(dlq) == 1
+    task = json.loads(dlq[0][1][b"data"])
+    assert task["meta"]["dlq_reason"] == "max_retries"
+    assert task["meta"]["retries"] == 3
+
+
+def test_reclaims_entries_from_dead_consumer():
+    async def scenario():
+        r = fakeredis.FakeAsyncRedis()
+        await r.xgroup_create(STREAM, "workers", id="0", mkstream=True)
+        await _enqueue(r, 3)
+        await r.xreadgroup("workers", "dead-consumer", {STREAM: ">"}, count=3)
+        seen = []
+
+        async def fn(task):
+            seen.append(task["task_id"])
+
+        worker = _worker(r, fn)
+        await worker.run(max_iterations=2)
+        return seen, (await r.xinfo_groups(STREAM))[0]["pending"], worker.stats.counts[STREAM]
+
+    seen, pending, counts = asyncio.run(scenario())
+    assert sorted(seen) == ["t0", "t1", "t2"]
+    assert pending == 0
+    assert counts["claimed"] == 3  # one per message, not per XAUTOCLAIM batch
+
+
+def test_read_never_exceeds_free_slots_across_streams():
+    streams = ["tasks:urgent", "tasks:high", "tasks:normal"]
+
+    async def scenario():
+        r = fakeredis.FakeAsyncRedis()
+        for stream in streams:
+            for i in range(4):
+                await r.xadd(stream, {"data": json.dumps({"task_id": f"{stream}-{i}", "payload": {}})})
+        release = asyncio.Event()
+
+        async def fn(task):
+            await release.wait()
+
+        worker = BatchWorker(fn, consumer_id="w1", redis_client=r, streams=streams, batch_size=8, concurrency=5)
+        await worker.ensure_groups()
+        scheduled = await worker.read_once(None)
+        inflight = sorted(stream for stream, _ in worker._inflight_ids)
+        release.set()
+        await worker.drain()
+        return scheduled, inflight
+
+    scheduled, inflight = asyncio.run(scenario())
+    assert scheduled == 5
+    # Higher-priority streams are read first; the rest stay in the streams
+    assert inflight == ["tasks:high"] + ["tasks:urgent"] * 4
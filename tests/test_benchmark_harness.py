@@ -0,0 +1,60 @@
+"""
+Model-in-the-loop benchmark harness: stub model server, per-stage timings, report comparison.
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from validation.benchmarks import harness  # noqa: E402
+from validation.benchmarks.stub_model_server import stub_output  # noqa: E402
+
+
+def test_stub_output_is_deterministic_canonical_block():
+    out = stub_output("prompt A")
+    assert out == stub_output("prompt A")
+    body = json.loads(out.split("===BEGIN_OUTPUT===")[1].split("===END_OUTPUT===")[0])
+    assert body["risk"] in harness.RISK_TO_CLASS
+
+
+def test_summary_and_comparison():
+    records = [
+        {"case_id": str(i), "latency_ms": float(i), "stage_ms": {"model": i / 2}, "risk": "monitor", "error": None}
+        for i in range(1, 101)
+    ]
+    records.append({"case_id": "x", "latency_ms": 1.0, "stage_ms": {}, "risk": None, "error": "RuntimeError: boom"})
+    report = harness.summarize(records, wall_s=2.0, config={"target": "api"})
+    assert report["schema"] == harness.BENCHMARK_SCHEMA
+    assert report["errors"] == 1 and report["throughput_rps"] == 50.0
+    assert report["latency_ms"]["p50"] == pytest.approx(50.5)
+    assert set(report["stages_ms"]) == {"model"}
+
+    slower = json.loads(json.dumps(report))
+    slower["latency_ms"]["p95"] *= 1.5
+    slower["throughput_rps"] = 40.0
+    rows = harness.compare_reports(slower, report)
+    bad = {r["metric"] for r in harness.regressions(rows, 10)}
+    assert bad == {"latency_ms.p95", "throughput_rps"}
+
+
+def test_run_benchmark_cli_replays_holdout(tmp_path):
+    proc = subprocess.run(
+        [
+            sys.executable, "validation/benchmarks/run_benchmark.py",
+            "--limit", "12", "--concurrency", "4", "--model-latency-ms", "5",
+            "--output-dir", str(tmp_path),
+        ],
+        cwd=ROOT, capture_output=True, text=True, timeout=90,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    perf = json.loads((tmp_path / "benchmark_perf.json").read_text())
+    assert perf["requests"] == 12 and perf["errors"] == 0
+    assert set(perf["stages_ms"]) == set(harness.STAGES)
+    assert perf["stages_ms"]["model"]["p50"] >= 5
+    assert (tmp_path / "validation_report.json").exists()
@@ -46,3 +46,72 @@ def test_embedding_saved_and_loaded(tmp_path):
     loaded = np.load(save_path)
     assert loaded.shape == emb.shape
     assert np.allclose(loaded, emb)
+
+
+def test_batch_mode_caches_and_reembeds_only_changed(tmp_path):
+    out = tmp_path / "synth"
+    synth_images.main(out_dir=str(out), n=4)
+    paths = embed.iter_image_paths(str(out))
+    assert len(paths) == 4
+    cache_dir = tmp_path / "cache"
+
+    done, embs, stats = embed.embed_paths(paths, dim=64, target_size=(64, 64), cache_dir=str(cache_dir), batch_size=3)
+    assert done == paths and embs.shape == (4, 64) and embs.dtype == np.float32
+    assert stats["embedded"] == 4 and stats["cache_hits"] == 0
+    for p, row in zip(paths, embs):
+        single = embed.extract_embedding_from_image_path(p, dim=64, target_size=(64, 64))
+        assert np.allclose(single[0], row)
+
+    # Change one image: only that one is recomputed; the rest come from the memory-mapped shard
+    Path(paths[1]).write_bytes(Path(paths[0]).read_bytes() + b"\0")
+    _, embs2, stats2 = embed.embed_paths(paths, dim=64, target_size=(64, 64), cache_dir=str(cache_dir), batch_size=3)
+    assert stats2["embedded"] == 1 and stats2["cache_hits"] == 3
+    assert np.allclose(embs2[[0, 2, 3]], embs[[0, 2, 3]])
+    assert not np.allclose(embs2[1], embs[1])
+    cache = embed.EmbeddingCache(str(cache_dir), 64)
+    assert len(cache) == 5 and (cache_dir / "embeddings.npy").exists()
+
+
+def test_interrupted_batch_run_keeps_flushed_progress(tmp_path, monkeypatch):
+    out = tmp_path / "synth"
+    synth_images.main(out_dir=str(out), n=5)
+    paths = embed.iter_image_paths(str(out))
+    cache_dir = tmp_path / "cache"
+    real_embed = embed.ImageEmbedder.embed
+    calls = []
+
+    def flaky_embed(self, images, raw):
+        calls.append(len(images))
+        if len(calls) == 4:
+            raise RuntimeError("killed")
+        return real_embed(self, images, raw)
+
+    monkeypatch.setattr(embed.ImageEmbedder, "embed", flaky_embed)
+    with pytest.raises(RuntimeError):
+        embed.embed_paths(paths, dim=64, target_size=(64, 64), cache_dir=str(cache_dir), batch_size=1, flush_every=2)
+    # The periodic flush (after batch 2) plus the one in `finally` cover all three finished batches
+    assert len(embed.EmbeddingCache(str(cache_dir), 64)) == 3
+
+
+def test_cache_grows_and_survives_reopen(tmp_path):
+    cache = embed.EmbeddingCache(str(tmp_path), 8)
+    rng = np.random.default_rng(0)
+    first = rng.normal(size=(1000, 8)).astype("float32")
+    cache.put_many([f"k{i}" for i in range(1000)], first)
+    second = rng.normal(size=(600, 8)).astype("float32")
+    cache.put_many([f"k{i}" for i in range(1000, 1600)], second)
+    cache.flush()
+    reopened = embed.EmbeddingCache(str(tmp_path), 8)
+    assert len(reopened) == 1600
+    assert np.allclose(reopened.get("k5"), first[5:6])
+    assert np.allclose(reopened.get("k1599"), second[-1:])
+    assert embed.EmbeddingCache(str(tmp_path), 16).get("k5") is None
+
+
+def test_manifest_input(tmp_path):
+    out = tmp_path / "synth"
+    synth_images.main(out_dir=str(out), n=2)
+    names = sorted(p.name for p in out.glob("*.png"))
+    manifest = tmp_path / "m.jsonl"
+    manifest.write_text("\n".join(f'{{"image_path": "synth/{n}"}}' for n in names) + "\n")
+    assert [Path(p).name for p in embed.iter_image_paths(str(manifest))] == names
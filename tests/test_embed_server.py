@@ -0,0 +1,118 @@
+"""MedSigLIP embed server: dynamic micro-batching and the /embed/batch endpoint."""
+import asyncio
+import base64
+import io
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("loguru")
+pytest.importorskip("multipart")
+os.environ.setdefault("USE_REAL_MEDSIGLIP", "0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from server import embed_server  # noqa: E402
+from server.embed_server import EmbedBatcher  # noqa: E402
+
+
+def _png(color) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 6), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def test_batcher_coalesces_concurrent_requests():
+    sizes = []
+
+    def embed_fn(images):
+        sizes.append(len(images))
+        return np.arange(len(images), dtype=np.float32).reshape(-1, 1), "v"
+
+    async def scenario():
+        b = EmbedBatcher(embed_fn=embed_fn, max_batch=4, max_wait_ms=50)
+        img = Image.new("RGB", (2, 2))
+        try:
+            return await asyncio.gather(*(b.submit(img, bytes([i])) for i in range(6))), b.stats()
+        finally:
+            await b.stop()
+
+    results, stats = asyncio.run(scenario())
+    assert sizes == [4, 2]
+    assert [float(r[0][0, 0]) for r in results] == [0, 1, 2, 3, 0, 1]
+    assert stats["batches"] == 2 and stats["images"] == 6
+
+
+def test_batcher_propagates_errors():
+    def embed_fn(images):
+        raise RuntimeError("oom")
+
+    async def scenario():
+        b = EmbedBatcher(embed_fn=embed_fn, max_batch=2, max_wait_ms=1)
+        try:
+            await b.submit(Image.new("RGB", (2, 2)), b"x")
+        finally:
+            await b.stop()
+
+    with pytest.raises(RuntimeError, match="oom"):
+        asyncio.run(scenario())
+
+
+def test_batcher_restart_keeps_queued_requests():
+    def embed_fn(images):
+        return np.ones((len(images), 1), dtype=np.float32), "v"
+
+    async def scenario():
+        b = EmbedBatcher(embed_fn=embed_fn, max_batch=1, max_wait_ms=1)
+        run_batch = b._run_batch
+        calls = []
+
+        async def dies_once(loop, batch):
+            calls.append(len(batch))
+            if len(calls) == 1:
+                raise RuntimeError("batch loop crashed")
+            await run_batch(loop, batch)
+
+        b._run_batch = dies_once
+        img = Image.new("RGB", (2, 2))
+        try:
+            first = asyncio.ensure_future(b.submit(img, b"a"))
+            queued = asyncio.ensure_future(b.submit(img, b"b"))
+            with pytest.raises(RuntimeError, match="crashed"):
+                await first
+            # The next request restarts the loop on the same queue; the queued one is served too
+            later = await asyncio.wait_for(b.submit(img, b"c"), 1)
+            return await asyncio.wait_for(queued, 1), later
+        finally:
+            await b.stop()
+
+    queued, later = asyncio.run(scenario())
+    assert queued[1] == later[1] == "v"
+
+
+def test_embed_and_batch_endpoints_agree():
+    embed_server.batcher = EmbedBatcher()
+    with TestClient(embed_server.app) as client:
+        red, blue = _png("red"), _png("blue")
+        single = client.post("/embed", files={"file": ("r.png", red, "image/png")}).json()
+        batch = client.post(
+            "/embed/batch",
+            files=[("files", ("r.png", red, "image/png")), ("files", ("b.png", blue, "image/png"))],
+        ).json()["embeddings"]
+        health = client.get("/health").json()
+    assert len(batch) == 2
+    assert batch[0]["embedding_b64"] == single["embedding_b64"]
+    assert batch[0]["shape"] == single["shape"] == [1, 256]
+    assert batch[0]["image_meta"] == {"width": 8, "height": 6, "color_space": "RGB"}
+    vec = np.frombuffer(base64.b64decode(single["embedding_b64"]), dtype=np.float32)
+    assert abs(np.linalg.norm(vec) - 1.0) < 1e-4
+    assert health["batching"]["images"] == 3
+
+
+def test_bad_image_rejected():
+    embed_server.batcher = EmbedBatcher()
+    with TestClient(embed_server.app) as client:
+        resp = client.post("/embed", files={"file": ("x.png", b"not an image", "image/png")})
+    assert resp.status_code == 400
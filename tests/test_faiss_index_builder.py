@@ -0,0 +1,117 @@
+# tests/test_faiss_index_builder.py
+"""model-dev FAISS index builder: sharded streaming build, binary metadata sidecar, recall benchmark."""
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+EVAL_DIR = REPO_ROOT / "model-dev" / "eval"
+if str(EVAL_DIR) not in sys.path:
+    sys.path.insert(0, str(EVAL_DIR))
+
+import faiss_index_builder as fib  # noqa: E402
+
+DIM = 32
+
+
+def _shards(tmp_path, sizes, seed=0):
+    rng = np.random.default_rng(seed)
+    vecs = rng.standard_normal((sum(sizes), DIM)).astype(np.float32)
+    paths, start = [], 0
+    for i, size in enumerate(sizes):
+        path = tmp_path / f"emb_{i:03d}.npy"
+        np.save(path, vecs[start:start + size])
+        paths.append(str(path))
+        start += size
+    return paths, vecs
+
+
+def _metadata(tmp_path, n):
+    path = tmp_path / "meta.jsonl"
+    path.write_text("".join(json.dumps({"id": f"case-{i}", "description": f"café {i}"}) + "\n" for i in range(n)),
+                    encoding="utf-8")
+    return str(path)
+
+
+def test_index_type_by_corpus_size():
+    assert fib.index_spec("auto", 5_000, 768) == "Flat"
+    assert fib.index_spec("auto", 50_000, 768) == "HNSW32"
+    assert fib.index_spec("auto", 1_000_000, 768) == "IVF4000,Flat"
+    assert fib.index_spec("auto", 10_000_000, 768) == "IVF12649,PQ96x8"
+    assert fib.index_spec("ivf_pq", 100_000, 36) == "IVF1264,PQ4x8"  # m must divide dim
+    with pytest.raises(ValueError):
+        fib.index_spec("lsh", 10, DIM)
+
+
+def test_build_spans_shards_in_chunks(tmp_path):
+    paths, vecs = _shards(tmp_path, [300, 250, 150])
+    shards = fib.EmbeddingShards(fib.resolve_shards([str(tmp_path)]))
+    assert shards.paths == paths and len(shards) == 700
+
+    index, spec = fib.build_index(shards, "flat", chunk_size=64)
+    assert spec == "Flat" and index.ntotal == 700
+    q = vecs[[10, 320, 699]] / np.linalg.norm(vecs[[10, 320, 699]], axis=1, keepdims=True)
+    _, ids = index.search(q, 1)
+    assert ids.ravel().tolist() == [10, 320, 699]
+
+
+def test_sidecar_round_trip_and_count_check(tmp_path):
+    rows = [{"id": f"case-{i}", "description": f"café {i}"} for i in range(5)]
+    path = str(tmp_path / "faiss_meta.bin")
+    fib.write_meta_sidecar(iter(rows), 5, path, jsonl_path=str(tmp_path / "faiss_meta.jsonl"))
+    meta = fib.MetaSidecar(path)
+    assert len(meta) == 5 and [meta[i] for i in (4, 0)] == [rows[4], rows[0]]
+    assert [json.loads(line) for line in (tmp_path / "faiss_meta.jsonl").read_text("utf-8").splitlines()] == rows
+
+    meta_path = _metadata(tmp_path, 4)
+    with pytest.raises(ValueError):
+        list(fib.iter_metadata(meta_path, 5))
+    with pytest.raises(ValueError):
+        list(fib.iter_metadata(meta_path, 3))
+
+
+def test_cli_writes_serving_files(tmp_path):
+    _shards(tmp_path, [400, 200])
+    out = tmp_path / "infra"
+    report = tmp_path / "bench.json"
+    argv = ["--embeddings", str(tmp_path / "emb_*.npy"), "--metadata", _metadata(tmp_path, 600),
+            "--output-dir", str(out), "--index-type", "hnsw", "--benchmark", "--k", "5", "--queries", "50",
+            "--report", str(report)]
+    assert fib.main(argv) == 0
+
+    assert faiss.read_index(str(out / "faiss_index.bin")).ntotal == 600
+    assert fib.MetaSidecar(str(out / "faiss_meta.bin"))[599]["id"] == "case-599"
+    assert len((out / "faiss_meta.jsonl").read_text("utf-8").splitlines()) == 600
+    assert not list(out.glob("*.tmp"))
+    result = json.loads(report.read_text())["indexes"]["hnsw"]
+    assert result["spec"] == "HNSW32" and result["recall@1"] >= 0.9
+
+
+def test_benchmark_compares_index_types(tmp_path):
+    _shards(tmp_path, [2000, 2000])
+    shards = fib.EmbeddingShards(fib.resolve_shards([str(tmp_path)]))
+    report = fib.benchmark(shards, ["flat", "ivf_flat", "ivf_pq"], k=10, n_queries=100, chunk_size=1000)
+
+    assert report["n_vectors"] == 4000 and report["exact"]["qps"] > 0
+    flat, ivf, pq = (report["indexes"][t] for t in ("flat", "ivf_flat", "ivf_pq"))
+    assert flat["recall@1"] == 1.0 and flat["recall@10"] == 1.0
+    assert ivf["spec"] == "IVF102,Flat" and ivf["recall@10"] >= 0.5
+    assert pq["spec"].endswith("PQ4x8") and pq["index_bytes"] < flat["index_bytes"]
+    # Self-matches are excluded, so lossy indexes no longer score a perfect recall@1
+    assert pq["recall@1"] < 1.0
+    assert all(r["qps"] > 0 and r["build_seconds"] >= 0 for r in report["indexes"].values())
+
+
+def test_ground_truth_excludes_self_matches(tmp_path):
+    _shards(tmp_path, [300, 200])
+    shards = fib.EmbeddingShards(fib.resolve_shards([str(tmp_path)]))
+    gt = fib.ground_truth(shards, n_queries=50, k=5)
+    assert gt["truth"].shape == (50, 5)
+    assert not (gt["truth"] == gt["rows"][:, None]).any()
@@ -0,0 +1,77 @@
+# tests/test_queue.py
+"""Redis Streams queue layer: pooled clients, bulk enqueue, background depth sampling."""
+import asyncio
+import json
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from orchestrator import queue
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    r = fakeredis.FakeRedis()
+    monkeypatch.setattr(queue, "_redis", lambda: r)
+    return r
+
+
+def test_sync_clients_share_one_pool():
+    assert queue._redis().connection_pool is queue._redis().connection_pool
+
+
+def test_enqueue_tasks_pipelines_by_priority(fake):
+    tasks = [{"task_id": f"t{i}", "priority": p} for i, p in enumerate(["urgent", "normal", "normal", "bogus"])]
+    ids = queue.enqueue_tasks(tasks)
+    assert len(ids) == 4 and all(isinstance(i, str) for i in ids)
+    assert fake.xlen("tasks:urgent") == 1
+    assert fake.xlen("tasks:normal") == 3
+    first = fake.xrange("tasks:urgent")[0]
+    assert json.loads(first[1][b"data"])["task_id"] == "t0"
+    assert queue.enqueue_tasks([]) == []
+
+
+def test_enqueue_async_variants(monkeypatch):
+    r = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(queue, "_aredis", lambda: r)
+
+    async def scenario():
+        one = await queue.enqueue_task_async({"task_id": "a", "priority": "high"})
+        many = await queue.enqueue_tasks_async([{"task_id": "b"}, {"task_id": "c"}], queue_name="tasks:low")
+        return one, many, await r.xlen("tasks:high"), await r.xlen("tasks:low")
+
+    one, many, high, low = asyncio.run(scenario())
+    assert isinstance(one, str) and len(many) == 2
+    assert (high, low) == (1, 2)
+
+
+def test_async_client_is_per_loop():
+    async def get():
+        return queue._aredis()
+
+    a, b = asyncio.run(get()), asyncio.run(get())
+    assert a is not b
+
+
+def test_depth_sampler_pipelines_xlen(fake):
+    queue.enqueue_tasks([{"task_id": "x", "priority": "urgent"}, {"task_id": "y"}])
+    seen = []
+    sampler = queue.QueueDepthSampler(["tasks:urgent", "tasks:normal", "tasks:low"], on_sample=seen.append)
+    depths = sampler.sample_once()
+    assert depths == {"tasks:urgent": 1, "tasks:normal": 1, "tasks:low": 0}
+    assert seen == [depths]
+
+
+def test_start_depth_sampler_exposes_cached_depths(fake):
+    queue.enqueue_task({"task_id": "z", "priority": "high"})
+    sampler = queue.start_depth_sampler(interval_s=60)
+    try:
+        for _ in range(50):
+            if queue.queue_depths():
+                break
+            sampler._stop.wait(0.01)
+        assert queue.queue_depths()["tasks:high"] == 1
+    finally:
+        queue.stop_depth_sampler()
+    assert queue.queue_depths() == {}
@@ -0,0 +1,148 @@
+# tests/test_retriever_agent.py
+"""RetrieverAgent: resident FAISS index, real query embeddings, append-log persistence."""
+import asyncio
+import base64
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from agent_system.agents import retriever_agent
+from agent_system.agents.retriever_agent import ReferenceIndex, RetrieverAgent, decode_embedding
+from agent_system.schemas.models import CaseInputs, CasePayload, EmbeddingData
+
+DIM = 64
+
+
+def _vectors(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+def _metas(n, start=0):
+    return [{"case_id": f"ref-{i}", "age_months": 12 + i % 24} for i in range(start, start + n)]
+
+
+def _embedding(vec, image_id="img_1"):
+    return EmbeddingData(
+        image_id=image_id,
+        model="medsiglip-base",
+        shape=[1, DIM],
+        b64=base64.b64encode(np.asarray(vec, dtype=np.float32).tobytes()).decode(),
+    )
+
+
+def _payload(*embeddings):
+    return CasePayload(
+        case_id="case_1", client_version="0.1.0", consent_id="c", age_months=18,
+        inputs=CaseInputs(), embeddings=list(embeddings),
+    )
+
+
+def test_decode_is_zero_copy_and_rejects_mock_strings():
+    vec = _vectors(1)[0]
+    arr = decode_embedding(_embedding(vec))
+    assert arr.shape == (1, DIM) and np.array_equal(arr[0], vec)
+    assert not arr.flags.owndata  # view over the decoded bytes
+    mock = EmbeddingData(image_id="x", model="m", shape=[1, 768], b64="medsiglip_base64_768_dim")
+    assert decode_embedding(mock) is None
+
+
+def test_query_uses_the_case_embedding(tmp_path):
+    index = ReferenceIndex(str(tmp_path))
+    vecs = _vectors(200)
+    index.add(vecs, _metas(200))
+    agent = RetrieverAgent(index)
+
+    for target in (7, 123):
+        noisy = vecs[target] + 0.01 * _vectors(1, seed=target)[0]
+        res = asyncio.run(agent.process(_payload(_embedding(noisy))))
+        examples = res.data["examples"]
+        assert res.success and examples[0]["case_id"] == f"ref-{target}"
+        assert examples[0]["_score"] > 0.99 and len(examples) == retriever_agent.TOP_K
+
+
+def test_appends_go_to_the_log_and_replay_on_load(tmp_path):
+    index = ReferenceIndex(str(tmp_path))
+    index.add(_vectors(50), _metas(50))
+    size_after_first = (tmp_path / "faiss_index.bin").stat().st_size
+
+    extra = _vectors(10, seed=1)
+    index.add(extra, _metas(10, start=50))
+    # The checkpoint is untouched; the new rows are in the vector log and meta file
+    assert (tmp_path / "faiss_index.bin").stat().st_size == size_after_first
+    assert (tmp_path / "faiss_vectors.log").stat().st_size == 8 + extra.nbytes  # int64 header + rows
+    assert len((tmp_path / "faiss_meta.jsonl").read_text().splitlines()) == 60
+
+    reloaded = ReferenceIndex(str(tmp_path))
+    assert reloaded.ntotal == 60
+    assert reloaded.search(extra[3])[0]["case_id"] == "ref-53"
+
+    reloaded.checkpoint()
+    assert (tmp_path / "faiss_vectors.log").stat().st_size == 8
+    assert ReferenceIndex(str(tmp_path)).search(extra[3])[0]["case_id"] == "ref-53"
+
+
+def test_crash_between_checkpoint_swap_and_log_reset(tmp_path):
+    index = ReferenceIndex(str(tmp_path))
+    index.add(_vectors(50), _metas(50))
+    extra = _vectors(10, seed=1)
+    index.add(extra, _metas(10, start=50))
+    stale_log = (tmp_path / "faiss_vectors.log").read_bytes()
+    index.checkpoint()
+    # As if the process died after os.replace(index) but before the log reset
+    (tmp_path / "faiss_vectors.log").write_bytes(stale_log)
+
+    reloaded = ReferenceIndex(str(tmp_path))
+    assert reloaded.ntotal == 60
+    assert len((tmp_path / "faiss_meta.jsonl").read_text().splitlines()) == 60
+    assert reloaded.search(extra[3])[0]["case_id"] == "ref-53"
+
+
+def test_metadata_realignment_replaces_the_file(tmp_path):
+    ReferenceIndex(str(tmp_path)).add(_vectors(5), _metas(5))
+    meta_path = tmp_path / "faiss_meta.jsonl"
+    with open(meta_path, "a") as fh:
+        fh.write('{"case_id": "orphan"}\n')
+    inode = meta_path.stat().st_ino
+    assert ReferenceIndex(str(tmp_path)).ntotal == 5
+    assert len(meta_path.read_text().splitlines()) == 5
+    assert meta_path.stat().st_ino != inode  # swapped in, never truncated under a reader
+
+
+def test_index_is_loaded_once(tmp_path, monkeypatch):
+    ReferenceIndex(str(tmp_path)).add(_vectors(20), _metas(20))
+    index = ReferenceIndex(str(tmp_path), check_interval_s=60)
+    agent = RetrieverAgent(index)
+    asyncio.run(agent.process(_payload(_embedding(_vectors(1)[0]))))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("index re-read from disk")
+
+    monkeypatch.setattr(retriever_agent.faiss, "read_index", fail)
+    for seed in range(5):
+        assert asyncio.run(agent.process(_payload(_embedding(_vectors(1, seed)[0])))).success
+
+
+@pytest.mark.parametrize("kind", ["ivf", "hnsw"])
+def test_approximate_index_types(tmp_path, kind):
+    vecs = _vectors(2000)
+    index = ReferenceIndex(str(tmp_path))
+    index.add(vecs, _metas(2000), kind=kind)
+    assert retriever_agent.index_spec(kind, 2000) != "Flat"
+    hits = sum(index.search(vecs[i], k=1)[0]["case_id"] == f"ref-{i}" for i in range(0, 2000, 50))
+    assert hits >= 36  # >= 90% of 40 exact-match queries
+    assert ReferenceIndex(str(tmp_path)).ntotal == 2000
+
+
+def test_dimension_mismatch_and_empty_index(tmp_path):
+    empty = RetrieverAgent(ReferenceIndex(str(tmp_path / "none")))
+    res = asyncio.run(empty.process(_payload(_embedding(_vectors(1)[0]))))
+    assert res.success and res.data["examples"] == []
+
+    index = ReferenceIndex(str(tmp_path))
+    index.add(_vectors(10), _metas(10))
+    other = EmbeddingData(image_id="x", model="m", shape=[1, 32],
+                          b64=base64.b64encode(np.ones(32, np.float32).tobytes()).decode())
+    res = asyncio.run(RetrieverAgent(index).process(_payload(other)))
+    assert res.success and res.data["examples"] == []
@@ -105,3 +105,58 @@ def test_route_candidates_empty_registry():
     req = {"capability": ["embed"], "priority": "normal", "payload": {}}
     best = route_candidates(req, r, top_n=3)
     assert best == []
+
+
+# --- registry index / TTL heap / ranking cache ---
+
+def test_registry_find_uses_capability_index():
+    r = AgentRegistry(ttl_seconds=300)
+    r.register("a", ["embed", "vision"], "http://a")
+    r.register("b", ["vision"], "http://b")
+    r.register("c", [], "http://c")
+    assert [a.agent_id for a in r.find(["vision"])] == ["a", "b"]
+    assert [a.agent_id for a in r.find(["embed", "vision"])] == ["a", "b"]
+    r.register("a", ["triage"], "http://a")  # capabilities replaced on re-register
+    assert [a.agent_id for a in r.find(["vision"])] == ["b"]
+    assert [a.agent_id for a in r.find(["triage"])] == ["a"]
+
+
+def test_registry_ttl_heap_expires_and_heartbeat_revives(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("orchestrator.agent_registry.time.time", lambda: clock[0])
+    r = AgentRegistry(ttl_seconds=10)
+    r.register("a", ["embed"], "http://a")
+    r.register("b", ["embed"], "http://b")
+    clock[0] += 6
+    r.heartbeat("b")
+    clock[0] += 6
+    assert [a.agent_id for a in r.find(["embed"])] == ["b"]
+    assert r.get("a") is None
+    r.heartbeat("a")
+    assert [a.agent_id for a in r.find(["embed"])] == ["a", "b"]
+
+
+def test_route_candidates_ranking_cached_until_heartbeat_change(registry_with_agents, monkeypatch):
+    import orchestrator.router as router_mod
+
+    calls = []
+    real = router_mod.score_agent
+    monkeypatch.setattr(router_mod, "score_agent", lambda *a: calls.append(1) or real(*a))
+    req = {"capability": ["embed", "vision"], "priority": "normal", "payload": {"consent_given": True}}
+    first = route_candidates(req, registry_with_agents, top_n=3)
+    scored = len(calls)
+    assert route_candidates(req, registry_with_agents, top_n=3) == first
+    assert len(calls) == scored  # served from cache
+
+    registry_with_agents.heartbeat("vision-v1", latency_ms=400)  # unchanged fields
+    route_candidates(req, registry_with_agents, top_n=3)
+    assert len(calls) == scored
+
+    assert first[0].agent_id == "embedder-v1"
+    registry_with_agents.heartbeat("embedder-v1", latency_ms=3000)
+    best = route_candidates(req, registry_with_agents, top_n=3)
+    assert len(calls) > scored
+    assert best[0].agent_id == "vision-v1"
+
+    registry_with_agents.heartbeat("vision-v1", health_status="degraded", latency_ms=400)
+    assert all(a.agent_id != "vision-v1" for a in route_candidates(req, registry_with_agents, top_n=3))
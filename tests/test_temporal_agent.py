@@ -0,0 +1,129 @@
+# tests/test_temporal_agent.py
+"""Unit tests for the ring-buffer temporal store (memory, mmap and Redis backends)."""
+import os
+
+import numpy as np
+import pytest
+
+from orchestrator.agents.temporal_agent import (
+    TemporalStore,
+    _MemoryBackend,
+    _MmapBackend,
+    _RedisBackend,
+    _cosine_distance,
+)
+
+DIM = 256
+
+
+def _vec(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+
+def test_unknown_without_history():
+    store = TemporalStore(_MemoryBackend())
+    assert store.score("c1", _vec(0)).as_tuple() == ("unknown", None, 0)
+    assert store.score("c1", None).stability == "unknown"
+
+
+def test_stability_against_all_visits():
+    store = TemporalStore(_MemoryBackend())
+    base = _vec(1)
+    store.add("c1", base)
+    assert store.score("c1", base * 3).stability == "stable"
+
+    other = _vec(2)
+    store.add("c1", other)
+    s = store.score("c1", base)
+    assert s.history_count == 2
+    assert s.last_distance == pytest.approx(_cosine_distance(base, other), abs=1e-5)
+    assert s.max_distance == pytest.approx(s.last_distance, abs=1e-5)
+    assert s.cosine_distance == pytest.approx(s.last_distance / 2, abs=1e-5)
+
+
+def test_ring_keeps_last_capacity_visits():
+    store = TemporalStore(_MemoryBackend(), capacity=3)
+    for i in range(5):
+        store.add("c1", _vec(i))
+    assert store.history_count("c1") == 3
+    # Most recent visit is _vec(4), even though its slot wrapped around
+    assert store.score("c1", _vec(4)).last_distance == pytest.approx(0.0, abs=1e-5)
+
+
+def test_score_batch_matches_single():
+    store = TemporalStore(_MemoryBackend())
+    for case in range(4):
+        for visit in range(case + 1):
+            store.add(f"c{case}", _vec(10 * case + visit))
+    ids = ["c0", "c1", "missing", "c3", "c2"]
+    queries = np.stack([_vec(100 + i) for i in range(len(ids))])
+    batch = store.score_batch(ids, queries)
+    for case_id, q, got in zip(ids, queries, batch):
+        assert got == store.score(case_id, q)
+    assert batch[2].stability == "unknown"
+    assert batch[3].history_count == 4
+
+
+def test_dim_change_resets_history():
+    store = TemporalStore(_MemoryBackend())
+    store.add("c1", _vec(0))
+    store.add("c1", np.ones(8, dtype=np.float32))
+    assert store.history_count("c1") == 1
+
+
+def test_mmap_backend_survives_restart(tmp_path):
+    store = TemporalStore(_MmapBackend(str(tmp_path)), capacity=4)
+    for i in range(6):
+        store.add("case/1", _vec(i))
+    expected = store.score("case/1", _vec(0))
+
+    reopened = TemporalStore(_MmapBackend(str(tmp_path)), capacity=4)
+    assert reopened.history_count("case/1") == 4
+    assert reopened.score("case/1", _vec(0)) == expected
+
+
+def test_mmap_backend_bounds_open_files(tmp_path):
+    fd_dir = "/proc/self/fd"
+    if not os.path.isdir(fd_dir):
+        pytest.skip("needs /proc")
+    store = TemporalStore(_MmapBackend(str(tmp_path), max_open=8), capacity=4)
+    before = len(os.listdir(fd_dir))
+    for i in range(200):
+        store.add(f"case-{i}", _vec(i))
+    assert len(os.listdir(fd_dir)) - before <= 8
+    # Evicted cases are reopened from disk
+    assert store.history_count("case-0") == 1
+    assert store.score("case-0", _vec(0)).last_distance == pytest.approx(0.0, abs=1e-5)
+
+
+def test_redis_concurrent_appends_are_not_lost():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    other = _RedisBackend(fakeredis.FakeRedis(server=server))
+
+    class Racing(_RedisBackend):
+        raced = False
+
+        def _decode(self, data):
+            # Another replica appends between this replica's read and its write
+            if not Racing.raced:
+                Racing.raced = True
+                other.append("c1", _vec(1), 4)
+            return super()._decode(data)
+
+    store = TemporalStore(Racing(fakeredis.FakeRedis(server=server)), capacity=4)
+    store.add("c1", _vec(0))
+    assert store.history_count("c1") == 2
+
+
+def test_redis_backend_shared_between_stores():
+    fakeredis = pytest.importorskip("fakeredis")
+    client = fakeredis.FakeRedis()
+    writer = TemporalStore(_RedisBackend(client))
+    reader = TemporalStore(_RedisBackend(client))
+    writer.add("c1", _vec(0))
+    writer.add("c1", _vec(1))
+    assert reader.history_count("c1") == 2
+    assert reader.score("c1", _vec(1)).last_distance == pytest.approx(0.0, abs=1e-5)
+    reader.clear()
+    assert writer.history_count("c1") == 0
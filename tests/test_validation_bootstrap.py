@@ -0,0 +1,83 @@
+"""Vectorized bootstrap CIs for ClinicalMetrics (bincount replicates, stratified, BCa, process pool)."""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+pytest.importorskip("sklearn")
+
+from src.validation import ClinicalMetrics  # noqa: E402
+from src.validation import bootstrap  # noqa: E402
+
+
+@pytest.fixture
+def labels():
+    rng = np.random.default_rng(7)
+    y_true = rng.integers(0, 4, size=2000)
+    noise = rng.random(2000) < 0.2
+    y_pred = np.where(noise, rng.integers(0, 4, size=2000), y_true)
+    return y_true, y_pred
+
+
+def test_replicates_match_explicit_resampling(labels, monkeypatch):
+    y_true, y_pred = labels
+    monkeypatch.setattr(bootstrap, "MAX_INDEX_ELEMENTS", 5000)  # force several chunks
+    reps = bootstrap.replicate_confusion_matrices(y_true * 4 + y_pred, 4, 7, seed=3)
+    rng = np.random.default_rng(3)
+    expected = []
+    # 5000 // 2000 = 2 replicates per chunk, same draw order
+    idx_all = np.concatenate([rng.integers(0, 2000, size=(c, 2000)) for c in (2, 2, 2, 1)])
+    for idx in idx_all:
+        cm = np.zeros((4, 4), dtype=int)
+        np.add.at(cm, (y_true[idx], y_pred[idx]), 1)
+        expected.append(cm)
+    np.testing.assert_array_equal(reps, np.array(expected))
+
+
+def test_point_metrics_match_existing_properties(labels):
+    m = ClinicalMetrics(*labels)
+    vals = bootstrap.confusion_metrics(m.confusion_matrix, m.labels)
+    binary = m.binary_sensitivity_specificity()
+    for key in ("sensitivity", "specificity", "ppv", "npv"):
+        assert vals[key] == pytest.approx(binary[key])
+    for label in m.labels:
+        assert vals[f"sensitivity_{label}"] == pytest.approx(m.sensitivity_by_risk[label])
+        assert vals[f"specificity_{label}"] == pytest.approx(m.specificity_by_risk[label])
+
+
+def test_percentile_cis_agree_with_legacy_loop(labels):
+    m = ClinicalMetrics(*labels)
+    cis = m.bootstrap_metric_cis(n_bootstrap=2000, random_state=0)
+    _, lo, hi = m.bootstrap_ci(lambda x: x.binary_sensitivity_specificity()["sensitivity"], n_bootstrap=400, random_state=1)
+    point, vlo, vhi = cis["sensitivity"]
+    assert vlo < point < vhi
+    assert vlo == pytest.approx(lo, abs=0.01) and vhi == pytest.approx(hi, abs=0.01)
+    assert {"ppv_refer", "npv_on_track", "specificity_monitor"} <= set(cis)
+
+
+def test_bca_and_stratified_intervals(labels):
+    m = ClinicalMetrics(*labels)
+    bca = m.bootstrap_metric_cis(n_bootstrap=1000, method="bca", random_state=0)
+    strat = m.bootstrap_metric_cis(n_bootstrap=1000, stratified=True, random_state=0)
+    for cis in (bca, strat):
+        for point, lo, hi in cis.values():
+            assert lo <= point + 1e-9 and point - 1e-9 <= hi
+    reps = bootstrap.bootstrap_confusion_matrices(*labels, 4, n_bootstrap=50, stratified=True, random_state=0)
+    np.testing.assert_array_equal(reps.sum(axis=2), np.broadcast_to(m.confusion_matrix.sum(axis=1), (50, 4)))
+    with pytest.raises(ValueError):
+        m.bootstrap_metric_cis(n_bootstrap=10, method="bogus")
+
+
+def test_process_pool_and_compute_all(labels):
+    m = ClinicalMetrics(*labels)
+    a = bootstrap.bootstrap_confusion_matrices(*labels, 4, n_bootstrap=40, random_state=5, n_jobs=2)
+    b = bootstrap.bootstrap_confusion_matrices(*labels, 4, n_bootstrap=40, random_state=5, n_jobs=2)
+    assert a.shape == (40, 4, 4)
+    np.testing.assert_array_equal(a, b)
+    out = m.compute_all(n_bootstrap=200, random_state=0)
+    assert len(out["sensitivity_ci_95"]) == 2 and "sensitivity_refer" in out["ci_95"]
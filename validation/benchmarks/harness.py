@@ -0,0 +1,298 @@
+"""
+Model-in-the-loop benchmark harness.
+
+Replays gold-holdout cases through the real inference path at a fixed
+concurrency and records end-to-end latency plus per-stage timings reported by
+the backend (decode, prompt, model, parse, evidence, audit). Targets:
+
+  api     in-process FastAPI app with the /api/infer router (full request path)
+  engine  pedi_screen InferenceEngine.infer -> MedGemmaService (no HTTP layer)
+  url     a running server's /api/infer
+
+For api/engine, MedGemmaService is pointed at an HF-compatible model server via
+HF_INFERENCE_URL (the local stub in stub_model_server.py by default).
+Reports are plain JSON (schema BENCHMARK_SCHEMA) so runs from different commits
+can be diffed with compare_reports().
+"""
+import asyncio
+import base64
+import hashlib
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+BACKEND = ROOT / "backend"
+
+BENCHMARK_SCHEMA = "pediscreen.benchmark/v1"
+STAGES = ("decode", "prompt", "model", "parse", "evidence", "audit")
+# Model risk vocabulary -> gold holdout class index (on_track, monitor, discuss, refer)
+RISK_TO_CLASS = {"on_track": 0, "low": 0, "monitor": 1, "discuss": 2, "high": 2, "refer": 3}
+
+Send = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+def case_embedding_b64(case_id: str, dim: int = 256) -> str:
+    """Deterministic L2-normalized float32 embedding for a case (stands in for MedSigLIP output)."""
+    seed = int.from_bytes(hashlib.sha256(case_id.encode()).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    vec /= np.linalg.norm(vec)
+    return base64.b64encode(vec.tobytes()).decode("ascii")
+
+
+def build_requests(cases: Sequence[Dict[str, Any]], dim: int = 256) -> List[Dict[str, Any]]:
+    """/api/infer payloads for gold-holdout rows (case_id, age_months, observations)."""
+    return [
+        {
+            "case_id": str(c["case_id"]),
+            "age_months": int(c["age_months"]),
+            "observations": str(c.get("observations") or ""),
+            "embedding_b64": case_embedding_b64(str(c["case_id"]), dim),
+            "shape": [1, dim],
+            "emb_version": "benchmark-synthetic",
+        }
+        for c in cases
+    ]
+
+
+def latency_summary(values: Sequence[float]) -> Dict[str, float]:
+    if not values:
+        return {"n": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    arr = np.asarray(values, dtype=np.float64)
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {
+        "n": int(arr.size),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "mean": round(float(arr.mean()), 3),
+        "max": round(float(arr.max()), 3),
+    }
+
+
+async def replay(
+    payloads: Sequence[Dict[str, Any]],
+    send: Send,
+    concurrency: int = 8,
+) -> Tuple[List[Dict[str, Any]], float]:
+    """
+    Send every payload with at most `concurrency` in flight.
+    Returns (records in payload order, wall seconds).
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+    records: List[Optional[Dict[str, Any]]] = [None] * len(payloads)
+
+    async def one(i: int, payload: Dict[str, Any]) -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                resp = await send(payload)
+                error = None
+            except Exception as e:
+                resp, error = {}, f"{type(e).__name__}: {e}"[:300]
+            records[i] = {
+                "case_id": payload["case_id"],
+                "latency_ms": (time.perf_counter() - t0) * 1000,
+                "stage_ms": resp.get("stage_ms") or {},
+                "risk": (resp.get("result") or {}).get("risk"),
+                "error": error,
+            }
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i, p) for i, p in enumerate(payloads)))
+    return records, time.perf_counter() - t0
+
+
+def git_revision(cwd: Path = ROOT) -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=cwd, capture_output=True, text=True, timeout=10
+        )
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def summarize(records: Sequence[Dict[str, Any]], wall_s: float, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Machine-readable performance report for one run."""
+    ok = [r for r in records if not r["error"]]
+    stages = {}
+    for stage in STAGES:
+        vals = [r["stage_ms"][stage] for r in ok if stage in r["stage_ms"]]
+        if vals:
+            stages[stage] = latency_summary(vals)
+    errors = [r for r in records if r["error"]]
+    return {
+        "schema": BENCHMARK_SCHEMA,
+        "git_rev": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": config,
+        "requests": len(records),
+        "errors": len(errors),
+        "error_samples": sorted({r["error"] for r in errors})[:5],
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(ok) / wall_s, 2) if wall_s else 0.0,
+        "latency_ms": latency_summary([r["latency_ms"] for r in ok]),
+        "stages_ms": stages,
+    }
+
+
+def compare_reports(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Metric-by-metric comparison against a baseline report.
+    delta_pct > 0 means slower (latency) or faster (throughput_rps).
+    """
+    pairs = [("throughput_rps", current.get("throughput_rps"), baseline.get("throughput_rps"))]
+    for q in ("p50", "p95", "p99"):
+        pairs.append((f"latency_ms.{q}", current["latency_ms"].get(q), baseline.get("latency_ms", {}).get(q)))
+    for stage, cur in current.get("stages_ms", {}).items():
+        base = baseline.get("stages_ms", {}).get(stage, {})
+        for q in ("p50", "p95"):
+            pairs.append((f"stages_ms.{stage}.{q}", cur.get(q), base.get(q)))
+    rows = []
+    for name, cur, base in pairs:
+        if cur is None or base is None:
+            continue
+        delta = (cur - base) / base * 100 if base else 0.0
+        rows.append({"metric": name, "baseline": base, "current": cur, "delta_pct": round(delta, 1)})
+    return rows
+
+
+def regressions(rows: Sequence[Dict[str, Any]], max_pct: float) -> List[Dict[str, Any]]:
+    """Rows that got worse by more than max_pct (lower throughput, higher latency)."""
+    out = []
+    for row in rows:
+        worse = -row["delta_pct"] if row["metric"] == "throughput_rps" else row["delta_pct"]
+        if worse > max_pct:
+            out.append(row)
+    return out
+
+
+# -------------------------
+# Targets
+# -------------------------
+def _backend_on_path() -> None:
+    # backend/app must win over the repo-root app package
+    path = str(BACKEND)
+    if path in sys.path:
+        sys.path.remove(path)
+    sys.path.insert(0, path)
+
+
+def _service(model_url: str, concurrency: int):
+    _backend_on_path()
+    from app.services.medgemma_service import MedGemmaService
+
+    return MedGemmaService({
+        "HF_MODEL": "benchmark-stub",
+        "HF_API_KEY": "benchmark",
+        "HF_INFERENCE_URL": model_url,
+        # Measure the model path, not the prompt cache
+        "RESPONSE_CACHE_ENABLED": False,
+        "HTTP_MAX_CONNECTIONS": max(64, concurrency),
+        "HTTP_MAX_KEEPALIVE": max(32, concurrency),
+    })
+
+
+def _json_or_raise(resp) -> Dict[str, Any]:
+    if resp.status_code != 200:
+        raise RuntimeError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+    return resp.json()
+
+
+@asynccontextmanager
+async def api_target(model_url: str, concurrency: int, api_key: str) -> AsyncIterator[Send]:
+    """In-process app with the /api/infer router and a MedGemmaService on model_url."""
+    import httpx
+
+    svc = _service(model_url, concurrency)
+    from fastapi import FastAPI
+    from app.api import infer
+    from app.services.medgemma_provider import get_medgemma_service
+
+    app = FastAPI()
+    app.include_router(infer.router)
+    app.dependency_overrides[get_medgemma_service] = lambda: svc
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120.0)
+
+    async def send(payload: Dict[str, Any]) -> Dict[str, Any]:
+        return _json_or_raise(await client.post("/api/infer", json=payload, headers={"X-API-Key": api_key}))
+
+    try:
+        yield send
+    finally:
+        await client.aclose()
+        await svc.close()
+
+
+@asynccontextmanager
+async def engine_target(model_url: str, concurrency: int, api_key: str = "") -> AsyncIterator[Send]:
+    """InferenceEngine.infer with a MedGemmaService on model_url (no HTTP layer, no audit)."""
+    svc = _service(model_url, concurrency)
+    if str(ROOT) not in sys.path:
+        sys.path.append(str(ROOT))
+    from pedi_screen.medgemma_core.inference_engine import InferenceEngine
+
+    engine = InferenceEngine(service=svc)
+
+    async def send(payload: Dict[str, Any]) -> Dict[str, Any]:
+        return await engine.infer(**payload)
+
+    try:
+        yield send
+    finally:
+        await svc.close()
+
+
+@asynccontextmanager
+async def url_target(url: str, concurrency: int, api_key: str) -> AsyncIterator[Send]:
+    """A running server; the model behind it is whatever that server is configured with."""
+    import httpx
+
+    limits = httpx.Limits(max_connections=max(1, concurrency))
+    async with httpx.AsyncClient(base_url=url, timeout=120.0, limits=limits) as client:
+
+        async def send(payload: Dict[str, Any]) -> Dict[str, Any]:
+            return _json_or_raise(await client.post("/api/infer", json=payload, headers={"X-API-Key": api_key}))
+
+        yield send
+
+
+async def run_benchmark(
+    cases: Sequence[Dict[str, Any]],
+    target: str = "api",
+    concurrency: int = 8,
+    model_url: Optional[str] = None,
+    url: Optional[str] = None,
+    api_key: str = "dev-example-key",
+    warmup: int = 2,
+    config: Optional[Dict[str, Any]] = None,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Replay cases against a target. Returns (report, per-case records).
+    `warmup` requests are sent first and excluded from the report.
+    """
+    payloads = build_requests(cases)
+    if target == "api":
+        ctx = api_target(model_url, concurrency, api_key)
+    elif target == "engine":
+        ctx = engine_target(model_url, concurrency, api_key)
+    elif target == "url":
+        if not url:
+            raise ValueError("target 'url' requires url")
+        ctx = url_target(url, concurrency, api_key)
+    else:
+        raise ValueError(f"Unknown benchmark target: {target!r}")
+    async with ctx as send:
+        if warmup:
+            await replay([dict(p, case_id=f"warmup-{i}") for i, p in enumerate(payloads[:warmup])], send, warmup)
+        records, wall_s = await replay(payloads, send, concurrency)
+    cfg = {"target": target, "concurrency": concurrency, "cases": len(payloads), "warmup": warmup}
+    cfg.update(config or {})
+    return summarize(records, wall_s, cfg), records
@@ -2,11 +2,22 @@
 """
 Run clinical validation benchmark against gold holdout.
 
+Predictions come from the real inference path (see harness.py): by default the
+in-process /api/infer router backed by MedGemmaService and a local stub model
+server. Latency/throughput go to benchmark_perf.json alongside the clinical
+reports; pass --compare to diff against a report from another commit.
+
 Usage:
   PYTHONPATH=. python validation/benchmarks/run_benchmark.py
   PYTHONPATH=. python validation/benchmarks/run_benchmark.py --gold-path validation/datasets/gold_holdout.csv
+  PYTHONPATH=. python validation/benchmarks/run_benchmark.py --concurrency 32 --model-latency-ms 200
+  PYTHONPATH=. python validation/benchmarks/run_benchmark.py --target url --url http://localhost:8000
+  PYTHONPATH=. python validation/benchmarks/run_benchmark.py --compare baseline_perf.json --max-regression-pct 10
 """
 import argparse
+import asyncio
+import json
+import os
 import sys
 from pathlib import Path
 
@@ -19,6 +30,8 @@ import numpy as np
 import pandas as pd
 
 from src.validation import ClinicalMetrics, SafetyMetrics, ValidationReport
+from validation.benchmarks import harness
+from validation.benchmarks.stub_model_server import StubModelServer
 
 
 def load_gold_holdout(path: Path) -> pd.DataFrame:
@@ -47,6 +60,26 @@ def main():
         action="store_true",
         help="Use mock predictions (for CI without model)",
     )
+    parser.add_argument(
+        "--target",
+        choices=("api", "engine", "url"),
+        default="api",
+        help="api: in-process /api/infer; engine: InferenceEngine.infer; url: running server",
+    )
+    parser.add_argument("--url", default=None, help="Server base URL for --target url")
+    parser.add_argument("--model-url", default=None, help="HF-compatible model server (default: start local stub)")
+    parser.add_argument("--model-latency-ms", type=float, default=50.0, help="Stub model latency per call")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight")
+    parser.add_argument("--limit", type=int, default=None, help="Only replay the first N cases")
+    parser.add_argument("--api-key", default="dev-example-key")
+    parser.add_argument("--perf-output", type=Path, default=None, help="Default: <output-dir>/benchmark_perf.json")
+    parser.add_argument("--compare", type=Path, default=None, help="Baseline benchmark_perf.json to diff against")
+    parser.add_argument(
+        "--max-regression-pct",
+        type=float,
+        default=None,
+        help="With --compare: exit 1 if any latency/throughput metric regresses by more than this",
+    )
     args = parser.parse_args()
 
     if not args.gold_path.exists():
@@ -55,6 +88,8 @@ def main():
         sys.exit(1)
 
     df = load_gold_holdout(args.gold_path)
+    if args.limit:
+        df = df.head(args.limit)
     risk_map = {"on_track": 0, "monitor": 1, "discuss": 2, "refer": 3}
     y_true = np.array([risk_map.get(str(r).lower(), 0) for r in df["clinician_risk"]])
 
@@ -71,8 +106,14 @@ def main():
         mask = np.random.random(len(y_true)) < 0.1
         y_pred[mask] = np.clip(y_true[mask] + np.random.randint(-1, 2, mask.sum()), 0, 3)
     else:
-        # TODO: Call inference API for real predictions
-        y_pred = y_true.copy()  # Placeholder
+        perf, records = run_inference(df, args)
+        y_pred = np.array([harness.RISK_TO_CLASS.get(str(r["risk"]).lower(), 1) for r in records])
+        ok = np.array([not r["error"] for r in records])
+        if not ok.all():
+            print(f"{(~ok).sum()} inference errors (excluded from clinical metrics): {perf['error_samples']}")
+            df, y_true, y_pred = df[ok].reset_index(drop=True), y_true[ok], y_pred[ok]
+        if not ok.any():
+            sys.exit(1)
 
     # Clinical metrics
     metrics = ClinicalMetrics(y_true, y_pred)
@@ -99,6 +140,53 @@ def main():
     print(f"Specificity: {acc['specificity']:.2%}")
     print(f"False Negatives (refer): {fn['count']} (rate: {fn['false_negative_rate']:.2%})")
     print(f"Reports written to {args.output_dir}/")
+    if not args.mock_predictions:
+        return report_performance(perf, args)
+    return 0
+
+
+def run_inference(df: pd.DataFrame, args):
+    """Replay the holdout through the configured target; writes the perf report."""
+    cases = df[["case_id", "age_months", "observations"]].to_dict("records")
+    # Audit writes are part of the measured path; keep them out of the working tree
+    os.environ.setdefault("AUDIT_LOG_PATH", str(args.output_dir / "audit.log"))
+    os.environ.setdefault("INFRA_AUDIT_PATH", str(args.output_dir / "infra_audit.log"))
+    config = {"model_latency_ms": args.model_latency_ms if args.target != "url" and not args.model_url else None}
+    kwargs = dict(target=args.target, concurrency=args.concurrency, url=args.url, api_key=args.api_key, config=config)
+    if args.target == "url" or args.model_url:
+        perf, records = asyncio.run(harness.run_benchmark(cases, model_url=args.model_url, **kwargs))
+    else:
+        with StubModelServer(latency_ms=args.model_latency_ms) as stub:
+            perf, records = asyncio.run(harness.run_benchmark(cases, model_url=stub.url, **kwargs))
+    out = args.perf_output or args.output_dir / "benchmark_perf.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(perf, indent=2), encoding="utf-8")
+    return perf, records
+
+
+def report_performance(perf: dict, args) -> int:
+    lat = perf["latency_ms"]
+    print("\n=== Inference Performance ===")
+    print(
+        f"target={perf['config']['target']} concurrency={perf['config']['concurrency']} "
+        f"requests={perf['requests']} errors={perf['errors']}"
+    )
+    print(f"Throughput: {perf['throughput_rps']:.1f} req/s")
+    print(f"Latency: p50={lat['p50']:.1f}ms p95={lat['p95']:.1f}ms p99={lat['p99']:.1f}ms")
+    for stage, s in perf["stages_ms"].items():
+        print(f"  {stage:<9} p50={s['p50']:>8.2f}ms p95={s['p95']:>8.2f}ms p99={s['p99']:>8.2f}ms")
+    if not args.compare:
+        return 0
+    baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+    rows = harness.compare_reports(perf, baseline)
+    print(f"\nvs {args.compare} (git_rev={baseline.get('git_rev')}):")
+    for row in rows:
+        print(f"  {row['metric']:<24} {row['baseline']:>10.2f} -> {row['current']:>10.2f} ({row['delta_pct']:+.1f}%)")
+    if args.max_regression_pct is not None:
+        bad = harness.regressions(rows, args.max_regression_pct)
+        if bad:
+            print(f"Regressions over {args.max_regression_pct}%: {', '.join(r['metric'] for r in bad)}")
+            return 1
     return 0
 
 
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Local stub of the Hugging Face text-generation API for benchmarks.
+
+Answers POST /models/<name> with a canonical ===BEGIN_OUTPUT=== block after a
+fixed latency, so MedGemmaService runs its real HTTP, parse and evidence path
+without a GPU or network. The risk is derived from a hash of the prompt: it is
+deterministic but carries no clinical signal.
+
+Usage:
+  python validation/benchmarks/stub_model_server.py --port 8081 --latency-ms 50
+  HF_INFERENCE_URL=http://127.0.0.1:8081 HF_MODEL=stub HF_API_KEY=stub uvicorn app.main:app
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+RISKS = ["on_track", "monitor", "discuss", "refer"]
+
+
+def stub_output(prompt: str) -> str:
+    """Canonical model output for a prompt (same prompt, same output)."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    risk = RISKS[digest[0] % len(RISKS)]
+    body = {
+        "summary": [f"Stub assessment ({risk})."],
+        "risk": risk,
+        "parent_text": "Stub response for benchmarking.",
+        "recommendations": ["Re-screen in 3 months"],
+        "explain": "Deterministic stub model.",
+        "reasoning_chain": ["Stub model: no clinical reasoning."],
+        "confidence": round(0.5 + digest[1] / 512, 3),
+    }
+    return f"===BEGIN_OUTPUT===\n{json.dumps(body)}\n===END_OUTPUT==="
+
+
+class StubModelServer:
+    """Threaded HTTP stub; use as a context manager or call start()/stop()."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0):
+        self.latency_s = latency_ms / 1000.0
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if server.latency_s:
+                    time.sleep(server.latency_s)
+                server.requests += 1
+                data = json.dumps([{"generated_text": stub_output(str(payload.get("inputs", "")))}]).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubModelServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-model", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubModelServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub HF-compatible model server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Simulated model latency per request")
+    args = parser.parse_args()
+    server = StubModelServer(args.host, args.port, args.latency_ms)
+    print(f"Stub model server on {server.url} (latency {args.latency_ms} ms)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())